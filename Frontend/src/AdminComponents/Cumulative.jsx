@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import api from "../api/axios";
+import { postJob } from "../api/jobs";
 
 const months = [
   "April", "May", "June", "July",
@@ -114,7 +115,7 @@ const Cumulative = () => {
       
       formData.append('skipFirstRow', skipFirstRow);
 
-      const response = await api.post('/cumulative/api/download', formData, {
+      const response = await postJob(api, '/cumulative/api/download', formData, {
         headers: {
           'Content-Type': 'multipart/form-data',
         },
@@ -191,7 +191,8 @@ const CustomerManager = ({ onDataUpdated }) => {
         custNameCol,
       };
       
-      await api.post("/bulk-assign-customers", payload);
+      const res = await api.post("/bulk-assign-customers", payload);
+      const { inserted = 0, updated = 0, skipped = 0 } = res.data || {};
 
       await fetchCustomers();
       await fetchUnmapped();
@@ -200,7 +201,7 @@ const CustomerManager = ({ onDataUpdated }) => {
         onDataUpdated();
       }
 
-      setSuccessMessage(`Bulk assignment complete! Processed ${sheetData.length} customer records successfully.`);
+      setSuccessMessage(`Bulk assignment complete! ${inserted} customers added, ${updated} updated, ${skipped} rows skipped.`);
       
       // Reset form after successful processing
       setSheetData([]);
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { postJob } from '../api/jobs';
 import { getAllReportsForPPT, clearConsolidatedReports } from '../utils/consolidatedStorage';
 
 const ConsolidatedReportPanel = () => {
@@ -296,7 +297,7 @@ const ConsolidatedReportPanel = () => {
       // Choose API endpoint based on report type
       if (reportType === 'branch') {
         // Use branch route for branch reports
-        response = await axios.post('http://localhost:5000/api/branch/generate_consolidated_branch_ppt', {
+        response = await postJob(axios, 'http://localhost:5000/api/branch/generate_consolidated_branch_ppt', {
           allDfsInfo: reportsForBackend, // Branch route expects 'allDfsInfo'
           reportTitle: reportTitle
         }, {
@@ -307,7 +308,7 @@ const ConsolidatedReportPanel = () => {
         });
       } else {
         // Use executive route for executive reports
-        response = await axios.post('http://localhost:5000/api/executive/generate_consolidated_ppt', {
+        response = await postJob(axios, 'http://localhost:5000/api/executive/generate_consolidated_ppt', {
           reports_data: reportsForBackend, // Executive route expects 'reports_data'
           title: reportTitle,
           logo_file: null
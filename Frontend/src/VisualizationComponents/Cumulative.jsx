@@ -1,4 +1,5 @@
 import React, { useState } from 'react';
+import { fetchJob } from '../api/jobs';
 
 const months = [
   "April", "May", "June", "July", 
@@ -126,7 +127,7 @@ const App = () => {
       
       formData.append('skipFirstRow', skipFirstRow.toString());
 
-      const response = await fetch(`${API_BASE_URL}/api/download`, {
+      const response = await fetchJob(`${API_BASE_URL}/api/download`, {
         method: 'POST',
         body: formData,
         credentials: 'include',
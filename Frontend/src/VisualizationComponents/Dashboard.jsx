@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useRef, useMemo } from 'react';
 import axios from 'axios';
+import { postJob } from '../api/jobs';
 import Plot from 'react-plotly.js';
 import * as XLSX from 'xlsx';
 import './App.css';
@@ -143,7 +144,7 @@ const api = {
   },
   generateMasterPPT: async (data) => {
     try {
-      const response = await axios.post("http://localhost:5003/download-master-ppt", data, {
+      const response = await postJob(axios, "http://localhost:5003/download-master-ppt", data, {
         responseType: 'blob',
         headers: {
           'Content-Type': 'application/json'
@@ -169,7 +170,7 @@ const api = {
 function Dashboard() {
     // State management
       const [uploadedFile, setUploadedFile] = useState(null);
-      const [fileData, setFileData] = useState(null);
+      const [datasetId, setDatasetId] = useState(null);
       const [sheetNames, setSheetNames] = useState([]);
       const [selectedSheet, setSelectedSheet] = useState('');
       const [tableData, setTableData] = useState(null);
@@ -351,20 +352,9 @@ function Dashboard() {
         }
         setSheetType(detectedSheetType);
 
-        // Initialize FileReader
-        const reader = new FileReader();
-        reader.onload = (e) => {
-          const arrayBuffer = e.target.result;
-          const bytes = new Uint8Array(arrayBuffer);
-          let binary = '';
-          for (let i = 0; i < bytes.byteLength; i++) {
-            binary += String.fromCharCode(bytes[i]);
-          }
-          const base64String = btoa(binary);
-          setFileData(base64String);
-          setProcessingProgress(100);
-        };
-        reader.readAsArrayBuffer(file);
+        // The workbook now lives server-side; later calls only send its ID
+        setDatasetId(result.dataset_id);
+        setProcessingProgress(100);
       } catch (err) {
         setError(err.message);
       } finally {
@@ -374,7 +364,7 @@ function Dashboard() {
     
       // Process sheet data
       useEffect(() => {
-        if (!fileData || !selectedSheet) return;
+        if (!datasetId || !selectedSheet) return;
     
         const processSheet = async () => {
           setIsProcessing(true); // Only set processing state
@@ -404,7 +394,7 @@ function Dashboard() {
           try {
             setProcessingProgress(20);
             const result = await api.processSheet({
-              file_data: fileData,
+              dataset_id: datasetId,
               sheet_name: selectedSheet,
               table_choice: tableChoice || undefined,
             });
@@ -474,7 +464,7 @@ function Dashboard() {
         };
     
         processSheet();
-      }, [fileData, selectedSheet, tableChoice]);
+      }, [datasetId, selectedSheet, tableChoice]);
     
       const processedData = useMemo(() => {
         if (!tableData || !tableData.data) return [];
@@ -1817,34 +1807,23 @@ function Dashboard() {
       try {
         setIsLoading(true);
         
-        // Prepare data exactly as shown in the table
-        const csvData = processedData.map(row => {
-          const csvRow = {};
-          tableData.columns.forEach(col => {
-            // Preserve the exact formatting from the table
-            const value = row[col];
-            if (value === null || value === undefined || value === 'NaN') {
-              csvRow[col] = '';
-            } else {
-              // Check if the value is numeric
-              const numValue = parseFloat(String(value).replace(/,/g, ''));
-              if (!isNaN(numValue)) {
-                // Format numbers with commas and 2 decimal places if needed
-                csvRow[col] = numValue % 1 === 0 ? 
-                  numValue.toLocaleString() : 
-                  numValue.toLocaleString(undefined, {minimumFractionDigits: 2, maximumFractionDigits: 2});
-              } else {
-                // Keep strings as-is
-                csvRow[col] = String(value);
-              }
-            }
-          });
-          return csvRow;
-        });
+        // The table lives server-side; send its ID plus the preview's row filters,
+        // the backend formats the rows exactly as shown in the table
+        const firstColumn = tableData.columns[0];
+        const rowFilters = [];
+        if (isBranchAnalysis && selectedBranch !== 'Select All') {
+          rowFilters.push({ column: firstColumn, value: selectedBranch });
+        }
+        if (isProductAnalysis && selectedProduct !== 'Select All') {
+          rowFilters.push({ column: firstColumn, value: selectedProduct });
+        }
     
         const payload = {
-          table_data: csvData,
+          dataset_id: datasetId,
+          sheet_name: selectedSheet,
+          table_choice: tableChoice || undefined,
           columns: tableData.columns,
+          row_filters: rowFilters,
           filename: `${tableName || 'data'}_${new Date().toISOString().slice(0,10)}.csv`
         };
     
@@ -12,6 +12,7 @@ import {
   AlertCircle,
   Info
 } from 'lucide-react';
+import { fetchJob } from '../api/jobs';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000/api';
 
@@ -275,7 +276,7 @@ const EROPWAnalysis = ({
 
       addMessage('Processing ERO-PW analysis...', 'info');
 
-      const response = await fetch(`${API_BASE_URL}/ero-pw/process-ero-pw`, {
+      const response = await fetchJob(`${API_BASE_URL}/ero-pw/process-ero-pw`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json'
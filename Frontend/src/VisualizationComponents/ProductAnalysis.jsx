@@ -14,6 +14,7 @@ import {
   Save,
   FileSpreadsheet
 } from 'lucide-react';
+import { fetchJob } from '../api/jobs';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000/api';
 
@@ -384,7 +385,7 @@ const ProductAnalysis = ({
 
       addMessage('Processing Product-wise analysis...', 'info');
 
-      const response = await fetch(`${API_BASE_URL}/product/process`, {
+      const response = await fetchJob(`${API_BASE_URL}/product/process`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json'
@@ -4,6 +4,7 @@ import {
   RefreshCw,
   Eye
 } from 'lucide-react';
+import { fetchJob } from '../api/jobs';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000/api';
 
@@ -261,7 +262,7 @@ const RegionAnalysis = ({
 
       addMessage('🔄 Processing Region-wise analysis...', 'info');
 
-      const response = await fetch(`${API_BASE_URL}/region/process-region-analysis`, {
+      const response = await fetchJob(`${API_BASE_URL}/region/process-region-analysis`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json'
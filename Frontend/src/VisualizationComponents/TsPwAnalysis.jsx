@@ -13,6 +13,7 @@ import {
   AlertCircle,
   Info
 } from 'lucide-react';
+import { fetchJob } from '../api/jobs';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000/api';
 
@@ -278,7 +279,7 @@ const TSPWAnalysis = ({
 
       addMessage('Processing TS-PW analysis...', 'info');
 
-      const response = await fetch(`${API_BASE_URL}/ts-pw/process-ts-pw`, {
+      const response = await fetchJob(`${API_BASE_URL}/ts-pw/process-ts-pw`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json'
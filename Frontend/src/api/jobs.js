@@ -0,0 +1,75 @@
+// Heavy report endpoints (region / TS-PW / ERO-PW / product analysis, the
+// consolidated PPTs, the cumulative download) can run as background jobs on
+// the server: asked with ?async=1 / "Prefer: respond-async" they answer 202
+// with a job id instead of holding the request open until a proxy times out.
+// These helpers submit the request that way, poll /api/jobs/<id> until the
+// job finishes and then fetch /api/jobs/<id>/result, which is the response
+// the endpoint would have returned directly. Callers handle it exactly as
+// before. A server that answers synchronously is passed through unchanged.
+
+const POLL_INTERVAL_MS = 1000;
+const FINISHED = ['succeeded', 'failed', 'cancelled'];
+const ASYNC_HEADERS = { Prefer: 'respond-async' };
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const withAsyncFlag = (url) => `${url}${url.includes('?') ? '&' : '?'}async=1`;
+
+// Job URLs are paths on the server the request went to
+const resolveOn = (requestUrl, path) =>
+  new URL(path, new URL(requestUrl, window.location.href)).toString();
+
+async function waitForJob(statusUrl, getStatus, onProgress) {
+  for (;;) {
+    const status = await getStatus(statusUrl);
+    if (onProgress) onProgress(status);
+    if (FINISHED.includes(status.status)) return status;
+    await sleep(POLL_INTERVAL_MS);
+  }
+}
+
+function jobError(status) {
+  return new Error(status.error || `Background job ${status.status}`);
+}
+
+// fetch(url, options) run as a background job; resolves to the endpoint's Response.
+// onProgress receives each polled status ({status, progress, message, ...}).
+export async function fetchJob(url, options = {}, onProgress) {
+  const response = await fetch(withAsyncFlag(url), {
+    ...options,
+    headers: { ...(options.headers || {}), ...ASYNC_HEADERS },
+  });
+  if (response.status !== 202) return response;
+
+  const job = await response.json();
+  const status = await waitForJob(resolveOn(url, job.status_url), async (statusUrl) => {
+    const reply = await fetch(statusUrl, { credentials: options.credentials });
+    if (!reply.ok) throw new Error(`Could not read job status (HTTP ${reply.status})`);
+    return reply.json();
+  }, onProgress);
+  if (!status.result_url) throw jobError(status);
+  return fetch(resolveOn(url, status.result_url), { credentials: options.credentials });
+}
+
+// client.post(url, data, config) for an axios client, run as a background job;
+// resolves (or rejects) like the direct post would, with the same responseType.
+export async function postJob(client, url, data, config = {}, onProgress) {
+  const response = await client.post(url, data, {
+    ...config,
+    params: { ...(config.params || {}), async: 1 },
+    headers: { ...(config.headers || {}), ...ASYNC_HEADERS },
+  });
+  if (response.status !== 202) return response;
+
+  const job = response.data instanceof Blob ? JSON.parse(await response.data.text()) : response.data;
+  const base = client.getUri({ ...config, url });
+  const follow = { withCredentials: config.withCredentials };
+  const status = await waitForJob(resolveOn(base, job.status_url),
+    async (statusUrl) => (await client.get(statusUrl, follow)).data, onProgress);
+  if (!status.result_url) throw jobError(status);
+  return client.get(resolveOn(base, status.result_url), {
+    ...follow,
+    responseType: config.responseType,
+    timeout: config.timeout,
+  });
+}
@@ -26,6 +26,8 @@ from routes.sales_routes import sales_bp
 from routes.os_processing_routes import os_bp
 from routes.branch_routes import branch_bp
 from routes.executive_routes import executive_bp
+from routes.job_routes import jobs_bp
+from routes.stats_routes import all_cache_stats, stats_bp
 
 # This is your cumulative routes - make sure this file exists and has the right exports
 from routes.cumulative_routes import api_bp
@@ -45,6 +47,7 @@ from routes.auditor.upload_routes import upload_bp
 
 from routes.dashboard.main_routes import main_bp
 from routes.routes import api1_bp
+from models.migrations import apply_schema_migrations
 
 def create_app():
     app = Flask(__name__)
@@ -55,6 +58,15 @@ def create_app():
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
     
     db.init_app(app)
+
+    # Bring indexes/unique constraints on existing tables up to the models (idempotent)
+    with app.app_context():
+        try:
+            created = apply_schema_migrations()
+            if created:
+                logger.info(f"Applied schema migrations: {', '.join(created)}")
+        except Exception as e:
+            logger.warning(f"Skipping schema migrations: {e}")
     
     # FIXED CORS configuration - Allow both 3000 and 3001 ports and any local development
     CORS(app, resources={
@@ -69,7 +81,7 @@ def create_app():
                 "http://13.201.218.4"
             ],
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization", "Accept"],
+            "allow_headers": ["Content-Type", "Authorization", "Accept", "Prefer"],  # Prefer: respond-async (background jobs)
             "supports_credentials": True,
             "expose_headers": ["Content-Disposition"]  # For file downloads
         }
@@ -85,7 +97,7 @@ def create_app():
             origin == "http://13.201.218.4"
         ):
             response.headers.add('Access-Control-Allow-Origin', origin)
-            response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,Accept')
+            response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,Accept,Prefer')
             response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
             response.headers.add('Access-Control-Allow-Credentials', 'true')
             response.headers.add('Access-Control-Expose-Headers', 'Content-Disposition')
@@ -264,6 +276,8 @@ def create_app():
     app.register_blueprint(os_bp, url_prefix="/api")
     app.register_blueprint(branch_bp, url_prefix='/api/branch')
     app.register_blueprint(executive_bp, url_prefix='/api/executive')
+    app.register_blueprint(jobs_bp, url_prefix='/api')
+    app.register_blueprint(stats_bp, url_prefix='/api')
     
     # This is your cumulative routes blueprint
     app.register_blueprint(api_bp, url_prefix="/api")
@@ -287,7 +301,7 @@ def create_app():
     # Add debugging routes
     @app.route('/health')
     def health_check():
-        return jsonify({"status": "healthy", "message": "Flask server is running"})
+        return jsonify({"status": "healthy", "message": "Flask server is running", "caches": all_cache_stats()})
     
     @app.route('/api/debug/routes')
     def list_routes():
@@ -391,6 +405,7 @@ if __name__ == "__main__":
     print(f"🌐 CORS enabled for localhost ports 3000, 3001, and others")
     print(f"🔍 Debug routes available at /api/debug/routes")
     print(f"💊 Health check at /health")
+    print(f"📊 Cache hit/miss counters at /api/cache-stats")
     print(f"🧪 CORS test at /api/test-cors")
     print(f"📁 Direct file processing at:")
     print(f"   - /api/process-file-direct (general file processing)")
@@ -18,7 +18,9 @@ def create_app():
 
     # Register blueprints
     from routes.dashboard.main_routes import main_bp
+    from routes.job_routes import jobs_bp
     app.register_blueprint(main_bp)
+    app.register_blueprint(jobs_bp, url_prefix='/api')  # status/result of /download-master-ppt jobs
 
     return app
 
@@ -0,0 +1,89 @@
+"""
+Budget-vs-billed matching: per-budget-line sales filter vs utils.budget_matching.
+
+Builds a synthetic grouped budget (20k lines) and sales frame (500k rows) keyed
+by branch + SL code + product group, then times the legacy loop, which filters
+the whole sales frame once per budget line, against attach_sales_totals +
+cap_at_budget. The loop is timed on a sample of lines and extrapolated.
+
+    cd backend && python -m benchmarks.bench_budget_matching [budget_lines] [sales_rows]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.budget_matching import SALES_QTY, SALES_VALUE, attach_sales_totals, cap_at_budget
+
+KEYS = ['Branch', 'SL Code', 'Product Group']
+LOOP_SAMPLE = 200
+
+
+def make_frames(n_budget, n_sales, seed=0):
+    rng = np.random.default_rng(seed)
+    branches = np.array([f'BRANCH {i}' for i in range(40)])
+    sl_codes = np.array([str(100000 + i) for i in range(5000)])
+    products = np.array([f'PRODUCT {i}' for i in range(300)])
+    budget = pd.DataFrame({
+        'Branch': rng.choice(branches, n_budget),
+        'SL Code': rng.choice(sl_codes, n_budget),
+        'Product Group': rng.choice(products, n_budget),
+        'Qty': rng.uniform(0, 100, n_budget).round(2),
+        'Value': rng.uniform(0, 10000, n_budget).round(2),
+    }).groupby(KEYS, as_index=False).sum()
+    # Draw most sales rows from budget keys so lines actually match
+    picks = budget[KEYS].sample(n_sales, replace=True, random_state=seed).reset_index(drop=True)
+    stray = rng.random(n_sales) < 0.2
+    picks.loc[stray, 'SL Code'] = rng.choice(sl_codes, stray.sum())
+    sales = picks.assign(
+        Qty=rng.uniform(0, 20, n_sales).round(2),
+        Value=rng.uniform(0, 2000, n_sales).round(2),
+    )
+    return budget, sales
+
+
+def legacy(budget, sales):
+    rows = []
+    for _, line in budget.iterrows():
+        matching = sales[
+            (sales['Branch'] == line['Branch']) &
+            (sales['SL Code'] == line['SL Code']) &
+            (sales['Product Group'] == line['Product Group'])
+        ]
+        qty = matching['Qty'].sum() if not matching.empty else 0
+        value = matching['Value'].sum() if not matching.empty else 0
+        rows.append((min(line['Qty'], qty), min(line['Value'], value)))
+    return rows
+
+
+def vectorized(budget, sales):
+    matched = attach_sales_totals(budget, sales, KEYS, KEYS, 'Qty', 'Value')
+    return cap_at_budget(matched['Qty'], matched[SALES_QTY]), cap_at_budget(matched['Value'], matched[SALES_VALUE])
+
+
+def main():
+    n_budget = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    n_sales = int(sys.argv[2]) if len(sys.argv) > 2 else 500000
+    budget, sales = make_frames(n_budget, n_sales)
+
+    sample = budget.head(LOOP_SAMPLE)
+    start = time.perf_counter()
+    expected = legacy(sample, sales)
+    loop_seconds = (time.perf_counter() - start) * len(budget) / len(sample)
+
+    start = time.perf_counter()
+    qty, value = vectorized(budget, sales)
+    join_seconds = time.perf_counter() - start
+
+    got = list(zip(qty.head(LOOP_SAMPLE), value.head(LOOP_SAMPLE)))
+    assert np.allclose(np.array(expected, dtype=float), np.array(got, dtype=float)), "results differ"
+
+    print(f"{len(budget):,} budget lines x {len(sales):,} sales rows")
+    print(f"per-line filter: {loop_seconds:9.2f}s (extrapolated from {len(sample)} lines)")
+    print(f"grouped join:    {join_seconds:9.2f}s")
+    print(f"speedup:         {loop_seconds / join_seconds:9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Cumulative monthly merge: serial per-request parsing vs utils.cumulative_merge.
+
+Builds twelve synthetic monthly workbooks (the column set varies a little
+from month to month, as real exports do) and times what /api/process
+followed by /api/download costs: the legacy way parses every workbook
+twice, one after another, trying openpyxl first; the new way parses them
+concurrently with the sniffed engine once, and /download reuses the parsed
+months from the result store. The combined frames are checked to agree.
+
+    cd backend && python -m benchmarks.bench_cumulative_merge [rows per month] [workers]
+"""
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+import utils.cumulative_merge as cumulative_merge
+import utils.result_store as result_store
+from utils.cumulative_merge import combine_frames, parse_month_files
+
+MONTHS = ['Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec', 'Jan', 'Feb', 'Mar']
+
+
+def make_frames(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    uploads = []
+    for position, month in enumerate(MONTHS):
+        df = pd.DataFrame({
+            'Date': pd.Timestamp('2024-04-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'),
+            'Customer': rng.choice([f'Customer {i}' for i in range(2000)], rows),
+            'Product': rng.choice([f'Product {i}' for i in range(80)], rows),
+            'Qty': rng.integers(1, 50, rows),
+            'Value': rng.normal(5000, 2000, rows).round(2),
+        })
+        if position % 3 == 0:
+            df['Remarks'] = rng.choice(['', 'urgent', 'credit'], rows)
+        buffer = BytesIO()
+        df.to_excel(buffer, index=False)
+        uploads.append((month, f"{month.lower()}_sales.xlsx", buffer.getvalue()))
+    return uploads
+
+
+def legacy_parse(data, month, filename):
+    try:
+        df = pd.read_excel(BytesIO(data), header=0, engine="openpyxl")
+    except Exception:
+        df = pd.read_excel(BytesIO(data), header=0, engine="xlrd")
+    df.columns = [str(col).strip() for col in df.columns]
+    df = df.replace([float('inf'), -float('inf')], None)
+    if "Month" not in df.columns:
+        df["Month"] = month
+    df["Source File"] = filename
+    return df
+
+
+def legacy(uploads):
+    """/process then /download: every workbook parsed serially, twice."""
+    for _ in range(2):
+        combined = pd.concat([legacy_parse(data, month, name) for month, name, data in uploads], ignore_index=True)
+    return combined
+
+
+def engine(uploads):
+    """/process then /download through parse_month_files and combine_frames."""
+    for _ in range(2):
+        combined = combine_frames(parse_month_files(uploads))
+    return combined
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    if len(sys.argv) > 2:
+        cumulative_merge.MAX_WORKERS = int(sys.argv[2])
+    result_store.RESULTS_DIR = os.path.join(tempfile.mkdtemp(), 'results')
+    uploads = make_frames(rows)
+
+    expected, legacy_seconds = timed(legacy, uploads)
+    got, engine_seconds = timed(engine, uploads)
+    # months without a column are NaN under pd.concat, None (text) under Arrow
+    pd.testing.assert_frame_equal(expected.isna(), got.isna())
+    pd.testing.assert_frame_equal(expected.where(expected.notna(), None), got.where(got.notna(), None))
+
+    print(f"12 months x {rows:,} rows, {cumulative_merge.MAX_WORKERS} parse workers, {os.cpu_count()} cores")
+    print(f"serial, parsed twice:   {legacy_seconds:8.2f}s")
+    print(f"pool + reuse:           {engine_seconds:8.2f}s ({legacy_seconds / engine_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
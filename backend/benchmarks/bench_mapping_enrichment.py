@@ -0,0 +1,106 @@
+"""
+Benchmark for the set-based sales/budget/OS enrichment in services.mapping_service.
+
+Seeds an in-memory SQLite database with a realistic mapping master and times
+process_sales_file / process_budget_file / process_os_file at 100k and 1M rows.
+
+    cd backend && python -m benchmarks.bench_mapping_enrichment [rows ...]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+
+from extensions import db
+from models.schema import (
+    Branch, BranchExecutiveMap, Company, CompanyProductMap, Customer,
+    Executive, Product, Region, RegionBranchMap,
+)
+from services.mapping_service import (
+    load_mapping_lookups, process_budget_file, process_os_file, process_sales_file,
+)
+
+N_EXECUTIVES = 150
+N_CUSTOMERS = 40000
+N_PRODUCTS = 300
+
+
+def seed_database():
+    rng = np.random.default_rng(7)
+    branches = [Branch(name=f"BRANCH {i}") for i in range(30)]
+    regions = [Region(name=f"REGION {i}") for i in range(6)]
+    companies = [Company(name=f"COMPANY {i}") for i in range(12)]
+    products = [Product(name=f"Product Group {i}") for i in range(N_PRODUCTS)]
+    executives = [Executive(name=f"Executive {i}", code=str(1000 + i)) for i in range(N_EXECUTIVES)]
+    db.session.add_all(branches + regions + companies + products + executives)
+    db.session.flush()
+
+    for i, e in enumerate(executives):
+        db.session.add(BranchExecutiveMap(executive_id=e.id, branch_id=branches[i % len(branches)].id))
+    for i, b in enumerate(branches):
+        db.session.add(RegionBranchMap(branch_id=b.id, region_id=regions[i % len(regions)].id))
+    for i, p in enumerate(products):
+        db.session.add(CompanyProductMap(company_id=companies[i % len(companies)].id, product_id=p.id))
+    db.session.bulk_insert_mappings(Customer, [
+        {"code": str(500000 + i), "executive_id": executives[int(rng.integers(N_EXECUTIVES))].id}
+        for i in range(N_CUSTOMERS)
+    ])
+    db.session.commit()
+
+
+def make_frames(rows):
+    rng = np.random.default_rng(rows)
+    sales = pd.DataFrame({
+        "Executive Code": rng.integers(1000, 1000 + N_EXECUTIVES + 20, rows).astype(str),
+        "Executive Name": "",
+        "Type (Make)": np.char.add("product group ", rng.integers(0, N_PRODUCTS + 30, rows).astype(str)),
+        "UOM": rng.choice(["MT", "KGS", "NOS"], rows),
+        "Quantity": rng.random(rows) * 5000,
+        "Invoice Value": rng.random(rows) * 1e6,
+    })
+    budget = pd.DataFrame({
+        "SL Code": rng.integers(500000, 500000 + N_CUSTOMERS + 2000, rows),
+        "Executive Code": 0,
+        "Executive Name": "",
+        "Branch": "",
+        "Region": "",
+    })
+    # OS exports prefix/suffix codes, so most rows go through containment matching
+    os_codes = rng.integers(1000, 1000 + N_EXECUTIVES + 20, rows).astype(str)
+    os_df = pd.DataFrame({
+        "Executive Code": np.where(rng.random(rows) < 0.5, np.char.add("EX", os_codes), os_codes),
+        "Balance": rng.random(rows) * 1e5,
+    })
+    return sales, budget, os_df
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"  {label:<28}{time.perf_counter() - start:8.2f}s")
+    return result
+
+
+def main(sizes):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        seed_database()
+        lookups = timed("load_mapping_lookups", load_mapping_lookups)
+        for rows in sizes:
+            sales, budget, os_df = make_frames(rows)
+            print(f"{rows:,} rows")
+            timed("process_sales_file", lambda: process_sales_file(
+                sales, "Executive Code", "Type (Make)", "Executive Name", "UOM", "Quantity", "Invoice Value",
+                lookups=lookups))
+            timed("process_budget_file", lambda: process_budget_file(
+                budget, "SL Code", "Executive Code", "Executive Name", "Branch", "Region", lookups=lookups))
+            timed("process_os_file", lambda: process_os_file(os_df, "Executive Code", lookups=lookups))
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100_000, 1_000_000])
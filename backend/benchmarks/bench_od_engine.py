@@ -0,0 +1,101 @@
+"""
+OD target vs collection: per-month filtering vs utils.od_engine.
+
+Builds synthetic OS-first, OS-second and sales frames (300k rows each) and
+computes the four OD measures per executive for every month of a year, once
+the legacy way (filter every frame by date for each month, then group) and
+once from an od_cube (one pass, then a lookup per month). The cube is timed
+keyed by source identity, as the routes call it, and keyed by hashing the
+frames' contents, as when no sources are passed.
+
+    cd backend && python -m benchmarks.bench_od_engine [rows] [months]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.budget_matching import clear_report_cache
+from utils.od_engine import OS_FIRST, OS_SECOND, SALES, month_number, od_cube, od_sums
+
+COLS = {
+    'os_first_due': 'Due Date', 'os_first_value': 'Net Value',
+    'os_second_due': 'Due Date', 'os_second_ref': 'Ref Date', 'os_second_value': 'Net Value',
+    'sale_bill': 'Bill Date', 'sale_due': 'Due Date', 'sale_value': 'Value',
+}
+DIMS = {OS_FIRST: ['Executive'], OS_SECOND: ['Executive'], SALES: ['Executive']}
+
+
+def make_frames(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    executives = np.array([f'EXEC {i}' for i in range(80)])
+    days = pd.date_range('2023-10-01', '2025-03-31').values
+
+    def frame(first_date, value_col):
+        return pd.DataFrame({
+            first_date: rng.choice(days, n_rows),
+            'Due Date': rng.choice(days, n_rows),
+            'Executive': rng.choice(executives, n_rows),
+            value_col: rng.normal(20000, 15000, n_rows).round(2),
+        })
+
+    return frame('Ref Date', 'Net Value'), frame('Ref Date', 'Net Value'), frame('Bill Date', 'Value')
+
+
+def legacy(os_first, os_second, sales, month_start):
+    month_end = month_start + pd.offsets.MonthEnd(0)
+    first = os_first[os_first['Net Value'] >= 0]
+    second = os_second[os_second['Net Value'] >= 0]
+    return {
+        'due': first[first['Due Date'] <= month_end].groupby('Executive')['Net Value'].sum(),
+        'carried': second[(second['Ref Date'] < month_start) & (second['Due Date'] <= month_end)]
+        .groupby('Executive')['Net Value'].sum(),
+        'month_os': second[second['Ref Date'].between(month_start, month_end) &
+                           second['Due Date'].between(month_start, month_end)]
+        .groupby('Executive')['Net Value'].sum(),
+        'overdue': sales[sales['Bill Date'].between(month_start, month_end) &
+                         sales['Due Date'].between(month_start, month_end)]
+        .groupby('Executive')['Value'].sum(),
+    }
+
+
+def engine(os_first, os_second, sales, month_start, sources=None):
+    cube = od_cube(os_first, os_second, sales, COLS, DIMS, sources=sources)
+    month = month_number(month_start)
+    result = {}
+    for measure, table in [('due', OS_FIRST), ('carried', OS_SECOND), ('month_os', OS_SECOND), ('overdue', SALES)]:
+        sums = od_sums(cube, measure, month, cube['groups'][table]['Executive'])
+        result[measure] = sums.set_index('key')['value']
+    return result
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    n_months = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    os_first, os_second, sales = make_frames(n_rows)
+    months = pd.date_range('2024-04-01', periods=n_months, freq='MS')
+
+    start = time.perf_counter()
+    expected = [legacy(os_first, os_second, sales, m) for m in months]
+    loop_seconds = time.perf_counter() - start
+
+    timings = {}
+    for label, sources in [('sources', ('bench', n_rows)), ('content', None)]:
+        clear_report_cache()
+        start = time.perf_counter()
+        got = [engine(os_first, os_second, sales, m, sources) for m in months]
+        timings[label] = time.perf_counter() - start
+        for want, have in zip(expected, got):
+            for measure in want:
+                assert np.allclose(want[measure].sort_index().to_numpy(),
+                                   have[measure].sort_index().to_numpy()), measure
+
+    print(f"{n_rows:,} rows per file x {n_months} months")
+    print(f"per-month filter:      {loop_seconds:8.2f}s")
+    print(f"od cube, by sources:   {timings['sources']:8.2f}s ({loop_seconds / timings['sources']:.1f}x)")
+    print(f"od cube, by content:   {timings['content']:8.2f}s ({loop_seconds / timings['content']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Product growth: per-company-group slicing vs utils.product_growth_engine.
+
+Builds a synthetic three-year sales frame (LY = the middle year, CY = the
+last year, both read from the same cumulative sales sheet) and a budget, and
+computes the branch product growth tables for every company group, once the
+legacy way (standardize names row by row, then filter, group and merge every
+frame per company group and compute growth row by row) and once through
+calculate_product_growth (one aligned groupby, vectorized growth).
+
+    cd backend && python -m benchmarks.bench_product_growth [rows_per_year] [company_groups]
+"""
+import contextlib
+import io
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.product_growth import calculate_product_growth, standardize_name
+
+LY_MONTHS = list(pd.date_range('2023-04-01', periods=12, freq='MS').strftime('%b %y'))
+CY_MONTHS = list(pd.date_range('2024-04-01', periods=12, freq='MS').strftime('%b %y'))
+
+
+def make_frames(rows_per_year, n_groups, seed=0):
+    rng = np.random.default_rng(seed)
+    groups = np.array([f'company {i}' for i in range(n_groups)] + ['GENERAL'])
+    products = np.array([f'product-{i}' for i in range(30)] + ['gc'])
+    executives = np.array([f'EXEC {i}' for i in range(60)])
+    days = pd.date_range('2022-04-01', '2025-03-31').strftime('%d/%m/%Y').values
+    n_rows = rows_per_year * 3
+    sales = pd.DataFrame({
+        'Date': rng.choice(days, n_rows),
+        'Company Group': rng.choice(groups, n_rows),
+        'Type (Make)': rng.choice(products, n_rows),
+        'Executive': rng.choice(executives, n_rows),
+        'Actual Quantity': rng.integers(1, 50, n_rows),
+        'Value': rng.normal(5000, 2000, n_rows).round(2),
+    })
+    n_budget = len(groups) * len(products) * 4
+    budget = pd.DataFrame({
+        'Company Group': rng.choice(groups, n_budget),
+        'Product Group': rng.choice(products, n_budget),
+        'Executive Name': rng.choice(executives, n_budget),
+        'Budget Qty': rng.integers(1, 500, n_budget),
+        'Budget Value': rng.normal(50000, 20000, n_budget).round(2),
+    })
+    return sales, budget
+
+
+def growth(cy, ly):
+    if ly == 0:
+        return 0.0 if cy == 0 else 100.0
+    return round((cy - ly) / ly * 100, 2)
+
+
+def legacy(sales, budget):
+    dates = pd.to_datetime(sales['Date'], dayfirst=True)
+    ly = sales[dates.dt.strftime('%b %y').isin(LY_MONTHS)].copy()
+    cy = sales[dates.dt.strftime('%b %y').isin(CY_MONTHS)].copy()
+    budget = budget.copy()
+    for df, cols in [(ly, ['Type (Make)', 'Company Group']), (cy, ['Type (Make)', 'Company Group']),
+                     (budget, ['Product Group', 'Company Group'])]:
+        for col in cols:
+            df[col] = df[col].fillna('').astype(str).apply(standardize_name)
+
+    result = {}
+    for group in pd.concat([ly['Company Group'], cy['Company Group'], budget['Company Group']]).unique():
+        ly_g = ly[ly['Company Group'] == group]
+        cy_g = cy[cy['Company Group'] == group]
+        budget_g = budget[budget['Company Group'] == group]
+        names = sorted(set(ly_g['Type (Make)']) | set(cy_g['Type (Make)']) | set(budget_g['Product Group']))
+        if group != 'General':
+            names = [p for p in names if p != 'Gc']
+        table = pd.DataFrame({'PRODUCT NAME': names})
+        for df, col, qty, label in [(ly_g, 'Type (Make)', 'Actual Quantity', 'LY'),
+                                    (budget_g, 'Product Group', 'Budget Qty', 'BUDGET'),
+                                    (cy_g, 'Type (Make)', 'Actual Quantity', 'CY')]:
+            sums = df.groupby(col)[qty].sum().rename(label)
+            table = table.merge(sums, left_on='PRODUCT NAME', right_index=True, how='left')
+        table = table.fillna(0)
+        table['GROWTH %'] = table.apply(lambda row: growth(row['CY'], row['LY']), axis=1)
+        result[group] = table
+    return result
+
+
+def engine(sales, budget):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return calculate_product_growth(
+            sales, sales, budget, LY_MONTHS, CY_MONTHS, 'Date', 'Date', 'Actual Quantity', 'Actual Quantity',
+            'Value', 'Value', 'Budget Qty', 'Budget Value', 'Type (Make)', 'Type (Make)',
+            'Company Group', 'Company Group', 'Company Group', 'Product Group',
+            'Executive', 'Executive', 'Executive Name',
+        )
+
+
+def main():
+    rows_per_year = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    n_groups = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    sales, budget = make_frames(rows_per_year, n_groups)
+
+    start = time.perf_counter()
+    expected = legacy(sales, budget)
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    got = engine(sales, budget)
+    engine_seconds = time.perf_counter() - start
+
+    assert sorted(expected) == sorted(got)
+    for group, want in expected.items():
+        have = got[group]['qty_df'].iloc[:-1]
+        assert want['PRODUCT NAME'].tolist() == have['PRODUCT NAME'].tolist(), group
+        assert np.allclose(want['CY'], have['CURRENT YEAR QTY/MT']), group
+        assert np.allclose(want['GROWTH %'], have['GROWTH %']), group
+
+    print(f"{rows_per_year * 3:,} sales rows over 3 years, {len(expected)} company groups")
+    print(f"per-group slicing:     {loop_seconds:8.2f}s")
+    print(f"aligned groupby:       {engine_seconds:8.2f}s ({loop_seconds / engine_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Report aggregations: pandas vs the DuckDB query engine (utils.query_engine).
+
+Builds a synthetic multi-year sales history and two OS files and times the
+heavy pass of three reports under each engine: the budget vs billed sales
+totals over the sales fact table (warm; the Parquet copy is written once up
+front), the NBC distinct-customer counts and the OD target vs collection
+cube. Results are checked to agree (exactly for counts, to the paisa for
+sums).
+
+    cd backend && python -m benchmarks.bench_query_engine [rows]
+"""
+import contextlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import utils.query_engine as query_engine
+import utils.sales_facts as sales_facts_module
+from utils.budget_matching import clear_report_cache
+from utils.budget_vs_billed import _sales_source, _sales_totals, _sql_sales_totals
+from utils.nbc_od_utils import create_customer_table
+from utils.od_target import calculate_od_values_updated
+from utils.sales_facts import sales_facts_file
+
+
+def make_frames(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    days = pd.date_range('2022-04-01', '2025-03-31')
+    # every SL code (customer account) belongs to one branch and buys a few product groups
+    sl_codes = rng.integers(0, 3000, rows)
+    sales = pd.DataFrame({
+        'Date': rng.choice(days.strftime('%Y-%m-%d').values, rows),
+        'Branch': np.array([f'branch {i}' for i in range(25)])[sl_codes % 25],
+        'Executive': rng.choice([f'Exec {i}' for i in range(150)], rows),
+        'SL Code': np.array([f'sl{i}' for i in range(3000)])[sl_codes],
+        'Product Group': np.array([f'product {i}' for i in range(60)])[(sl_codes * 7 + rng.integers(0, 4, rows)) % 60],
+        'Customer': rng.integers(0, 40000, rows),
+        'Qty': rng.integers(1, 50, rows),
+        'Value': rng.normal(5000, 2000, rows).round(2),
+        'Due': rng.choice(days.values, rows),
+    })
+    os_files = [
+        pd.DataFrame({
+            'Due': rng.choice(days.values, rows // 2),
+            'Ref': rng.choice(days.values, rows // 2),
+            'Branch': rng.choice([f'branch {i}' for i in range(25)], rows // 2),
+            'Executive': rng.choice([f'Exec {i}' for i in range(150)], rows // 2),
+            'Net': rng.normal(20000, 15000, rows // 2).round(2),
+        })
+        for _ in range(2)
+    ]
+    return sales, os_files
+
+
+def legacy(run):
+    """run() with the pandas engine, from a cold report cache."""
+    query_engine.QUERY_ENGINE = 'pandas'
+    clear_report_cache()
+    return timed(run)
+
+
+def engine(run):
+    """run() with the DuckDB engine, from a cold report cache."""
+    query_engine.QUERY_ENGINE = 'duckdb'
+    clear_report_cache()
+    return timed(run)
+
+
+def timed(run):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = run()
+        return result, time.perf_counter() - start
+
+
+def assert_close(expected, got, exact=False):
+    if isinstance(expected, dict):
+        assert expected.keys() == got.keys()
+        for key in expected:
+            assert_close(expected[key], got[key], exact)
+    elif isinstance(expected, (list, tuple)):
+        assert len(expected) == len(got)
+        for want, have in zip(expected, got):
+            assert_close(want, have, exact)
+    elif isinstance(expected, pd.DataFrame):
+        want = expected.sort_values(list(expected.columns[:-2])).reset_index(drop=True) if not exact else expected
+        have = got.sort_values(list(got.columns[:-2])).reset_index(drop=True) if not exact else got
+        for col in want.columns:
+            if pd.api.types.is_numeric_dtype(want[col]) and not exact:
+                assert np.allclose(want[col], have[col], atol=0.005, equal_nan=True), col
+            else:
+                assert want[col].astype(str).equals(have[col].astype(str)), col
+    else:
+        assert expected == got
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    logging.disable(logging.INFO)
+    if not query_engine.DUCKDB_AVAILABLE:
+        sys.exit("duckdb is not installed")
+    sales, (os_first, os_second) = make_frames(rows)
+
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    os.makedirs('uploads')
+    sales_facts_module.FACTS_DIR = os.path.join(workdir, 'facts')
+    sales.to_csv(os.path.join('uploads', 'sales.csv'), index=False)
+    data = {
+        'sales_filename': 'sales.csv', 'sales_sheet': 0, 'sales_header': 1, 'sales_date_col': 'Date',
+        'sales_exec_col': 'Executive', 'sales_area_col': 'Branch', 'sales_sl_code_col': 'SL Code',
+        'sales_product_group_col': 'Product Group', 'sales_qty_col': 'Qty', 'sales_value_col': 'Value',
+        'selected_sales_execs': [f'Exec {i}' for i in range(40)], 'selected_branches': [],
+    }
+    sales_facts_file(**_sales_source(data))  # both engines start from a built fact table
+
+    od_args = (
+        'Mar 24', 'Due', 'Ref', 'Branch', 'Net', 'Executive', None, 'Due', 'Ref', 'Branch', 'Net', 'Executive', None,
+        'Date', 'Due', 'Branch', 'Value', 'Executive', None, [], [], [],
+    )
+    reports = [
+        ('budget vs billed', lambda: _sales_totals(data), lambda: _sql_sales_totals(data), False),
+        ('NBC counts', lambda: create_customer_table(sales, 'Date', 'Branch', 'Customer', 'Executive'), None, True),
+        ('OD cube', lambda: calculate_od_values_updated(os_first, os_second, sales, *od_args), None, False),
+    ]
+
+    print(f"{rows:,} sales rows, {len(os_first):,} rows per OS file, {os.cpu_count()} cores")
+    for name, pandas_run, sql_run, exact in reports:
+        expected, pandas_seconds = legacy(pandas_run)
+        got, sql_seconds = engine(sql_run or pandas_run)
+        assert_close(expected, got, exact)
+        print(f"{name:18} pandas {pandas_seconds:7.2f}s   duckdb {sql_seconds:7.2f}s ({pandas_seconds / sql_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
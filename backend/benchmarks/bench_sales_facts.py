@@ -0,0 +1,100 @@
+"""
+Sales preparation: per-request parsing vs utils.sales_facts.
+
+Writes a synthetic sales CSV and prepares the executive budget vs billed
+sales rows from it (month label, standardized branch / executive / SL code /
+product group, numeric quantity and value), once the legacy way (read the
+file, parse dates, coerce numbers and normalize text row by row on every
+request) and once from the fact table: the first build, a warm in-memory hit
+and a reload of the Parquet copy.
+
+    cd backend && python -m benchmarks.bench_sales_facts [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import utils.sales_facts as sales_facts_module
+from utils.date_parsing import month_labels, parse_dates
+from utils.sales_facts import clear_sales_facts, fact_dimension, fact_month_labels, sales_facts
+
+COLUMNS = {
+    'date': 'Date', 'value': 'Value', 'qty': 'Qty', 'branch': 'Branch',
+    'executive': 'Executive', 'sl_code': 'SL Code', 'product_group': 'Product Group',
+}
+
+
+def make_frames(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    days = pd.date_range('2023-04-01', '2025-03-31').strftime('%d/%m/%Y').values
+    return pd.DataFrame({
+        'Date': rng.choice(days, rows),
+        'Branch': rng.choice([f' branch {i}' for i in range(25)], rows),
+        'Executive': rng.choice([f'Exec {i} ' for i in range(150)], rows),
+        'SL Code': rng.choice([f'sl{i}' for i in range(3000)], rows),
+        'Product Group': rng.choice([f'product {i}' for i in range(60)], rows),
+        'Qty': rng.integers(1, 50, rows),
+        'Value': rng.normal(5000, 2000, rows).round(2),
+    })
+
+
+def legacy(path):
+    df = pd.read_csv(path)
+    df['Date'] = parse_dates(df['Date'], dayfirst=True)
+    df['Value'] = pd.to_numeric(df['Value'], errors='coerce').fillna(0)
+    df['Qty'] = pd.to_numeric(df['Qty'], errors='coerce').fillna(0)
+    df['Month'] = month_labels(df['Date'])
+    for col in ['Branch', 'Executive', 'SL Code', 'Product Group']:
+        df[col] = df[col].astype(str).str.strip().str.upper()
+    return df[['Month', 'Branch', 'Executive', 'SL Code', 'Product Group', 'Qty', 'Value']]
+
+
+def engine(path):
+    facts = sales_facts(path, COLUMNS)
+    standardize = lambda text: text.strip().upper()
+    return pd.DataFrame({
+        'Month': fact_month_labels(facts),
+        'Branch': fact_dimension(facts, 'branch', standardize),
+        'Executive': fact_dimension(facts, 'executive', standardize),
+        'SL Code': fact_dimension(facts, 'sl_code', standardize),
+        'Product Group': fact_dimension(facts, 'product_group', standardize),
+        'Qty': facts['qty'].fillna(0),
+        'Value': facts['value'].fillna(0),
+    })
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    workdir = tempfile.mkdtemp()
+    sales_facts_module.FACTS_DIR = os.path.join(workdir, 'facts')
+    path = os.path.join(workdir, 'sales.csv')
+    make_frames(rows).to_csv(path, index=False)
+
+    expected, legacy_seconds = timed(legacy, path)
+    _, cold_seconds = timed(engine, path)
+    _, warm_seconds = timed(engine, path)
+    clear_sales_facts()
+    got, disk_seconds = timed(engine, path)
+
+    for col in expected.columns:
+        assert expected[col].astype(str).equals(got[col].astype(str)), col
+
+    print(f"{rows:,} sales rows")
+    print(f"per-request parsing:   {legacy_seconds:8.2f}s")
+    print(f"fact table, first:     {cold_seconds:8.2f}s")
+    print(f"fact table, memory:    {warm_seconds:8.2f}s ({legacy_seconds / warm_seconds:.1f}x)")
+    print(f"fact table, parquet:   {disk_seconds:8.2f}s ({legacy_seconds / disk_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
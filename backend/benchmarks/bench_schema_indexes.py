@@ -0,0 +1,127 @@
+"""
+Before/after latency of the mapping lookups once models.migrations has added
+the indexes and unique constraints.
+
+Seeds a database without those indexes (50k customers by default), times the
+lookups mapping_service issues, applies the migrations and times them again.
+
+    cd backend && python -m benchmarks.bench_schema_indexes [--uri mysql+pymysql://...] [--customers 50000]
+
+Without --uri a temporary SQLite file is used. The target database is
+dropped and recreated, so never point --uri at real data.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from flask import Flask
+
+from extensions import db
+from models.migrations import MIGRATED_MODELS, apply_schema_migrations
+from models.schema import (
+    Branch, BranchExecutiveMap, Company, CompanyProductMap, Customer,
+    Executive, Product, Region, RegionBranchMap,
+)
+
+N_EXECUTIVES = 200
+N_BRANCHES = 40
+N_PRODUCTS = 2000
+
+
+def seed(n_customers):
+    rnd = random.Random(0)
+    db.session.bulk_insert_mappings(Executive, [{"id": i + 1, "name": f"Executive {i}", "code": str(1000 + i)} for i in range(N_EXECUTIVES)])
+    db.session.bulk_insert_mappings(Branch, [{"id": i + 1, "name": f"BRANCH {i}"} for i in range(N_BRANCHES)])
+    db.session.bulk_insert_mappings(Region, [{"id": i + 1, "name": f"REGION {i}"} for i in range(8)])
+    db.session.bulk_insert_mappings(Company, [{"id": i + 1, "name": f"COMPANY {i}"} for i in range(20)])
+    db.session.bulk_insert_mappings(Product, [{"id": i + 1, "name": f"Product {i}"} for i in range(N_PRODUCTS)])
+    db.session.bulk_insert_mappings(BranchExecutiveMap, [
+        {"executive_id": e + 1, "branch_id": b + 1}
+        for e in range(N_EXECUTIVES) for b in rnd.sample(range(N_BRANCHES), 2)
+    ])
+    db.session.bulk_insert_mappings(RegionBranchMap, [{"branch_id": b + 1, "region_id": b % 8 + 1} for b in range(N_BRANCHES)])
+    db.session.bulk_insert_mappings(CompanyProductMap, [{"company_id": p % 20 + 1, "product_id": p + 1} for p in range(N_PRODUCTS)])
+    for start in range(0, n_customers, 5000):
+        db.session.bulk_insert_mappings(Customer, [
+            {"code": str(500000 + i), "name": f"Customer {i}", "executive_id": rnd.randint(1, N_EXECUTIVES)}
+            for i in range(start, min(start + 5000, n_customers))
+        ])
+    db.session.commit()
+
+
+def lookups(n_customers):
+    rnd = random.Random(1)
+    return {
+        "customer by code": lambda: Customer.query.filter_by(code=str(500000 + rnd.randrange(n_customers))).first(),
+        "customers of executive": lambda: Customer.query.filter_by(executive_id=rnd.randint(1, N_EXECUTIVES)).count(),
+        "executive by code": lambda: Executive.query.filter_by(code=str(1000 + rnd.randrange(N_EXECUTIVES))).first(),
+        "branches of executive": lambda: BranchExecutiveMap.query.filter_by(executive_id=rnd.randint(1, N_EXECUTIVES)).all(),
+        "exec-branch pair exists": lambda: BranchExecutiveMap.query.filter_by(
+            executive_id=rnd.randint(1, N_EXECUTIVES), branch_id=rnd.randint(1, N_BRANCHES)).first(),
+        "region of branch": lambda: RegionBranchMap.query.filter_by(branch_id=rnd.randint(1, N_BRANCHES)).first(),
+        "products of company": lambda: CompanyProductMap.query.filter_by(company_id=rnd.randint(1, 20)).all(),
+    }
+
+
+def measure(queries, repeat):
+    results = {}
+    for label, query in queries.items():
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            query()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[label] = statistics.median(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--uri", help="SQLAlchemy URI of a scratch database (default: temporary SQLite file)")
+    parser.add_argument("--customers", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    sqlite_path = None
+    uri = args.uri
+    if not uri:
+        fd, sqlite_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        uri = f"sqlite:///{sqlite_path}"
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+    db.init_app(app)
+    try:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            # Start from the pre-migration schema
+            for model in MIGRATED_MODELS:
+                for index in model.__table__.indexes:
+                    index.drop(db.engine)
+            seed(args.customers)
+            queries = lookups(args.customers)
+
+            before = measure(queries, args.repeat)
+            start = time.perf_counter()
+            created = apply_schema_migrations()
+            migrate_seconds = time.perf_counter() - start
+            db.session.expire_all()
+            after = measure(queries, args.repeat)
+
+            print(f"{args.customers:,} customers on {db.engine.dialect.name}; "
+                  f"created {len(created)} indexes in {migrate_seconds:.2f}s")
+            print(f"{'lookup':<26}{'before ms':>11}{'after ms':>10}{'speedup':>9}")
+            for label in queries:
+                print(f"{label:<26}{before[label]:>11.3f}{after[label]:>10.3f}{before[label] / after[label]:>8.1f}x")
+    finally:
+        if sqlite_path:
+            os.remove(sqlite_path)
+
+
+if __name__ == "__main__":
+    main()
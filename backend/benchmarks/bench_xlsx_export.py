@@ -0,0 +1,98 @@
+"""
+Combined sales export: pd.ExcelWriter into a BytesIO vs utils.xlsx_export.
+
+Builds a synthetic combined sales frame and writes it the way /api/download
+used to (df.to_excel through xlsxwriter into memory, header restyled) and
+through write_xlsx (constant-memory workbook in a temporary file). Each
+variant runs in its own process so its peak RSS can be reported on its own;
+the frame's own footprint is reported as the baseline. The two workbooks are
+read back and checked to agree.
+
+    cd backend && python -m benchmarks.bench_xlsx_export [rows]
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from utils.xlsx_export import write_xlsx
+
+HEADER = {"bold": True, "bg_color": "#D3D3D3", "border": 1}
+
+
+def make_frames(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Date': pd.Timestamp('2024-04-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'),
+        'Customer': rng.choice([f'Customer {i}' for i in range(2000)], rows),
+        'Product': rng.choice([f'Product {i}' for i in range(80)], rows),
+        'Qty': rng.integers(1, 50, rows),
+        'Value': rng.normal(5000, 2000, rows).round(2),
+        'Month': rng.choice(['Apr', 'May', 'Jun'], rows),
+        'Source File': 'sales.xlsx',
+    })
+
+
+def legacy(df, path):
+    """The old /api/download: whole workbook built in memory, then written out."""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False, sheet_name="Combined Sales")
+        header_format = writer.book.add_format(HEADER)
+        for col_num, value in enumerate(df.columns.values):
+            writer.sheets["Combined Sales"].write(0, col_num, value, header_format)
+    with open(path, 'wb') as fh:
+        fh.write(output.getvalue())
+
+
+def engine(df, path):
+    write_xlsx(path, [("Combined Sales", df)], header_format=HEADER)
+
+
+def peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(variant, rows, path):
+    """Child process: build the frame, write it with one variant, report timings and peak RSS."""
+    df = make_frames(rows)
+    baseline = peak_mb()
+    start = time.perf_counter()
+    {'legacy': legacy, 'engine': engine}[variant](df, path)
+    print(json.dumps({'seconds': time.perf_counter() - start, 'baseline': baseline, 'peak': peak_mb()}))
+
+
+def measure(variant, rows, path):
+    out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_xlsx_export', '--run', variant, str(rows), path],
+                         check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        return run(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    workdir = tempfile.mkdtemp()
+    paths = {name: os.path.join(workdir, f'{name}.xlsx') for name in ('legacy', 'engine')}
+    results = {name: measure(name, rows, path) for name, path in paths.items()}
+
+    expected, got = (pd.read_excel(paths[name]) for name in ('legacy', 'engine'))
+    pd.testing.assert_frame_equal(expected, got)
+
+    old, new = results['legacy'], results['engine']
+    print(f"{rows:,} rows x {len(expected.columns)} columns, frame baseline {old['baseline']:.0f} MB RSS")
+    print(f"pd.ExcelWriter + BytesIO:   {old['seconds']:7.2f}s  peak {old['peak']:7.0f} MB "
+          f"(+{old['peak'] - old['baseline']:.0f} MB)")
+    print(f"constant-memory writer:     {new['seconds']:7.2f}s  peak {new['peak']:7.0f} MB "
+          f"(+{new['peak'] - new['baseline']:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import logging
+
+from sqlalchemy import inspect, text
+
+from extensions import db
+from models.schema import (
+    BranchExecutiveMap, BudgetFile, CompanyProductMap, Customer, Executive,
+    LastYearSalesFile, OsFile, RegionBranchMap, SalesFile,
+)
+
+logger = logging.getLogger(__name__)
+
+# ========================
+# Schema migrations
+# ========================
+# db.create_all() only creates missing tables, so columns and indexes declared
+# on the models never reach databases created before they were added.
+# apply_schema_migrations() adds missing nullable columns and creates any
+# declared index that is missing on an existing table. It is safe to run on
+# every startup: anything that already exists is left alone, and no rows are
+# ever deleted. A unique index whose columns already hold duplicate rows is
+# not created; the duplicates are logged as errors on each startup until
+# they are cleaned up, either by hand or with the explicit step
+#     python -m models.migrations --remove-duplicates
+# which reports them and deletes all but the lowest id of each group (run
+# it without the flag to only list them).
+
+MIGRATED_MODELS = (Executive, Customer, BranchExecutiveMap, RegionBranchMap, CompanyProductMap)
+FILE_MODELS = (BudgetFile, SalesFile, OsFile, LastYearSalesFile)
+
+
+def _duplicate_groups(conn, table, columns):
+    """[(column values, row count)] for the column values held by more than one row."""
+    preparer = conn.dialect.identifier_preparer
+    cols = ", ".join(preparer.quote(c) for c in columns)
+    rows = conn.execute(text(
+        f"SELECT {cols}, COUNT(*) AS n FROM {preparer.quote(table.name)} "
+        f"GROUP BY {cols} HAVING COUNT(*) > 1 ORDER BY {cols}"
+    ))
+    return [(tuple(row[:-1]), row[-1]) for row in rows]
+
+
+def _remove_duplicate_pairs(conn, table, columns):
+    """Keep the lowest id of each duplicate row so a unique index can be built."""
+    preparer = conn.dialect.identifier_preparer
+    name = preparer.quote(table.name)
+    cols = ", ".join(preparer.quote(c) for c in columns)
+    # The derived table is needed for MySQL, which can't select from the DELETE target
+    result = conn.execute(text(
+        f"DELETE FROM {name} WHERE id NOT IN ("
+        f"SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM {name} GROUP BY {cols}) AS keep_rows)"
+    ))
+    return result.rowcount or 0
+
+
+def _describe_duplicates(table, columns, groups, limit=10):
+    extra = sum(count - 1 for _, count in groups)
+    shown = "; ".join(f"{dict(zip(columns, values))} x{count}" for values, count in groups[:limit])
+    more = f"; ... {len(groups) - limit} more" if len(groups) > limit else ""
+    return f"{table.name}{columns}: {len(groups)} duplicated pairs, {extra} extra rows ({shown}{more})"
+
+
+def _unique_indexes(inspector):
+    """(table, index) for the declared unique indexes of MIGRATED_MODELS' existing tables."""
+    for model in MIGRATED_MODELS:
+        table = model.__table__
+        if inspector.has_table(table.name):
+            for index in sorted(table.indexes, key=lambda ix: ix.name):
+                if index.unique:
+                    yield table, index
+
+
+def remove_duplicate_rows(engine=None, dry_run=False):
+    """
+    The explicit clean-up step for unique indexes that migrations skipped:
+    logs the duplicate rows of each and, unless dry_run, deletes all but the
+    lowest id of each group. Returns {table name: duplicate rows found}.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    found = {}
+
+    with engine.begin() as conn:
+        for table, index in _unique_indexes(inspector):
+            columns = tuple(c.name for c in index.columns)
+            groups = _duplicate_groups(conn, table, columns)
+            if not groups:
+                continue
+            found[table.name] = sum(count - 1 for _, count in groups)
+            logger.warning(f"Duplicates in {_describe_duplicates(table, columns, groups)}")
+            if not dry_run:
+                removed = _remove_duplicate_pairs(conn, table, columns)
+                logger.warning(f"Removed {removed} duplicate rows from {table.name}")
+    return found
+
+
+def _add_missing_columns(conn, inspector, table):
+    """ALTER TABLE ... ADD COLUMN for nullable model columns the table lacks."""
+    present = {c['name'] for c in inspector.get_columns(table.name)}
+    preparer = conn.dialect.identifier_preparer
+    added = []
+    for column in table.columns:
+        if column.name in present or not column.nullable:
+            continue
+        conn.execute(text(
+            f"ALTER TABLE {preparer.quote(table.name)} "
+            f"ADD COLUMN {preparer.quote(column.name)} {column.type.compile(dialect=conn.dialect)} NULL"
+        ))
+        added.append(column.name)
+    return added
+
+
+def apply_schema_migrations(engine=None):
+    """Add missing columns and indexes on existing tables. Returns what was created."""
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    created = []
+
+    with engine.begin() as conn:
+        for model in FILE_MODELS:
+            table = model.__table__
+            if not inspector.has_table(table.name):
+                continue
+            added = _add_missing_columns(conn, inspector, table)
+            created.extend(f"{table.name}.{name}" for name in added)
+            if 'file_size' in added:
+                # Sizes are cheap to derive in SQL; hashes stay NULL until a file is re-saved
+                conn.execute(text(
+                    f"UPDATE {table.name} SET file_size = LENGTH(file_data) WHERE file_size IS NULL"
+                ))
+
+        for model in MIGRATED_MODELS:
+            table = model.__table__
+            if not inspector.has_table(table.name):
+                continue  # create_all() builds new tables with their indexes
+
+            existing = inspector.get_indexes(table.name) + [
+                dict(uc, unique=True) for uc in inspector.get_unique_constraints(table.name)
+            ]
+            names = {ix['name'] for ix in existing}
+            covered = {(tuple(ix['column_names']), bool(ix.get('unique'))) for ix in existing}
+
+            for index in sorted(table.indexes, key=lambda ix: ix.name):
+                columns = tuple(c.name for c in index.columns)
+                if index.name in names or (columns, True) in covered or (columns, bool(index.unique)) in covered:
+                    continue
+                if index.unique:
+                    groups = _duplicate_groups(conn, table, columns)
+                    if groups:
+                        logger.error(
+                            f"Not creating unique index {index.name}: duplicates in "
+                            f"{_describe_duplicates(table, columns, groups)}. "
+                            f"Clean them up, e.g. with: python -m models.migrations --remove-duplicates"
+                        )
+                        continue
+                index.create(conn)
+                created.append(index.name)
+                logger.info(f"Created index {index.name} on {table.name}{columns}")
+
+    return created
+
+
+def main():
+    import argparse
+
+    from flask import Flask
+
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Report (and remove) duplicate mapping rows that block unique indexes.")
+    parser.add_argument("--uri", default=Config.SQLALCHEMY_DATABASE_URI, help="SQLAlchemy URI (default: DB_URI)")
+    parser.add_argument("--remove-duplicates", action="store_true",
+                        help="delete all but the lowest id of each duplicate group, then create the indexes")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = args.uri
+    db.init_app(app)
+    with app.app_context():
+        found = remove_duplicate_rows(dry_run=not args.remove_duplicates)
+        if not found:
+            print("No duplicate mapping rows")
+        elif not args.remove_duplicates:
+            print(f"Duplicate rows: {found}; rerun with --remove-duplicates to delete them")
+        created = apply_schema_migrations()
+        if created:
+            print(f"Applied schema migrations: {', '.join(created)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 from extensions import db
 from datetime import datetime
+import hashlib
 from sqlalchemy import LargeBinary
+from sqlalchemy.orm import deferred, validates
 
 # ========================
 # Executive-related Models
@@ -10,7 +12,7 @@ class Executive(db.Model):
     __tablename__ = 'executives'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
-    code = db.Column(db.String(50), nullable=True)
+    code = db.Column(db.String(50), nullable=True, index=True)
 
     customers = db.relationship("Customer", backref="executive", lazy=True)
     branches = db.relationship("BranchExecutiveMap", backref="executive", lazy=True)
@@ -22,10 +24,10 @@ class Executive(db.Model):
 class Customer(db.Model):
     __tablename__ = 'customers'
     id = db.Column(db.Integer, primary_key=True)
-    code = db.Column(db.String(50), nullable=False)
+    code = db.Column(db.String(50), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=True)
 
-    executive_id = db.Column(db.Integer, db.ForeignKey('executives.id'))
+    executive_id = db.Column(db.Integer, db.ForeignKey('executives.id'), index=True)
 
 # ========================
 # Branch and Region
@@ -48,12 +50,19 @@ class Region(db.Model):
 
 class BranchExecutiveMap(db.Model):
     __tablename__ = 'branch_exec_map'
+    __table_args__ = (
+        db.Index('uq_branch_exec_map_executive_branch', 'executive_id', 'branch_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     branch_id = db.Column(db.Integer, db.ForeignKey('branches.id'), nullable=False)
     executive_id = db.Column(db.Integer, db.ForeignKey('executives.id'), nullable=False)
 
 class RegionBranchMap(db.Model):
     __tablename__ = 'region_branch_map'
+    __table_args__ = (
+        # Leading branch_id also serves the branch -> region lookups
+        db.Index('uq_region_branch_map_branch_region', 'branch_id', 'region_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     region_id = db.Column(db.Integer, db.ForeignKey('regions.id'), nullable=False)
     branch_id = db.Column(db.Integer, db.ForeignKey('branches.id'), nullable=False)
@@ -78,6 +87,9 @@ class Product(db.Model):
 
 class CompanyProductMap(db.Model):
     __tablename__ = 'company_product_map'
+    __table_args__ = (
+        db.Index('uq_company_product_map_company_product', 'company_id', 'product_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
@@ -86,30 +98,45 @@ class CompanyProductMap(db.Model):
 # File Processing
 # ========================
 
-class BudgetFile(db.Model):
+class StoredFileMixin:
+    """
+    file_data is deferred so listings never pull the blob; file_size and
+    file_hash are filled in whenever file_data is assigned.
+    """
+    file_size = db.Column(db.BigInteger, nullable=True)
+    file_hash = db.Column(db.String(64), nullable=True)
+
+    @validates('file_data')
+    def _record_file_stats(self, key, value):
+        if value is not None:
+            self.file_size = len(value)
+            self.file_hash = hashlib.sha256(value).hexdigest()
+        return value
+
+class BudgetFile(StoredFileMixin, db.Model):
     __tablename__ = "budget_files"
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
-    file_data = db.Column(LargeBinary, nullable=False)
+    file_data = deferred(db.Column(LargeBinary, nullable=False))
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-class SalesFile(db.Model):
+class SalesFile(StoredFileMixin, db.Model):
     __tablename__ = "sales_files"
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
-    file_data = db.Column(db.LargeBinary, nullable=False)
+    file_data = deferred(db.Column(db.LargeBinary, nullable=False))
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-class OsFile(db.Model):
+class OsFile(StoredFileMixin, db.Model):
     __tablename__ = "os_files"
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
-    file_data = db.Column(db.LargeBinary, nullable=False)
+    file_data = deferred(db.Column(db.LargeBinary, nullable=False))
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-class LastYearSalesFile(db.Model):
+class LastYearSalesFile(StoredFileMixin, db.Model):
     __tablename__ = 'last_year_sales_files'
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
-    file_data = db.Column(db.LargeBinary, nullable=False)
+    file_data = deferred(db.Column(db.LargeBinary, nullable=False))
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
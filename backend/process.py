@@ -7,6 +7,7 @@ from io import BytesIO
 import traceback
 from fuzzywuzzy import process
 import Levenshtein
+from utils.column_resolver import resolve_column
 
 # Configuration
 warnings.filterwarnings('ignore')
@@ -244,28 +245,33 @@ def extract_tables(df, possible_headers, is_product_analysis=False):
     
     return None, None
 
-def find_column(df, possible_names, case_sensitive=False, threshold=80):
+def _match_column(columns, possible_names, case_sensitive=False, threshold=80):
     """Enhanced fuzzy matching for column names"""
     if isinstance(possible_names, str):
         possible_names = [possible_names]
     
     for name in possible_names:
         if case_sensitive:
-            if name in df.columns:
+            if name in columns:
                 return name
         else:
-            for col in df.columns:
+            for col in columns:
                 if col.lower() == name.lower():
                     return col
     
     # If exact match not found, try fuzzy matching
     for name in possible_names:
-        matches = process.extractOne(name, df.columns, score_cutoff=threshold)
+        matches = process.extractOne(name, columns, score_cutoff=threshold)
         if matches:
             return matches[0]
     
     return None
 
+def find_column(df, possible_names, case_sensitive=False, threshold=80):
+    """Enhanced fuzzy matching for column names (cached per header row)"""
+    return resolve_column(df.columns, possible_names, _match_column,
+                          case_sensitive=case_sensitive, threshold=threshold)
+
 def standardize_column_names(df, is_auditor=False):
     """Standardize column names for consistency"""
     df = df.copy()
@@ -4,6 +4,8 @@ import re
 import traceback
 import logging
 from utils.auditor.data_processor import DataProcessor
+from utils.result_store import drop_table, get_table, put_table, result_key, result_store_stats
+from utils.workbook_cache import file_digest
 
 # Create the blueprint
 auditor_bp = Blueprint('auditor', __name__)
@@ -50,6 +52,44 @@ def get_session_key(filepath, sheet_name, table_type):
         logger.error(f"Error generating session key: {str(e)}")
         return f"auditor_default_{table_type}"
 
+def _table_store_key(filepath, sheet_name, table_type):
+    """Result store key of a processed table: file content, sheet and table type (None if the file is unreadable)"""
+    try:
+        return result_key('auditor', file_digest(filepath), sheet_name, table_type)
+    except OSError as e:
+        logger.warning(f"Cannot key cached table for {filepath}: {str(e)}")
+        return None
+
+def store_table(filepath, sheet_name, table_type, table_df, table_data):
+    """Keep a processed table in the result store; the session only remembers its store key"""
+    store_key = _table_store_key(filepath, sheet_name, table_type)
+    if store_key is None:
+        return
+    put_table(store_key, table_df, {k: v for k, v in table_data.items() if k != 'data'})
+    session[get_session_key(filepath, sheet_name, table_type)] = store_key
+
+def stored_table(filepath, sheet_name, table_type):
+    """(DataFrame, metadata) of a table this session processed, or None if not cached (or expired)"""
+    session_key = get_session_key(filepath, sheet_name, table_type)
+    store_key = session.get(session_key)
+    if store_key is None:
+        return None
+    stored = get_table(store_key) if store_key == _table_store_key(filepath, sheet_name, table_type) else None
+    if stored is None:
+        # expired, evicted from disk, the file changed, or an old session holding the whole table
+        session.pop(session_key, None)
+    return stored
+
+def drop_stored(store_key):
+    """Remove a session's cached table from the result store, so the next request reprocesses it"""
+    if isinstance(store_key, str):
+        drop_table(store_key)
+
+def table_payload(stored):
+    """Response of process-auditor-auto for a stored (DataFrame, metadata) table"""
+    table_df, meta = stored
+    return dict(meta, data=table_df.to_dict('records'))
+
 @auditor_bp.route('/process-auditor-auto', methods=['POST'])
 def process_auditor_auto():
     """Auto-process auditor table and store both tables in session"""
@@ -78,19 +118,19 @@ def process_auditor_auto():
         table2_key = get_session_key(filepath, sheet_name, 'Table2')
         
         logger.debug(f"Session keys: table1={table1_key}, table2={table2_key}")
-        logger.debug(f"Session contains table1: {'table1_key' in session}, table2: {'table2_key' in session}")
-        
-        if not force_refresh and table1_key in session and table2_key in session:
-            logger.info("Both tables found in session, returning cached data")
-            # Return the requested table from session
-            if table_choice == "Table 1: SALES in MT/Tonage" and table1_key in session:
-                stored_data = session[table1_key]
-                logger.info("Returning cached Table 1 data")
-                return jsonify(stored_data)
-            elif table_choice == "Table 2: SALES in Value" and table2_key in session:
-                stored_data = session[table2_key]
-                logger.info("Returning cached Table 2 data")
-                return jsonify(stored_data)
+        
+        if not force_refresh:
+            stored1 = stored_table(filepath, sheet_name, 'Table1')
+            stored2 = stored_table(filepath, sheet_name, 'Table2')
+            logger.debug(f"Result store contains table1: {stored1 is not None}, table2: {stored2 is not None}")
+            if stored1 is not None and stored2 is not None:
+                logger.info("Both tables found in result store, returning cached data")
+                if table_choice == "Table 1: SALES in MT/Tonage":
+                    logger.info("Returning cached Table 1 data")
+                    return jsonify(table_payload(stored1))
+                elif table_choice == "Table 2: SALES in Value":
+                    logger.info("Returning cached Table 2 data")
+                    return jsonify(table_payload(stored2))
         
         # Initialize DataProcessor
         try:
@@ -210,7 +250,7 @@ def process_auditor_auto():
                         
                         logger.info(f"Table 1 column analysis: Act={len(act_columns1)}, Gr={len(gr_columns1)}, Ach={len(ach_columns1)}, Budget={len(budget_columns1)}, LY={len(ly_columns1)}")
                         
-                        # Prepare Table 1 data for session storage
+                        # Prepare Table 1 response (rows go to the result store)
                         table1_data = {
                             'success': True,
                             'table_name': 'Table 1: SALES in MT/Tonage',
@@ -234,9 +274,9 @@ def process_auditor_auto():
                             }
                         }
                         
-                        # Store in session
-                        session[table1_key] = table1_data
-                        logger.info(f"Table 1 stored in session with key: {table1_key}")
+                        # Store in the result store (the session keeps only its key)
+                        store_table(filepath, sheet_name, 'Table1', table1_df, table1_data)
+                        logger.info(f"Table 1 stored with session key: {table1_key}")
                     else:
                         logger.warning("Table 1 dataframe is empty after processing")
                         
@@ -278,7 +318,7 @@ def process_auditor_auto():
                         
                         logger.info(f"Table 2 column analysis: Act={len(act_columns2)}, Gr={len(gr_columns2)}, Ach={len(ach_columns2)}, Budget={len(budget_columns2)}, LY={len(ly_columns2)}")
                         
-                        # Prepare Table 2 data for session storage
+                        # Prepare Table 2 response (rows go to the result store)
                         table2_data = {
                             'success': True,
                             'table_name': 'Table 2: SALES in Value',
@@ -302,9 +342,9 @@ def process_auditor_auto():
                             }
                         }
                         
-                        # Store in session
-                        session[table2_key] = table2_data
-                        logger.info(f"Table 2 stored in session with key: {table2_key}")
+                        # Store in the result store (the session keeps only its key)
+                        store_table(filepath, sheet_name, 'Table2', table2_df, table2_data)
+                        logger.info(f"Table 2 stored with session key: {table2_key}")
                     else:
                         logger.warning("Table 2 dataframe is empty after processing")
                         
@@ -402,38 +442,38 @@ def get_available_tables():
             logger.error(f"Missing required parameters")
             return jsonify({'error': 'Missing filepath or sheet_name'}), 400
         
-        # Check session first
-        table1_key = get_session_key(filepath, sheet_name, 'Table1')
-        table2_key = get_session_key(filepath, sheet_name, 'Table2')
+        # Check the result store first
+        stored1 = stored_table(filepath, sheet_name, 'Table1')
+        stored2 = stored_table(filepath, sheet_name, 'Table2')
         
         available_tables = []
         table_info = {}
         
-        # Check if tables are in session
-        if table1_key in session:
+        # Check if tables are cached
+        if stored1 is not None:
             available_tables.append("Table 1: SALES in MT/Tonage")
             table_info["Table 1: SALES in MT/Tonage"] = {
                 'source': 'session_cache',
-                'estimated_rows': session[table1_key]['shape'][0]
+                'estimated_rows': stored1[1]['shape'][0]
             }
             logger.info("Found Table 1 in session cache")
         
-        if table2_key in session:
+        if stored2 is not None:
             available_tables.append("Table 2: SALES in Value")
             table_info["Table 2: SALES in Value"] = {
                 'source': 'session_cache',
-                'estimated_rows': session[table2_key]['shape'][0]
+                'estimated_rows': stored2[1]['shape'][0]
             }
             logger.info("Found Table 2 in session cache")
         
-        # If both tables are in session, return cached info
+        # If both tables are cached, return cached info
         if len(available_tables) == 2:
             logger.info("Both tables found in cache, returning cached information")
             return jsonify({
                 'success': True,
                 'available_tables': available_tables,
                 'table_info': table_info,
-                'analysis_type': session[table2_key]['analysis_type'] if table2_key in session else session[table1_key]['analysis_type'],
+                'analysis_type': stored2[1]['analysis_type'],
                 'default_table': "Table 2: SALES in Value" if "Table 2: SALES in Value" in available_tables else available_tables[0],
                 'from_cache': True
             })
@@ -555,18 +595,19 @@ def get_cached_table():
         
         # Determine which table to get
         if table_choice == "Table 1: SALES in MT/Tonage":
-            table_key = get_session_key(filepath, sheet_name, 'Table1')
+            table_type = 'Table1'
         elif table_choice == "Table 2: SALES in Value":
-            table_key = get_session_key(filepath, sheet_name, 'Table2')
+            table_type = 'Table2'
         else:
             return jsonify({'error': 'Invalid table choice'}), 400
         
-        # Check if table exists in session
-        if table_key in session:
+        # Check if table exists in the result store
+        stored = stored_table(filepath, sheet_name, table_type)
+        if stored is not None:
             logger.info(f"Returning cached table: {table_choice}")
-            return jsonify(session[table_key])
+            return jsonify(table_payload(stored))
         else:
-            logger.warning(f"Table not found in cache: {table_key}")
+            logger.warning(f"Table not found in cache: {get_session_key(filepath, sheet_name, table_type)}")
             return jsonify({'error': 'Table not found in cache. Please refresh.'}), 404
             
     except Exception as e:
@@ -592,12 +633,10 @@ def clear_session_cache():
             table2_key = get_session_key(filepath, sheet_name, 'Table2')
             
             removed_count = 0
-            if table1_key in session:
-                session.pop(table1_key, None)
-                removed_count += 1
-            if table2_key in session:
-                session.pop(table2_key, None)
-                removed_count += 1
+            for key in (table1_key, table2_key):
+                if key in session:
+                    drop_stored(session.pop(key))
+                    removed_count += 1
             
             logger.info(f"Cleared {removed_count} tables for sheet '{sheet_name}'")
             
@@ -609,7 +648,7 @@ def clear_session_cache():
             # Clear all auditor cache
             keys_to_remove = [key for key in session.keys() if key.startswith('auditor_')]
             for key in keys_to_remove:
-                session.pop(key, None)
+                drop_stored(session.pop(key, None))
             
             logger.info(f"Cleared {len(keys_to_remove)} cached tables")
             
@@ -644,19 +683,16 @@ def export_auditor_data():
         if not filepath or not sheet_name:
             return jsonify({'error': 'Missing filepath or sheet_name'}), 400
         
-        # Try to get data from session cache first
-        if table_choice == "Table 1: SALES in MT/Tonage":
-            table_key = get_session_key(filepath, sheet_name, 'Table1')
-        else:
-            table_key = get_session_key(filepath, sheet_name, 'Table2')
+        # Try to get data from the result store first
+        table_type = 'Table1' if table_choice == "Table 1: SALES in MT/Tonage" else 'Table2'
         
         df = None
+        stored = stored_table(filepath, sheet_name, table_type)
         
-        if table_key in session:
-            # Get data from session
+        if stored is not None:
+            # Get data from the result store
             logger.info("Getting data from session cache")
-            cached_data = session[table_key]
-            df = pd.DataFrame(cached_data['data'])
+            df = stored[0]
         else:
             # If not in cache, process fresh (fallback)
             logger.info("Data not in cache, processing fresh")
@@ -749,12 +785,18 @@ def debug_session():
         
         for key in auditor_keys:
             try:
-                data = session[key]
+                stored = get_table(session[key]) if isinstance(session[key], str) else None
+                if stored is None:
+                    session_info[key] = {'store_key': session[key], 'cached': False}
+                    continue
+                table_df, data = stored
                 session_info[key] = {
+                    'store_key': session[key],
+                    'cached': True,
                     'table_name': data.get('table_name', 'Unknown'),
                     'shape': data.get('shape', [0, 0]),
                     'columns_count': len(data.get('columns', [])),
-                    'data_rows': len(data.get('data', [])),
+                    'data_rows': len(table_df),
                     'success': data.get('success', False)
                 }
             except Exception as e:
@@ -764,7 +806,8 @@ def debug_session():
             'success': True,
             'total_auditor_keys': len(auditor_keys),
             'session_info': session_info,
-            'all_session_keys': list(session.keys())
+            'all_session_keys': list(session.keys()),
+            'result_store': result_store_stats()
         })
         
     except Exception as e:
@@ -786,7 +829,8 @@ def health_check():
             'message': 'Auditor blueprint is healthy',
             'data_processor_available': True,
             'session_keys_count': len(session.keys()),
-            'auditor_session_keys': len([k for k in session.keys() if k.startswith('auditor_')])
+            'auditor_session_keys': len([k for k in session.keys() if k.startswith('auditor_')]),
+            'result_store': result_store_stats()
         })
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
@@ -794,4 +838,9 @@ def health_check():
             'success': False,
             'error': f'Health check failed: {str(e)}',
             'data_processor_available': False
-        }), 500
\ No newline at end of file
+        }), 500
+
+@auditor_bp.route('/result-store-stats', methods=['GET'])
+def result_store_stats_endpoint():
+    """Hit/miss counters and size of the server-side result store"""
+    return jsonify({'success': True, 'result_store': result_store_stats()})
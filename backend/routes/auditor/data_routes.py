@@ -3,6 +3,7 @@ import pandas as pd
 from io import BytesIO
 import traceback
 from process import safe_merge_dataframes, clean_and_convert_numeric
+from utils.xlsx_export import frames_response
 
 # Create the blueprint - this line is CRITICAL
 data_bp = Blueprint('data', __name__)
@@ -124,39 +125,30 @@ def export_excel():
         if not datasets:
             return jsonify({'error': 'No datasets provided for export'}), 400
         
-        # Create Excel writer
-        output = BytesIO()
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            for dataset in datasets:
-                try:
-                    df = pd.read_excel(dataset['filepath'], sheet_name=dataset['sheet_name'])
-                    df = clean_and_convert_numeric(df)
-                    
-                    # Use provided sheet name or generate one
-                    export_sheet_name = dataset.get('export_name', dataset['sheet_name'])
-                    
-                    # Excel sheet names have a 31 character limit
-                    if len(export_sheet_name) > 31:
-                        export_sheet_name = export_sheet_name[:31]
-                    
-                    df.to_excel(writer, sheet_name=export_sheet_name, index=False)
-                    
-                except Exception as e:
-                    return jsonify({'error': f"Failed to process dataset {dataset.get('name', 'Unknown')}: {str(e)}"}), 400
-        
-        output.seek(0)
+        # Load every dataset first, then stream them out with the constant-memory writer
+        sheets = []
+        for dataset in datasets:
+            try:
+                df = pd.read_excel(dataset['filepath'], sheet_name=dataset['sheet_name'])
+                df = clean_and_convert_numeric(df)
+                
+                # Use provided sheet name or generate one
+                export_sheet_name = dataset.get('export_name', dataset['sheet_name'])
+                
+                # Excel sheet names have a 31 character limit
+                if len(export_sheet_name) > 31:
+                    export_sheet_name = export_sheet_name[:31]
+                
+                sheets.append((export_sheet_name, df))
+                
+            except Exception as e:
+                return jsonify({'error': f"Failed to process dataset {dataset.get('name', 'Unknown')}: {str(e)}"}), 400
         
         # Ensure filename has .xlsx extension
         if not filename.endswith('.xlsx'):
             filename += '.xlsx'
         
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
+        return frames_response(sheets, filename)
         
     except Exception as e:
         return jsonify({'error': f'Excel export failed: {str(e)}'}), 500
@@ -7,6 +7,9 @@ from io import BytesIO
 import os
 from werkzeug.utils import secure_filename
 import base64
+from utils.column_resolver import resolve_column
+from utils.job_queue import background_job
+from utils.xlsx_export import open_workbook
 
 ero_pw_bp = Blueprint('ero_pw', __name__, url_prefix='/api/ero-pw')
 
@@ -388,7 +391,7 @@ def handle_duplicate_columns(df):
     df.columns = cols
     return df
 
-def find_column(df, search_terms, threshold=80, case_sensitive=False):
+def _match_column(columns, search_terms, threshold=80, case_sensitive=False):
     """Find column by fuzzy matching"""
     from difflib import SequenceMatcher
     
@@ -397,11 +400,16 @@ def find_column(df, search_terms, threshold=80, case_sensitive=False):
                              b.lower() if not case_sensitive else b).ratio() * 100
     
     for term in search_terms:
-        for col in df.columns:
+        for col in columns:
             if similarity(str(col), term) >= threshold:
                 return col
     return None
 
+def find_column(df, search_terms, threshold=80, case_sensitive=False):
+    """Find column by fuzzy matching (cached per header row)"""
+    return resolve_column(df.columns, search_terms, _match_column,
+                          threshold=threshold, case_sensitive=case_sensitive)
+
 def process_budget_data_product_region(budget_df, group_type='product_region'):
     """Process budget data for ERO-PW analysis"""
     budget_df = handle_duplicate_columns(budget_df.copy())
@@ -1083,6 +1091,7 @@ def calculate_total_row_with_proper_formulas(valid_products, product_name='TOTAL
 
 # Main ERO-PW Analysis Processing Endpoint
 @ero_pw_bp.route('/process-ero-pw', methods=['POST'])
+@background_job
 def process_ero_pw_analysis():
     """Process ERO-PW data analysis - UPDATED with smart header detection"""
     try:
@@ -1722,9 +1731,9 @@ def export_combined_ero_pw_excel():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"ero_pw_combined_analysis_west_{fiscal_year}_{timestamp}.xlsx"
         
+        # Constant-memory workbook: rows are flushed as they are written (top to bottom)
         output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            workbook = writer.book
+        with open_workbook(output) as workbook:
             
             # Enhanced formats matching TS-PW style exactly
             def create_enhanced_formats():
@@ -1794,6 +1803,15 @@ def export_combined_ero_pw_excel():
                 formats['footer'] = workbook.add_format({
                     'font_size': 9, 'italic': True, 'font_color': '#666666'
                 })
+
+                formats['number'] = workbook.add_format({
+                    'num_format': '#,##0.00', 'border': 1
+                })
+                
+                formats['total_label'] = workbook.add_format({
+                    'bold': True, 'bg_color': '#C3E6CB', 
+                    'font_color': '#155724', 'border': 1
+                })
                 
                 return formats
             
@@ -1816,7 +1834,7 @@ def export_combined_ero_pw_excel():
                 elif 'YTD' in col_name_upper:
                     return formats['ytd']
                 else:
-                    return workbook.add_format({'num_format': '#,##0.00', 'border': 1})
+                    return formats['number']
             
             def write_table_data(worksheet, data, columns, start_row, table_title, formats):
                 """Write table data with enhanced formatting"""
@@ -1847,10 +1865,7 @@ def export_combined_ero_pw_excel():
                         
                         if col_num == 0:  # Product column
                             if str(cell_value).upper() == 'TOTAL SALES':
-                                fmt = workbook.add_format({
-                                    'bold': True, 'bg_color': '#C3E6CB', 
-                                    'font_color': '#155724', 'border': 1
-                                })
+                                fmt = formats['total_label']
                             else:
                                 fmt = formats['text']
                             worksheet.write(current_row, col_num, str(cell_value), fmt)
@@ -7,6 +7,11 @@ from io import BytesIO
 import os
 from werkzeug.utils import secure_filename
 import base64
+import uuid
+from utils.column_resolver import resolve_column
+from utils.result_store import get_table, put_table, result_key
+from utils.job_queue import background_job
+from utils.xlsx_export import export_file, open_workbook, xlsx_response
 
 product_bp = Blueprint('product', __name__, url_prefix='/api/product')
 
@@ -849,14 +854,15 @@ def store_totals_in_session(data_dict, data_type='mt'):
         if 'total_sales_data' not in session:
             session['total_sales_data'] = {}
         
-        # Store the total sales row data
+        # Store the total sales row in the result store; the session keeps its key
         session_key = 'tonnage' if data_type.lower() == 'mt' else 'value'
-        session['total_sales_data'][session_key] = {
-            'data': total_sales_row,
+        store_key = result_key('total_sales_data', _store_owner(), session_key)
+        put_table(store_key, pd.DataFrame([total_sales_row]), {
             'columns': data_dict['columns'],
             'timestamp': datetime.now().isoformat(),
             'source': 'product_analysis'
-        }
+        })
+        session['total_sales_data'][session_key] = store_key
         
         # Mark session as modified
         session.modified = True
@@ -868,6 +874,26 @@ def store_totals_in_session(data_dict, data_type='mt'):
         current_app.logger.error(f"Error storing {data_type} totals in session: {str(e)}")
         return False
 
+def _store_owner():
+    """Opaque id of this session's entries in the result store"""
+    if 'result_store_owner' not in session:
+        session['result_store_owner'] = uuid.uuid4().hex
+    return session['result_store_owner']
+
+def stored_totals():
+    """
+    Totals stored by store_totals_in_session for this session, as
+    {'tonnage'|'value': {'data': total sales row, 'columns', 'timestamp', 'source'}};
+    expired entries are left out
+    """
+    totals = {}
+    for kind, store_key in session.get('total_sales_data', {}).items():
+        stored = get_table(store_key) if isinstance(store_key, str) else None
+        if stored is not None:
+            row_df, meta = stored
+            totals[kind] = dict(meta, data=row_df.to_dict('records')[0])
+    return totals
+
 # Utility functions
 def handle_duplicate_columns(df):
     """Handle duplicate column names by adding suffix"""
@@ -882,7 +908,7 @@ def handle_duplicate_columns(df):
     df.columns = cols
     return df
 
-def find_column(df, possible_names, threshold=80, case_sensitive=False):
+def _match_column(columns, possible_names, threshold=80, case_sensitive=False):
     """Find column by fuzzy matching"""
     from difflib import SequenceMatcher
     
@@ -892,7 +918,7 @@ def find_column(df, possible_names, threshold=80, case_sensitive=False):
     best_match = None
     best_score = 0
     
-    for col in df.columns:
+    for col in columns:
         for name in possible_names:
             if not case_sensitive:
                 score = similarity(str(col).lower(), str(name).lower())
@@ -905,6 +931,11 @@ def find_column(df, possible_names, threshold=80, case_sensitive=False):
     
     return best_match
 
+def find_column(df, possible_names, threshold=80, case_sensitive=False):
+    """Find column by fuzzy matching (cached per header row)"""
+    return resolve_column(df.columns, possible_names, _match_column,
+                          threshold=threshold, case_sensitive=case_sensitive)
+
 def rename_columns(columns):
     """Rename columns to standard format"""
     renamed = []
@@ -1777,6 +1808,7 @@ def build_merge_analysis(budget_data, all_products, actual_mt_data, actual_value
 
 # MAIN ENDPOINT: Process product analysis with conditional Gr/Ach calculation
 @product_bp.route('/process', methods=['POST'])
+@background_job
 def process_product_analysis():
     """Process product analysis with budget, sales data, and LAST YEAR data - Only calculate Gr/Ach when Act values present"""
     try:
@@ -2480,10 +2512,8 @@ def download_combined_single_sheet():
                 'error': 'No data provided for download'
             }), 400
         
-        output = BytesIO()
-        
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            workbook = writer.book
+        # Constant-memory workbook written to a temporary file, streamed back in chunks
+        with export_file() as path, open_workbook(path) as workbook:
             
             # Define enhanced formats
             title_format = workbook.add_format({
@@ -2787,18 +2817,12 @@ def download_combined_single_sheet():
             worksheet.set_paper(9)  # A4
             worksheet.fit_to_pages(1, 0)  # Fit to 1 page wide, unlimited pages tall
         
-        excel_data = output.getvalue()
-        
         current_app.logger.info(f"=== DEBUG: Product download file generated successfully ===")
-        current_app.logger.info(f"File size: {len(excel_data)} bytes")
+        current_app.logger.info(f"File size: {os.path.getsize(path)} bytes")
         
-        # Return as binary data for download
-        from flask import send_file
-        return send_file(
-            BytesIO(excel_data),
-            as_attachment=True,
-            download_name=f"product_report{fiscal_year}_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        # Stream the file for download
+        return xlsx_response(
+            path, f"product_report{fiscal_year}_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
         )
         
     except Exception as e:
@@ -2816,4 +2840,4 @@ def download_combined_single_sheet():
 
 
 # Export the blueprint
-__all__ = ['product_bp', 'store_totals_in_session']
+__all__ = ['product_bp', 'store_totals_in_session', 'stored_totals']
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 import pandas as pd
 import numpy as np
 import re
@@ -9,6 +9,11 @@ from werkzeug.utils import secure_filename
 import os
 import xlsxwriter
 
+from utils.auditor.branch_resolver import resolve_branch_names
+from utils.column_resolver import resolve_column
+from utils.job_queue import background_job
+from utils.xlsx_export import export_file, open_workbook, xlsx_response
+
 region_bp = Blueprint('region', __name__)
 
 # Enhanced column aliases for comprehensive branch identification
@@ -106,66 +111,41 @@ def create_branch_name_mappings():
     
     return branch_mappings
 
+# Built once; the resolver caches decisions by mapping content, so share one dict
+DEFAULT_BRANCH_MAPPINGS = create_branch_name_mappings()
+
 def normalize_branch_name(branch_name, branch_mappings=None):
     """
     Normalize branch name using various mapping strategies
+    (prefix/suffix stripping, direct mapping, then fuzzy matching; see
+    utils.auditor.branch_resolver, which resolves whole columns at once)
     """
-    if pd.isna(branch_name) or branch_name == '':
-        return ''
-    
-    # Convert to string and clean
-    clean_name = str(branch_name).strip().upper()
-    
-    # Remove common prefixes/suffixes
-    prefixes_to_remove = ['BRANCH', 'REGION', 'OFFICE', 'DEPOT', 'UNIT', 'DIVISION', 'CENTRE', 'CENTER']
-    suffixes_to_remove = ['BRANCH', 'REGION', 'OFFICE', 'DEPOT', 'UNIT', 'DIVISION', 'CENTRE', 'CENTER']
-    
-    for prefix in prefixes_to_remove:
-        if clean_name.startswith(prefix + ' '):
-            clean_name = clean_name[len(prefix):].strip()
-    
-    for suffix in suffixes_to_remove:
-        if clean_name.endswith(' ' + suffix):
-            clean_name = clean_name[:-len(suffix)].strip()
-    
-    # Use mappings if provided, otherwise use default
     if branch_mappings is None:
-        branch_mappings = create_branch_name_mappings()
-    
-    # Direct mapping
-    if clean_name in branch_mappings:
-        return branch_mappings[clean_name]
-    
-    # Fuzzy matching for close matches
-    best_match = process.extractOne(clean_name, list(branch_mappings.keys()), score_cutoff=85)
-    if best_match:
-        return branch_mappings[best_match[0]]
-    
-    # Return cleaned name if no mapping found
-    return clean_name
+        branch_mappings = DEFAULT_BRANCH_MAPPINGS
+    return resolve_branch_names([branch_name], branch_mappings).iloc[0]
 
-def find_column(df, possible_names, case_sensitive=False, threshold=80):
+def _match_column(columns, possible_names, case_sensitive=False, threshold=80):
     """Enhanced fuzzy matching for column names"""
     if isinstance(possible_names, str):
         possible_names = [possible_names]
     
     for name in possible_names:
         if case_sensitive:
-            if name in df.columns:
+            if name in columns:
                 return name
         else:
-            for col in df.columns:
+            for col in columns:
                 if col.lower() == name.lower():
                     return col
     
     for name in possible_names:
-        matches = process.extractOne(name, df.columns, score_cutoff=threshold)
+        matches = process.extractOne(name, columns, score_cutoff=threshold)
         if matches:
             return matches[0]
     
     return None
 
-def enhanced_find_column(df, possible_names, case_sensitive=False, threshold=80, exact_match_priority=True):
+def _enhanced_match_column(columns, possible_names, case_sensitive=False, threshold=80, exact_match_priority=True):
     """
     Enhanced fuzzy matching for column names with priority for exact matches
     """
@@ -176,21 +156,35 @@ def enhanced_find_column(df, possible_names, case_sensitive=False, threshold=80,
     if exact_match_priority:
         for name in possible_names:
             if case_sensitive:
-                if name in df.columns:
+                if name in columns:
                     return name
             else:
-                for col in df.columns:
+                for col in columns:
                     if col.lower() == name.lower():
                         return col
     
     # Then try fuzzy matching
     for name in possible_names:
-        matches = process.extractOne(name, df.columns, score_cutoff=threshold)
+        matches = process.extractOne(name, columns, score_cutoff=threshold)
         if matches:
             return matches[0]
     
     return None
 
+def find_column(df, possible_names, case_sensitive=False, threshold=80):
+    """Enhanced fuzzy matching for column names (cached per header row)"""
+    return resolve_column(df.columns, possible_names, _match_column,
+                          case_sensitive=case_sensitive, threshold=threshold)
+
+def enhanced_find_column(df, possible_names, case_sensitive=False, threshold=80, exact_match_priority=True):
+    """
+    Enhanced fuzzy matching for column names with priority for exact matches
+    (cached per header row)
+    """
+    return resolve_column(df.columns, possible_names, _enhanced_match_column,
+                          case_sensitive=case_sensitive, threshold=threshold,
+                          exact_match_priority=exact_match_priority)
+
 def handle_duplicate_columns(df):
     """Handle duplicate column names by renaming them"""
     cols = pd.Series(df.columns)
@@ -358,8 +352,8 @@ def process_budget_data(budget_df, group_type='region'):
     budget_data = budget_data.rename(columns=rename_dict)
     
     # Enhanced branch name normalization for budget data
-    budget_data[rename_dict[identifier_col]] = budget_data[rename_dict[identifier_col]].apply(
-        lambda x: normalize_branch_name(x) if pd.notna(x) else ''
+    budget_data[rename_dict[identifier_col]] = resolve_branch_names(
+        budget_data[rename_dict[identifier_col]], DEFAULT_BRANCH_MAPPINGS
     )
     
     return budget_data
@@ -688,11 +682,9 @@ def process_sales_data_for_year(filepath, sheet_name, is_last_year=False, data_t
         print(f"Sample original branch names: {[str(b) for b in original_branches]}")
         
         # Apply branch name normalization
-        branch_mappings = custom_branch_mappings if custom_branch_mappings else create_branch_name_mappings()
+        branch_mappings = custom_branch_mappings if custom_branch_mappings else DEFAULT_BRANCH_MAPPINGS
         df_sales['Branch_Original'] = df_sales['Branch'].copy()
-        df_sales['Branch'] = df_sales['Branch'].apply(
-            lambda x: normalize_branch_name(x, branch_mappings)
-        )
+        df_sales['Branch'] = resolve_branch_names(df_sales['Branch'], branch_mappings)
         
         # Show branch mapping results (sample)
         branch_mapping_sample = df_sales[['Branch_Original', 'Branch']].drop_duplicates().head(5)
@@ -850,6 +842,7 @@ def merge_last_year_data_with_current(current_data, last_year_data):
 
 # Main processing route
 @region_bp.route('/process-region-analysis', methods=['POST'])
+@background_job
 def process_region_analysis():
     """Process region analysis using existing uploaded files from main app"""
     try:
@@ -1364,10 +1357,8 @@ def download_combined_single_sheet():
                 'error': 'No data provided for Excel generation'
             }), 400
         
-        output = BytesIO()
-        
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            workbook = writer.book
+        # Constant-memory workbook written to a temporary file, streamed back in chunks
+        with export_file() as path, open_workbook(path) as workbook:
             
             # Define enhanced formats for single sheet
             title_format = workbook.add_format({
@@ -1610,18 +1601,11 @@ def download_combined_single_sheet():
             worksheet.set_paper(9)  # A4
             worksheet.fit_to_pages(1, 0)  # Fit to 1 page wide, unlimited pages tall
             
-        excel_data = output.getvalue()
-
         # Generate filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"region_sheet_{fiscal_year}_{timestamp}.xlsx"
         
-        return send_file(
-            BytesIO(excel_data),
-            as_attachment=True,
-            download_name=filename,
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        return xlsx_response(path, filename)
         
     except Exception as e:
         print(f"=== DEBUG: Error in enhanced single sheet generation ===")
@@ -6,6 +6,7 @@ from io import BytesIO
 import os
 from werkzeug.utils import secure_filename
 from datetime import datetime
+from routes.auditor.product import stored_totals
 
 # Create Blueprint
 salesmonthwise_bp = Blueprint('salesmonthwise', __name__, url_prefix='/api/salesmonthwise')
@@ -381,6 +382,9 @@ def process_sales_monthwise_with_session():
         filepath = data.get('filepath')
         sheet_name = data.get('sheet_name')
         session_totals = data.get('session_totals', {})  # Get totals from request
+        if not session_totals:
+            # Fall back to the totals product analysis kept in the result store for this session
+            session_totals = {kind: stored['data'] for kind, stored in stored_totals().items()}
         
         if not filepath or not sheet_name:
             return jsonify({
@@ -7,6 +7,9 @@ from io import BytesIO
 import os
 from werkzeug.utils import secure_filename
 import base64
+from utils.column_resolver import resolve_column
+from utils.job_queue import background_job
+from utils.xlsx_export import open_workbook
 
 ts_pw_bp = Blueprint('ts_pw', __name__, url_prefix='/api/ts-pw')
 
@@ -537,7 +540,7 @@ def handle_duplicate_columns(df):
     df.columns = cols
     return df
 
-def find_column(df, search_terms, threshold=80, case_sensitive=False):
+def _match_column(columns, search_terms, threshold=80, case_sensitive=False):
     """Find column by fuzzy matching"""
     from difflib import SequenceMatcher
     
@@ -546,11 +549,16 @@ def find_column(df, search_terms, threshold=80, case_sensitive=False):
                              b.lower() if not case_sensitive else b).ratio() * 100
     
     for term in search_terms:
-        for col in df.columns:
+        for col in columns:
             if similarity(str(col), term) >= threshold:
                 return col
     return None
 
+def find_column(df, search_terms, threshold=80, case_sensitive=False):
+    """Find column by fuzzy matching (cached per header row)"""
+    return resolve_column(df.columns, search_terms, _match_column,
+                          threshold=threshold, case_sensitive=case_sensitive)
+
 def process_budget_data_product_region(budget_df, group_type='product_region'):
     """Process budget data for TS-PW analysis"""
     budget_df = handle_duplicate_columns(budget_df.copy())
@@ -1124,6 +1132,7 @@ def remove_specific_unwanted_columns_fixed(df, product_col_name):
 # Main TS-PW Analysis Processing 
 
 @ts_pw_bp.route('/process-ts-pw', methods=['POST'])
+@background_job
 def process_ts_pw_analysis():
     """Process TS-PW data analysis - UPDATED with flexible budget header reading and FIXED total calculations"""
     try:
@@ -2065,9 +2074,9 @@ def export_combined_ts_pw_excel():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M")
         filename = f"ts_pw_report{fiscal_year}_{timestamp}.xlsx"
         
+        # Constant-memory workbook: rows are flushed as they are written (top to bottom)
         output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            workbook = writer.book
+        with open_workbook(output) as workbook:
             
             # Enhanced formats matching region code exactly
             def create_enhanced_formats():
@@ -2134,6 +2143,15 @@ def export_combined_ts_pw_excel():
                 formats['footer'] = workbook.add_format({
                     'font_size': 9, 'italic': True, 'font_color': '#666666'
                 })
+
+                formats['number'] = workbook.add_format({
+                    'num_format': '#,##0.00', 'border': 1
+                })
+                
+                formats['total_label'] = workbook.add_format({
+                    'bold': True, 'bg_color': '#C3E6CB', 
+                    'font_color': '#155724', 'border': 1
+                })
                 
                 return formats
             
@@ -2156,7 +2174,7 @@ def export_combined_ts_pw_excel():
                 elif 'YTD' in col_name_upper:
                     return formats['ytd']
                 else:
-                    return workbook.add_format({'num_format': '#,##0.00', 'border': 1})
+                    return formats['number']
             
             def write_table_data(worksheet, data, columns, start_row, table_title, formats):
                 """Write table data with enhanced formatting"""
@@ -2187,10 +2205,7 @@ def export_combined_ts_pw_excel():
                         
                         if col_num == 0:  # Product column
                             if str(cell_value).upper() == 'TOTAL SALES':
-                                fmt = workbook.add_format({
-                                    'bold': True, 'bg_color': '#C3E6CB', 
-                                    'font_color': '#155724', 'border': 1
-                                })
+                                fmt = formats['total_label']
                             else:
                                 fmt = formats['text']
                             worksheet.write(current_row, col_num, str(cell_value), fmt)
@@ -3,6 +3,7 @@ import pandas as pd
 import os
 from datetime import datetime
 from werkzeug.utils import secure_filename
+from utils.workbook_inspector import list_sheets
 
 # Create the blueprint - this line is CRITICAL
 upload_bp = Blueprint('upload', __name__)
@@ -41,9 +42,7 @@ def upload_file():
             
             # Read Excel file and get sheet names
             try:
-                xl_file = pd.ExcelFile(filepath)
-                sheet_names = xl_file.sheet_names
-                xl_file.close()
+                sheet_names = list_sheets(filepath)
                 
                 return jsonify({
                     'success': True,
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from models.schema import db, Branch, Region, Executive, BranchExecutiveMap, RegionBranchMap
+from sqlalchemy import func
 
 branch_region_bp = Blueprint("branch_region_bp", __name__)
 
@@ -94,7 +95,8 @@ def map_branch_executives():
 
     BranchExecutiveMap.query.filter_by(branch_id=branch.id).delete()
 
-    for name in exec_names:
+    # dict.fromkeys drops repeated names (the map table is unique per pair)
+    for name in dict.fromkeys(exec_names):
         exec_obj = Executive.query.filter_by(name=name).first()
         if exec_obj:
             db.session.add(BranchExecutiveMap(branch_id=branch.id, executive_id=exec_obj.id))
@@ -114,7 +116,7 @@ def map_region_branches():
 
     RegionBranchMap.query.filter_by(region_id=region.id).delete()
 
-    for bname in branch_names:
+    for bname in dict.fromkeys(branch_names):
         branch = Branch.query.filter_by(name=bname).first()
         if branch:
             db.session.add(RegionBranchMap(region_id=region.id, branch_id=branch.id))
@@ -126,21 +128,37 @@ def map_region_branches():
 
 @branch_region_bp.route("/mappings", methods=["GET"])
 def get_branch_region_exec_mapping():
-    branches = Branch.query.all()
-    result = []
-
-    for b in branches:
-        region = Region.query.join(RegionBranchMap, Region.id == RegionBranchMap.region_id)\
-            .join(Branch, Branch.id == RegionBranchMap.branch_id)\
-            .filter(Branch.id == b.id).first()
-
-        execs = Executive.query.join(BranchExecutiveMap, Executive.id == BranchExecutiveMap.executive_id)\
-            .filter(BranchExecutiveMap.branch_id == b.id).all()
+    # Two round-trips regardless of branch count: branches with their first
+    # mapped region, then every branch/executive pair
+    first_region = (
+        db.session.query(RegionBranchMap.branch_id, func.min(RegionBranchMap.region_id).label("region_id"))
+        .group_by(RegionBranchMap.branch_id)
+        .subquery()
+    )
+    branch_rows = (
+        db.session.query(Branch.id, Branch.name, Region.name)
+        .outerjoin(first_region, first_region.c.branch_id == Branch.id)
+        .outerjoin(Region, Region.id == first_region.c.region_id)
+        .order_by(Branch.id)
+        .all()
+    )
+    exec_rows = (
+        db.session.query(BranchExecutiveMap.branch_id, Executive.name)
+        .join(Executive, Executive.id == BranchExecutiveMap.executive_id)
+        .order_by(Executive.id)
+        .all()
+    )
+    execs_by_branch = {}
+    for branch_id, exec_name in exec_rows:
+        execs_by_branch.setdefault(branch_id, []).append(exec_name)
 
+    result = []
+    for branch_id, branch_name, region_name in branch_rows:
+        execs = execs_by_branch.get(branch_id, [])
         result.append({
-            "branch": b.name,
-            "region": region.name if region else "Unmapped",
-            "executives": [e.name for e in execs],
+            "branch": branch_name,
+            "region": region_name if region_name is not None else "Unmapped",
+            "executives": execs,
             "count": len(execs)
         })
 
@@ -214,18 +232,15 @@ def upload_branch_region_file():
 # Get sheet names from Excel file
 @branch_region_bp.route("/get-sheet-names", methods=["POST"])
 def get_sheet_names():
-    from openpyxl import load_workbook
+    from utils.workbook_inspector import list_sheets
     file = request.files.get("file")
-    wb = load_workbook(file)
-    return jsonify({"sheets": wb.sheetnames})
+    return jsonify({"sheets": list_sheets(file.stream)})
 
 # Preview column names from a sheet
 @branch_region_bp.route("/preview-excel", methods=["POST"])
 def preview_excel():
-    from io import BytesIO
-    import pandas as pd
+    from utils.workbook_inspector import get_columns
     file = request.files.get("file")
     sheet_name = request.form.get("sheet_name")
     header_row = int(request.form.get("header_row", 0))
-    df = pd.read_excel(BytesIO(file.read()), sheet_name=sheet_name, header=header_row)
-    return jsonify({"columns": list(df.columns)})
+    return jsonify({"columns": get_columns(file.stream, sheet_name=sheet_name, header=header_row)})
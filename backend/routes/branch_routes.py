@@ -5,15 +5,20 @@ import datetime
 import logging
 import json 
 from werkzeug.utils import secure_filename
-from utils.budget_vs_billed import calculate_budget_vs_billed, auto_map_budget_columns
+from utils.budget_vs_billed import calculate_budget_vs_billed, calculate_budget_vs_billed_all_months, auto_map_budget_columns
 from utils.ppt_generator import create_budget_ppt, create_od_ppt_updated, create_product_growth_ppt, create_nbc_individual_ppt, create_od_individual_ppt, create_consolidated_ppt, format_budget_dataframes, format_od_target_vs_collection_dataframes, format_product_growth_dataframes
 from utils.od_target import auto_map_od_columns,calculate_od_values_updated,create_region_branch_mapping,create_dynamic_regional_summary,get_cumulative_branches,get_cumulative_regions
 from utils.product_growth import calculate_product_growth,auto_map_product_growth_columns,standardize_name,format_product_growth_dataframes_backend
 from utils.nbc_od_utils import auto_map_nbc_columns,auto_map_od_target_columns,create_customer_table,filter_os_qty,nbc_branch_mapping
+from utils.workbook_cache import file_digest, read_sheet, invalidate as invalidate_workbook
+from utils.workbook_inspector import list_sheets, get_columns
+from utils.normalizers import normalize_column
+from utils.date_parsing import in_months, month_labels, parse_dates
 from utils.branch_proof import (
     create_proof_of_calculation_excel,
     get_required_columns
 )
+from utils.job_queue import background_job
 
 branch_bp = Blueprint('branch', __name__)
 logger = logging.getLogger(__name__)
@@ -30,6 +35,7 @@ def upload_file():
     filename = secure_filename(file.filename)
     path = os.path.join(UPLOAD_FOLDER, filename)
     file.save(path)
+    invalidate_workbook(path)
     return jsonify({'message': 'File uploaded successfully', 'filename': filename})
 
 @branch_bp.route('/sheets', methods=['POST'])
@@ -37,8 +43,7 @@ def get_sheet_names():
     file = request.json.get('filename')
     path = os.path.join(UPLOAD_FOLDER, file)
     try:
-        xl = pd.ExcelFile(path)
-        return jsonify({'sheets': xl.sheet_names})
+        return jsonify({'sheets': list_sheets(path)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
@@ -50,8 +55,7 @@ def get_columns_and_auto_map():
     sheet_name = data['sheet_name']
 
     try:
-        df = pd.read_excel(path, sheet_name=sheet_name, header=header_row)
-        columns = df.columns.tolist()
+        columns = get_columns(path, sheet_name=sheet_name, header=header_row)
         return jsonify({'columns': columns})
     except Exception as e:
         import traceback
@@ -79,8 +83,8 @@ def get_exec_branch_options():
         sales_path = os.path.join('uploads', data['sales_filename'])
         budget_path = os.path.join('uploads', data['budget_filename'])
 
-        sales_df = pd.read_excel(sales_path, sheet_name=data['sales_sheet'], header=data['sales_header'] - 1)
-        budget_df = pd.read_excel(budget_path, sheet_name=data['budget_sheet'], header=data['budget_header'] - 1)
+        sales_df = read_sheet(sales_path, sheet_name=data['sales_sheet'], header=data['sales_header'] - 1)
+        budget_df = read_sheet(budget_path, sheet_name=data['budget_sheet'], header=data['budget_header'] - 1)
 
         exec_sales_col = data['sales_exec_col']
         exec_budget_col = data['budget_exec_col']
@@ -93,7 +97,7 @@ def get_exec_branch_options():
         budget_execs = sorted(budget_df[exec_budget_col].dropna().unique().tolist())
 
         combined = pd.concat([sales_df[area_sales_col], budget_df[area_budget_col]], ignore_index=True).dropna()
-        branches = sorted(set(map(map_branch, combined)))
+        branches = sorted(set(normalize_column(combined, map_branch)))
 
         return jsonify({
             'sales_executives': sales_execs,
@@ -109,10 +113,11 @@ def extract_months():
     try:
         data = request.json
         sales_path = os.path.join('uploads', data['sales_filename'])
-        df = pd.read_excel(sales_path, sheet_name=data['sales_sheet'], header=data['sales_header'] - 1)
         date_col = data['sales_date_col']
+        df = read_sheet(sales_path, sheet_name=data['sales_sheet'], header=data['sales_header'] - 1,
+                        date_columns=[date_col], dayfirst=True)
 
-        months = pd.to_datetime(df[date_col], dayfirst=True, errors='coerce').dt.strftime('%b %y').dropna().unique().tolist()
+        months = month_labels(df[date_col]).dropna().unique().tolist()
         return jsonify({'months': months})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -121,6 +126,9 @@ def extract_months():
 def budget_vs_billed():
     data = request.json
     try:
+        # all_months returns every month's tables at once; either way the months are computed and cached together
+        if data.get('all_months'):
+            return jsonify({'months': calculate_budget_vs_billed_all_months(data)})
         results = calculate_budget_vs_billed(data)
         return jsonify(results)
     except Exception as e:
@@ -140,8 +148,8 @@ def generate_proof_of_calculation():
         budget_path = os.path.join('uploads', data['budget_filename'])
         sales_path = os.path.join('uploads', data['sales_filename'])
         
-        budget_df = pd.read_excel(budget_path, sheet_name=data['budget_sheet'], header=data['budget_header'] - 1)
-        sales_df = pd.read_excel(sales_path, sheet_name=data['sales_sheet'], header=data['sales_header'] - 1)
+        budget_df = read_sheet(budget_path, sheet_name=data['budget_sheet'], header=data['budget_header'] - 1)
+        sales_df = read_sheet(sales_path, sheet_name=data['sales_sheet'], header=data['sales_header'] - 1)
         
         # Get parameters
         selected_month = data['selected_month']
@@ -197,8 +205,8 @@ def get_proof_summary():
         budget_path = os.path.join('uploads', data['budget_filename'])
         sales_path = os.path.join('uploads', data['sales_filename'])
         
-        budget_df = pd.read_excel(budget_path, sheet_name=data['budget_sheet'], header=data['budget_header'] - 1)
-        sales_df = pd.read_excel(sales_path, sheet_name=data['sales_sheet'], header=data['sales_header'] - 1)
+        budget_df = read_sheet(budget_path, sheet_name=data['budget_sheet'], header=data['budget_header'] - 1)
+        sales_df = read_sheet(sales_path, sheet_name=data['sales_sheet'], header=data['sales_header'] - 1)
         
         # Get parameters
         selected_month = data['selected_month']
@@ -214,8 +222,8 @@ def get_proof_summary():
         budget_df_copy = budget_df.copy()
         
         # Apply the same filtering logic as in the main function
-        sales_df_copy[data['sales_date_col']] = pd.to_datetime(sales_df_copy[data['sales_date_col']], dayfirst=True, errors='coerce')
-        filtered_sales_df = sales_df_copy[sales_df_copy[data['sales_date_col']].dt.strftime('%b %y') == selected_month].copy()
+        sales_df_copy[data['sales_date_col']] = parse_dates(sales_df_copy[data['sales_date_col']], dayfirst=True)
+        filtered_sales_df = sales_df_copy[in_months(sales_df_copy[data['sales_date_col']], selected_month)].copy()
         
         if filtered_sales_df.empty:
             return jsonify({'error': f'No sales data found for {selected_month}'}), 400
@@ -280,6 +288,7 @@ def get_required_proof_columns():
 # EXISTING ROUTES CONTINUE...
 
 @branch_bp.route('/generate_consolidated_branch_ppt', methods=['POST'])
+@background_job
 def generate_consolidated_branch_ppt():
     try:
         data = request.get_json()
@@ -399,9 +408,9 @@ def get_od_columns():
 def get_od_filter_options():
     data = request.get_json()
     try:
-        os_prev = pd.read_excel(f"uploads/{data['os_prev_filename']}", sheet_name=data['os_prev_sheet'], header=data['os_prev_header'] - 1)
-        os_curr = pd.read_excel(f"uploads/{data['os_curr_filename']}", sheet_name=data['os_curr_sheet'], header=data['os_curr_header'] - 1)
-        sales = pd.read_excel(f"uploads/{data['sales_filename']}", sheet_name=data['sales_sheet'], header=data['sales_header'] - 1)
+        os_prev = read_sheet(f"uploads/{data['os_prev_filename']}", sheet_name=data['os_prev_sheet'], header=data['os_prev_header'] - 1)
+        os_curr = read_sheet(f"uploads/{data['os_curr_filename']}", sheet_name=data['os_curr_sheet'], header=data['os_curr_header'] - 1)
+        sales = read_sheet(f"uploads/{data['sales_filename']}", sheet_name=data['sales_sheet'], header=data['sales_header'] - 1)
 
         # Pull mapped column names
         os_prev_exec = data['os_prev_mapping'].get('executive')
@@ -461,9 +470,9 @@ def calculate_od_target():
         print("📄 Filenames:", data['os_prev_filename'], data['sales_filename'])
 
         # Load the 3 Excel files
-        os_prev = pd.read_excel(f"uploads/{data['os_prev_filename']}", sheet_name=data['os_prev_sheet'], header=data['os_prev_header'] - 1)
-        os_curr = pd.read_excel(f"uploads/{data['os_curr_filename']}", sheet_name=data['os_curr_sheet'], header=data['os_curr_header'] - 1)
-        sales = pd.read_excel(f"uploads/{data['sales_filename']}", sheet_name=data['sales_sheet'], header=data['sales_header'] - 1)
+        os_prev = read_sheet(f"uploads/{data['os_prev_filename']}", sheet_name=data['os_prev_sheet'], header=data['os_prev_header'] - 1)
+        os_curr = read_sheet(f"uploads/{data['os_curr_filename']}", sheet_name=data['os_curr_sheet'], header=data['os_curr_header'] - 1)
+        sales = read_sheet(f"uploads/{data['sales_filename']}", sheet_name=data['sales_sheet'], header=data['sales_header'] - 1)
 
         # === Apply filters and calculate final output ===
         final, regional, region_map = calculate_od_values_updated(
@@ -489,7 +498,11 @@ def calculate_od_target():
             data['sales_mapping'].get('region'),
             data.get('selected_executives', []),
             data.get('selected_branches', []),
-            data.get('selected_regions', [])
+            data.get('selected_regions', []),
+            sources=[
+                (file_digest(f"uploads/{data[f'{name}_filename']}"), data[f'{name}_sheet'], data[f'{name}_header'])
+                for name in ('os_prev', 'os_curr', 'sales')
+            ]
         )
 
         return jsonify({
@@ -607,13 +620,13 @@ def get_product_growth_filters():
         budget_group_col = data["budget_group_col"]
 
         # Load DataFrames
-        ly_df = pd.read_excel(f"uploads/{ly_filename}", sheet_name=ly_sheet, header=ly_header)
-        cy_df = pd.read_excel(f"uploads/{cy_filename}", sheet_name=cy_sheet, header=cy_header)
-        budget_df = pd.read_excel(f"uploads/{budget_filename}", sheet_name=budget_sheet, header=budget_header)
+        ly_df = read_sheet(f"uploads/{ly_filename}", sheet_name=ly_sheet, header=ly_header, date_columns=[ly_date_col], dayfirst=True)
+        cy_df = read_sheet(f"uploads/{cy_filename}", sheet_name=cy_sheet, header=cy_header, date_columns=[cy_date_col], dayfirst=True)
+        budget_df = read_sheet(f"uploads/{budget_filename}", sheet_name=budget_sheet, header=budget_header)
 
         # Extract unique months from LY and CY
-        ly_months = pd.to_datetime(ly_df[ly_date_col], dayfirst=True, errors="coerce").dt.strftime("%b %y").dropna().unique().tolist()
-        cy_months = pd.to_datetime(cy_df[cy_date_col], dayfirst=True, errors="coerce").dt.strftime("%b %y").dropna().unique().tolist()
+        ly_months = month_labels(ly_df[ly_date_col]).dropna().unique().tolist()
+        cy_months = month_labels(cy_df[cy_date_col]).dropna().unique().tolist()
 
         # Get unique executives
         executives = pd.concat([
@@ -649,9 +662,9 @@ def calculate_product_growth_api():
         print(f"Product Growth API called with payload keys: {list(data.keys())}")
 
         # Load Excel files directly from 'uploads/'
-        ly_df = pd.read_excel(f"uploads/{data['ly_filename']}", sheet_name=data['ly_sheet'], header=data['ly_header'] - 1)
-        cy_df = pd.read_excel(f"uploads/{data['cy_filename']}", sheet_name=data['cy_sheet'], header=data['cy_header'] - 1)
-        budget_df = pd.read_excel(f"uploads/{data['budget_filename']}", sheet_name=data['budget_sheet'], header=data['budget_header'] - 1)
+        ly_df = read_sheet(f"uploads/{data['ly_filename']}", sheet_name=data['ly_sheet'], header=data['ly_header'] - 1)
+        cy_df = read_sheet(f"uploads/{data['cy_filename']}", sheet_name=data['cy_sheet'], header=data['cy_header'] - 1)
+        budget_df = read_sheet(f"uploads/{data['budget_filename']}", sheet_name=data['budget_sheet'], header=data['budget_header'] - 1)
 
         print(f"Loaded dataframes - LY: {ly_df.shape}, CY: {cy_df.shape}, Budget: {budget_df.shape}")
 
@@ -773,8 +786,7 @@ def get_nbc_columns():
         sheet_name = data['sheet_name']
         header = data['header'] - 1
 
-        df = pd.read_excel(f"uploads/{filename}", sheet_name=sheet_name, header=header)
-        columns = df.columns.tolist()
+        columns = get_columns(f"uploads/{filename}", sheet_name=sheet_name, header=header)
         mapped = auto_map_nbc_columns(columns)
 
         return jsonify({"columns": columns, "mapping": mapped})
@@ -795,7 +807,7 @@ def get_nbc_filters():
         branch_col = data["branch_col"]
         executive_col = data["executive_col"]
 
-        df = pd.read_excel(f"uploads/{filename}", sheet_name=sheet_name, header=header_row)
+        df = read_sheet(f"uploads/{filename}", sheet_name=sheet_name, header=header_row)
 
         # Clean column names
         df.columns = [str(col).strip() for col in df.columns]
@@ -843,7 +855,7 @@ def calculate_nbc_table():
 
         # Load and validate data
         try:
-            df = pd.read_excel(f"uploads/{filename}", sheet_name=sheet_name, header=header)
+            df = read_sheet(f"uploads/{filename}", sheet_name=sheet_name, header=header, date_columns=[date_col])
             logger.info(f"Loaded DataFrame with shape: {df.shape}")
             logger.info(f"Columns: {df.columns.tolist()}")
         except Exception as e:
@@ -862,7 +874,8 @@ def calculate_nbc_table():
         results = create_customer_table(
             df, date_col, branch_col, customer_id_col, executive_col,
             selected_branches=selected_branches,
-            selected_executives=selected_executives
+            selected_executives=selected_executives,
+            sources=(file_digest(f"uploads/{filename}"), sheet_name, header, date_col)
         )
 
         if not results:
@@ -991,7 +1004,7 @@ def get_column_unique_values():
         header = data["header"] - 1
         column_names = data.get("column_names", [])
 
-        df = pd.read_excel(f"uploads/{filename}", sheet_name=sheet_name, header=header)
+        df = read_sheet(f"uploads/{filename}", sheet_name=sheet_name, header=header)
 
         response = {}
 
@@ -1009,11 +1022,11 @@ def get_column_unique_values():
                 response[col] = {"years": [str(y) for y in valid_years]}
             elif "area" in lower_col or "branch" in lower_col:
                 from utils.nbc_od_utils import extract_area_name
-                cleaned = sorted(set(filter(None, col_data.map(extract_area_name))))
+                cleaned = sorted(set(filter(None, normalize_column(col_data, extract_area_name))))
                 response[col] = {"values": cleaned}
             elif "executive" in lower_col:
                 from utils.nbc_od_utils import extract_executive_name
-                cleaned = sorted(set(filter(None, col_data.map(extract_executive_name))))
+                cleaned = sorted(set(filter(None, normalize_column(col_data, extract_executive_name))))
                 response[col] = {"values": cleaned}
             else:
                 cleaned = sorted(set(col_data.astype(str).str.strip().unique()))
@@ -1043,7 +1056,7 @@ def calculate_od_target_table():
         selected_years = data.get("selected_years", [])
         till_month = data.get("till_month")
 
-        df = pd.read_excel(f"uploads/{filename}", sheet_name=sheet_name, header=header)
+        df = read_sheet(f"uploads/{filename}", sheet_name=sheet_name, header=header)
 
         result_df, start_date, end_date = filter_os_qty(
             df,
@@ -1,9 +1,9 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 import pandas as pd
-from io import BytesIO
 import base64
 import re
 from services.mapping_service import process_budget_file
+from utils.xlsx_export import export_file, read_export, write_xlsx
 
 budget_bp = Blueprint("budget", __name__)
 
@@ -72,36 +72,22 @@ def upload_budget_file():
         # Ensure the processed dataframe also has numeric executive codes
         processed = ensure_numeric_executive_code(processed, exec_code_col)
 
-        # --- Enhanced Export with better number formatting ---
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            # Ensure numeric columns are properly typed before writing
-            if exec_code_col in processed.columns:
-                processed[exec_code_col] = pd.to_numeric(
-                    processed[exec_code_col], errors='coerce'
-                ).fillna(0).astype('int64')
-            
-            processed.to_excel(writer, index=False, sheet_name="Sheet1")
-            workbook = writer.book
-            worksheet = writer.sheets["Sheet1"]
-
-            # Apply numeric format to Executive Code column
-            if exec_code_col in processed.columns:
-                col_idx = processed.columns.get_loc(exec_code_col)
-                col_letter = chr(ord("A") + col_idx)
-                
-                # Create number format (no decimals, right aligned)
-                num_format = workbook.add_format({
-                    'num_format': '0',      # Integer format
-                    'align': 'right',       # Right align numbers
-                    'valign': 'vcenter'     # Vertical center alignment
-                })
-                
-                # Apply format to the entire column (starting from row 2, after header)
-                worksheet.set_column(f"{col_letter}:{col_letter}", 15, num_format)
-
-        output.seek(0)
-        encoded_excel = base64.b64encode(output.read()).decode("utf-8")
+        # Ensure numeric columns are properly typed before writing
+        if exec_code_col in processed.columns:
+            processed[exec_code_col] = pd.to_numeric(
+                processed[exec_code_col], errors='coerce'
+            ).fillna(0).astype('int64')
+
+        # --- Enhanced Export with better number formatting (constant-memory writer) ---
+        # Executive Code column: integer format, right aligned, vertically centered
+        exec_code_format = {'num_format': '0', 'align': 'right', 'valign': 'vcenter'}
+        with export_file() as path:
+            write_xlsx(
+                path, [("Sheet1", processed)],
+                column_formats={exec_code_col: exec_code_format},
+                column_widths={exec_code_col: 15},
+            )
+        encoded_excel = base64.b64encode(read_export(path)).decode("utf-8")
 
         return {
             "preview": processed.head(10).fillna("").to_dict(orient="records"),
@@ -153,15 +139,8 @@ def save_budget_file():
 def list_budget_files():
     try:
         from models.schema import BudgetFile
-        files = BudgetFile.query.order_by(BudgetFile.uploaded_at.desc()).all()
-        return jsonify([
-            {
-                "id": f.id, 
-                "filename": f.filename, 
-                "uploaded_at": f.uploaded_at.isoformat()
-            }
-            for f in files
-        ])
+        from utils.stored_files import list_stored_files
+        return jsonify(list_stored_files(BudgetFile))
     except Exception as e:
         print(f"Error in list_budget_files: {str(e)}")
         return jsonify({"error": f"Failed to list files: {str(e)}"}), 500
@@ -171,16 +150,9 @@ def list_budget_files():
 def download_budget_file(file_id):
     try:
         from models.schema import BudgetFile
-        import io
-        
-        file = BudgetFile.query.get_or_404(file_id)
+        from utils.stored_files import stream_stored_file
 
-        return send_file(
-            io.BytesIO(file.file_data),
-            download_name=file.filename,
-            as_attachment=True,
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        return stream_stored_file(BudgetFile, file_id)
     except Exception as e:
         print(f"Error in download_budget_file: {str(e)}")
         return jsonify({"error": f"Failed to download file: {str(e)}"}), 500
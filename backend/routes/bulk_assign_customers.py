@@ -1,9 +1,23 @@
+import os
+
 from flask import Blueprint, request, jsonify
 from models.schema import *
 from extensions import db
+from services.mapping_service import collation_key
+from services.mapping_snapshot import bump_mapping_version
 
 bulk_bp = Blueprint("bulk", __name__)
 
+# Rows per IN query / bulk statement / commit. Kept well below the bind
+# parameter limits of SQLite (32766) and MySQL placeholders per statement.
+CHUNK_SIZE = int(os.getenv("BULK_ASSIGN_CHUNK_SIZE", "1000"))
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
 @bulk_bp.route("/bulk-assign-customers", methods=["POST"])
 def bulk_assign_customers():
     try:
@@ -13,11 +27,18 @@ def bulk_assign_customers():
         exec_code_col = payload.get("execCodeCol")
         cust_code_col = payload.get("custCodeCol")
         cust_name_col = payload.get("custNameCol")
+        chunk_size = max(1, int(payload.get("chunkSize") or CHUNK_SIZE))
 
         if not exec_name_col or not cust_code_col:
             return jsonify({"error": "Missing required column mappings"}), 400
 
-        exec_map = {}
+        # Collapse the sheet to one assignment per customer code: the last row
+        # decides the executive, the last non-empty name wins. Names and codes
+        # that only differ in case are the same row in the DB (see collation_key);
+        # the first spelling in the sheet is the one used for new rows.
+        exec_names = {}       # exec key -> (exec name, code) from its first row
+        assignments = {}      # cust key -> [cust code, exec key, cust name or None]
+        skipped = 0
         for row in data:
             exec_name = str(row.get(exec_name_col, "")).strip()
             exec_code = str(row.get(exec_code_col, "")).strip() if exec_code_col else None
@@ -25,31 +46,92 @@ def bulk_assign_customers():
             cust_name = str(row.get(cust_name_col, "")).strip() if cust_name_col else None
 
             if not exec_name or not cust_code:
+                skipped += 1
                 continue
 
-            # Find or create executive
-            if exec_name not in exec_map:
-                exec_obj = Executive.query.filter_by(name=exec_name).first()
-                if not exec_obj:
-                    exec_obj = Executive(name=exec_name, code=exec_code)
-                    db.session.add(exec_obj)
-                    db.session.flush()
-                exec_map[exec_name] = exec_obj
-            else:
-                exec_obj = exec_map[exec_name]
+            exec_key = collation_key(exec_name)
+            exec_names.setdefault(exec_key, (exec_name, exec_code))
+            entry = assignments.setdefault(collation_key(cust_code), [cust_code, exec_key, None])
+            entry[1] = exec_key
+            if cust_name:
+                entry[2] = cust_name
 
-            # Create or update customer
-            cust = Customer.query.filter_by(code=cust_code).first()
-            if not cust:
-                cust = Customer(code=cust_code, name=cust_name or "", executive_id=exec_obj.id)
-                db.session.add(cust)
-            else:
-                cust.executive_id = exec_obj.id
+        # Executives: one IN query per chunk, create the missing ones
+        exec_ids = {}         # exec key -> id
+        names = [name for name, _ in exec_names.values()]
+        for chunk in _chunks(names, chunk_size):
+            for exec_id, name in db.session.query(Executive.id, Executive.name).filter(Executive.name.in_(chunk)):
+                exec_ids[collation_key(name)] = exec_id
+        new_execs = [Executive(name=name, code=code) for key, (name, code) in exec_names.items() if key not in exec_ids]
+        if new_execs:
+            db.session.add_all(new_execs)
+            db.session.flush()
+            exec_ids.update({collation_key(e.name): e.id for e in new_execs})
+
+        # Customers: first existing row per code is the one that gets updated
+        existing = {}         # cust key -> id
+        codes = [code for code, _, _ in assignments.values()]
+        for chunk in _chunks(codes, chunk_size):
+            rows = (
+                db.session.query(Customer.id, Customer.code)
+                .filter(Customer.code.in_(chunk))
+                .order_by(Customer.id)
+            )
+            for cust_id, code in rows:
+                existing.setdefault(collation_key(code), cust_id)
+
+        updates = []
+        inserts = []
+        for key, (code, exec_key, cust_name) in assignments.items():
+            if key in existing:
+                values = {"id": existing[key], "executive_id": exec_ids[exec_key]}
                 if cust_name:
-                    cust.name = cust_name
+                    values["name"] = cust_name
+                updates.append(values)
+            else:
+                inserts.append({"code": code, "name": cust_name or "", "executive_id": exec_ids[exec_key]})
 
         db.session.commit()
-        return jsonify({"message": "Bulk customer assignment completed."})
-
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
+
+    # Each chunk is its own transaction (one for the whole sheet held locks
+    # long enough to time out), so a failure part-way leaves the chunks
+    # before it applied: the error response says how far it got. Re-sending
+    # the same sheet is safe, the committed rows are then just updated.
+    done = {"updated": 0, "inserted": 0}
+    try:
+        for chunk in _chunks(updates, chunk_size):
+            db.session.bulk_update_mappings(Customer, chunk)
+            db.session.commit()
+            done["updated"] += len(chunk)
+        for chunk in _chunks(inserts, chunk_size):
+            db.session.bulk_insert_mappings(Customer, chunk)
+            db.session.commit()
+            done["inserted"] += len(chunk)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "error": str(e),
+            "partial": True,
+            "message": (f"Bulk customer assignment stopped after {done['updated']} of {len(updates)} updates "
+                        f"and {done['inserted']} of {len(inserts)} inserts; those were saved."),
+            "inserted": done["inserted"],
+            "updated": done["updated"],
+            "skipped": skipped,
+            "executives_created": len(new_execs),
+        }), 500
+    finally:
+        # Bulk statements skip the session events that track mapping changes;
+        # publish even when a later chunk fails so no worker keeps the old rows
+        if done["updated"] or done["inserted"]:
+            bump_mapping_version()
+
+    return jsonify({
+        "message": "Bulk customer assignment completed.",
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "skipped": skipped,
+        "executives_created": len(new_execs),
+    })
@@ -2,10 +2,12 @@
 
 import traceback
 import logging
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 import pandas as pd
-from io import BytesIO
 from werkzeug.utils import secure_filename
+from utils.cumulative_merge import combine_frames, parse_month_file, parse_month_files
+from utils.job_queue import background_job, report_progress
+from utils.xlsx_export import frames_response
 
 # Create the blueprint - make sure this matches your existing code
 api_bp = Blueprint('cumulative_api', __name__)
@@ -14,48 +16,24 @@ logger = logging.getLogger(__name__)
 
 def read_excel_file(file_stream, month, filename, skip_first_row=False):
     """Read Excel file directly from memory with improved error handling"""
-    try:
-        logger.info(f"Reading Excel file: {filename}")
+    return parse_month_file(file_stream.read(), month, filename, skip_first_row)
+
 
-        # Try reading with different engines
-        try:
-            df = pd.read_excel(file_stream, header=None if skip_first_row else 0, engine="openpyxl")
-        except Exception as e1:
-            logger.warning(f"openpyxl failed, trying xlrd: {e1}")
+def collect_month_files(files):
+    """(uploads [(month, filename, bytes)] of the Excel files, errors for the others)"""
+    uploads, errors = [], []
+    for month, file in files.items():
+        logger.info(f"Processing month={month}, file={file.filename if file else 'None'}")
+        if file and file.filename.lower().endswith(('.xlsx', '.xls')):
             try:
-                file_stream.seek(0)
-                df = pd.read_excel(file_stream, header=None if skip_first_row else 0, engine="xlrd")
-            except Exception as e2:
-                logger.warning(f"xlrd failed, trying calamine: {e2}")
-                file_stream.seek(0)
-                df = pd.read_excel(file_stream, header=None if skip_first_row else 0, engine="calamine")
-
-        if skip_first_row and not df.empty:
-            df.columns = df.iloc[0]
-            df = df.iloc[1:]
-
-        if not df.empty:
-            # Clean column names
-            df.columns = [str(col).strip() for col in df.columns]
-
-            # Replace problematic values
-            df = df.replace([float('inf'), -float('inf')], None)
-
-            # Add metadata
-            if "Month" not in df.columns:
-                df["Month"] = month
-            df["Source File"] = filename
-
-            logger.info(f"Processed {filename}: {len(df)} rows, {len(df.columns)} columns")
-            return df
+                file.stream.seek(0)
+                uploads.append((month, secure_filename(file.filename), file.stream.read()))
+            except Exception as e:
+                errors.append(f"Error processing {month}: {str(e)}")
+                logger.error(traceback.format_exc())
         else:
-            logger.warning(f"Empty dataframe from {filename}")
-            return None
-
-    except Exception as e:
-        logger.error(f"Error reading {filename}: {str(e)}")
-        logger.error(traceback.format_exc())
-        return None
+            errors.append(f"Invalid file type for {month}: {file.filename}")
+    return uploads, errors
 
 
 @api_bp.route("/process", methods=["POST", "OPTIONS"])
@@ -78,28 +56,16 @@ def process_files():
         if not files:
             return jsonify({"success": False, "message": "No files uploaded"}), 400
 
-        all_dfs, errors, uploaded_months = [], [], []
-
-        for month, file in files.items():
-            logger.info(f"Processing month={month}, file={file.filename if file else 'None'}")
-
-            if file and file.filename.lower().endswith(('.xlsx', '.xls')):
-                try:
-                    filename = secure_filename(file.filename)
-                    file.stream.seek(0)
-                    df = read_excel_file(file.stream, month, filename, skip_first_row)
-
-                    if df is not None and not df.empty:
-                        all_dfs.append(df)
-                        uploaded_months.append(month)
-                    else:
-                        errors.append(f"No data found in {month} file")
+        all_dfs, uploaded_months = [], []
+        uploads, errors = collect_month_files(files)
 
-                except Exception as e:
-                    errors.append(f"Error processing {month}: {str(e)}")
-                    logger.error(traceback.format_exc())
+        # Parse the month files concurrently (cached by content for /download)
+        for (month, _, _), df in zip(uploads, parse_month_files(uploads, skip_first_row)):
+            if df is not None and not df.empty:
+                all_dfs.append(df)
+                uploaded_months.append(month)
             else:
-                errors.append(f"Invalid file type for {month}: {file.filename}")
+                errors.append(f"No data found in {month} file")
 
         if not all_dfs:
             return jsonify({
@@ -109,7 +75,7 @@ def process_files():
             }), 400
 
         # Combine all dataframes
-        final_df = pd.concat(all_dfs, ignore_index=True)
+        final_df = combine_frames(all_dfs)
 
         # Create preview (first 5 rows)
         preview_data = []
@@ -142,6 +108,7 @@ def process_files():
 
 
 @api_bp.route("/download", methods=["POST", "OPTIONS"])
+@background_job
 def download_file():
     """Download combined Excel file in memory"""
     logger.info("=== DOWNLOAD ENDPOINT CALLED ===")
@@ -149,7 +116,7 @@ def download_file():
     if request.method == "OPTIONS":
         response = jsonify({"status": "ok"})
         response.headers.add('Access-Control-Allow-Origin', 'http://13.201.218.4')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Prefer')
         response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
         response.headers.add('Access-Control-Allow-Credentials', 'true')
         return response
@@ -161,22 +128,14 @@ def download_file():
         if not files:
             return jsonify({"success": False, "message": "No files uploaded"}), 400
 
-        all_dfs, errors = [], []
-
-        for month, file in files.items():
-            if file and file.filename.lower().endswith(('.xlsx', '.xls')):
-                try:
-                    filename = secure_filename(file.filename)
-                    file.stream.seek(0)
-                    df = read_excel_file(file.stream, month, filename, skip_first_row)
+        uploads, errors = collect_month_files(files)
 
-                    if df is not None and not df.empty:
-                        all_dfs.append(df)
-                except Exception as e:
-                    errors.append(f"Error processing {month}: {str(e)}")
-                    logger.error(traceback.format_exc())
-            else:
-                errors.append(f"Invalid file type for {month}: {file.filename}")
+        # Reuses the months /process already parsed; parses the rest concurrently
+        parsed = parse_month_files(
+            uploads, skip_first_row,
+            progress=lambda done, total: report_progress(80 * done / total, f"Read {done} of {total} files"),
+        )
+        all_dfs = [df for df in parsed if df is not None and not df.empty]
 
         if not all_dfs:
             return jsonify({
@@ -185,31 +144,14 @@ def download_file():
                 "errors": errors
             }), 400
 
-        combined_df = pd.concat(all_dfs, ignore_index=True)
-
-        # Write combined Excel to memory
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            combined_df.to_excel(writer, index=False, sheet_name="Combined Sales")
-
-            workbook = writer.book
-            worksheet = writer.sheets["Combined Sales"]
-
-            header_format = workbook.add_format({
-                "bold": True,
-                "bg_color": "#D3D3D3",
-                "border": 1
-            })
-            for col_num, value in enumerate(combined_df.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-
-        output.seek(0)
+        combined_df = combine_frames(all_dfs)
+        report_progress(80, "Writing combined workbook")
 
-        return send_file(
-            output,
-            download_name="Combined_Sales_Report.xlsx",
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            as_attachment=True
+        # Stream the combined workbook (constant-memory writer, sent in chunks)
+        return frames_response(
+            [("Combined Sales", combined_df)],
+            "Combined_Sales_Report.xlsx",
+            header_format={"bold": True, "bg_color": "#D3D3D3", "border": 1}
         )
 
     except Exception as e:
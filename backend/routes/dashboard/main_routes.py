@@ -17,6 +17,7 @@ import csv
 import gc
 import io
 from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
 import os
 import json
 import base64
@@ -42,6 +43,8 @@ from utils.dashboard.helpers import (
 from utils.dashboard import helpers
 from utils.dashboard.helpers import make_jsonly_serializable
 import services.dashboard.data_processing as data_processing
+from services.dashboard import dataset_store
+from utils.job_queue import background_job
 
 # Add this near the top of data_processing.py
 BRANCH_EXCLUDE_TERMS = [
@@ -79,18 +82,11 @@ def upload_file():
         if not file.filename.endswith('.xlsx'):
             return jsonify({'error': 'Invalid file format. Please upload an Excel file (.xlsx)'}), 400
 
-        file_buffer = BytesIO(file.read())
+        # Register the workbook server-side; later calls reference it by ID
+        dataset_id = dataset_store.register_workbook(file.read())
+        sheet_names = dataset_store.sheet_names(dataset_id)
         
-        try:
-            xls = pd.ExcelFile(file_buffer, engine='openpyxl')
-        except:
-            file_buffer.seek(0)
-            xls = pd.ExcelFile(file_buffer)
-        
-        sheet_names = xls.sheet_names
-        
-        file_buffer.seek(0)
-        df_sheet = pd.read_excel(file_buffer, sheet_name=sheet_names[0], header=None, nrows=1000)
+        df_sheet = dataset_store.read_sheet_head(dataset_id, sheet_names[0], nrows=1000)
         
         # Determine sheet type for table ending logic
         sheet_name = sheet_names[0].lower()
@@ -98,16 +94,6 @@ def upload_file():
         is_branch_analysis = 'region wise analysis' in sheet_name
         is_product_analysis = 'product' in sheet_name or 'ts-pw' in sheet_name or 'ero-pw' in sheet_name
 
-        # Alternative reading method for narrow sheets with long text
-        if df_sheet.shape[1] < 10 and df_sheet.iloc[:, 0].astype(str).str.len().max() > 200:
-            try:
-                file_buffer.seek(0)
-                df_sheet_alt = pd.read_excel(file_buffer, sheet_name=sheet_names[0], header=None, engine='openpyxl', nrows=1000)
-                if df_sheet_alt.shape[1] > df_sheet.shape[1]:
-                    df_sheet = df_sheet_alt
-            except:
-                pass
-        
         # Process sheets with fewer than 20 columns (align with Streamlit logic)
         if df_sheet.shape[1] < 20:
             new_data = []
@@ -197,7 +183,8 @@ def upload_file():
         response = {
             'preview_data': preview_data.to_dict(orient='records'),
             'preview_columns': preview_columns,
-            'sheet_names': sheet_names
+            'sheet_names': sheet_names,
+            'dataset_id': dataset_id
         }
         
         return jsonify(response)
@@ -205,377 +192,442 @@ def upload_file():
     except Exception as e:
         return jsonify({'error': f'Error processing file: {str(e)}'}), 500
 
-@main_bp.route('/process-sheet', methods=['POST'])
-def process_sheet():
-    try:
-        # Initial setup and validation
-        data = request.get_json()
-        file_data = data.get('file_data')
-        sheet_name = data.get('sheet_name')
-        table_choice = data.get('table_choice')
-        
-        if not file_data or not sheet_name:
-            return jsonify({'error': 'Missing file data or sheet name'}), 400
-
-        # Decode and read Excel file
-        file_content = base64.b64decode(file_data)
-        file_buffer = BytesIO(file_content)
-        
-        try:
-            xls = pd.ExcelFile(file_buffer, engine='openpyxl')
-        except Exception as e:
-            logging.warning(f"Openpyxl failed, trying default engine: {str(e)}")
-            file_buffer.seek(0)
-            xls = pd.ExcelFile(file_buffer)
-        
-        if sheet_name not in xls.sheet_names:
-            return jsonify({'error': f'Sheet "{sheet_name}" not found in file'}), 404
-
-        # Read sheet data with initial processing
-        df_sheet = pd.read_excel(xls, sheet_name=sheet_name, header=None, nrows=1000)
-        original_shape = df_sheet.shape
-        logging.info(f"Processing sheet: {sheet_name}, initial shape: {original_shape}")
-
-        # Data restructuring for poorly formatted files
-        if df_sheet.shape[1] < 20:
-            new_data = []
-            months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                     'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-            metrics = ['Budget', 'LY', 'Act', 'Gr', 'Ach', 'YTD']
-            year_pattern = r'\d{2,4}(?:[-–]\d{2,4})?'
-            
-            for idx, row in df_sheet.iterrows():
-                if pd.notna(row.iloc[0]):
-                    row_text = str(row.iloc[0]).strip()
-                    
-                    if any(metric in row_text for metric in metrics) or re.search(r'SALES\s*(in\s*(MT|Value|Ton[n]?age))?', row_text, re.IGNORECASE):
-                        patterns = []
-                        patterns.append(r'SALES\s*in\s*(MT|Value|Ton[n]?age)', re.IGNORECASE)
-                        for metric in metrics:
-                            for month in months:
-                                patterns.append(
-                                    rf'{metric}[-–\s]*{month}[-–\s]*{year_pattern}', 
-                                    re.IGNORECASE
-                                )
-                            patterns.append(
-                                rf'{metric}[-–\s]*YTD[-–\s]*{year_pattern}\s*\([^)]*\)', 
-                                re.IGNORECASE
-                            )
+def _sheet_payload(dataset_id, sheet_name, table_choice):
+    """
+    Extracted-table payload for one sheet of a registered dataset, served from
+    the dataset store when this (sheet, table choice) was already processed.
+    Returns (payload, None) or (None, error response).
+    """
+    if dataset_store.workbook_path(dataset_id) is None:
+        return None, (jsonify({'error': f'Unknown dataset_id "{dataset_id}". Please upload the file again.'}), 404)
+
+    payload = dataset_store.get_table(dataset_id, sheet_name, table_choice)
+    if payload is not None:
+        return payload, None
+
+    result = _build_sheet_response(dataset_id, sheet_name, table_choice)
+    if isinstance(result, tuple):
+        return None, result
+    payload = result.get_json()
+    dataset_store.put_table(dataset_id, sheet_name, table_choice, payload)
+    return payload, None
+
+
+def _request_table_data(data):
+    """Table records sent inline as table_data, or looked up from dataset_id."""
+    if isinstance(data.get('table_data'), list):
+        return data['table_data']
+    dataset_id = data.get('dataset_id')
+    sheet_name = data.get('sheet_name') or data.get('selected_sheet')
+    if not dataset_id or not sheet_name:
+        return None
+    payload, _ = _sheet_payload(dataset_id, sheet_name, data.get('table_choice'))
+    return payload.get('data') if payload else None
+
+
+_JS_NUMBER_PREFIX = re.compile(r'\s*([+-]?(?:Infinity|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?))')
+
+
+def _preview_cell(value):
+    """A table cell formatted as the dashboard preview's CSV export shows it (parseFloat + toLocaleString)."""
+    if value is None or value == 'NaN' or (isinstance(value, float) and np.isnan(value)):
+        return ''
+    text = str(value).lower() if isinstance(value, bool) else str(value)
+    match = _JS_NUMBER_PREFIX.match(text.replace(',', ''))
+    if not match:
+        return text
+    number = float(match.group(1))
+    if np.isinf(number):
+        return '∞' if number > 0 else '-∞'
+    if number.is_integer():
+        return f'{number + 0.0:,.0f}'
+    # Intl rounds the shortest decimal form half away from zero
+    return f"{Decimal(repr(number)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP):,.2f}"
+
+
+def _preview_rows(records, columns, row_filters=None):
+    """Stored table records as the preview shows them: rows kept by row_filters, cells formatted."""
+    rows = []
+    for record in records:
+        if any(str(record.get(f['column'])).strip() != f['value'] for f in row_filters or []):
+            continue
+        rows.append({col: _preview_cell(record.get(col)) for col in columns})
+    return rows
+
+
+def _build_sheet_response(dataset_id, sheet_name, table_choice):
+    workbook_sheets = dataset_store.sheet_names(dataset_id)
+    if sheet_name not in workbook_sheets:
+        return jsonify({'error': f'Sheet "{sheet_name}" not found in file'}), 404
+
+    # Read sheet data with initial processing
+    df_sheet = dataset_store.read_sheet_head(dataset_id, sheet_name, nrows=1000)
+    original_shape = df_sheet.shape
+    logging.info(f"Processing sheet: {sheet_name}, initial shape: {original_shape}")
+
+    # Data restructuring for poorly formatted files
+    if df_sheet.shape[1] < 20:
+        new_data = []
+        months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
+                 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+        metrics = ['Budget', 'LY', 'Act', 'Gr', 'Ach', 'YTD']
+        year_pattern = r'\d{2,4}(?:[-–]\d{2,4})?'
+        
+        for idx, row in df_sheet.iterrows():
+            if pd.notna(row.iloc[0]):
+                row_text = str(row.iloc[0]).strip()
+                
+                if any(metric in row_text for metric in metrics) or re.search(r'SALES\s*(in\s*(MT|Value|Ton[n]?age))?', row_text, re.IGNORECASE):
+                    patterns = []
+                    patterns.append(r'SALES\s*in\s*(MT|Value|Ton[n]?age)', re.IGNORECASE)
+                    for metric in metrics:
+                        for month in months:
                             patterns.append(
-                                rf'YTD[-–\s]*\d{2,4}\s*\([^)]*\)\s*{metric}', 
+                                rf'{metric}[-–\s]*{month}[-–\s]*{year_pattern}', 
                                 re.IGNORECASE
                             )
-                        
-                        positions = []
-                        for pattern in patterns:
-                            for match in re.finditer(pattern, row_text):
-                                positions.append((match.start(), match.group()))
-                        positions.sort()
-                        
-                        parts = [item[1].strip() for item in positions]
-                        
-                        if len(parts) < 5:
-                            parts = [part.strip() for part in row_text.split() if part.strip()]
-                        
-                        new_data.append(parts)
-                    else:
-                        new_data.append(row_text.split())
+                        patterns.append(
+                            rf'{metric}[-–\s]*YTD[-–\s]*{year_pattern}\s*\([^)]*\)', 
+                            re.IGNORECASE
+                        )
+                        patterns.append(
+                            rf'YTD[-–\s]*\d{2,4}\s*\([^)]*\)\s*{metric}', 
+                            re.IGNORECASE
+                        )
+                    
+                    positions = []
+                    for pattern in patterns:
+                        for match in re.finditer(pattern, row_text):
+                            positions.append((match.start(), match.group()))
+                    positions.sort()
+                    
+                    parts = [item[1].strip() for item in positions]
+                    
+                    if len(parts) < 5:
+                        parts = [part.strip() for part in row_text.split() if part.strip()]
+                    
+                    new_data.append(parts)
                 else:
-                    new_data.append([])
-             
-            if new_data:
-                max_cols = max(len(row) for row in new_data)
-                for row in new_data:
-                    while len(row) < max_cols:
-                        row.append(None)
-                df_sheet = pd.DataFrame(new_data)
-
-        # Determine sheet type
-        sheet_index = xls.sheet_names.index(sheet_name)
-        is_first_sheet = sheet_index == 0
-        is_branch_analysis = 'region wise analysis' in sheet_name.lower()
-        is_product_analysis = ('product' in sheet_name.lower() or 
-                             'ts-pw' in sheet_name.lower() or 
-                             'ero-pw' in sheet_name.lower())
-
-        # Enhanced table processing function
-        def process_table(start_idx, end_idx, is_branch=False, is_product=False, is_table1=False):
-            if start_idx is None:
-                logging.warning("No start index for table")
-                return None
-            
-            table = df_sheet.iloc[start_idx:end_idx].dropna(how='all')
-            if table.empty:
-                logging.warning("Extracted table is empty")
-                return None
-            
-            # Enhanced header detection
-            header_row_idx = None
-            for i in range(min(10, len(table))):
-                row_text = ' '.join(str(cell) for cell in table.iloc[i].values if pd.notna(cell)).upper()
-                metric_count = sum(1 for m in ['BUDGET', 'LY', 'ACT', 'GR', 'ACH'] if m in row_text)
-                month_count = sum(1 for m in ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 
-                                            'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'] if m in row_text)
-                
-                if metric_count >= 2 or month_count >= 3:
-                    header_row_idx = i
-                    break
-            
-            if header_row_idx is None:
-                return None
-                
-            table.columns = [str(val).strip() if pd.notna(val) else f'Unnamed_{i}' 
-                           for i, val in enumerate(table.iloc[header_row_idx])]
-            table = table.iloc[header_row_idx+1:].reset_index(drop=True)
-            
-            # Clean and standardize column names
-            table.columns = rename_columns(table.columns)
-            table = table.loc[:, ~table.columns.duplicated()]
-            table = table.replace([np.nan, None], 0.0)
+                    new_data.append(row_text.split())
+            else:
+                new_data.append([])
+         
+        if new_data:
+            max_cols = max(len(row) for row in new_data)
+            for row in new_data:
+                while len(row) < max_cols:
+                    row.append(None)
+            df_sheet = pd.DataFrame(new_data)
+
+    # Determine sheet type
+    sheet_index = workbook_sheets.index(sheet_name)
+    is_first_sheet = sheet_index == 0
+    is_branch_analysis = 'region wise analysis' in sheet_name.lower()
+    is_product_analysis = ('product' in sheet_name.lower() or 
+                         'ts-pw' in sheet_name.lower() or 
+                         'ero-pw' in sheet_name.lower())
+
+    # Enhanced table processing function
+    def process_table(start_idx, end_idx, is_branch=False, is_product=False, is_table1=False):
+        if start_idx is None:
+            logging.warning("No start index for table")
+            return None
+        
+        table = df_sheet.iloc[start_idx:end_idx].dropna(how='all')
+        if table.empty:
+            logging.warning("Extracted table is empty")
+            return None
+        
+        # Enhanced header detection
+        header_row_idx = None
+        for i in range(min(10, len(table))):
+            row_text = ' '.join(str(cell) for cell in table.iloc[i].values if pd.notna(cell)).upper()
+            metric_count = sum(1 for m in ['BUDGET', 'LY', 'ACT', 'GR', 'ACH'] if m in row_text)
+            month_count = sum(1 for m in ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 
+                                        'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'] if m in row_text)
             
-            # Filtering logic
-            if is_branch and table.columns[0]:
-                exclude_terms = current_app.config.get('BRANCH_EXCLUDE_TERMS', [])
-                if exclude_terms:
-                    pattern = '|'.join(exclude_terms)
-                    table = table[~table[table.columns[0]].astype(str).str.upper().str.contains(pattern, na=False)]
+            if metric_count >= 2 or month_count >= 3:
+                header_row_idx = i
+                break
+        
+        if header_row_idx is None:
+            return None
             
-            if is_table1 and table.columns[0]:
-                table = table[~(
-                    table[table.columns[0]].astype(str).str.contains('SALES', case=False, na=False) &
-                    (table.iloc[:, 1:].eq(0.0) | table.iloc[:, 1:].isna()).all(axis=1)
-                )]
-            # Extra filter for product sheets to remove summary rows like:
+        table.columns = [str(val).strip() if pd.notna(val) else f'Unnamed_{i}' 
+                       for i, val in enumerate(table.iloc[header_row_idx])]
+        table = table.iloc[header_row_idx+1:].reset_index(drop=True)
+        
+        # Clean and standardize column names
+        table.columns = rename_columns(table.columns)
+        table = table.loc[:, ~table.columns.duplicated()]
+        table = table.replace([np.nan, None], 0.0)
+        
+        # Filtering logic
+        if is_branch and table.columns[0]:
+            exclude_terms = current_app.config.get('BRANCH_EXCLUDE_TERMS', [])
+            if exclude_terms:
+                pattern = '|'.join(exclude_terms)
+                table = table[~table[table.columns[0]].astype(str).str.upper().str.contains(pattern, na=False)]
+        
+        if is_table1 and table.columns[0]:
+            table = table[~(
+                table[table.columns[0]].astype(str).str.contains('SALES', case=False, na=False) &
+                (table.iloc[:, 1:].eq(0.0) | table.iloc[:, 1:].isna()).all(axis=1)
+            )]
+        # Extra filter for product sheets to remove summary rows like:
 # "TS-PW Monthly Budget and Actual Values North [FY 25-26]"
 # or "ERO-PW Monthly Budget and Actual Values West [FY 25-26]"
-            if is_product and table.columns[0]:
-                first_col_series = table[table.columns[0]].astype(str)
-                # Normalize multiple spaces to single space before matching
-                first_col_series = first_col_series.str.replace(r'\s+', ' ', regex=True)
-                table = table[
-                    ~first_col_series.str.contains(
-                        r'Monthly\s+Budget\s+and\s+Actual',
-                        case=False,
-                        na=False,
-                        regex=True
-                    )
-                ]
-
-            return make_jsonly_serializable(table)
-
-        # First sheet processing
-        if is_first_sheet:
-            # Enhanced table detection
-            table1_start = table2_start = None
-            for i in range(len(df_sheet)):
-                row_text = ' '.join(str(cell) for cell in df_sheet.iloc[i].values if pd.notna(cell)).upper()
-                
-                if table1_start is None and any(t in row_text for t in ['SALES IN MT', 'SALES(MT)', 'SALES IN TONNAGE', 'SALES IN TONAGE']):
-                    table1_start = i
-                
-                if table2_start is None and any(t in row_text for t in ['SALES IN VALUE', 'SALES(VALUE)']):
-                    table2_start = i
-            
-            table_options = []
-            if table1_start is not None:
-                table_options.append("Table 1: SALES IN MT")  # Always use "MT" here
-            if table2_start is not None:
-                table_options.append("Table 2: SALES IN VALUE")
-            
-            if not table_options:
-                return jsonify({
-                    'tables': [],
-                    'data': make_jsonly_serializable(df_sheet).to_dict(orient='records'),
-                    'csv_filename': 'raw_data.csv',
-                    'is_first_sheet': True,
-                    'columns': list(df_sheet.columns)
-                })
-
-            if not table_choice:
-                table_choice = table_options[0]
-            elif table_choice not in table_options:
-                # Handle case where frontend expects "MT" but we found "TONAGE"
-                if table_choice == "Table 1: SALES IN MT" and "Table 1: SALES IN TONAGE" in table_options:
-                    table_choice = "Table 1: SALES IN TONAGE"
-                else:
-                    return jsonify({
-                        'tables': table_options,
-                        'error': f"Selected table '{table_choice}' is invalid. Available options: {table_options}",
-                        'is_first_sheet': True
-                    }), 400
-            
-            # Process selected table
-            # Process selected table
-            if "Table 1" in table_choice and table1_start is not None:  # Handles both MT and TONAGE cases
-                table1_end = table2_start if table2_start is not None else len(df_sheet)
-                table_data = process_table(
-                    table1_start,
-                    table1_end,
-                    is_branch=is_branch_analysis,
-                    is_product=is_product_analysis,
-                    is_table1=True
+        if is_product and table.columns[0]:
+            first_col_series = table[table.columns[0]].astype(str)
+            # Normalize multiple spaces to single space before matching
+            first_col_series = first_col_series.str.replace(r'\s+', ' ', regex=True)
+            table = table[
+                ~first_col_series.str.contains(
+                    r'Monthly\s+Budget\s+and\s+Actual',
+                    case=False,
+                    na=False,
+                    regex=True
                 )
-                csv_filename = 'sales_in_mt.csv'
-
-            elif table_choice == "Table 2: SALES IN VALUE" and table2_start is not None:
-                table2_end = len(df_sheet)
-                table_data = process_table(
-                    table2_start,
-                    table2_end,
-                    is_branch=is_branch_analysis,
-                    is_product=is_product_analysis
-                )
-                csv_filename = 'sales_in_value.csv'
+            ]
 
-            else:
-                return jsonify({
-                    'tables': table_options,
-                    'error': f"Selected table '{table_choice}' not found or invalid.",
-                    'is_first_sheet': True
-                }), 400
+        return make_jsonly_serializable(table)
 
+    # First sheet processing
+    if is_first_sheet:
+        # Enhanced table detection
+        table1_start = table2_start = None
+        for i in range(len(df_sheet)):
+            row_text = ' '.join(str(cell) for cell in df_sheet.iloc[i].values if pd.notna(cell)).upper()
             
-            if table_data is None or table_data.empty:
-                return jsonify({
-                    'tables': table_options,
-                    'error': f"No valid data in selected table '{table_choice}'.",
-                    'debug_info': {
-                        'table_start': table1_start if "Table 1" in table_choice else table2_start,
-                        'sheet_name': sheet_name,
-                        'sample_data': df_sheet.head(5).to_dict(orient='records')
-                    },
-                    'is_first_sheet': True
-                }), 400
+            if table1_start is None and any(t in row_text for t in ['SALES IN MT', 'SALES(MT)', 'SALES IN TONNAGE', 'SALES IN TONAGE']):
+                table1_start = i
             
+            if table2_start is None and any(t in row_text for t in ['SALES IN VALUE', 'SALES(VALUE)']):
+                table2_start = i
+        
+        table_options = []
+        if table1_start is not None:
+            table_options.append("Table 1: SALES IN MT")  # Always use "MT" here
+        if table2_start is not None:
+            table_options.append("Table 2: SALES IN VALUE")
+        
+        if not table_options:
             return jsonify({
-                'tables': table_options,
-                'data': table_data.to_dict(orient='records'),
-                'csv_filename': csv_filename,
+                'tables': [],
+                'data': make_jsonly_serializable(df_sheet).to_dict(orient='records'),
+                'csv_filename': 'raw_data.csv',
                 'is_first_sheet': True,
-                'columns': list(table_data.columns)
+                'columns': list(df_sheet.columns)
             })
-        
-        # Non-first sheet processing - handle both "MT" and "Tonage" for branch/product analysis
-        if is_branch_analysis or is_product_analysis:
-            # Try both "MT" and "Tonage" variants
-            table1_header = "Sales in MT"
-            table2_header = "Sales in Value"
-            
-            # First try with "MT"
-            idx1, idx2 = extract_tables(df_sheet, table1_header, table2_header)
-            
-            # If "MT" not found, try "Tonage"
-            if idx1 is None:
-                table1_header_alt = "Sales in Tonage"
-                idx1, idx2 = extract_tables(df_sheet, table1_header_alt, table2_header)
-                if idx1 is None:
-                    return jsonify({'error': f"Could not locate sales table header in sheet."}), 400
-        else:
-            # For other sheets, only use "MT"
-            table1_header = "Sales in MT"
-            table2_header = "Sales in Value"
-            idx1, idx2 = extract_tables(df_sheet, table1_header, table2_header)
-            if idx1 is None:
-                return jsonify({'error': f"Could not locate sales table header in sheet."}), 400
-        
-        # Process the selected table
-        table1_end = idx2 if idx2 is not None else find_table_end(df_sheet, idx1 + 1, is_branch_analysis, is_product_analysis)
-        table1 = process_table(idx1, table1_end, is_branch_analysis, is_product_analysis, is_table1=True)
-
-        table2 = None
-        if idx2 is not None:
-            table2_end = find_table_end(df_sheet, idx2 + 1, is_branch_analysis, is_product_analysis)
-            table2 = process_table(idx2, table2_end, is_branch_analysis, is_product_analysis)
-
-        # Set table options - always use "MT" in the label even if we found "Tonage"
-        table_options = ["Table 1: SALES IN MT"]
-        if idx2 is not None:
-            table_options.append("Table 2: SALES IN VALUE")
 
-        # Validate table choice - handle both "MT" and "Tonage" cases
         if not table_choice:
             table_choice = table_options[0]
         elif table_choice not in table_options:
-            # Special handling for frontend sending "MT" when we have "Tonage"
-            if table_choice == "Table 1: SALES IN MT":
-                table_choice = "Table 1: SALES IN MT"  # Still use this label
+            # Handle case where frontend expects "MT" but we found "TONAGE"
+            if table_choice == "Table 1: SALES IN MT" and "Table 1: SALES IN TONAGE" in table_options:
+                table_choice = "Table 1: SALES IN TONAGE"
             else:
                 return jsonify({
                     'tables': table_options,
                     'error': f"Selected table '{table_choice}' is invalid. Available options: {table_options}",
-                    'is_first_sheet': False
+                    'is_first_sheet': True
                 }), 400
         
-        # Select the appropriate table data
-        table_df = table1 if "Table 1" in table_choice else (table2 if idx2 is not None else table1)
-        
-        if table_df is None or table_df.empty:
+        # Process selected table
+        # Process selected table
+        if "Table 1" in table_choice and table1_start is not None:  # Handles both MT and TONAGE cases
+            table1_end = table2_start if table2_start is not None else len(df_sheet)
+            table_data = process_table(
+                table1_start,
+                table1_end,
+                is_branch=is_branch_analysis,
+                is_product=is_product_analysis,
+                is_table1=True
+            )
+            csv_filename = 'sales_in_mt.csv'
+
+        elif table_choice == "Table 2: SALES IN VALUE" and table2_start is not None:
+            table2_end = len(df_sheet)
+            table_data = process_table(
+                table2_start,
+                table2_end,
+                is_branch=is_branch_analysis,
+                is_product=is_product_analysis
+            )
+            csv_filename = 'sales_in_value.csv'
+
+        else:
             return jsonify({
                 'tables': table_options,
-                'error': f"Selected table '{table_choice}' is empty or invalid.",
-                'is_first_sheet': False
+                'error': f"Selected table '{table_choice}' not found or invalid.",
+                'is_first_sheet': True
             }), 400
+
         
-        # Prepare response data
-        first_col = table_df.columns[0]
-        branch_list = []
-        product_list = []
-        
-        if is_branch_analysis:
-            valid_rows = table_df[table_df[first_col].notna()]
-            branch_list = sorted(
-                valid_rows[first_col].astype(str).str.strip().unique(),
-                key=lambda x: x.lower()
-            )
-            exclude_terms = current_app.config.get('BRANCH_EXCLUDE_TERMS', [])
-            branch_list = [b for b in branch_list if not any(ex in b.upper() for ex in exclude_terms)]
-        
-        elif is_product_analysis:
-            valid_rows = table_df[table_df[first_col].notna()]
-            product_list = sorted(
-                valid_rows[first_col].astype(str).str.strip().unique(),
-                key=lambda x: x.lower()
-            )
+        if table_data is None or table_data.empty:
+            return jsonify({
+                'tables': table_options,
+                'error': f"No valid data in selected table '{table_choice}'.",
+                'debug_info': {
+                    'table_start': table1_start if "Table 1" in table_choice else table2_start,
+                    'sheet_name': sheet_name,
+                    'sample_data': df_sheet.head(5).to_dict(orient='records')
+                },
+                'is_first_sheet': True
+            }), 400
         
-        all_columns = ' '.join(str(col) for col in table_df.columns)
-        months = sorted(
-            set(re.findall(
-                r'\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\b',
-                all_columns,
-                re.IGNORECASE
-            )),
-            key=lambda x: ['jan','feb','mar','apr','may','jun',
-                          'jul','aug','sep','oct','nov','dec'].index(x.lower())
+        return jsonify({
+            'tables': table_options,
+            'data': table_data.to_dict(orient='records'),
+            'csv_filename': csv_filename,
+            'is_first_sheet': True,
+            'columns': list(table_data.columns)
+        })
+    
+    # Non-first sheet processing - handle both "MT" and "Tonage" for branch/product analysis
+    if is_branch_analysis or is_product_analysis:
+        # Try both "MT" and "Tonage" variants
+        table1_header = "Sales in MT"
+        table2_header = "Sales in Value"
+        
+        # First try with "MT"
+        idx1, idx2 = extract_tables(df_sheet, table1_header, table2_header)
+        
+        # If "MT" not found, try "Tonage"
+        if idx1 is None:
+            table1_header_alt = "Sales in Tonage"
+            idx1, idx2 = extract_tables(df_sheet, table1_header_alt, table2_header)
+            if idx1 is None:
+                return jsonify({'error': f"Could not locate sales table header in sheet."}), 400
+    else:
+        # For other sheets, only use "MT"
+        table1_header = "Sales in MT"
+        table2_header = "Sales in Value"
+        idx1, idx2 = extract_tables(df_sheet, table1_header, table2_header)
+        if idx1 is None:
+            return jsonify({'error': f"Could not locate sales table header in sheet."}), 400
+    
+    # Process the selected table
+    table1_end = idx2 if idx2 is not None else find_table_end(df_sheet, idx1 + 1, is_branch_analysis, is_product_analysis)
+    table1 = process_table(idx1, table1_end, is_branch_analysis, is_product_analysis, is_table1=True)
+
+    table2 = None
+    if idx2 is not None:
+        table2_end = find_table_end(df_sheet, idx2 + 1, is_branch_analysis, is_product_analysis)
+        table2 = process_table(idx2, table2_end, is_branch_analysis, is_product_analysis)
+
+    # Set table options - always use "MT" in the label even if we found "Tonage"
+    table_options = ["Table 1: SALES IN MT"]
+    if idx2 is not None:
+        table_options.append("Table 2: SALES IN VALUE")
+
+    # Validate table choice - handle both "MT" and "Tonage" cases
+    if not table_choice:
+        table_choice = table_options[0]
+    elif table_choice not in table_options:
+        # Special handling for frontend sending "MT" when we have "Tonage"
+        if table_choice == "Table 1: SALES IN MT":
+            table_choice = "Table 1: SALES IN MT"  # Still use this label
+        else:
+            return jsonify({
+                'tables': table_options,
+                'error': f"Selected table '{table_choice}' is invalid. Available options: {table_options}",
+                'is_first_sheet': False
+            }), 400
+    
+    # Select the appropriate table data
+    table_df = table1 if "Table 1" in table_choice else (table2 if idx2 is not None else table1)
+    
+    if table_df is None or table_df.empty:
+        return jsonify({
+            'tables': table_options,
+            'error': f"Selected table '{table_choice}' is empty or invalid.",
+            'is_first_sheet': False
+        }), 400
+    
+    # Prepare response data
+    first_col = table_df.columns[0]
+    branch_list = []
+    product_list = []
+    
+    if is_branch_analysis:
+        valid_rows = table_df[table_df[first_col].notna()]
+        branch_list = sorted(
+            valid_rows[first_col].astype(str).str.strip().unique(),
+            key=lambda x: x.lower()
         )
-        
-        years = sorted(
-            set(re.findall(r'[-–](\d{2,4})\b', all_columns)),
-            reverse=True
+        exclude_terms = current_app.config.get('BRANCH_EXCLUDE_TERMS', [])
+        branch_list = [b for b in branch_list if not any(ex in b.upper() for ex in exclude_terms)]
+    
+    elif is_product_analysis:
+        valid_rows = table_df[table_df[first_col].notna()]
+        product_list = sorted(
+            valid_rows[first_col].astype(str).str.strip().unique(),
+            key=lambda x: x.lower()
         )
+    
+    all_columns = ' '.join(str(col) for col in table_df.columns)
+    months = sorted(
+        set(re.findall(
+            r'\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\b',
+            all_columns,
+            re.IGNORECASE
+        )),
+        key=lambda x: ['jan','feb','mar','apr','may','jun',
+                      'jul','aug','sep','oct','nov','dec'].index(x.lower())
+    )
+    
+    years = sorted(
+        set(re.findall(r'[-–](\d{2,4})\b', all_columns)),
+        reverse=True
+    )
+
+    response_data = {
+        'tables': table_options,
+        'data': table_df.to_dict(orient='records'),
+        'csv_filename': 'filtered_data.csv',
+        'is_first_sheet': False,
+        'is_branch_analysis': is_branch_analysis,
+        'is_product_analysis': is_product_analysis,
+        'months': ['Select All'] + months,
+        'years': ['Select All'] + years,
+        'columns': list(table_df.columns)
+    }
+    
+    if is_branch_analysis:
+        response_data['branches'] = ['Select All'] + branch_list
+        response_data['products'] = []
+    elif is_product_analysis:
+        response_data['products'] = ['Select All'] + product_list
+        response_data['branches'] = []
+    else:
+        response_data['branches'] = []
+        response_data['products'] = []
+
+    return jsonify(response_data)
 
-        response_data = {
-            'tables': table_options,
-            'data': table_df.to_dict(orient='records'),
-            'csv_filename': 'filtered_data.csv',
-            'is_first_sheet': False,
-            'is_branch_analysis': is_branch_analysis,
-            'is_product_analysis': is_product_analysis,
-            'months': ['Select All'] + months,
-            'years': ['Select All'] + years,
-            'columns': list(table_df.columns)
-        }
+@main_bp.route('/process-sheet', methods=['POST'])
+def process_sheet():
+    try:
+        # Initial setup and validation
+        data = request.get_json()
+        dataset_id = data.get('dataset_id')
+        file_data = data.get('file_data')
+        sheet_name = data.get('sheet_name')
+        table_choice = data.get('table_choice')
         
-        if is_branch_analysis:
-            response_data['branches'] = ['Select All'] + branch_list
-            response_data['products'] = []
-        elif is_product_analysis:
-            response_data['products'] = ['Select All'] + product_list
-            response_data['branches'] = []
-        else:
-            response_data['branches'] = []
-            response_data['products'] = []
+        if not (dataset_id or file_data) or not sheet_name:
+            return jsonify({'error': 'Missing dataset_id (or file data) or sheet name'}), 400
 
-        return jsonify(response_data)
+        if not dataset_id:
+            # Older clients still post the workbook inline; register it so the
+            # response hands back an ID they can use from here on.
+            dataset_id = dataset_store.register_workbook(base64.b64decode(file_data))
+
+        payload, error_response = _sheet_payload(dataset_id, sheet_name, table_choice)
+        if error_response is not None:
+            return error_response
+        return jsonify(dict(payload, dataset_id=dataset_id))
 
     except Exception as e:
         logging.error(f"Error in process_sheet: {str(e)}", exc_info=True)
@@ -588,10 +640,11 @@ def process_sheet():
 def process_ytd():
     try:
         data = request.get_json()
-        if not isinstance(data.get('table_data'), list):
-            return jsonify({'error': 'table_data must be a list of records'}), 400
+        records = _request_table_data(data)
+        if not isinstance(records, list):
+            return jsonify({'error': 'table_data must be a list of records (or pass dataset_id and sheet_name)'}), 400
         
-        table_data = pd.DataFrame(data['table_data'])
+        table_data = pd.DataFrame(records)
         metric = data.get('metric')
         selected_year = data.get('selected_year')
         
@@ -632,9 +685,10 @@ def get_visualizations():
     try:
         # Validate and parse request data
         data = request.get_json()
-        if not isinstance(data.get('table_data'), list):
+        records = _request_table_data(data)
+        if not isinstance(records, list):
             logging.error("Invalid table_data format")
-            return jsonify({'error': 'table_data must be a list of records'}), 400
+            return jsonify({'error': 'table_data must be a list of records (or pass dataset_id and selected_sheet)'}), 400
         
         selected_sheet = data.get('selected_sheet', '').lower()
         
@@ -643,10 +697,10 @@ def get_visualizations():
             return jsonify({
                 'status': 'skipped',
                 'message': 'Visualizations blocked for Sales Month-wise sheet',
-                'display_data': make_jsonly_serializable(pd.DataFrame(data['table_data'])).to_dict(orient='records')
+                'display_data': make_jsonly_serializable(pd.DataFrame(records)).to_dict(orient='records')
             }), 200
 
-        table_data = pd.DataFrame(data['table_data'])
+        table_data = pd.DataFrame(records)
         table_name = data.get('table_name', '')
         visual_type = data.get('visual_type', 'bar').lower().replace(" chart", "")
         selected_month = data.get('selected_month')
@@ -1196,12 +1250,18 @@ def download_csv():
         data = request.get_json()
         
         # Get the raw table data (exactly as shown in preview)
-        table_data = data.get('table_data')
+        table_data = _request_table_data(data)
         columns = data.get('columns', [])
         
         if not table_data or not columns:
             return jsonify({'error': 'Missing table data or columns'}), 400
 
+        if not isinstance(data.get('table_data'), list):
+            # Looked up by dataset_id: apply the preview's row filters and number formatting here
+            table_data = _preview_rows(table_data, columns, data.get('row_filters'))
+            if not table_data:
+                return jsonify({'error': 'Missing table data or columns'}), 400
+
         # Create DataFrame while preserving original formatting
         df = pd.DataFrame(table_data)
         
@@ -1625,6 +1685,7 @@ def download_budget_actual_ppt():
         return jsonify({'error': str(e)}), 500
 
 @main_bp.route('/download-master-ppt', methods=['POST'])
+@background_job
 def download_master_ppt():
     try:
         data = request.get_json()
@@ -55,6 +55,8 @@ from utils.executive_ppt_generator import (
 from utils.flask_proof_calculation import (
     create_proof_of_calculation_excel
 )
+from utils.workbook_cache import file_digest, read_sheet, invalidate as invalidate_workbook
+from utils.job_queue import background_job
 
 executive_bp = Blueprint('executive', __name__, url_prefix='/api/executive')
 logger = logging.getLogger(__name__)
@@ -163,7 +165,8 @@ def calculate_customer_analysis():
             executive_col=executive_col,
             selected_months=selected_months if selected_months else None,
             selected_branches=selected_branches if selected_branches else None,
-            selected_executives=selected_executives if selected_executives else None
+            selected_executives=selected_executives if selected_executives else None,
+            sources=[file_digest(sales_file_path)]
         )
         
         if result.get('success'):
@@ -671,6 +674,7 @@ def upload_executive_file():
         
         file_path = os.path.join(upload_folder, unique_filename)
         file.save(file_path)
+        invalidate_workbook(file_path)
         
         return jsonify({
             'message': 'File uploaded successfully',
@@ -1350,9 +1354,9 @@ def od_auto_map_columns():
         try:
             # Load with sheet and header information
             if os_jan_file_path.endswith(('.xlsx', '.xls')):
-                os_jan_df = pd.read_excel(os_jan_file_path, sheet_name=os_jan_sheet, header=os_jan_header-1)
-                os_feb_df = pd.read_excel(os_feb_file_path, sheet_name=os_feb_sheet, header=os_feb_header-1)
-                sales_df = pd.read_excel(sales_file_path, sheet_name=sales_sheet, header=sales_header-1)
+                os_jan_df = read_sheet(os_jan_file_path, sheet_name=os_jan_sheet, header=os_jan_header-1)
+                os_feb_df = read_sheet(os_feb_file_path, sheet_name=os_feb_sheet, header=os_feb_header-1)
+                sales_df = read_sheet(sales_file_path, sheet_name=sales_sheet, header=sales_header-1)
             else:
                 # For CSV files, ignore sheet parameter
                 os_jan_df = pd.read_csv(os_jan_file_path, header=os_jan_header-1)
@@ -1609,7 +1613,8 @@ def calculate_od_vs_collection():
             os_jan_due_date, os_jan_ref_date, os_jan_net_value, os_jan_executive, os_jan_sl_code, os_jan_area,
             os_feb_due_date, os_feb_ref_date, os_feb_net_value, os_feb_executive, os_feb_sl_code, os_feb_area,
             sales_bill_date, sales_due_date, sales_value, sales_executive, sales_sl_code, sales_area,
-            selected_executives, selected_branches
+            selected_executives, selected_branches,
+            sources=[file_digest(path) for path in (os_jan_file_path, os_feb_file_path, sales_file_path)]
         )
         
         if result.get('success'):
@@ -1749,6 +1754,7 @@ def generate_od_ppt():
 
 
 @executive_bp.route('/generate_consolidated_ppt', methods=['POST'])
+@background_job
 def generate_consolidated_ppt():
     """Generate consolidated PowerPoint presentation with multiple reports"""
     try:
@@ -0,0 +1,50 @@
+from flask import Blueprint, Response, jsonify, request
+import logging
+
+from utils.job_queue import JobError, cancel_job, job_result, job_status, list_jobs
+
+jobs_bp = Blueprint('jobs', __name__)
+
+logger = logging.getLogger(__name__)
+
+
+@jobs_bp.route('/jobs', methods=['GET'])
+def get_jobs():
+    """Recent background jobs, newest first"""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({'success': True, 'jobs': list_jobs(limit)})
+
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, percent complete and result URL of a background job"""
+    try:
+        return jsonify(dict(job_status(job_id), success=True))
+    except JobError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+
+
+@jobs_bp.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """The response the job's endpoint produced (JSON or a file download)"""
+    try:
+        body, status, mimetype, headers = job_result(job_id)
+    except JobError as e:
+        try:
+            state = job_status(job_id)['status']
+        except JobError:
+            return jsonify({'success': False, 'error': str(e)}), 404
+        return jsonify({'success': False, 'error': str(e), 'status': state}), 409
+    return Response(body, status=status, mimetype=mimetype, headers=headers)
+
+
+@jobs_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+@jobs_bp.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel(job_id):
+    """Cancel a queued or running job"""
+    try:
+        status = cancel_job(job_id)
+        logger.info(f"Cancel requested for job {job_id} ({status['status']})")
+        return jsonify(dict(status, success=True))
+    except JobError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
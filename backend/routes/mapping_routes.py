@@ -3,6 +3,7 @@
 from flask import Blueprint, request, jsonify
 from services import mapping_service as svc
 from models.schema import *
+from sqlalchemy import func
 
 mapping_bp = Blueprint("mapping", __name__)
 
@@ -41,19 +42,34 @@ def get_exec_customers(name):
 
 @mapping_bp.route("/executives-with-counts", methods=["GET"])
 def get_executives_with_counts():
-    execs = Executive.query.all()
-    result = []
-
-    for e in execs:
-        customer_count = Customer.query.filter_by(executive_id=e.id).count()
-        branch_count = BranchExecutiveMap.query.filter_by(executive_id=e.id).count()
-
-        result.append({
-            "name": e.name,
-            "code": e.code,
-            "customers": customer_count,
-            "branches": branch_count
-        })
+    # One round-trip: per-executive counts come from two grouped subqueries
+    customer_counts = (
+        db.session.query(Customer.executive_id, func.count(Customer.id).label("n"))
+        .group_by(Customer.executive_id)
+        .subquery()
+    )
+    branch_counts = (
+        db.session.query(BranchExecutiveMap.executive_id, func.count(BranchExecutiveMap.id).label("n"))
+        .group_by(BranchExecutiveMap.executive_id)
+        .subquery()
+    )
+    rows = (
+        db.session.query(
+            Executive.name,
+            Executive.code,
+            func.coalesce(customer_counts.c.n, 0),
+            func.coalesce(branch_counts.c.n, 0),
+        )
+        .outerjoin(customer_counts, customer_counts.c.executive_id == Executive.id)
+        .outerjoin(branch_counts, branch_counts.c.executive_id == Executive.id)
+        .order_by(Executive.id)
+        .all()
+    )
+
+    result = [
+        {"name": name, "code": code, "customers": customers, "branches": branches}
+        for name, code, customers, branches in rows
+    ]
 
     return jsonify(result)
 
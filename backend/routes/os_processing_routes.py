@@ -67,23 +67,22 @@ def save_os_file():
 @os_bp.route("/os-files", methods=["GET"])
 def list_os_files():
     from models.schema import OsFile
-    files = OsFile.query.order_by(OsFile.uploaded_at.desc()).all()
-    return jsonify([
-        {"id": f.id, "filename": f.filename, "uploaded_at": f.uploaded_at.isoformat()}
-        for f in files
-    ])
+    from utils.stored_files import list_stored_files
+    return jsonify(list_stored_files(OsFile))
 
 @os_bp.route("/os-files/<int:file_id>/download", methods=["GET"])
 def download_os_file(file_id):
     from models.schema import OsFile
-    import io
-    file = OsFile.query.get_or_404(file_id)
+    from utils.stored_files import stream_stored_file
+    from extensions import db
 
-    return send_file(
-        io.BytesIO(file.file_data),
-        download_name=file.filename if file.filename.endswith(".xlsx") else f"{file.filename}.xlsx",
-        as_attachment=True,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    filename = db.session.query(OsFile.filename).filter(OsFile.id == file_id).scalar()
+    if filename is None:
+        return jsonify({"error": "File not found"}), 404
+
+    return stream_stored_file(
+        OsFile, file_id,
+        download_name=filename if filename.endswith(".xlsx") else f"{filename}.xlsx",
     )
 
 @os_bp.route("/os-files/<int:file_id>", methods=["DELETE"])
@@ -6,6 +6,7 @@ import tempfile
 import os
 import shutil
 import atexit
+from utils.workbook_inspector import list_sheets
 
 api1_bp = Blueprint('api1', __name__)
 
@@ -41,9 +42,7 @@ def upload_file():
     
     try:
         file.save(temp_path)
-        xls = pd.ExcelFile(temp_path)
-        sheet_names = xls.sheet_names
-        xls.close()
+        sheet_names = list_sheets(temp_path)
         
         return jsonify({
             'success': True,
@@ -4,6 +4,7 @@ from io import BytesIO
 import base64
 from services.mapping_service import process_sales_file
 from models.schema import *
+from utils.stored_files import list_stored_files, stream_stored_file
 import io
 
 sales_bp = Blueprint("sales", __name__)
@@ -66,21 +67,11 @@ def save_sales_file():
 
 @sales_bp.route("/sales-files", methods=["GET"])
 def list_sales_files():
-    files = SalesFile.query.order_by(SalesFile.uploaded_at.desc()).all()
-    return jsonify([
-        {"id": f.id, "filename": f.filename, "uploaded_at": f.uploaded_at.isoformat()}
-        for f in files
-    ])
+    return jsonify(list_stored_files(SalesFile))
 
 @sales_bp.route("/sales-files/<int:file_id>/download", methods=["GET"])
 def download_sales_file(file_id):
-    file = SalesFile.query.get_or_404(file_id)
-    return send_file(
-        io.BytesIO(file.file_data),
-        download_name=file.filename,
-        as_attachment=True,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    return stream_stored_file(SalesFile, file_id)
 
 @sales_bp.route("/sales-files/<int:file_id>", methods=["DELETE"])
 def delete_sales_file(file_id):
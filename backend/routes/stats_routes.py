@@ -0,0 +1,26 @@
+from flask import Blueprint, jsonify
+
+from utils.budget_matching import report_cache_stats
+from utils.column_resolver import column_resolver_stats
+from utils.result_store import result_store_stats
+from utils.sales_facts import sales_facts_stats
+from utils.workbook_cache import cache_stats
+
+stats_bp = Blueprint('stats', __name__)
+
+
+def all_cache_stats():
+    """Hit/miss counters and sizes of this worker's in-process caches."""
+    return {
+        'workbook_cache': cache_stats(),
+        'column_resolver': column_resolver_stats(),
+        'report_cache': report_cache_stats(),
+        'sales_facts': sales_facts_stats(),
+        'result_store': result_store_stats(),
+    }
+
+
+@stats_bp.route('/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss counters of the parsed-workbook, column-detection, report, sales-fact and result caches"""
+    return jsonify({'success': True, 'caches': all_cache_stats()})
@@ -1,13 +1,13 @@
 from flask import Blueprint, request, jsonify
 import pandas as pd
+from utils.workbook_inspector import list_sheets, preview_sheet as inspect_preview
 
 upload_tools_bp = Blueprint("upload_tools", __name__)
 
 @upload_tools_bp.route("/upload-tools/sheet-names", methods=["POST"])
 def get_sheet_names():
     file = request.files["file"]
-    excel = pd.ExcelFile(file)
-    return jsonify({"sheet_names": excel.sheet_names})
+    return jsonify({"sheet_names": list_sheets(file.stream)})
 
 
 # In routes/upload_tools.py
@@ -22,7 +22,7 @@ def preview_sheet():
         # ✅ REWIND THE FILE STREAM TO THE BEGINNING
         file.seek(0) 
 
-        df = pd.read_excel(file, sheet_name=sheet_name, header=header_row)
+        df = inspect_preview(file.stream, sheet_name=sheet_name, header=header_row, nrows=10)
 
         return jsonify({
             "columns": list(df.columns),
@@ -0,0 +1,147 @@
+import os
+import re
+import glob
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from utils.workbook_cache import invalidate, read_sheet
+from utils.workbook_inspector import list_sheets
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Dashboard dataset registry
+# =========================
+# /upload stores the workbook once under uploads/datasets/<sha256>.xlsx and
+# hands the client that ID. /process-sheet, /visualizations, /process-ytd and
+# /download-csv then reference the ID instead of shipping base64 workbooks or
+# whole tables back and forth. Sheet parses go through the workbook cache;
+# extracted tables are kept per (dataset, sheet, table choice) in an LRU.
+# Workbooks are removed DASHBOARD_DATASET_TTL seconds after their last upload
+# (a re-upload of the same bytes restarts the clock), and the oldest go first
+# once the directory holds more than DASHBOARD_DATASET_MAX_MB; a client still
+# holding a removed ID is asked to upload the file again. Uploads sweep the
+# directory at most every SWEEP_SECONDS.
+
+DATASET_DIR = os.getenv('DASHBOARD_DATASET_DIR', os.path.join('uploads', 'datasets'))
+MAX_TABLES = int(os.getenv('DASHBOARD_TABLE_CACHE_ENTRIES', '64'))
+TTL_SECONDS = int(os.getenv('DASHBOARD_DATASET_TTL', str(7 * 24 * 3600)))
+MAX_BYTES = int(float(os.getenv('DASHBOARD_DATASET_MAX_MB', '2048')) * 1024 * 1024)
+SWEEP_SECONDS = 600
+_ID_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+_lock = threading.Lock()
+_tables = OrderedDict()   # (dataset_id, sheet_name, table_choice) -> response payload
+_state = {'last_sweep': 0.0}
+
+
+def register_workbook(content):
+    """Persist workbook bytes (once per distinct content) and return the dataset ID."""
+    dataset_id = hashlib.sha256(content).hexdigest()
+    path = os.path.join(DATASET_DIR, f"{dataset_id}.xlsx")
+    try:
+        os.utime(path)  # already stored: restart its retention
+    except FileNotFoundError:
+        os.makedirs(DATASET_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            fh.write(content)
+        os.replace(tmp_path, path)
+    now = time.time()
+    with _lock:
+        sweep = now - _state['last_sweep'] > SWEEP_SECONDS
+        if sweep:
+            _state['last_sweep'] = now
+    if sweep:
+        purge_datasets(keep=dataset_id)
+    return dataset_id
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+
+def purge_datasets(keep=None):
+    """
+    Remove workbooks uploaded more than TTL_SECONDS ago, then the oldest until
+    the rest fit in MAX_BYTES, never the dataset `keep`. Returns the removed IDs.
+    """
+    now = time.time()
+    datasets = []
+    for path in glob.glob(os.path.join(DATASET_DIR, '*')):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        name = os.path.basename(path)
+        if name.endswith('.tmp'):
+            # left behind by an interrupted upload
+            if now - st.st_mtime > TTL_SECONDS:
+                _remove_file(path)
+            continue
+        dataset_id, ext = os.path.splitext(name)
+        if ext == '.xlsx' and _ID_PATTERN.match(dataset_id):
+            datasets.append((st.st_mtime, st.st_size, dataset_id, path))
+
+    removed = []
+    total = 0
+    for mtime, size, dataset_id, path in sorted(datasets, reverse=True):
+        total += size
+        if dataset_id == keep or (now - mtime <= TTL_SECONDS and total <= MAX_BYTES):
+            continue
+        if _remove_file(path):
+            total -= size
+            removed.append(dataset_id)
+            invalidate(path)
+
+    if removed:
+        with _lock:
+            for key in [k for k in _tables if k[0] in removed]:
+                del _tables[key]
+        logger.info(f"Dataset store: removed {len(removed)} workbooks from {DATASET_DIR}")
+    return removed
+
+
+def workbook_path(dataset_id):
+    """Path of a registered workbook, or None for unknown/malformed IDs."""
+    if not dataset_id or not _ID_PATTERN.match(str(dataset_id)):
+        return None
+    path = os.path.join(DATASET_DIR, f"{dataset_id}.xlsx")
+    return path if os.path.exists(path) else None
+
+
+def sheet_names(dataset_id):
+    return list_sheets(workbook_path(dataset_id))
+
+
+def read_sheet_head(dataset_id, sheet_name, nrows=1000):
+    """
+    pd.read_excel(..., header=None, nrows=nrows) through the workbook cache:
+    only the first nrows rows are parsed, however long the sheet is.
+    """
+    return read_sheet(workbook_path(dataset_id), sheet_name=sheet_name, header=None, nrows=nrows)
+
+
+def get_table(dataset_id, sheet_name, table_choice):
+    with _lock:
+        key = (dataset_id, sheet_name, table_choice or None)
+        payload = _tables.get(key)
+        if payload is not None:
+            _tables.move_to_end(key)
+        return payload
+
+
+def put_table(dataset_id, sheet_name, table_choice, payload):
+    with _lock:
+        key = (dataset_id, sheet_name, table_choice or None)
+        _tables[key] = payload
+        _tables.move_to_end(key)
+        while len(_tables) > MAX_TABLES:
+            _tables.popitem(last=False)
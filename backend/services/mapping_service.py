@@ -3,9 +3,13 @@
 from models.schema import *
 from extensions import db
 from sqlalchemy.orm import joinedload
+import numpy as np
 import pandas as pd
 import io
 
+from services.mapping_snapshot import get_mapping_snapshot
+from utils.aho_corasick import AhoCorasick
+
 ### --------- Executive & Customer Logic ----------
 
 def add_executive(name, code=None):
@@ -118,9 +122,11 @@ def map_company_products(company_name, product_names):
     CompanyProductMap.query.filter_by(company_id=company.id).delete()
 
     count = 0
+    mapped_ids = set()
     for product_name in product_names:
         product = Product.query.filter_by(name=product_name).first()
-        if product:
+        if product and product.id not in mapped_ids:
+            mapped_ids.add(product.id)
             db.session.add(CompanyProductMap(company_id=company.id, product_id=product.id))
             count += 1
 
@@ -128,17 +134,26 @@ def map_company_products(company_name, product_names):
     return count
 
 def get_all_company_product_mappings():
-    companies = Company.query.all()
+    rows = (
+        db.session.query(Company.id, Company.name, Product.id, Product.name)
+        .outerjoin(CompanyProductMap, CompanyProductMap.company_id == Company.id)
+        .outerjoin(Product, Product.id == CompanyProductMap.product_id)
+        .order_by(Company.id, Product.id)
+        .all()
+    )
     result = []
-    for company in companies:
-        mappings = CompanyProductMap.query.filter_by(company_id=company.id).all()
-        product_ids = [m.product_id for m in mappings]
-        product_names = [p.name for p in Product.query.filter(Product.id.in_(product_ids)).all()]
-        result.append({
-            "company": company.name,
-            "products": product_names,
-            "count": len(product_names)
-        })
+    by_company = {}
+    for company_id, company_name, product_id, product_name in rows:
+        entry = by_company.get(company_id)
+        if entry is None:
+            entry = by_company[company_id] = {"company": company_name, "products": [], "seen": set()}
+            result.append(entry)
+        if product_id is not None and product_id not in entry["seen"]:
+            entry["seen"].add(product_id)
+            entry["products"].append(product_name)
+    for entry in result:
+        del entry["seen"]
+        entry["count"] = len(entry["products"])
     return result
 
 def upload_company_product_from_df(df, company_col, product_col):
@@ -246,6 +261,14 @@ def normalize_customer_code(code):
     
     return code_str
 
+def collation_key(value):
+    """
+    A name or code as the database compares it: MySQL's default collation
+    ignores case and trailing spaces, so filter_by(name=...) found "John Doe "
+    for "john doe". In-memory lookups against DB values match on this key.
+    """
+    return str(value).rstrip(" ").casefold()
+
 def get_exec_by_customer_code(customer_code):
     cust = Customer.query.filter_by(code=customer_code).first()
     if cust and cust.executive:
@@ -277,10 +300,122 @@ def get_region_for_branch(branch_name):
     return ""
 
 
-def process_budget_file(df, customer_col, exec_code_col, exec_name_col, branch_col, region_col, cust_name_col=None):
-    from models.schema import Customer, Executive
-    import pandas as pd
+def load_mapping_lookups():
+    """
+    Query every mapping table and return plain lookups for set-based enrichment
+    (callers normally go through get_mapping_snapshot(), which caches this):
+    customer code → exec name, exec name → code / joined branches,
+    exec code → exec name, branch → region, the ordered product → company list
+    and the ordered (name, code) executive list used by ExecCodeMatcher.
+    """
+    executives = db.session.query(Executive.id, Executive.name, Executive.code).order_by(Executive.id).all()
+    exec_names = {e.name for e in executives}
+    exec_code_by_name = {e.name: e.code for e in executives}
+    exec_name_by_code = {}
+    for e in executives:
+        if e.code:
+            exec_name_by_code.setdefault(e.code, e.name)
+
+    customer_rows = (
+        db.session.query(Customer.code, Executive.name)
+        .join(Executive, Customer.executive_id == Executive.id)
+        .order_by(Customer.id)
+        .all()
+    )
+    exec_by_customer = {normalize_customer_code(code): name for code, name in customer_rows}
+
+    branch_rows = (
+        db.session.query(Executive.name, Branch.name)
+        .join(BranchExecutiveMap, BranchExecutiveMap.executive_id == Executive.id)
+        .join(Branch, BranchExecutiveMap.branch_id == Branch.id)
+        .all()
+    )
+    branch_sets = {}
+    for exec_name, branch_name in branch_rows:
+        branch_sets.setdefault(exec_name, set()).add(branch_name)
+    branches_by_exec = {name: ", ".join(sorted(b)) for name, b in branch_sets.items()}
+
+    region_rows = (
+        db.session.query(Branch.name, Region.name)
+        .join(RegionBranchMap, RegionBranchMap.branch_id == Branch.id)
+        .join(Region, RegionBranchMap.region_id == Region.id)
+        .order_by(RegionBranchMap.id)
+        .all()
+    )
+    region_by_branch = {}
+    for branch_name, region_name in region_rows:
+        region_by_branch.setdefault(branch_name, region_name)
+
+    product_rows = (
+        db.session.query(Product.name, Company.name)
+        .join(CompanyProductMap, CompanyProductMap.product_id == Product.id)
+        .join(Company, CompanyProductMap.company_id == Company.id)
+        .order_by(CompanyProductMap.id)
+        .all()
+    )
+    company_by_product = [(' '.join(p.lower().strip().split()), c) for p, c in product_rows]
+
+    return {
+        "exec_names": exec_names,
+        "exec_code_by_name": exec_code_by_name,
+        "exec_name_by_code": exec_name_by_code,
+        "exec_by_customer": exec_by_customer,
+        "branches_by_exec": branches_by_exec,
+        "region_by_branch": region_by_branch,
+        "company_by_product": company_by_product,
+        "exec_codes": [(e.name, e.code) for e in executives],
+    }
 
+
+def _match_company(normalized_product, company_by_product):
+    """First exact match, else first containment match, in mapping order (see get_company_for_product)."""
+    for mapped_norm, company in company_by_product:
+        if normalized_product == mapped_norm:
+            return company
+    for mapped_norm, company in company_by_product:
+        if normalized_product in mapped_norm or mapped_norm in normalized_product:
+            return company
+    return ""
+
+
+def _collated_map(values, mapping):
+    """values.map(mapping) with keys matched by collation_key (first DB row wins, like .first())."""
+    keyed = {}
+    for key, value in mapping.items():
+        keyed.setdefault(collation_key(key), value)
+    resolved = {}
+    for value in values.dropna().unique():
+        key = collation_key(value)
+        if key in keyed:
+            resolved[value] = keyed[key]
+    return values.map(resolved)
+
+
+def _round2(values):
+    """
+    round(v, 2) of every value. Series.round scales by 100 and rounds, which
+    differs from Python's correctly rounded round() next to a .5 boundary
+    (about 1 value in 2,000 for whole-rupee amounts in lakhs): those few are
+    re-rounded with round() itself.
+    """
+    rounded = values.round(2)
+    scaled = values * 100
+    near_half = (scaled - np.floor(scaled) - 0.5).abs() < 1e-6
+    if near_half.any():
+        rounded[near_half] = [round(v, 2) for v in values[near_half].tolist()]
+    return rounded
+
+
+def _assign(df, mask, col, values):
+    """df.loc[mask, col] = values, widening the column to object first like row-wise .at did."""
+    if not mask.any():
+        return
+    if df[col].dtype != object:
+        df[col] = df[col].astype(object)
+    df.loc[mask, col] = values[mask] if isinstance(values, pd.Series) else values
+
+
+def process_budget_file(df, customer_col, exec_code_col, exec_name_col, branch_col, region_col, cust_name_col=None, lookups=None):
     processed_df = df.copy()
 
     if "Branch" not in processed_df.columns:
@@ -290,41 +425,33 @@ def process_budget_file(df, customer_col, exec_code_col, exec_name_col, branch_c
     if "Company Group" not in processed_df.columns:
         processed_df["Company Group"] = ""
 
-    # Load customer code → executive name mapping from DB
-    customers = Customer.query.all()
-    customer_code_map = {normalize_customer_code(c.code): c.executive.name for c in customers if c.executive}
-
-    # Load executive name → code mapping
-    executives = Executive.query.all()
-    exec_code_map = {e.name: e.code for e in executives}
-
-    for idx, row in processed_df.iterrows():
-        if pd.notna(row[customer_col]):
-            customer_code = normalize_customer_code(str(row[customer_col]).strip())
+    lookups = lookups or get_mapping_snapshot().lookups
 
-            if customer_code in customer_code_map:
-                exec_name = customer_code_map[customer_code]
+    # Resolve each distinct customer code once, then broadcast back to the rows
+    raw_codes = processed_df[customer_col]
+    present = raw_codes.notna()
+    codes = raw_codes[present].astype(str).str.strip()
+    code_map = {c: normalize_customer_code(c) for c in codes.unique()}
+    exec_names = _collated_map(codes.map(code_map), lookups["exec_by_customer"]).reindex(processed_df.index)
+    matched = exec_names.notna()
 
-                # Assign executive code
-                if exec_code_col in processed_df.columns and exec_name in exec_code_map:
-                    processed_df.at[idx, exec_code_col] = exec_code_map[exec_name]
+    if exec_code_col in processed_df.columns:
+        has_code = matched & exec_names.isin(lookups["exec_code_by_name"].keys())
+        _assign(processed_df, has_code, exec_code_col, exec_names.map(lookups["exec_code_by_name"]))
 
-                # Assign executive name
-                if exec_name_col in processed_df.columns:
-                    processed_df.at[idx, exec_name_col] = exec_name
+    if exec_name_col in processed_df.columns:
+        _assign(processed_df, matched, exec_name_col, exec_names)
 
-                # Assign branch
-                branch = get_branches_for_executive(exec_name)
-                if branch_col in processed_df.columns:
-                    processed_df.at[idx, branch_col] = branch
-                processed_df.at[idx, "Branch"] = branch
+    branches = exec_names.map(lookups["branches_by_exec"]).fillna("")
+    if branch_col in processed_df.columns:
+        _assign(processed_df, matched, branch_col, branches)
+    _assign(processed_df, matched, "Branch", branches)
 
-                # Assign region
-                if branch and "," not in branch:
-                    region = get_region_for_branch(branch)
-                    if region_col in processed_df.columns:
-                        processed_df.at[idx, region_col] = region
-                    processed_df.at[idx, "Region"] = region
+    single_branch = matched & (branches != "") & ~branches.str.contains(",", regex=False)
+    regions = branches.map(lookups["region_by_branch"]).fillna("")
+    if region_col in processed_df.columns:
+        _assign(processed_df, single_branch, region_col, regions)
+    _assign(processed_df, single_branch, "Region", regions)
 
     return processed_df
 
@@ -365,8 +492,9 @@ def get_company_for_product(product_name):
             return mapping.company.name
     return ""
 
-def process_sales_file(df, exec_code_col, product_col=None, exec_name_col=None, unit_col=None, quantity_col=None, value_col=None):
+def process_sales_file(df, exec_code_col, product_col=None, exec_name_col=None, unit_col=None, quantity_col=None, value_col=None, lookups=None):
     df = df.copy()
+    lookups = lookups or get_mapping_snapshot().lookups
 
     # Add standard columns
     df["Branch"] = ""
@@ -377,72 +505,60 @@ def process_sales_file(df, exec_code_col, product_col=None, exec_name_col=None,
     if value_col:
         df["Value"] = ""
 
-    exec_found, branch_found, region_found, product_mapped = 0, 0, 0, 0
-
-    for idx, row in df.iterrows():
-        exec_name = None
-
-        # Try by code
-        exec_code = str(row[exec_code_col]).strip() if pd.notna(row[exec_code_col]) else None
-        if exec_code:
-            exec_name = get_exec_name_by_code(exec_code)
-            if exec_name:
-                exec_found += 1
-
-        # Fallback by name
-        if not exec_name and exec_name_col and pd.notna(row[exec_name_col]):
-            potential_name = str(row[exec_name_col]).strip()
-            if Executive.query.filter_by(name=potential_name).first():
-                exec_name = potential_name
-                exec_found += 1
-
-        # Update executive name
-        if exec_name and exec_name_col and exec_name_col in df.columns:
-            df.at[idx, exec_name_col] = exec_name
-
-        # Get branch
-        if exec_name:
-            branch = get_branches_for_exec(exec_name)
-            if branch:
-                df.at[idx, "Branch"] = branch
-                branch_found += 1
-
-                if "," not in branch:
-                    region = get_region_for_branch(branch)
-                    if region:
-                        df.at[idx, "Region"] = region
-                        region_found += 1
-
-        # Product → Company
-        if product_col and pd.notna(row[product_col]):
-            product_name = str(row[product_col]).strip()
-            company = get_company_for_product(product_name)
-            if company:
-                df.at[idx, "Company Group"] = company
-                product_mapped += 1
-
-        # Quantity normalization
-        if unit_col and quantity_col and pd.notna(row[unit_col]) and pd.notna(row[quantity_col]):
-            try:
-                unit = str(row[unit_col]).strip().upper()
-                quantity = float(row[quantity_col])
-                if unit == "MT":
-                    actual = quantity
-                elif unit in ["KGS", "NOS"]:
-                    actual = quantity / 1000
-                else:
-                    actual = quantity
-                df.at[idx, "Actual Quantity"] = actual
-            except:
-                df.at[idx, "Actual Quantity"] = ""
-
-        # Value in lakhs
-        if value_col and pd.notna(row[value_col]):
-            try:
-                value = float(row[value_col])
-                df.at[idx, "Value"] = round(value / 100000, 2)
-            except:
-                df.at[idx, "Value"] = 0
+    # Executive: by code first, then fall back to a known name in the name
+    # column (kept as spelled in the file, like the per-row lookups did).
+    # Codes and names are matched the way the DB collation compares them.
+    raw_codes = df[exec_code_col]
+    codes = raw_codes.where(raw_codes.isna(), raw_codes.astype(str).str.strip())
+    exec_names = _collated_map(codes, lookups["exec_name_by_code"])
+    if exec_name_col:
+        raw_names = df[exec_name_col]
+        names = raw_names.where(raw_names.isna(), raw_names.astype(str).str.strip())
+        known = _collated_map(names, {name: name for name in lookups["exec_names"]})
+        exec_names = exec_names.fillna(names.where(known.notna()))
+    found = exec_names.notna()
+    exec_found = int(found.sum())
+
+    if exec_name_col and exec_name_col in df.columns:
+        _assign(df, found, exec_name_col, exec_names)
+
+    # Branch / region
+    branches = _collated_map(exec_names, lookups["branches_by_exec"]).fillna("")
+    has_branch = found & (branches != "")
+    _assign(df, has_branch, "Branch", branches)
+    regions = branches.map(lookups["region_by_branch"]).fillna("")
+    has_region = has_branch & ~branches.str.contains(",", regex=False) & (regions != "")
+    _assign(df, has_region, "Region", regions)
+    branch_found, region_found = int(has_branch.sum()), int(has_region.sum())
+
+    # Product → Company, matched once per distinct product name
+    product_mapped = 0
+    if product_col:
+        raw_products = df[product_col]
+        present = raw_products.notna()
+        products = raw_products[present].astype(str).str.strip()
+        company_map = {
+            p: _match_company(' '.join(p.lower().strip().split()), lookups["company_by_product"])
+            for p in products.unique()
+        }
+        companies = products.map(company_map).reindex(df.index).fillna("")
+        mapped = companies != ""
+        _assign(df, mapped, "Company Group", companies)
+        product_mapped = int(mapped.sum())
+
+    # Quantity normalization: KGS/NOS → MT, anything else taken as-is
+    if unit_col and quantity_col:
+        units = df[unit_col]
+        quantities = pd.to_numeric(df[quantity_col], errors="coerce")
+        present = units.notna() & df[quantity_col].notna()
+        divisor = units.astype(str).str.strip().str.upper().isin(["KGS", "NOS"]).map({True: 1000.0, False: 1.0})
+        _assign(df, present & quantities.notna(), "Actual Quantity", quantities / divisor)
+
+    # Value in lakhs (unparseable values become 0)
+    if value_col:
+        present = df[value_col].notna()
+        values = pd.to_numeric(df[value_col], errors="coerce")
+        _assign(df, present, "Value", _round2(values / 100000).fillna(0))
 
     print(f"[Sales File] Total: {len(df)}, Execs: {exec_found}, Branches: {branch_found}, Regions: {region_found}, Products: {product_mapped}")
     return df
@@ -477,48 +593,103 @@ def match_exec_name(exec_code_from_file):
             return exec.name
     return None
 
-def process_os_file(df, exec_code_col):
+
+class ExecCodeMatcher:
+    """
+    match_exec_name() for a whole column at once. Built once from the executive
+    list (in id order): exact codes go into a dict, containment in either
+    direction is resolved with Aho-Corasick automata, and each result is the
+    first executive match_exec_name would have returned.
+    """
+
+    def __init__(self, exec_codes):
+        self.names = [name for name, _ in exec_codes]
+        self.codes = [code.strip().lower() if code else "" for _, code in exec_codes]
+        self.exact = {}
+        for rank, code in enumerate(self.codes):
+            self.exact.setdefault(code, rank)
+        # An empty DB code is contained in every file code
+        self.empty_rank = self.exact.get("")
+        self.patterns = [code for code in self.exact if code]
+        self.pattern_rank = [self.exact[code] for code in self.patterns]
+        self.db_automaton = AhoCorasick(self.patterns)
+
+    def match_many(self, file_codes):
+        """Map each distinct file code to its executive name (codes without a match are left out)."""
+        ranks = {}
+        pending = []
+        for raw in set(file_codes):
+            code = str(raw).strip().lower()
+            rank = self.exact.get(code)
+            if rank is None:
+                pending.append((raw, code))
+            else:
+                ranks[raw] = rank
+
+        # File code contains a DB code
+        for raw, code in pending:
+            best = self.empty_rank
+            for idx in self.db_automaton.matched(code):
+                rank = self.pattern_rank[idx]
+                if best is None or rank < best:
+                    best = rank
+            if best is not None:
+                ranks[raw] = best
+
+        # DB code contains the file code: scan DB codes once against all pending codes
+        file_patterns = [code for _, code in pending]
+        if self.codes and any(file_patterns):
+            first_container = {}
+            file_automaton = AhoCorasick(file_patterns)
+            for rank, db_code in enumerate(self.codes):
+                for idx in file_automaton.matched(db_code):
+                    first_container.setdefault(idx, rank)
+            for idx, (raw, _) in enumerate(pending):
+                rank = first_container.get(idx)
+                if rank is not None and (raw not in ranks or rank < ranks[raw]):
+                    ranks[raw] = rank
+        if self.codes:
+            for raw, code in pending:
+                if not code:
+                    ranks[raw] = 0
+        return {raw: self.names[rank] for raw, rank in ranks.items()}
+
+def process_os_file(df, exec_code_col, lookups=None):
     df = df.copy()
+    lookups = lookups or get_mapping_snapshot().lookups
     if "Branch" not in df.columns:
         df["Branch"] = ""
     if "Region" not in df.columns:
         df["Region"] = ""
 
     total_rows = len(df)
-    exec_found_count = 0
-    branch_mapped_count = 0
-    region_mapped_count = 0
-    exec_not_found = []
-    branch_not_found = []
-
-    for idx, row in df.iterrows():
-        exec_name = None
-        if pd.notna(row[exec_code_col]):
-            exec_code = str(row[exec_code_col]).strip()
-            exec_name = match_exec_name(exec_code)
-
-            if exec_name:
-                exec_found_count += 1
-            else:
-                exec_not_found.append(exec_code)
-
-        if exec_name:
-            branch = get_branch_for_exec(exec_name)
-            if branch:
-                df.at[idx, "Branch"] = branch
-                branch_mapped_count += 1
-
-                if "," not in branch:
-                    region = get_region_for_branch(branch)
-                    if region:
-                        df.at[idx, "Region"] = region
-                        region_mapped_count += 1
-                    else:
-                        branch_not_found.append(branch)
-                else:
-                    df.at[idx, "Region"] = "Multiple Branches"
-            else:
-                branch_not_found.append(f"Executive: {exec_name}")
+
+    # Resolve each distinct code once, then broadcast back to the rows
+    raw_codes = df[exec_code_col]
+    present = raw_codes.notna()
+    codes = raw_codes[present].astype(str).str.strip()
+    matcher = ExecCodeMatcher(lookups["exec_codes"])
+    exec_names = codes.map(matcher.match_many(codes.unique())).reindex(df.index).astype(object)
+    found = exec_names.notna()
+    exec_found_count = int(found.sum())
+    exec_not_found = codes[~found[present]].tolist()
+
+    branches = exec_names.map(lookups["branches_by_exec"]).fillna("")
+    has_branch = found & (branches != "")
+    _assign(df, has_branch, "Branch", branches)
+    branch_mapped_count = int(has_branch.sum())
+
+    single = has_branch & ~branches.str.contains(",", regex=False)
+    regions = branches.map(lookups["region_by_branch"]).fillna("")
+    has_region = single & (regions != "")
+    _assign(df, has_region, "Region", regions)
+    _assign(df, has_branch & ~single, "Region", "Multiple Branches")
+    region_mapped_count = int(has_region.sum())
+
+    issues = pd.Series(None, index=df.index, dtype=object)
+    issues[found & ~has_branch] = "Executive: " + exec_names[found & ~has_branch]
+    issues[single & ~has_region] = branches[single & ~has_region]
+    branch_not_found = issues.dropna().tolist()
 
     # Optional: add debug logging
     print(f"[OS FILE] Total Rows: {total_rows}")
@@ -0,0 +1,174 @@
+# services/mapping_snapshot.py
+
+import os
+import uuid
+import logging
+import threading
+from itertools import chain
+from types import MappingProxyType
+
+import pandas as pd
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models.schema import (
+    Branch, BranchExecutiveMap, Company, CompanyProductMap, Customer,
+    Executive, Product, Region, RegionBranchMap,
+)
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Versioned mapping snapshot
+# =========================
+# The executive/customer/branch/region/company/product tables change rarely
+# but are read on every upload. get_mapping_snapshot() serves them from an
+# immutable in-process snapshot and only goes back to the database when the
+# mapping version has moved.
+#
+# The version is shared between workers through VERSION_FILE: every commit
+# that touched a mapping table atomically replaces it with a fresh random
+# nonce, so the file stays 32 bytes and checking for staleness is one small
+# read.
+# Commits are detected with session events, which covers the mapping_service
+# helpers as well as the routes that write these tables directly.
+
+VERSION_FILE = os.getenv('MAPPING_VERSION_FILE', os.path.join('uploads', '.cache', 'mapping.version'))
+
+MAPPING_MODELS = (
+    Executive, Customer, Branch, Region, BranchExecutiveMap,
+    RegionBranchMap, Company, Product, CompanyProductMap,
+)
+_MAPPING_TABLES = {model.__table__.name for model in MAPPING_MODELS}
+
+_lock = threading.Lock()
+_local_bumps = 0          # fallback when the version file cannot be written
+_snapshot = None
+
+
+def mapping_version():
+    """Current (shared, local) mapping version."""
+    try:
+        with open(VERSION_FILE) as fh:
+            shared = fh.read()
+    except OSError:
+        shared = ''
+    return shared, _local_bumps
+
+
+def bump_mapping_version():
+    """Mark every worker's snapshot stale; called after mapping tables change."""
+    global _local_bumps
+    with _lock:
+        _local_bumps += 1
+    try:
+        os.makedirs(os.path.dirname(VERSION_FILE) or '.', exist_ok=True)
+        # readers see the old or the new nonce, never a partial one; concurrent
+        # bumps from several workers each leave a version nobody has seen
+        tmp_path = f"{VERSION_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as fh:
+            fh.write(uuid.uuid4().hex)
+        os.replace(tmp_path, VERSION_FILE)
+    except OSError as e:
+        logger.warning(f"Could not publish mapping version to {VERSION_FILE}: {e}")
+
+
+class MappingSnapshot:
+    """
+    Read-only view of all mapping tables at one version.
+
+    `lookups` is the dict consumed by process_budget_file / process_sales_file /
+    process_os_file; the DataFrames are the same data in tabular form and must
+    be treated as read-only (copy before modifying).
+    """
+
+    def __init__(self, version, lookups):
+        self.version = version
+        self.lookups = MappingProxyType({
+            key: (MappingProxyType(value) if isinstance(value, dict)
+                  else frozenset(value) if isinstance(value, set)
+                  else tuple(value) if isinstance(value, list)
+                  else value)
+            for key, value in lookups.items()
+        })
+
+        self.executives = pd.DataFrame(
+            [(name, code, lookups["branches_by_exec"].get(name, "")) for name, code in lookups["exec_codes"]],
+            columns=["executive", "code", "branches"],
+        )
+        self.customers = pd.DataFrame(list(lookups["exec_by_customer"].items()), columns=["customer_code", "executive"])
+        self.branches = pd.DataFrame(list(lookups["region_by_branch"].items()), columns=["branch", "region"])
+        self.products = pd.DataFrame(lookups["company_by_product"], columns=["product", "company"])
+
+    # Convenience lookups mirroring the per-row mapping_service helpers
+    def exec_for_code(self, exec_code):
+        return self.lookups["exec_name_by_code"].get(str(exec_code).strip())
+
+    def exec_for_customer(self, customer_code):
+        from services.mapping_service import normalize_customer_code
+        return self.lookups["exec_by_customer"].get(normalize_customer_code(customer_code))
+
+    def branches_for_exec(self, exec_name):
+        return self.lookups["branches_by_exec"].get(exec_name, "")
+
+    def region_for_branch(self, branch_name):
+        return self.lookups["region_by_branch"].get(branch_name, "")
+
+
+def get_mapping_snapshot():
+    """Return the current snapshot, reloading it only when the mapping version changed."""
+    global _snapshot
+    version = mapping_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    from services.mapping_service import load_mapping_lookups
+
+    with _lock:
+        if _snapshot is not None and _snapshot.version == version:
+            return _snapshot
+        # Read the version before querying: a commit landing mid-load bumps it
+        # again, so the next call reloads instead of keeping half-new data.
+        _snapshot = MappingSnapshot(version, load_mapping_lookups())
+        logger.info(f"Loaded mapping snapshot v{version[0][:8] or 0}.{version[1]}")
+        return _snapshot
+
+
+def invalidate_mapping_snapshot():
+    """Drop this worker's snapshot without publishing a new version."""
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+# =========================
+# Write-through invalidation
+# =========================
+
+@event.listens_for(Session, 'after_flush')
+def _track_flush(session, flush_context):
+    if any(isinstance(obj, MAPPING_MODELS) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info['mappings_changed'] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_statement(orm_execute_state):
+    # Query.delete()/update() and insert() statements bypass the flush
+    if not (orm_execute_state.is_delete or orm_execute_state.is_update or orm_execute_state.is_insert):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is not None and getattr(table, 'name', None) in _MAPPING_TABLES:
+        orm_execute_state.session.info['mappings_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_on_commit(session):
+    if session.info.pop('mappings_changed', False):
+        bump_mapping_version()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_on_rollback(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop('mappings_changed', None)
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Flask app on an in-memory SQLite database with the schema created; mapping version file in tmp_path."""
+    from flask import Flask
+
+    import services.mapping_snapshot as mapping_snapshot
+    from extensions import db
+
+    monkeypatch.setattr(mapping_snapshot, 'VERSION_FILE', str(tmp_path / 'mapping.version'))
+    mapping_snapshot.invalidate_mapping_snapshot()
+
+    flask_app = Flask(__name__)
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(flask_app)
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+    mapping_snapshot.invalidate_mapping_snapshot()
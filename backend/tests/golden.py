@@ -0,0 +1,203 @@
+"""
+Golden outputs for parity tests.
+
+Report rewrites are checked against what the implementation they replaced
+returned for the same inputs. Those outputs are stored as JSON under
+tests/fixtures/<name>.json (frames, .xlsx exports, scalars and containers of
+them) and compared with compare(). A test module regenerates its fixture by
+running its old implementation, loaded from git with module_at(), when run
+as a script:
+
+    cd backend && python tests/test_budget_matching.py
+"""
+import importlib.util
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RTOL = 1e-9
+
+# run as a script (regenerating a fixture) the backend is not on sys.path yet
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def _encode_value(value):
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        return value if math.isfinite(value) else {'__float__': repr(value)}
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return {'__timestamp__': pd.Timestamp(value).isoformat()}
+    if isinstance(value, tuple):
+        return {'__tuple__': [_encode_value(v) for v in value]}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if '__float__' in value:
+            return float(value['__float__'])
+        if '__timestamp__' in value:
+            return pd.Timestamp(value['__timestamp__'])
+        if '__tuple__' in value:
+            return tuple(_decode_value(v) for v in value['__tuple__'])
+    return value
+
+
+def mix(i, salt):
+    """Deterministic pseudo-random integer for building inputs (stable across numpy versions)."""
+    return (((i + 1) * 2654435761) ^ (salt * 40503 + 977)) * 2246822519 % 4294967296
+
+
+def pick(options, n, salt):
+    """n deterministic choices from options."""
+    return [options[mix(i, salt) % len(options)] for i in range(n)]
+
+
+def _encode_frame(df):
+    obj = {
+        'columns': [_encode_value(c) for c in df.columns],
+        'dtypes': [str(t) for t in df.dtypes],
+        'data': [[_encode_value(v) for v in row] for row in df.itertuples(index=False, name=None)],
+    }
+    if df.attrs:
+        obj['attrs'] = encode(dict(df.attrs))
+    return obj
+
+
+def _decode_frame(obj):
+    columns = [_decode_value(c) for c in obj['columns']]
+    rows = [[_decode_value(v) for v in row] for row in obj['data']]
+    df = pd.DataFrame(rows, columns=pd.Index(columns, dtype=object) if columns else None)
+    if not columns:
+        return pd.DataFrame(index=range(len(rows)))
+    df.attrs = decode(obj.get('attrs', {'__dict__': []}))
+    for position, dtype in enumerate(obj['dtypes']):
+        if dtype.startswith('datetime64'):
+            df.isetitem(position, pd.to_datetime(df.iloc[:, position]))
+        elif dtype != 'object':
+            try:
+                df.isetitem(position, df.iloc[:, position].astype(dtype))
+            except (TypeError, ValueError):
+                pass
+    return df
+
+
+def encode(value):
+    """JSON-able form of a result: frames, series, .xlsx BytesIO, scalars, dicts and lists of them."""
+    if isinstance(value, pd.DataFrame):
+        return {'__frame__': _encode_frame(value.reset_index(drop=True))}
+    if isinstance(value, pd.Series):
+        return {'__series__': _encode_frame(value.reset_index(drop=True).to_frame('value'))}
+    if isinstance(value, io.BytesIO):
+        book = pd.read_excel(io.BytesIO(value.getvalue()), sheet_name=None)
+        return {'__xlsx__': {name: _encode_frame(df) for name, df in book.items()}}
+    if isinstance(value, np.ndarray):
+        return {'__array__': [encode(v) for v in value.tolist()]}
+    if isinstance(value, dict):
+        return {'__dict__': [[encode(k), encode(v)] for k, v in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [encode(v) for v in value]
+    return _encode_value(value)
+
+
+def decode(obj):
+    if isinstance(obj, list):
+        return [decode(v) for v in obj]
+    if isinstance(obj, dict):
+        if '__frame__' in obj:
+            return _decode_frame(obj['__frame__'])
+        if '__series__' in obj:
+            return _decode_frame(obj['__series__'])['value']
+        if '__xlsx__' in obj:
+            return {'__xlsx__': {name: _decode_frame(df) for name, df in obj['__xlsx__'].items()}}
+        if '__array__' in obj:
+            return np.array([decode(v) for v in obj['__array__']], dtype=object)
+        if '__dict__' in obj:
+            return {decode(k): decode(v) for k, v in obj['__dict__']}
+    return _decode_value(obj)
+
+
+def _is_missing(value):
+    return value is None or value is pd.NaT or (isinstance(value, float) and math.isnan(value))
+
+
+def _assert_frames(actual, expected, where):
+    actual = actual.reset_index(drop=True)
+    compare(dict(actual.attrs), expected.attrs, f'{where}.attrs')
+    assert [_encode_value(c) for c in actual.columns] == [_encode_value(c) for c in expected.columns], where
+    # compare through the JSON form so both sides carry the same types
+    pd.testing.assert_frame_equal(_decode_frame(_encode_frame(actual)), expected, check_dtype=False,
+                                  check_column_type=False, check_index_type=False, rtol=RTOL, obj=where)
+
+
+def compare(actual, expected, where='result'):
+    """Assert actual (a live result) equals expected (decoded golden output)."""
+    if isinstance(actual, pd.DataFrame):
+        _assert_frames(actual, expected, where)
+    elif isinstance(actual, pd.Series):
+        _assert_frames(actual.reset_index(drop=True).to_frame('value'), expected.to_frame('value'), where)
+    elif isinstance(actual, io.BytesIO):
+        book = pd.read_excel(io.BytesIO(actual.getvalue()), sheet_name=None)
+        assert list(book) == list(expected['__xlsx__']), where
+        for name, df in book.items():
+            _assert_frames(df, expected['__xlsx__'][name], f'{where}/{name}')
+    elif isinstance(actual, np.ndarray):
+        compare(list(actual.tolist()), list(expected), where)
+    elif isinstance(actual, dict):
+        assert list(map(_encode_value, actual)) == list(map(_encode_value, expected)), f'{where}: keys differ'
+        for key in actual:
+            compare(actual[key], expected[_decode_value(_encode_value(key))], f'{where}[{key!r}]')
+    elif isinstance(actual, (list, tuple)):
+        assert len(actual) == len(expected), f'{where}: length {len(actual)} != {len(expected)}'
+        for position, (a, e) in enumerate(zip(actual, expected)):
+            compare(a, e, f'{where}[{position}]')
+    elif _is_missing(actual) or _is_missing(expected):
+        assert _is_missing(actual) and _is_missing(expected), f'{where}: {actual!r} != {expected!r}'
+    elif isinstance(actual, (float, np.floating)) or isinstance(expected, float):
+        assert math.isclose(float(actual), float(expected), rel_tol=RTOL, abs_tol=1e-12), \
+            f'{where}: {actual!r} != {expected!r}'
+    else:
+        assert _decode_value(_encode_value(actual)) == expected, f'{where}: {actual!r} != {expected!r}'
+
+
+def load_golden(name):
+    with open(os.path.join(FIXTURE_DIR, f'{name}.json')) as fh:
+        return decode(json.load(fh))
+
+
+def save_golden(name, value):
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    with open(os.path.join(FIXTURE_DIR, f'{name}.json'), 'w') as fh:
+        json.dump(encode(value), fh, separators=(',', ':'))
+        fh.write('\n')
+
+
+def module_at(revision, path, name=None):
+    """Import backend/<path> as it was at a git revision (for regenerating fixtures)."""
+    source = subprocess.run(['git', 'show', f'{revision}:backend/{path}'], cwd=BACKEND_DIR,
+                            check=True, capture_output=True, text=True).stdout
+    name = name or f"golden_{revision.replace('^', '_parent')}_{os.path.splitext(path)[0].replace('/', '_')}"
+    fd, file_path = tempfile.mkstemp(suffix='.py')
+    with os.fdopen(fd, 'w') as fh:
+        fh.write(source)
+    spec = importlib.util.spec_from_file_location(name, file_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,74 @@
+"""
+Batch auditor branch resolution against the per-name normalize_branch_name
+(fuzzywuzzy extractOne) it replaced (fixtures/branch_resolver.json).
+Regenerating needs fuzzywuzzy and python-Levenshtein:
+
+    cd backend && python tests/test_branch_resolver.py
+"""
+import pandas as pd
+import pytest
+from golden import load_golden, mix, module_at, save_golden
+
+import utils.auditor.branch_resolver as branch_resolver
+
+PRE_CHANGE = '7491847^'
+# accented Latin-1 letters (dropped by fuzzywuzzy), other scripts (kept), punctuation and '_'
+NOISE = ['é', 'É', 'ü', 'ß', 'Ñ', '\xa0', '°', 'Ś', 'İ', 'த', 'ा', '_', '-', '.', '/', ' ', '&', '1', 'X', 'a']
+AFFIXES = ['', '', 'BRANCH ', 'Region ', ' OFFICE', ' depot']
+
+
+def mutate(name, i):
+    """A deterministic misspelling of name: dropped, swapped or inserted characters, case and affixes."""
+    chars = list(name)
+    for step in range(1 + mix(i, 1) % 3):
+        at = mix(i, 10 + step) % (len(chars) + 1)
+        kind = mix(i, 20 + step) % 4
+        if kind == 0 and at < len(chars):
+            del chars[at]
+        elif kind == 1 and at + 1 < len(chars):
+            chars[at], chars[at + 1] = chars[at + 1], chars[at]
+        else:
+            chars.insert(at, NOISE[mix(i, 30 + step) % len(NOISE)])
+    text = ''.join(chars)
+    text = [text, text.lower(), text.title()][mix(i, 2) % 3]
+    affix = AFFIXES[mix(i, 3) % len(AFFIXES)]
+    return affix + text if affix.endswith(' ') else text + affix
+
+
+def branch_names(mappings):
+    keys = list(mappings)
+    names = [mutate(keys[mix(i, 4) % len(keys)], i) for i in range(3000)]
+    return names + ['VécOVAI', 'ERODE_CBE_KRR', 'erode cbe krr', 'ÉÉÉ', '', 'Chennai', 'NOWHERE']
+
+
+def old_outputs():
+    region = module_at(PRE_CHANGE, 'routes/auditor/region.py')
+    mappings = region.create_branch_name_mappings()
+    names = branch_names(mappings)
+    return {'mappings': mappings, 'resolved': [region.normalize_branch_name(name, mappings) for name in names]}
+
+
+@pytest.fixture(autouse=True)
+def fresh_decisions():
+    branch_resolver.clear_decision_cache()
+    yield
+    branch_resolver.clear_decision_cache()
+
+
+def test_resolution_matches_fuzzywuzzy():
+    expected = load_golden('branch_resolver')
+    mappings = expected['mappings']
+    names = branch_names(mappings)
+    resolved = branch_resolver.resolve_branch_names(names, mappings).tolist()
+    mismatches = [(name, got, want) for name, got, want in zip(names, resolved, expected['resolved']) if got != want]
+    assert mismatches == []
+
+
+def test_latin1_letters_are_ignored_when_scoring():
+    mappings = load_golden('branch_resolver')['mappings']
+    resolved = branch_resolver.resolve_branch_names(pd.Series(['VécOVAI', 'VÉCOVAI', None]), mappings)
+    assert resolved.tolist() == [mappings['COVAI'], mappings['COVAI'], '']
+
+
+if __name__ == '__main__':
+    save_golden('branch_resolver', old_outputs())
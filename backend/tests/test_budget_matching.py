@@ -0,0 +1,188 @@
+"""
+Budget vs billed matching kernel and its four callers.
+
+The callers' expected outputs (fixtures/budget_matching.json) were produced
+by the per-budget-line implementations that utils.budget_matching replaced
+(the tree before the shared kernel). Regenerate with:
+
+    cd backend && python tests/test_budget_matching.py
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from golden import compare, load_golden, mix, module_at, save_golden
+
+import utils.budget_matching as budget_matching
+import utils.query_engine as query_engine
+from utils.budget_matching import HAS_SALES, SALES_QTY, SALES_VALUE, attach_sales_totals, cap_at_budget
+
+PRE_CHANGE = '08dd6d2^'
+CASES = (0, 1)
+BRANCHES = ['CHENNAI', 'MADURAI', 'COIMBATORE', 'AAAA - ERODE', 'PONDY', 'Karur', 'SALEM']
+
+
+def make_inputs(case, n_sales=900, n_budget=240):
+    """(sales, budget) frames; case 1 adds missing SL codes, blank branches and untidy spellings."""
+    dates = pd.Timestamp('2025-01-01') + pd.to_timedelta([mix(i, 1) % 90 for i in range(n_sales)], unit='D')
+    sales = pd.DataFrame({
+        'Date': dates.strftime('%d/%m/%Y'),
+        'Branch': [BRANCHES[mix(i, 2) % 7] for i in range(n_sales)],
+        'SL Code': [str(100 + mix(i, 3) % 12) for i in range(n_sales)],
+        'Product Group': [f'Prod {mix(i, 4) % 6}' for i in range(n_sales)],
+        'Executive': [f'Exec {mix(i, 5) % 8}' for i in range(n_sales)],
+        'Qty': [round((mix(i, 6) % 1201 - 200) / 100, 2) for i in range(n_sales)],
+        'Value': [round((mix(i, 7) % 120001 - 20000) / 100, 2) for i in range(n_sales)],
+    })
+    budget = pd.DataFrame({
+        'Branch': [BRANCHES[mix(j, 12) % 7] for j in range(n_budget)],
+        'SL Code': [str(100 + mix(j, 13) % 12) for j in range(n_budget)],
+        'Product Group': [f'Prod {mix(j, 14) % 6}' for j in range(n_budget)],
+        'Executive': [f'Exec {mix(j, 15) % 8}' for j in range(n_budget)],
+        'Qty': [round((mix(j, 16) % 2001 - 300) / 100, 2) for j in range(n_budget)],
+        'Value': [round((mix(j, 17) % 200001 - 30000) / 100, 2) for j in range(n_budget)],
+    })
+    if case == 1:
+        sales.loc[::37, 'SL Code'] = None
+        sales.loc[5::41, 'Branch'] = ''
+        sales.loc[3::29, 'Product Group'] = sales.loc[3::29, 'Product Group'].str.lower() + ' '
+        budget.loc[::23, 'SL Code'] = None
+        budget.loc[7::31, 'Branch'] = budget.loc[7::31, 'Branch'].str.lower()
+    return sales, budget
+
+
+def branch_request(case):
+    return dict(
+        sales_filename=f's{case}.xlsx', budget_filename=f'b{case}.xlsx', sales_sheet='Sheet1', budget_sheet='Sheet1',
+        sales_header=1, budget_header=1, sales_date_col='Date', sales_value_col='Value', sales_qty_col='Qty',
+        sales_product_group_col='Product Group', sales_sl_code_col='SL Code', sales_area_col='Branch',
+        sales_exec_col='Executive', budget_value_col='Value', budget_qty_col='Qty',
+        budget_product_group_col='Product Group', budget_sl_code_col='SL Code', budget_area_col='Branch',
+        budget_exec_col='Executive', selected_sales_execs=[], selected_budget_execs=[], selected_branches=[],
+        selected_month='Feb 25',
+    )
+
+
+def outputs(modules, case):
+    """Results of the four callers for one input case; files are written under ./uploads."""
+    bvb, executive_bvb, flask_proof, branch_proof = modules
+    sales, budget = make_inputs(case)
+    os.makedirs('uploads', exist_ok=True)
+    sales.to_excel(f'uploads/s{case}.xlsx', index=False)
+    budget.to_excel(f'uploads/b{case}.xlsx', index=False)
+
+    results = {'branch': bvb.calculate_budget_vs_billed(branch_request(case))}
+    results['executive'] = executive_bvb.calculate_executive_budget_vs_billed(
+        f'uploads/s{case}.xlsx', f'uploads/b{case}.xlsx', 'Date', 'Value', 'Qty', 'Product Group', 'SL Code',
+        'Executive', 'Branch', 'Value', 'Qty', 'Product Group', 'SL Code', 'Executive', 'Branch',
+        [f'Exec {i}' for i in range(6)], ['Jan 25', 'Feb 25'])
+
+    budget = budget.assign(**{'Exec Code': budget['Executive'].str[-1]})
+    columns = ('Executive', 'Branch', 'SL Code', 'Product Group', 'Qty', 'Value',
+               'Executive', 'Date', 'Branch', 'SL Code', 'Product Group', 'Qty', 'Value')
+    results['flask_proof'] = flask_proof.create_proof_of_calculation_excel(
+        budget, sales, 'Mar 25', *columns[:1], 'Exec Code', *columns[1:],
+        selected_executives=[f'Exec {i}' for i in range(5)])
+    results['branch_proof'] = branch_proof.create_proof_of_calculation_excel(
+        budget.drop(columns='Exec Code'), sales, 'Mar 25', *columns, selected_executives=None)
+    return results
+
+
+CALLERS = ('utils/budget_vs_billed.py', 'utils/executive_budget_vs_billed.py',
+           'utils/flask_proof_calculation.py', 'utils/branch_proof.py')
+
+
+def current_modules():
+    import utils.branch_proof
+    import utils.budget_vs_billed
+    import utils.executive_budget_vs_billed
+    import utils.flask_proof_calculation
+    return (utils.budget_vs_billed, utils.executive_budget_vs_billed,
+            utils.flask_proof_calculation, utils.branch_proof)
+
+
+# =========================
+# Kernel
+# =========================
+
+def per_line_reference(budget_df, sales_df, budget_keys, sales_keys, qty_col, value_col):
+    """The pre-kernel algorithm: filter the whole sales frame once per budget line."""
+    rows = []
+    for _, line in budget_df.iterrows():
+        mask = np.ones(len(sales_df), dtype=bool)
+        for budget_key, sales_key in zip(budget_keys, sales_keys):
+            mask &= (sales_df[sales_key] == line[budget_key]).to_numpy()
+        matched = sales_df[mask]
+        rows.append((matched[qty_col].sum() if len(matched) else 0,
+                     matched[value_col].sum() if len(matched) else 0, bool(mask.any())))
+    return pd.DataFrame(rows, columns=[SALES_QTY, SALES_VALUE, HAS_SALES], index=budget_df.index)
+
+
+@pytest.mark.parametrize('case', CASES)
+def test_attach_sales_totals_matches_per_line_filter(case):
+    sales, budget = make_inputs(case)
+    sales = sales.fillna({'SL Code': 'nan'}).rename(columns={'Branch': 'Area', 'Qty': 'Sales Qty'})
+    budget = budget.fillna({'SL Code': 'nan'}).set_index(pd.RangeIndex(1000, 1000 + len(budget)))
+
+    result = attach_sales_totals(budget, sales, ['Branch', 'SL Code', 'Product Group'],
+                                 ['Area', 'SL Code', 'Product Group'], 'Sales Qty', 'Value')
+    expected = per_line_reference(budget, sales, ['Branch', 'SL Code', 'Product Group'],
+                                  ['Area', 'SL Code', 'Product Group'], 'Sales Qty', 'Value')
+
+    assert result.index.equals(budget.index)
+    pd.testing.assert_frame_equal(result[budget.columns], budget)
+    pd.testing.assert_frame_equal(result[expected.columns], expected, check_dtype=False)
+    assert 0 < result[HAS_SALES].sum() < len(result)
+
+
+def test_attach_sales_totals_without_sales():
+    _, budget = make_inputs(0)
+    empty = pd.DataFrame(columns=['Branch', 'SL Code', 'Product Group', 'Qty', 'Value'])
+    result = attach_sales_totals(budget, empty, ['Branch'], ['Branch'], 'Qty', 'Value')
+    assert (result[SALES_QTY] == 0).all() and (result[SALES_VALUE] == 0).all()
+    assert not result[HAS_SALES].any()
+
+
+def test_cap_at_budget():
+    budget = pd.Series([10.0, 5.0, 7.0, 3.0])
+    billed = pd.Series([4.0, 9.0, -2.0, 0.0])
+    assert cap_at_budget(budget, billed).tolist() == [4.0, 5.0, -2.0, 0.0]
+    assert cap_at_budget(budget, billed, positive_only=True).tolist() == [4.0, 5.0, 0.0, 0.0]
+    assert cap_at_budget(budget.to_numpy(), billed.to_numpy(), positive_only=True).tolist() == [4.0, 5.0, 0.0, 0.0]
+
+
+# =========================
+# Callers against the pre-change outputs
+# =========================
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    budget_matching.clear_report_cache()
+    yield tmp_path
+    budget_matching.clear_report_cache()
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'duckdb'])
+@pytest.mark.parametrize('case', CASES)
+def test_callers_match_pre_change_outputs(workdir, monkeypatch, case, engine):
+    if engine == 'duckdb' and not query_engine.DUCKDB_AVAILABLE:
+        pytest.skip('duckdb not installed')
+    monkeypatch.setattr(query_engine, 'QUERY_ENGINE', engine)
+    expected = load_golden('budget_matching')[f'case {case}']
+    actual = outputs(current_modules(), case)
+    for caller in ('branch', 'executive', 'flask_proof', 'branch_proof'):
+        assert actual[caller] is not None, caller
+    compare(actual, expected, f'case {case}')
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    old = tuple(module_at(PRE_CHANGE, path) for path in CALLERS)
+    golden = {}
+    os.chdir(tempfile.mkdtemp())
+    for case in CASES:
+        golden[f'case {case}'] = outputs(old, case)
+    save_golden('budget_matching', golden)
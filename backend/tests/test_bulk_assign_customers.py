@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import text
+
+from extensions import db
+from models.schema import Customer, Executive
+from routes.bulk_assign_customers import bulk_bp
+from services.mapping_snapshot import get_mapping_snapshot, mapping_version
+
+ROWS = [{'Exec': 'Exec 1', 'Code': '101', 'Cust': f'C{i}', 'Name': f'Customer {i}'} for i in range(5)]
+PAYLOAD = {'data': ROWS, 'execNameCol': 'Exec', 'execCodeCol': 'Code', 'custCodeCol': 'Cust',
+           'custNameCol': 'Name', 'chunkSize': 2}
+
+
+@pytest.fixture
+def client(app):
+    app.register_blueprint(bulk_bp)
+    return app.test_client()
+
+
+def _mysql_compare(a, b):
+    a, b = a.rstrip(' ').casefold(), b.rstrip(' ').casefold()
+    return (a > b) - (a < b)
+
+
+@pytest.fixture
+def mysql_collation(app):
+    """executives/customers with names and codes compared like MySQL's default case-insensitive collation."""
+    db.session.connection().connection.driver_connection.create_collation('mysql_ci', _mysql_compare)
+    for statement in (
+        "DROP TABLE customers",
+        "DROP TABLE executives",
+        "CREATE TABLE executives (id INTEGER PRIMARY KEY, name VARCHAR(100) COLLATE mysql_ci NOT NULL UNIQUE, "
+        "code VARCHAR(50))",
+        "CREATE TABLE customers (id INTEGER PRIMARY KEY, code VARCHAR(50) COLLATE mysql_ci NOT NULL, "
+        "name VARCHAR(100), executive_id INTEGER REFERENCES executives (id))",
+    ):
+        db.session.execute(text(statement))
+    db.session.commit()
+
+
+def test_assignment_publishes_mapping_version(client):
+    snapshot = get_mapping_snapshot()
+    response = client.post('/bulk-assign-customers', json=PAYLOAD)
+    assert response.get_json()['inserted'] == 5
+    assert get_mapping_snapshot() is not snapshot
+    assert len(get_mapping_snapshot().customers) == 5
+
+
+def test_partial_commit_still_publishes_mapping_version(client, monkeypatch):
+    inserted = []
+    original = db.session.bulk_insert_mappings
+
+    def fail_after_first_chunk(mapper, mappings):
+        if inserted:
+            raise RuntimeError('connection lost')
+        inserted.append(mappings)
+        original(mapper, mappings)
+
+    # the executive already exists, so only the bulk customer chunks change mappings
+    db.session.add(Executive(name='Exec 1', code='101'))
+    db.session.commit()
+    snapshot = get_mapping_snapshot()
+    before = mapping_version()
+
+    monkeypatch.setattr(db.session, 'bulk_insert_mappings', fail_after_first_chunk)
+    response = client.post('/bulk-assign-customers', json=PAYLOAD)
+
+    assert response.status_code == 500
+    body = response.get_json()
+    assert body['error'] == 'connection lost' and body['partial']
+    assert (body['inserted'], body['updated'], body['executives_created']) == (2, 0, 0)
+    assert Customer.query.count() == 2
+    assert mapping_version() != before
+    assert get_mapping_snapshot() is not snapshot
+    assert len(get_mapping_snapshot().customers) == 2
+
+
+def test_names_and_codes_match_like_the_collation(client, mysql_collation):
+    db.session.add(Executive(id=1, name='John Doe', code='7'))
+    db.session.add(Customer(id=1, code='AB12 ', name='Old', executive_id=None))
+    db.session.commit()
+    rows = [
+        {'Exec': 'john doe', 'Cust': 'ab12', 'Name': 'Renamed'},
+        {'Exec': 'JOHN DOE', 'Cust': 'cd34', 'Name': 'New'},
+        {'Exec': 'Jane Roe', 'Cust': 'CD34 ', 'Name': ''},
+    ]
+    response = client.post('/bulk-assign-customers', json={'data': rows, 'execNameCol': 'Exec',
+                                                           'custCodeCol': 'Cust', 'custNameCol': 'Name'})
+    body = response.get_json()
+    assert response.status_code == 200, body
+    assert (body['inserted'], body['updated'], body['executives_created']) == (1, 1, 1)
+    assert [(e.id, e.name) for e in Executive.query.order_by(Executive.id)] == [(1, 'John Doe'), (2, 'Jane Roe')]
+    customers = [(c.id, c.code, c.name, c.executive_id) for c in Customer.query.order_by(Customer.id)]
+    assert customers == [(1, 'AB12 ', 'Renamed', 1), (2, 'cd34', 'New', 2)]
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+from flask import Flask
+
+import utils.workbook_cache as workbook_cache
+from routes.stats_routes import stats_bp
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(workbook_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    workbook_cache.invalidate()
+    app = Flask(__name__)
+    app.register_blueprint(stats_bp, url_prefix='/api')
+    yield app.test_client()
+    workbook_cache.invalidate()
+
+
+def test_cache_stats_lists_every_cache(client):
+    body = client.get('/api/cache-stats').get_json()
+    assert body['success']
+    assert set(body['caches']) == {'workbook_cache', 'column_resolver', 'report_cache', 'sales_facts', 'result_store'}
+    for counters in body['caches'].values():
+        assert {'hits', 'misses', 'entries'} <= set(counters)
+
+
+def test_cache_stats_counts_workbook_reads(client, tmp_path):
+    path = str(tmp_path / 'sales.xlsx')
+    pd.DataFrame({'Branch': ['CHENNAI'], 'Value': [1.0]}).to_excel(path, index=False)
+    before = client.get('/api/cache-stats').get_json()['caches']['workbook_cache']
+    workbook_cache.read_sheet(path)
+    workbook_cache.read_sheet(path)
+    after = client.get('/api/cache-stats').get_json()['caches']['workbook_cache']
+    assert after['misses'] == before['misses'] + 1
+    assert after['hits'] == before['hits'] + 1
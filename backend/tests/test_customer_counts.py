@@ -0,0 +1,81 @@
+"""
+Billed-customer (NBC) tables on the customer_counts cube, against the
+outputs of the per-financial-year implementations it replaced
+(fixtures/customer_counts.json). Regenerate with:
+
+    cd backend && python tests/test_customer_counts.py
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from golden import compare, load_golden, mix, module_at, pick, save_golden
+
+import utils.budget_matching as budget_matching
+import utils.query_engine as query_engine
+
+PRE_CHANGE = 'bb3b29c^'
+BRANCHES = ['Chennai', 'CHN', ' pondy', 'PDY ', None, 'Erode', 'Karur', 'X - MDU', 'salem', 1, 1.0]
+EXECS = ['Ravi', 'ravi ', 'KUMAR', None, 'Anand', np.nan, 'Guna']
+BRANCH_FILTERS = [([], []), (['CHENNAI', 'PONDY'], []), ([], ['Ravi', 'KUMAR']), (['ERODE_CBE_KRR'], ['Anand']),
+                  (['NOPE'], [])]
+EXEC_FILTERS = [(None, None, None), (['Jan 2024', 'Apr 2024', 'Dec 2023'], None, None), (None, ['chennai', 'PDY'], None),
+                (None, None, ['ravi', 'Anand', 'ghost']), (None, ['CHENNAI', 'ERODE'], ['RAVI']),
+                (['Feb 2030'], None, None)]
+
+
+def make_sales(case):
+    """Sales rows over three financial years; dates are datetime cells, text or text with garbage."""
+    n = 200 + 400 * case
+    dates = pd.Series([datetime.datetime(2022, 11, 1) + datetime.timedelta(days=mix(i, 1 + case) % 940)
+                       if mix(i, 2 + case) % 33 else None for i in range(n)], dtype='datetime64[ns]')
+    if case % 3 == 1:
+        dates = dates.dt.strftime('%d/%m/%Y').where(dates.notna(), None)
+    elif case % 3 == 2:
+        dates = dates.astype(object).where(pd.Series([mix(i, 3) % 10 > 2 for i in range(n)]), 'garbage')
+    customers = [mix(i, 4 + case) % max(5, n // 8) if mix(i, 5) % 20 else None for i in range(n)]
+    branches = BRANCHES if case % 2 else BRANCHES[:9]
+    return pd.DataFrame({'Date': dates, 'Branch': pick(branches, n, 6 + case),
+                         'Cust': pd.Series(customers, dtype=object), 'Exec': pick(EXECS, n, 7 + case)})
+
+
+def outputs(modules, case):
+    nbc_od_utils, executive_nbc = modules
+    sales = make_sales(case)
+    results = {}
+    for branches, executives in BRANCH_FILTERS:
+        results[f'branch {branches} {executives}'] = nbc_od_utils.create_customer_table(
+            sales.copy(), 'Date', 'Branch', 'Cust', 'Exec', branches, executives)
+    for months, branches, executives in EXEC_FILTERS:
+        results[f'executive {months} {branches} {executives}'] = executive_nbc.create_customer_table(
+            sales.copy(), 'Date', 'Branch', 'Cust', 'Exec', months, branches, executives)
+    return results
+
+
+def current_modules():
+    import utils.executive_nbc
+    import utils.nbc_od_utils
+    return utils.nbc_od_utils, utils.executive_nbc
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    budget_matching.clear_report_cache()
+    yield
+    budget_matching.clear_report_cache()
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'duckdb'])
+@pytest.mark.parametrize('case', [0, 1, 2, 3])
+def test_customer_tables_match_pre_change_outputs(monkeypatch, case, engine):
+    if engine == 'duckdb' and not query_engine.DUCKDB_AVAILABLE:
+        pytest.skip('duckdb not installed')
+    monkeypatch.setattr(query_engine, 'QUERY_ENGINE', engine)
+    expected = load_golden('customer_counts')[f'case {case}']
+    compare(outputs(current_modules(), case), expected, f'case {case}')
+
+
+if __name__ == '__main__':
+    old = module_at(PRE_CHANGE, 'utils/nbc_od_utils.py'), module_at(PRE_CHANGE, 'utils/executive_nbc.py')
+    save_golden('customer_counts', {f'case {case}': outputs(old, case) for case in range(4)})
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+from flask import Flask
+
+import services.dashboard.dataset_store as dataset_store
+from routes.dashboard.main_routes import main_bp
+
+COLUMNS = ['REGION', 'Budget-Apr-25', 'Act-Apr-25', 'Gr-Apr-25']
+RECORDS = [
+    {'REGION': 'BANGALORE', 'Budget-Apr-25': 1234.5, 'Act-Apr-25': 1000, 'Gr-Apr-25': -0.125},
+    {'REGION': ' CHENNAI ', 'Budget-Apr-25': 2.675, 'Act-Apr-25': None, 'Gr-Apr-25': '12.5'},
+    {'REGION': 'GRAND TOTAL', 'Budget-Apr-25': 1237.175, 'Act-Apr-25': 1e6, 'Gr-Apr-25': 'NaN'},
+]
+# what Dashboard.jsx used to post as table_data (parseFloat + toLocaleString per cell)
+CLIENT_FORMATTED = [
+    {'REGION': 'BANGALORE', 'Budget-Apr-25': '1,234.50', 'Act-Apr-25': '1,000', 'Gr-Apr-25': '-0.13'},
+    {'REGION': ' CHENNAI ', 'Budget-Apr-25': '2.68', 'Act-Apr-25': '', 'Gr-Apr-25': '12.50'},
+    {'REGION': 'GRAND TOTAL', 'Budget-Apr-25': '1,237.18', 'Act-Apr-25': '1,000,000', 'Gr-Apr-25': ''},
+]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_store, 'DATASET_DIR', str(tmp_path))
+    dataset_id = dataset_store.register_workbook(b'workbook bytes')
+    dataset_store.put_table(dataset_id, 'Region wise analysis', None, {'columns': COLUMNS, 'data': RECORDS})
+    app = Flask(__name__)
+    app.register_blueprint(main_bp)
+    with app.test_client() as test_client:
+        yield test_client, dataset_id
+
+
+def _csv(test_client, payload):
+    # posted as the browser does, keys in table order (the test client's json= sorts them)
+    body = json.dumps(dict(payload, columns=COLUMNS, filename='t.csv'))
+    response = test_client.post('/download-csv', data=body, content_type='application/json')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_data(as_text=True)
+
+
+@pytest.mark.parametrize('row_filters, rows', [
+    ([], CLIENT_FORMATTED),
+    ([{'column': 'REGION', 'value': 'CHENNAI'}], CLIENT_FORMATTED[1:2]),
+])
+def test_dataset_id_matches_client_formatted_table(client, row_filters, rows):
+    test_client, dataset_id = client
+    by_id = _csv(test_client, {'dataset_id': dataset_id, 'sheet_name': 'Region wise analysis', 'row_filters': row_filters})
+    assert by_id == _csv(test_client, {'table_data': rows})
+    assert by_id.splitlines()[1] == (
+        '"BANGALORE","1,234.50","1,000","-0.13"' if not row_filters else '" CHENNAI ","2.68",,"12.50"')
+
+
+def test_filter_without_rows_is_rejected(client):
+    test_client, dataset_id = client
+    response = test_client.post('/download-csv', json={
+        'dataset_id': dataset_id, 'sheet_name': 'Region wise analysis', 'columns': COLUMNS,
+        'row_filters': [{'column': 'REGION', 'value': 'NOWHERE'}]})
+    assert response.status_code == 400
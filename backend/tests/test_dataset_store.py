@@ -0,0 +1,71 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import services.dashboard.dataset_store as dataset_store
+import utils.workbook_cache as workbook_cache
+
+DAY = 24 * 3600
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_store, 'DATASET_DIR', str(tmp_path / 'datasets'))
+    monkeypatch.setattr(workbook_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setitem(dataset_store._state, 'last_sweep', time.time())
+    workbook_cache.invalidate()
+    yield tmp_path
+    workbook_cache.invalidate()
+
+
+def _age(dataset_id, seconds):
+    path = dataset_store.workbook_path(dataset_id)
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_sheet_head_parses_only_the_requested_rows(store, monkeypatch):
+    path = store / 'long.xlsx'
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({'REGION': [f"R{i}" for i in range(30)], 'Act': range(30)}).to_excel(writer, index=False)
+        pd.DataFrame([['late', None, None, 'far right']]).to_excel(writer, startrow=40, header=False, index=False)
+    dataset_id = dataset_store.register_workbook(path.read_bytes())
+
+    expected = {nrows: pd.read_excel(path, header=None, nrows=nrows) for nrows in (10, 35, 1000)}
+    calls = []
+    read_excel = pd.read_excel
+    monkeypatch.setattr(workbook_cache.pd, 'read_excel', lambda *a, **kw: calls.append(kw['nrows']) or read_excel(*a, **kw))
+    for nrows, want in expected.items():
+        pd.testing.assert_frame_equal(dataset_store.read_sheet_head(dataset_id, 'Sheet1', nrows=nrows), want)
+        dataset_store.read_sheet_head(dataset_id, 'Sheet1', nrows=nrows)
+    assert calls == [10, 35, 1000]
+
+
+def test_purge_removes_expired_then_oldest_workbooks(store, monkeypatch):
+    ids = [dataset_store.register_workbook(bytes([i]) * 1000) for i in range(4)]
+    for age, dataset_id in zip((8 * DAY, 3 * DAY, 2 * DAY, 1 * DAY), ids):
+        _age(dataset_id, age)
+    dataset_store.put_table(ids[1], 'Sheet1', None, {'data': []})
+    stale_tmp = os.path.join(dataset_store.DATASET_DIR, f"{ids[0]}.xlsx.99.tmp")
+    open(stale_tmp, 'wb').close()
+    os.utime(stale_tmp, (time.time() - 8 * DAY,) * 2)
+
+    monkeypatch.setattr(dataset_store, 'MAX_BYTES', 1500)
+    assert dataset_store.purge_datasets(keep=ids[1]) == [ids[2], ids[0]]
+    assert [dataset_store.workbook_path(i) is not None for i in ids] == [False, True, False, True]
+    assert dataset_store.get_table(ids[1], 'Sheet1', None) == {'data': []}
+    assert not os.path.exists(stale_tmp)
+
+    assert dataset_store.purge_datasets() == [ids[1]]
+    assert dataset_store.get_table(ids[1], 'Sheet1', None) is None
+
+
+def test_uploading_again_restarts_retention(store, monkeypatch):
+    dataset_id = dataset_store.register_workbook(b'workbook bytes')
+    _age(dataset_id, 8 * DAY)
+    monkeypatch.setitem(dataset_store._state, 'last_sweep', 0.0)
+    assert dataset_store.register_workbook(b'workbook bytes') == dataset_id
+    assert dataset_store.purge_datasets() == []
+    assert dataset_store.workbook_path(dataset_id) is not None
@@ -0,0 +1,75 @@
+"""
+utils.date_parsing against the pandas calls it replaced: parse_dates is
+pd.to_datetime(dayfirst=..., errors='coerce'), parse_mixed_dates the same
+with format='mixed', in_months / month_labels a strftime('%b %y') comparison.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from golden import mix, pick
+
+from utils.date_parsing import in_months, month_labels, parse_dates, parse_mixed_dates
+
+# pandas warns about dayfirst/format guesses on both sides of the comparison
+pytestmark = pytest.mark.filterwarnings('ignore::UserWarning')
+
+FORMATS = ['%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y %H:%M:%S', '%m/%d/%Y', '%d-%b-%y', '%d.%m.%Y', '%Y-%m-%d %H:%M:%S']
+
+
+def day(i, salt):
+    return datetime.datetime(2022, 1, 1) + datetime.timedelta(days=mix(i, salt) % 900, hours=(0, 0, 13)[mix(i, salt + 1) % 3])
+
+
+def odd_value(i, salt):
+    """Any of the shapes a date cell turns up as in an uploaded sheet."""
+    d = day(i, salt)
+    return [d.strftime('%d/%m/%Y'), d.strftime('%Y-%m-%d'), d.strftime('%d-%b-%y'), d, pd.Timestamp(d), d.date(),
+            None, np.nan, pd.NaT, '', ' ', 'nan', 'NaT', 'junk', 45000, 3.5, d.strftime('%b %Y'),
+            '31/02/2024'][mix(i, salt + 2) % 18]
+
+
+def columns():
+    """(values, description) for uniform-format columns with stray cells, and fully mixed columns."""
+    for trial in range(400):
+        n = 1 + mix(trial, 1) % 30
+        if trial % 2:
+            fmt = FORMATS[mix(trial, 2) % len(FORMATS)]
+            values = [day(i, trial).strftime(fmt) if mix(i, trial + 7) % 100 < 85 else odd_value(i, trial)
+                      for i in range(n)]
+        else:
+            values = [odd_value(i, trial) for i in range(n)]
+        yield pd.Series(values, dtype=object)
+    yield pd.Series(pd.date_range('2023-01-01', periods=50, freq='7D'))
+    yield pd.Series([], dtype=object)
+
+
+def assert_same_dates(actual, expected):
+    assert actual.dtype == expected.dtype
+    assert actual.index.equals(expected.index)
+    assert actual.isna().equals(expected.isna())
+    assert (actual.dropna() == expected.dropna()).all()
+
+
+@pytest.mark.parametrize('dayfirst', [True, False])
+def test_parse_dates_matches_to_datetime(dayfirst):
+    for series in columns():
+        expected = pd.to_datetime(series, dayfirst=dayfirst, errors='coerce')
+        assert_same_dates(parse_dates(series, dayfirst), expected.astype('datetime64[ns]'))
+
+
+def test_parse_mixed_dates_matches_to_datetime():
+    for series in columns():
+        expected = pd.to_datetime(series, dayfirst=True, errors='coerce', format='mixed')
+        assert_same_dates(parse_mixed_dates(series, dayfirst=True), expected)
+
+
+def test_month_filters_match_strftime():
+    dates = pd.to_datetime(pd.Series(pick([day(i, 3) for i in range(40)] + [pd.NaT], 300, 4)))
+    labels = dates.dt.strftime('%b %y')
+    assert month_labels(dates).fillna('X').equals(labels.fillna('X'))
+    present = list(labels.dropna().unique())
+    for selected in (present[:1], present[1:4], ['Foo', 'apr 23', 'Apr 23', 'Jan 24'], [], None, present[0]):
+        wanted = [selected] if selected is None or isinstance(selected, str) else selected
+        assert in_months(dates, selected).equals(labels.isin(wanted)), selected
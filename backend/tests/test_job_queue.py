@@ -0,0 +1,109 @@
+import io
+
+import pytest
+from flask import Flask, jsonify, request, send_file
+
+import utils.job_queue as job_queue
+from routes.job_routes import jobs_bp
+
+
+def create_app():
+    app = Flask(__name__)
+    app.register_blueprint(jobs_bp, url_prefix='/api')
+
+    @app.route('/api/report', methods=['POST'])
+    @job_queue.background_job
+    def report():
+        payload = request.get_json()
+        return jsonify({'success': True, 'total': sum(payload['values']), 'branch': request.args.get('branch')})
+
+    @app.route('/api/file', methods=['POST'])
+    @job_queue.background_job
+    def download():
+        return send_file(io.BytesIO(b'xlsx bytes'), as_attachment=True, download_name='report.xlsx',
+                         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+    @app.route('/api/boom', methods=['POST'])
+    @job_queue.background_job
+    def boom():
+        return jsonify({'success': False, 'error': 'no sales sheet'}), 400
+
+    return app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """A test app whose jobs are run in-process with run_job instead of by the dispatcher."""
+    monkeypatch.setattr(job_queue, 'JOBS_DIR', str(tmp_path))
+    monkeypatch.setattr(job_queue, 'JOB_DB', str(tmp_path / 'jobs.sqlite'))
+    monkeypatch.setattr(job_queue, 'start_dispatcher', lambda: None)
+    monkeypatch.setattr(job_queue, '_state', {'schema': None, 'dispatcher': None, 'last_purge': 0.0})
+    monkeypatch.setattr(job_queue, '_load_app', create_app)
+    monkeypatch.setattr(job_queue, '_current', {'job_id': None})
+    return create_app().test_client()
+
+
+def submit(client, path, **kwargs):
+    response = client.post(path, **kwargs)
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['status'] == 'queued'
+    assert response.headers['Location'] == job['status_url'] == f"/api/jobs/{job['job_id']}"
+    return job
+
+
+def run(client, job):
+    """What the dispatcher does with the oldest queued job, minus the child process."""
+    assert job_queue._claim_job() == job['job_id']
+    assert client.get(job['status_url']).get_json()['status'] == 'running'
+    job_queue.run_job(job['job_id'])
+    job_queue._current['job_id'] = None
+    return client.get(job['status_url']).get_json()
+
+
+def test_without_async_the_view_answers_directly(client):
+    response = client.post('/api/report', json={'values': [1, 2]})
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 3
+
+
+@pytest.mark.parametrize('how', [{'query_string': {'async': '1'}}, {'headers': {'Prefer': 'respond-async'}}])
+def test_async_request_is_queued_and_replayed(client, how):
+    query = dict(how.get('query_string', {}), branch='CHENNAI')
+    job = submit(client, '/api/report', json={'values': [1, 2, 3.5]}, query_string=query,
+                 headers=how.get('headers'))
+    status = client.get(job['status_url']).get_json()
+    assert status['status'] == 'queued' and status['queue_position'] == 1
+    assert 'result_url' not in status
+
+    status = run(client, job)
+    assert status['status'] == 'succeeded' and status['progress'] == 100.0
+    result = client.get(status['result_url'])
+    assert result.status_code == 200
+    assert result.get_json() == {'success': True, 'total': 6.5, 'branch': 'CHENNAI'}
+
+
+def test_file_result_keeps_its_download_headers(client):
+    job = submit(client, '/api/file?async=1')
+    status = run(client, job)
+    result = client.get(status['result_url'])
+    assert result.data == b'xlsx bytes'
+    assert result.mimetype == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    assert 'report.xlsx' in result.headers['Content-Disposition']
+
+
+def test_error_response_fails_the_job_but_is_kept(client):
+    job = submit(client, '/api/boom?async=1', json={})
+    status = run(client, job)
+    assert status['status'] == 'failed' and status['error'] == 'no sales sheet'
+    result = client.get(status['result_url'])
+    assert result.status_code == 400
+    assert result.get_json()['error'] == 'no sales sheet'
+
+
+def test_cancelled_job_has_no_result(client):
+    job = submit(client, '/api/report?async=1', json={'values': [1]})
+    assert client.post(f"{job['status_url']}/cancel").get_json()['status'] == 'cancelled'
+    result = client.get(f"{job['status_url']}/result")
+    assert result.status_code == 409 and result.get_json()['status'] == 'cancelled'
+    assert client.get('/api/jobs/unknown').status_code == 404
@@ -0,0 +1,82 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+import services.mapping_service as mapping_service
+from extensions import db
+from models.schema import (
+    Branch, BranchExecutiveMap, Company, CompanyProductMap, Customer, Executive, Product, Region,
+    RegionBranchMap,
+)
+from routes.branch_region_routes import branch_region_bp
+from routes.mapping_routes import mapping_bp
+
+
+def seed(n_executives):
+    branches = [Branch(name=f'BR{i}') for i in range(n_executives)]
+    regions = [Region(name=f'REG{i}') for i in range(3)]
+    companies = [Company(name=f'CO{i}') for i in range(n_executives)]
+    db.session.add_all(branches + regions + companies)
+    executives = [Executive(name=f'Exec {i}', code=str(100 + i)) for i in range(n_executives)]
+    db.session.add_all(executives)
+    db.session.flush()
+    for i, executive in enumerate(executives):
+        db.session.add_all(Customer(code=f'{i}-{j}', executive_id=executive.id) for j in range(i % 4))
+        db.session.add_all(BranchExecutiveMap(executive_id=executive.id, branch_id=b.id)
+                           for b in branches[i:i + 1 + i % 2])
+    for i, branch in enumerate(branches):
+        db.session.add(RegionBranchMap(branch_id=branch.id, region_id=regions[i % 3].id))
+    for i, company in enumerate(companies):
+        product = Product(name=f'Product {i}')
+        db.session.add(product)
+        db.session.flush()
+        db.session.add(CompanyProductMap(company_id=company.id, product_id=product.id))
+    db.session.commit()
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def client(app):
+    app.register_blueprint(mapping_bp)
+    app.register_blueprint(branch_region_bp)
+    return app.test_client()
+
+
+CALLS = {
+    '/executives-with-counts': (1, lambda client: client.get('/executives-with-counts').get_json()),
+    'get_all_company_product_mappings': (1, lambda client: mapping_service.get_all_company_product_mappings()),
+    '/mappings': (2, lambda client: client.get('/mappings').get_json()),
+}
+
+
+@pytest.mark.parametrize('n_executives', [5, 50])
+@pytest.mark.parametrize('name', CALLS)
+def test_query_count_does_not_grow_with_executives(client, name, n_executives):
+    expected, call = CALLS[name]
+    seed(n_executives)
+    db.session.expire_all()
+    with count_queries() as statements:
+        result = call(client)
+    assert len(result) >= n_executives
+    assert len(statements) == expected, statements
+
+
+def test_executive_counts(client):
+    seed(6)
+    rows = {row['name']: row for row in client.get('/executives-with-counts').get_json()}
+    assert [rows[f'Exec {i}']['customers'] for i in range(6)] == [0, 1, 2, 3, 0, 1]
+    assert [rows[f'Exec {i}']['branches'] for i in range(6)] == [1, 2, 1, 2, 1, 1]
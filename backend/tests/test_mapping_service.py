@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from extensions import db
+from models.schema import Branch, BranchExecutiveMap, Customer, Executive, Region, RegionBranchMap
+from services.mapping_service import load_mapping_lookups, process_budget_file, process_sales_file
+
+
+@pytest.fixture
+def lookups(app):
+    """Mapping rows spelled the way they often are in the DB: mixed case, trailing spaces."""
+    db.session.add_all([Executive(id=1, name='John Doe ', code='E01'), Executive(id=2, name='Jane Roe', code='e01'),
+                        Branch(id=1, name='CHENNAI'), Region(id=1, name='SOUTH')])
+    db.session.add_all([Customer(code='AB12 ', executive_id=1), BranchExecutiveMap(executive_id=1, branch_id=1),
+                        RegionBranchMap(branch_id=1, region_id=1)])
+    db.session.commit()
+    return load_mapping_lookups()
+
+
+def test_sales_rows_match_codes_and_names_like_the_db_collation(lookups):
+    df = pd.DataFrame({'Code': ['e01 ', 'X9', 'X9', None], 'Name': ['', 'JOHN DOE', 'Nobody', None],
+                       'Amount': [100000.0, 250000.0, None, 1.0]})
+    out = process_sales_file(df, 'Code', exec_name_col='Name', value_col='Amount', lookups=lookups)
+    # code e01 is first held by id 1; the name fallback keeps the file's spelling
+    assert out['Name'].tolist() == ['John Doe ', 'JOHN DOE', 'Nobody', None]
+    assert out['Branch'].tolist() == ['CHENNAI', 'CHENNAI', '', '']
+    assert out['Region'].tolist() == ['SOUTH', 'SOUTH', '', '']
+    assert out['Value'].tolist() == [1.0, 2.5, '', 0.0]
+
+
+def test_budget_rows_match_customer_codes_like_the_db_collation(lookups):
+    df = pd.DataFrame({'Cust': ['ab12', 'AB12', 'CD34'], 'Exec': [''] * 3, 'ExecCode': [''] * 3})
+    out = process_budget_file(df, 'Cust', 'ExecCode', 'Exec', 'Branch', 'Region', lookups=lookups)
+    assert out['Exec'].tolist() == ['John Doe ', 'John Doe ', '']
+    assert out['ExecCode'].tolist() == ['E01', 'E01', '']
+    assert out['Region'].tolist() == ['SOUTH', 'SOUTH', '']
+
+
+def test_values_in_lakhs_round_like_python_round(app):
+    rupees = np.random.default_rng(3).integers(0, 10 ** 8, 20000).astype(float)
+    rupees[:3] = [28500.0, 100500.0, 12345678.0]
+    df = pd.DataFrame({'Code': [None] * len(rupees), 'Amount': rupees})
+    out = process_sales_file(df, 'Code', value_col='Amount', lookups=load_mapping_lookups())
+    assert out['Value'].tolist() == [round(v / 100000, 2) for v in rupees.tolist()]
@@ -0,0 +1,38 @@
+import os
+
+import services.mapping_snapshot as mapping_snapshot
+from extensions import db
+from models.schema import Branch, Executive
+from services.mapping_snapshot import bump_mapping_version, get_mapping_snapshot, mapping_version
+
+
+def test_bumps_change_version_without_growing_the_file(app):
+    seen = {mapping_version()[0]}
+    for _ in range(50):
+        bump_mapping_version()
+        seen.add(mapping_version()[0])
+    assert len(seen) == 51
+    assert os.path.getsize(mapping_snapshot.VERSION_FILE) == 32
+
+
+def test_version_file_from_append_log_is_replaced(app):
+    with open(mapping_snapshot.VERSION_FILE, 'w') as fh:
+        fh.write('.' * 1000)
+    before = mapping_version()
+    bump_mapping_version()
+    assert mapping_version() != before
+    assert os.path.getsize(mapping_snapshot.VERSION_FILE) == 32
+
+
+def test_commit_reloads_snapshot_in_other_workers(app):
+    db.session.add(Executive(name='Exec 1', code='101'))
+    db.session.commit()
+    snapshot = get_mapping_snapshot()
+    assert get_mapping_snapshot() is snapshot
+
+    # another worker only shares the version file: simulate it by resetting the local counter
+    mapping_snapshot._local_bumps = 0
+    db.session.add(Branch(name='BANGALORE'))
+    db.session.commit()
+    mapping_snapshot._local_bumps = 0
+    assert get_mapping_snapshot() is not snapshot
@@ -0,0 +1,57 @@
+import logging
+
+import pytest
+from flask import Flask
+from sqlalchemy import inspect
+
+from extensions import db
+from models.migrations import apply_schema_migrations, remove_duplicate_rows
+from models.schema import Branch, BranchExecutiveMap, Executive
+
+INDEX = 'uq_branch_exec_map_executive_branch'
+
+
+@pytest.fixture
+def duplicated(tmp_path):
+    """branch_exec_map from before its unique index, holding a duplicated pair (on a SQLite file)."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'mappings.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        BranchExecutiveMap.__table__.indexes.copy().pop().drop(db.engine)
+        db.session.add_all([Executive(id=1, name='A'), Executive(id=2, name='B'), Branch(id=1, name='CHENNAI')])
+        db.session.add_all([BranchExecutiveMap(id=i, executive_id=e, branch_id=1)
+                            for i, e in ((1, 1), (2, 1), (3, 2), (4, 1))])
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+def index_names():
+    return {ix['name'] for ix in inspect(db.engine).get_indexes('branch_exec_map')}
+
+
+def mapping_ids():
+    with db.engine.connect() as conn:
+        return [row.id for row in conn.execute(BranchExecutiveMap.__table__.select().order_by('id'))]
+
+
+def test_startup_migration_keeps_duplicates_and_skips_the_index(duplicated, caplog):
+    with caplog.at_level(logging.ERROR, logger='models.migrations'):
+        created = apply_schema_migrations()
+    assert INDEX not in created and INDEX not in index_names()
+    assert mapping_ids() == [1, 2, 3, 4]
+    assert "Not creating unique index uq_branch_exec_map_executive_branch" in caplog.text
+    assert "1 duplicated pairs, 2 extra rows" in caplog.text
+
+
+def test_remove_duplicate_rows_reports_then_removes(duplicated):
+    assert remove_duplicate_rows(dry_run=True) == {'branch_exec_map': 2}
+    assert mapping_ids() == [1, 2, 3, 4]
+
+    assert remove_duplicate_rows() == {'branch_exec_map': 2}
+    assert mapping_ids() == [1, 3]
+    assert apply_schema_migrations() == [INDEX]
+    assert INDEX in index_names()
+    assert remove_duplicate_rows() == {}
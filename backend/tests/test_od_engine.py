@@ -0,0 +1,107 @@
+"""
+OD target vs collection (branch and executive reports) on the od_engine
+month cube, against the outputs of the per-month implementations it
+replaced (fixtures/od_engine.json). Regenerate with:
+
+    cd backend && python tests/test_od_engine.py
+"""
+import datetime
+
+import pandas as pd
+import pytest
+from golden import compare, load_golden, mix, module_at, pick, save_golden
+
+import utils.budget_matching as budget_matching
+import utils.query_engine as query_engine
+
+PRE_CHANGE = '850a5f7^'
+UNITS = ['chennai', 'MADURAI ', 'Pondy', None, 'Salem', 'erode', 'karur']
+EXECS = ['Ravi', 'Kumar', 'ravi ', 'HO', 'Anand', None]
+REGIONS = ['South', 'North ', None, 'West']
+MONTHS = ['Jan 24', 'Mar-24', 'Jun 24', 'Dec 24', 'Feb 25', 'Aug 25', 'Jan 23']
+BRANCH_FILTERS = [([], [], []), (['Ravi', 'Kumar'], [], []), ([], ['Chennai', 'Madurai', 'Nowhere'], []),
+                  ([], [], ['South']), (['Nobody'], [], [])]
+EXEC_FILTERS = [([], []), (['ravi', 'KUMAR'], []), ([], ['CHENNAI', 'pondy']), (['Anand'], ['MADURAI'])]
+
+
+def dates(n, salt, kind):
+    values = pd.Series([datetime.datetime(2024, 1, 1) + datetime.timedelta(days=mix(i, salt) % 545,
+                                                                           hours=13 if kind == 'time' and mix(i, salt + 1) % 4 == 0 else 0)
+                        if mix(i, salt + 2) % 33 else None for i in range(n)], dtype='datetime64[ns]')
+    return values.dt.strftime('%Y-%m-%d').where(values.notna(), None) if kind == 'text' else values
+
+
+def amounts(n, salt, money):
+    if money == 'int':
+        return [mix(i, salt) % 5500 - 500 for i in range(n)]
+    if money == 'cents':
+        values = [round((mix(i, salt) % 1000001 - 200000) / 100, 2) for i in range(n)]
+    else:
+        values = pick([1500.0, 250.25, 0.1, 0.2, 99.99, -10.0, 333.33], n, salt)
+    return [value if mix(i, salt + 3) % 50 else 'n/a' for i, value in enumerate(values)]
+
+
+def frame(case, salt, n, ref=True, value='Net'):
+    kind = ('dt', 'time', 'text')[case % 3]
+    money = ('cents', 'int', 'round')[case % 3 - 1]
+    df = pd.DataFrame({'Due': dates(n, salt, kind), 'Unit': pick(UNITS, n, salt + 4),
+                       'Exec': pick(EXECS, n, salt + 5), 'Region': pick(REGIONS, n, salt + 6)})
+    df['Ref' if ref else 'Bill'] = dates(n, salt + 7, kind)
+    df[value] = pd.Series(amounts(n, salt + 8, money), dtype=object if money != 'int' else 'int64')
+    return df
+
+
+def make_inputs(case):
+    n = 300 + 150 * case
+    return (frame(case, 10 * case + 1, n), frame(case, 10 * case + 2, n),
+            frame(case, 10 * case + 3, n, ref=False, value='Val'))
+
+
+def outputs(modules, case):
+    od_target, executive_odc = modules
+    os_first, os_second, sales = make_inputs(case)
+    results = {}
+    for month in MONTHS:
+        for executives, branches, regions in BRANCH_FILTERS:
+            results[f'branch {month} {executives} {branches} {regions}'] = od_target.calculate_od_values_updated(
+                os_first.copy(), os_second.copy(), sales.copy(), month,
+                'Due', 'Ref', 'Unit', 'Net', 'Exec', 'Region', 'Due', 'Ref', 'Unit', 'Net', 'Exec', 'Region',
+                'Bill', 'Due', 'Unit', 'Val', 'Exec', 'Region', executives, branches, regions)
+        for executives, branches in EXEC_FILTERS:
+            results[f'executive {month} {executives} {branches}'] = executive_odc.calculate_od_values(
+                os_first.copy(), os_second.copy(), sales.copy(), month.replace(' ', '-'),
+                'Due', 'Ref', 'Net', 'Exec', 'Unit', 'Unit', 'Due', 'Ref', 'Net', 'Exec', 'Unit', 'Unit',
+                'Bill', 'Due', 'Val', 'Exec', 'Unit', 'Unit', executives, branches)
+    results['branch without regions'] = od_target.calculate_od_values_updated(
+        os_first.copy(), os_second.copy(), sales.copy(), 'Mar 24',
+        'Due', None, 'Unit', 'Net', 'Exec', None, 'Due', 'Ref', 'Unit', 'Net', 'Exec', None,
+        'Bill', 'Due', 'Unit', 'Val', 'Exec', None, [], [], [])
+    return results
+
+
+def current_modules():
+    import utils.executive_odc
+    import utils.od_target
+    return utils.od_target, utils.executive_odc
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    budget_matching.clear_report_cache()
+    yield
+    budget_matching.clear_report_cache()
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'duckdb'])
+@pytest.mark.parametrize('case', [0, 1, 2])
+def test_od_reports_match_pre_change_outputs(monkeypatch, case, engine):
+    if engine == 'duckdb' and not query_engine.DUCKDB_AVAILABLE:
+        pytest.skip('duckdb not installed')
+    monkeypatch.setattr(query_engine, 'QUERY_ENGINE', engine)
+    expected = load_golden('od_engine')[f'case {case}']
+    compare(outputs(current_modules(), case), expected, f'case {case}')
+
+
+if __name__ == '__main__':
+    old = module_at(PRE_CHANGE, 'utils/od_target.py'), module_at(PRE_CHANGE, 'utils/executive_odc.py')
+    save_golden('od_engine', {f'case {case}': outputs(old, case) for case in range(3)})
@@ -0,0 +1,95 @@
+"""
+Product growth (branch and executive reports) on product_growth_engine,
+against the outputs of the per-company-group implementations it replaced
+(fixtures/product_growth_engine.json). Regenerate with:
+
+    cd backend && python tests/test_product_growth_engine.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from golden import compare, load_golden, mix, module_at, pick, save_golden
+
+PRE_CHANGE = '8f8b0ad^'
+COMPANIES = ['Abc Ltd', 'abc ltd', 'ABC  Ltd.', 'General', 'gen', 'Xyz', np.nan, '', 'xyz!', 'Q1 Co', 5]
+PRODUCTS = ['Gc', 'gc', 'GC ', 'Pipe', 'pipe', 'Tube-A', 'tube a', np.nan, '', 'Wire', 'Rod 12', 'general pipe', 7]
+EXECS = ['A', 'b ', 'C', np.nan, 'd']
+SL_CODES = ['S1', ' S1', 'S2', 'S3', '', np.nan, 101, 'S4 ', 'S5']
+BRANCH_COLUMNS = ('Date', 'Date', 'Qty', 'Qty', 'Value', 'Value', 'Qty', 'Value', 'Prod', 'Prod',
+                  'Comp', 'Comp', 'Comp', 'Prod', 'Exec', 'Exec', 'Exec')
+EXEC_COLUMNS = ('Date', 'Date', 'Qty', 'Qty', 'Value', 'Value', 'Qty', 'Value', 'Comp', 'Comp', 'Comp',
+                'Prod', 'Prod', 'Prod', 'SL', 'SL', 'SL', 'Exec', 'Exec', 'Exec')
+
+
+def dates(n, year, salt):
+    values = []
+    for i in range(n):
+        month, day, kind = 1 + mix(i, salt) % 12, 1 + mix(i, salt + 1) % 27, mix(i, salt + 2) % 5
+        values.append([f'{day:02d}/{month:02d}/{year}', pd.Timestamp(year, month, day), f'{year}-{month:02d}-{day:02d}',
+                       f'{day:02d}-{month:02d}-{year} 10:00', np.nan if i % 3 else 'bad'][kind])
+    return values
+
+
+def numbers(n, kind, salt):
+    if kind == 'int':
+        return np.array([mix(i, salt) % 40 for i in range(n)])
+    if kind == 'tie':
+        # halves of a cent, so rounding ties show up
+        return np.array([mix(i, salt) % 400 * 0.005 for i in range(n)])
+    values = np.array([round((mix(i, salt) % 24001 - 2000) / 100, 2) for i in range(n)], dtype=object)
+    values[[i for i in range(n) if mix(i, salt + 1) % 20 == 0]] = 'x'
+    values[[i for i in range(n) if mix(i, salt + 1) % 20 == 1]] = np.nan
+    return values
+
+
+def frame(n, year, kind, salt):
+    return pd.DataFrame({
+        'Date': dates(n, year, salt), 'Qty': numbers(n, kind, salt + 3),
+        'Value': numbers(n, 'tie' if kind != 'obj' else 'obj', salt + 4),
+        'Prod': pick(PRODUCTS, n, salt + 5), 'Comp': pick(COMPANIES, n, salt + 6),
+        'Exec': pick(EXECS, n, salt + 7), 'SL': pd.Series(pick(SL_CODES, n, salt + 8), dtype=object),
+    })
+
+
+def outputs(modules, case):
+    product_growth, executive_product_growth = modules
+    kind = ('int', 'tie', 'obj')[case % 3]
+    n = 150 + 60 * case
+    ly, cy, budget = frame(n, 2023, kind, 10 * case), frame(n, 2024, kind, 10 * case + 1), \
+        frame(n // 3, 2024, kind, 10 * case + 2)
+    ly_months = [pd.Timestamp(2023, 1 + mix(k, case) % 12, 1).strftime('%b %y') for k in range(3)]
+    cy_months = [pd.Timestamp(2024, 1 + mix(k, case + 9) % 12, 1).strftime('%b %y') for k in range(3)]
+    executives = [None, ['A', 'C'], ['b ']][case % 3]
+    companies = [None, ['abc ltd', 'General'], ['Xyz', 'nope', 'abc ltd']][case // 3 % 3]
+    products = [None, ['pipe', 'Gc']][case % 2]
+
+    results = {'branch': product_growth.calculate_product_growth(
+        ly, cy, budget, ly_months, cy_months, *BRANCH_COLUMNS,
+        selected_executives=executives, selected_company_groups=companies)}
+    for ly_month, cy_month in [(ly_months[0], cy_months[0]), (None, None)]:
+        for budget_sl in ('SL', None):
+            columns = EXEC_COLUMNS[:16] + (budget_sl,) + EXEC_COLUMNS[17:]
+            results[f'executive {ly_month} {cy_month} {budget_sl}'] = executive_product_growth.calculate_product_growth(
+                ly, cy, budget, ly_month, cy_month, *columns,
+                selected_executives=[e.upper() for e in executives] if executives else None,
+                selected_company_groups=companies, selected_product_groups=products)
+    results['options'] = executive_product_growth.get_product_growth_options(
+        ly, cy, budget, 'Exec', 'Exec', 'Exec', 'Comp', 'Comp', 'Comp', 'Prod', 'Prod', 'Prod', 'SL', 'SL', 'SL')
+    return results
+
+
+def current_modules():
+    import utils.executive_product_growth
+    import utils.product_growth
+    return utils.product_growth, utils.executive_product_growth
+
+
+@pytest.mark.parametrize('case', range(6))
+def test_product_growth_matches_pre_change_outputs(case):
+    expected = load_golden('product_growth_engine')[f'case {case}']
+    compare(outputs(current_modules(), case), expected, f'case {case}')
+
+
+if __name__ == '__main__':
+    old = module_at(PRE_CHANGE, 'utils/product_growth.py'), module_at(PRE_CHANGE, 'utils/executive_product_growth.py')
+    save_golden('product_growth_engine', {f'case {case}': outputs(old, case) for case in range(6)})
@@ -0,0 +1,70 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import utils.query_engine as query_engine
+
+pytestmark = pytest.mark.skipif(not query_engine.DUCKDB_AVAILABLE, reason='duckdb not installed')
+
+
+class SharedConnection:
+    """The shared database, refusing statements that bypass the per-thread cursors."""
+
+    def __init__(self, database):
+        self.database = database
+
+    def cursor(self):
+        return self.database.cursor()
+
+    def execute(self, *args, **kwargs):
+        raise AssertionError('statement run on the shared connection')
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    database = query_engine.duckdb.connect(':memory:')
+    monkeypatch.setattr(query_engine, '_database', SharedConnection(database))
+    monkeypatch.setattr(query_engine, '_local', threading.local())
+    monkeypatch.setattr(query_engine, '_views', {})
+    yield query_engine
+    database.close()
+
+
+def write_facts(path, n, branch):
+    pd.DataFrame({'branch': [branch] * n, 'value': [float(i) for i in range(n)]}).to_parquet(path)
+
+
+def test_parquet_view_runs_on_the_thread_cursor(engine, tmp_path):
+    write_facts(tmp_path / 'a.parquet', 10, 'CHENNAI')
+    view = engine.parquet_view(tmp_path / 'a.parquet')
+    assert engine.parquet_view(str(tmp_path / 'a.parquet')) == view
+    sums = engine.view_sums(view, ['branch'], ['value'])
+    assert sums.to_dict('records') == [{'branch': 'CHENNAI', 'value': 45.0, 'rows': 10}]
+
+
+def test_views_and_queries_from_many_threads(engine, tmp_path):
+    paths = []
+    for i in range(6):
+        paths.append(tmp_path / f'{i}.parquet')
+        write_facts(paths[-1], 100 + i, f'B{i}')
+    errors = []
+
+    def work(worker):
+        try:
+            for step in range(30):
+                i = (worker + step) % len(paths)
+                sums = engine.view_sums(engine.parquet_view(paths[i]), ['branch'], ['value'])
+                assert sums['rows'].tolist() == [100 + i]
+                frame = pd.DataFrame({'x': range(step + 1)})
+                assert engine.query('SELECT count(*) AS n FROM frame', frame=frame)['n'][0] == step + 1
+        except Exception as e:  # reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(w,)) for w in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(engine._views) == len(paths)
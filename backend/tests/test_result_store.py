@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils.result_store as result_store
+
+pytestmark = pytest.mark.skipif(not result_store.PARQUET_AVAILABLE, reason='pyarrow not installed')
+
+ARROW_TABLE = pd.DataFrame({'Branch': ['CHENNAI', 'SALEM'], 'Value': [1.5, 2.5]})
+# a column mixing None and NaN doesn't survive Arrow, so this one is pickled
+PICKLED_TABLE = pd.DataFrame({'Branch': ['CHENNAI', None, np.nan], 'Value': [3.0, 4.0, 5.0]})
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_store, 'RESULTS_DIR', str(tmp_path))
+    result_store.clear_result_store()
+    yield result_store
+    result_store.clear_result_store()
+
+
+def files(key):
+    return sorted(os.path.splitext(path)[1] for path in result_store._disk_files(key) if os.path.exists(path))
+
+
+@pytest.mark.parametrize('first, second, ext', [(PICKLED_TABLE, ARROW_TABLE, '.arrow'),
+                                                (ARROW_TABLE, PICKLED_TABLE, '.pkl')])
+def test_storing_in_the_other_format_replaces_the_file(store, first, second, ext):
+    key = store.result_key('sales.xlsx', 'Sheet1', 'table1')
+    store.put_table(key, first, {'version': 1})
+    store.put_table(key, second, {'version': 2})
+    assert files(key) == [ext]
+
+    store.clear_result_store()
+    frame, meta = store.get_table(key)
+    pd.testing.assert_frame_equal(frame, second)
+    assert meta == {'version': 2}
+
+
+def test_unpersistable_entry_drops_the_old_file(store, monkeypatch):
+    key = store.result_key('sales.xlsx', 'Sheet1', 'table2')
+    store.put_table(key, ARROW_TABLE, {'version': 1})
+
+    def fail(*args):
+        raise OSError('disk full')
+    monkeypatch.setattr(result_store, '_write_arrow', fail)
+    monkeypatch.setattr(result_store, '_write_atomic', fail)
+    store.put_table(key, PICKLED_TABLE, {'version': 2})
+    assert files(key) == []
+    assert store.get_table(key)[1] == {'version': 2}
@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+
+import utils.budget_matching as budget_matching
+import utils.sales_facts as sales_facts
+import utils.workbook_cache as workbook_cache
+
+COLUMNS = {'date': 'Date', 'branch': 'Branch', 'executive': 'Executive', 'product_group': 'Product',
+           'qty': 'Qty', 'value': 'Value'}
+
+
+@pytest.fixture
+def sales_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(workbook_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(sales_facts, 'FACTS_DIR', str(tmp_path / 'cache' / 'facts'))
+    workbook_cache.invalidate()
+    sales_facts.clear_sales_facts()
+    budget_matching.clear_report_cache()
+    n = 400
+    df = pd.DataFrame({
+        'Date': [f"{1 + i % 28:02d}/{1 + i % 12:02d}/2024" if i % 17 else None for i in range(n)],
+        'Branch': [['CHENNAI', 'SALEM', None, 'MADURAI'][i % 4] for i in range(n)],
+        'Executive': [f"Exec {i % 5}" for i in range(n)],
+        'Product': [['PVC', 'GP', 101][i % 3] for i in range(n)],
+        'Qty': [i * 0.5 if i % 11 else 'n/a' for i in range(n)],
+        'Value': [float(i * 1000) for i in range(n)],
+    })
+    path = str(tmp_path / 'sales.xlsx')
+    df.to_excel(path, index=False)
+    yield path
+    workbook_cache.invalidate()
+    sales_facts.clear_sales_facts()
+    budget_matching.clear_report_cache()
+
+
+def test_rollup_sums_the_fact_rows(sales_file):
+    facts = sales_facts.sales_facts(sales_file, COLUMNS)
+    rollup = sales_facts.sales_rollup(sales_file, COLUMNS)
+    assert list(rollup.columns[:4]) == list(sales_facts.ROLLUP)
+    assert rollup['rows'].sum() == len(facts)
+    assert rollup['qty'].sum() == pytest.approx(facts['qty'].sum())
+    assert rollup['value_lakhs'].sum() == pytest.approx(facts['value'].sum() / 100000)
+    # undated rows and missing branches keep their own groups
+    assert (rollup['month'] == sales_facts.NO_MONTH).any()
+    assert rollup['branch'].isna().any()
+
+    expected = facts.groupby(['month', 'branch'], observed=True, dropna=False)['value'].sum()
+    by_branch = sales_facts.sales_rollup(sales_file, COLUMNS, by=('month', 'branch'))
+    got = by_branch.set_index(['month', 'branch'])['value']
+    pd.testing.assert_series_equal(got.sort_index(), expected.sort_index(), check_categorical=False)
+
+
+def test_rollup_is_cached_per_grouping(sales_file):
+    first = sales_facts.sales_rollup(sales_file, COLUMNS)
+    assert sales_facts.sales_rollup(sales_file, COLUMNS) is first
+    assert sales_facts.sales_rollup(sales_file, COLUMNS, by=('branch',)) is not first
+    # groupings only use the fields the fact table has
+    no_product = {field: col for field, col in COLUMNS.items() if field != 'product_group'}
+    assert list(sales_facts.sales_rollup(sales_file, no_product).columns) == [
+        'month', 'branch', 'executive', 'qty', 'value', 'rows', 'value_lakhs']
+
+
+def test_fact_table_reloads_from_parquet(sales_file):
+    if not sales_facts.PARQUET_AVAILABLE:
+        pytest.skip('pyarrow not installed')
+    built = sales_facts.sales_facts(sales_file, COLUMNS)
+    sales_facts.clear_sales_facts()
+    disk_hits = sales_facts.sales_facts_stats()['disk_hits']
+    reloaded = sales_facts.sales_facts(sales_file, COLUMNS)
+    assert sales_facts.sales_facts_stats()['disk_hits'] == disk_hits + 1
+    pd.testing.assert_frame_equal(reloaded, built)
+    assert reloaded['qty'].isna().any()
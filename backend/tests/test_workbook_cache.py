@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils.workbook_cache as workbook_cache
+from utils.workbook_cache import read_sheet
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(workbook_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    workbook_cache.invalidate()
+    yield tmp_path
+    workbook_cache.invalidate()
+
+
+def _budget_file(directory):
+    path = directory / 'b.xlsx'
+    pd.DataFrame({
+        'SL Code': ['A1', None, 'A3'],
+        'Branch': ['BANGALORE', 'BANGALORE', None],
+        'Qty': [10, np.nan, 5],
+    }).to_excel(path, index=False)
+    return str(path)
+
+
+def _disk_hit(path, **kwargs):
+    """read_sheet after the in-memory LRU is dropped, as in another worker or after a restart."""
+    workbook_cache.invalidate()
+    before = workbook_cache.cache_stats()['disk_hits']
+    df = read_sheet(path, **kwargs)
+    assert workbook_cache.cache_stats()['disk_hits'] == before + 1
+    return df
+
+
+@pytest.mark.parametrize('dtype', [None, {'SL Code': str}])
+def test_disk_hit_matches_cold_read(cache_dir, dtype):
+    path = _budget_file(cache_dir)
+    cold = read_sheet(path, dtype=dtype)
+    pd.testing.assert_frame_equal(cold, pd.read_excel(path, dtype=dtype))
+
+    warm = _disk_hit(path, dtype=dtype)
+    pd.testing.assert_frame_equal(warm, cold)
+    assert warm['SL Code'].astype(str).tolist() == cold['SL Code'].astype(str).tolist() == ['A1', 'nan', 'A3']
+    assert warm['Branch'].astype(str).tolist() == ['BANGALORE', 'BANGALORE', 'nan']
+
+
+def test_mixed_none_and_nan_survive_disk_hit(cache_dir, monkeypatch):
+    path = _budget_file(cache_dir)
+    mixed = pd.DataFrame({'Code': ['A1', None, np.nan]})
+    monkeypatch.setattr(workbook_cache.pd, 'read_excel', lambda *args, **kwargs: mixed.copy())
+    cold = read_sheet(path, sheet_name='mixed')
+    warm = _disk_hit(path, sheet_name='mixed')
+    assert warm['Code'].tolist()[1] is None
+    assert warm['Code'].astype(str).tolist() == cold['Code'].astype(str).tolist() == ['A1', 'None', 'nan']
+
+
+def test_entries_without_nan_metadata_are_reparsed(cache_dir):
+    path = _budget_file(cache_dir)
+    cold = read_sheet(path, dtype={'SL Code': str})
+    key = workbook_cache._cache_key(workbook_cache.file_digest(path), 0, 0, {'SL Code': str})
+    # a file spilled before NaN columns were recorded reads back with None
+    cold.to_parquet(workbook_cache._entry_path(key, 'parquet'), index=False)
+    workbook_cache.invalidate()
+    df = read_sheet(path, dtype={'SL Code': str})
+    assert df['SL Code'].astype(str).tolist() == ['A1', 'nan', 'A3']
+
+
+def test_threads_writing_one_entry_use_their_own_temp_files(cache_dir):
+    path = str(cache_dir / 'entry.pkl')
+    both_writing = threading.Barrier(2)
+    errors = []
+
+    def writer(text):
+        def write(tmp):
+            with open(tmp, 'w') as fh:
+                fh.write(text)
+            both_writing.wait(timeout=5)
+        try:
+            workbook_cache._write_atomic(path, write)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(text,)) for text in ('first', 'second')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert open(path).read() in ('first', 'second')
+    assert os.listdir(cache_dir) == ['entry.pkl']
+
+
+def _cache_file(relative, size, age):
+    path = os.path.join(workbook_cache.CACHE_DIR, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fh:
+        fh.write(b'x' * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_disk_cache_drops_stale_then_least_recently_used_files(cache_dir, monkeypatch):
+    monkeypatch.setattr(workbook_cache, 'DISK_MAX_BYTES', 2500)
+    day = 24 * 3600
+    stale = _cache_file('ab/stale.parquet', 10, 15 * day)
+    oldest = _cache_file('facts/cd/oldest.parquet', 1000, 3 * day)
+    older = _cache_file('results/ef/older.arrow', 1000, 2 * day)
+    newest = _cache_file('ab/newest.pkl', 1000, 1 * day)
+    # job files and the column decision store are not rebuildable cache entries
+    kept = [_cache_file('jobs/1.result', 1000, 30 * day), _cache_file('column_decisions.sqlite3', 1000, 30 * day)]
+
+    assert workbook_cache.purge_disk_cache() == 2
+    assert [os.path.exists(p) for p in (stale, oldest, older, newest, *kept)] == [False, False, True, True, True, True]
+
+
+def test_disk_hits_keep_entries_from_expiring(cache_dir, monkeypatch):
+    path = _budget_file(cache_dir)
+    read_sheet(path)
+    entry = workbook_cache._entry_path(workbook_cache._cache_key(workbook_cache.file_digest(path), 0, 0, None),
+                                       'parquet' if workbook_cache.PARQUET_AVAILABLE else 'pkl')
+    stamp = time.time() - 15 * 24 * 3600
+    os.utime(entry, (stamp, stamp))
+    _disk_hit(path)
+    assert workbook_cache.purge_disk_cache() == 0
+    assert os.path.exists(entry)
@@ -0,0 +1,34 @@
+import io
+
+import pandas as pd
+import pytest
+
+import utils.xlsx_export as xlsx_export
+
+
+def test_write_xlsx_matches_to_excel():
+    df = pd.DataFrame({'Branch': ['CHENNAI', None], 'Value': [1.5, float('nan')], 'Qty': [3, 4]})
+    target = io.BytesIO()
+    xlsx_export.write_xlsx(target, [('Sales', df)])
+    target.seek(0)
+    pd.testing.assert_frame_equal(pd.read_excel(target, sheet_name='Sales'), df)
+
+
+@pytest.mark.parametrize('shape, start_row', [((xlsx_export.MAX_ROWS, 1), 0),
+                                              ((xlsx_export.MAX_ROWS - 1, 1), 1),
+                                              ((0, xlsx_export.MAX_COLS + 1), 0)])
+def test_frame_larger_than_a_sheet_is_refused(shape, start_row):
+    rows, cols = shape
+    df = pd.DataFrame(0, index=range(rows), columns=[f"c{i}" for i in range(cols)])
+    with xlsx_export.open_workbook(io.BytesIO()) as workbook:
+        with pytest.raises(ValueError, match='This sheet is too large'):
+            xlsx_export.write_frame(workbook, 'Sheet1', df, start_row=start_row)
+
+
+def test_frame_filling_a_sheet_is_written(monkeypatch):
+    monkeypatch.setattr(xlsx_export, 'MAX_ROWS', 4)
+    df = pd.DataFrame({'Value': [1, 2, 3]})
+    target = io.BytesIO()
+    xlsx_export.write_xlsx(target, [('Sheet1', df)])
+    target.seek(0)
+    pd.testing.assert_frame_equal(pd.read_excel(target), df)
@@ -0,0 +1,64 @@
+from collections import deque
+
+# =========================
+# Multi-pattern substring search
+# =========================
+# Small pure-Python Aho-Corasick automaton: built once over a set of patterns,
+# it reports every pattern occurring in a text in a single pass over the text,
+# instead of testing `pattern in text` for each pattern separately.
+
+
+class AhoCorasick:
+    """Automaton over `patterns`; matches are reported as indices into that list."""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]       # pattern indices ending exactly at this node
+        self._link = [0]       # nearest proper suffix node that ends a pattern (0 = none)
+
+        for idx, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._link.append(0)
+                node = nxt
+            self._out[node].append(idx)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._link[child] = target if self._out[target] else self._link[target]
+
+    def iter_matches(self, text):
+        """Yield the index of every pattern occurrence in `text` (empty patterns never match)."""
+        goto, fail, out, link = self._goto, self._fail, self._out, self._link
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = node if out[node] else link[node]
+            while hit:
+                yield from out[hit]
+                hit = link[hit]
+
+    def matched(self, text):
+        """Set of pattern indices that occur in `text`."""
+        return set(self.iter_matches(text))
@@ -0,0 +1,157 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    from rapidfuzz import fuzz, process as rf_process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+try:
+    from fuzzywuzzy import fuzz as fw_fuzz, process as fw_process
+    FUZZYWUZZY_AVAILABLE = True
+except ImportError:
+    FUZZYWUZZY_AVAILABLE = False
+
+# =========================
+# Batch branch-name resolution
+# =========================
+# Resolves raw branch names to mapped branches the way region.normalize_branch_name
+# does (strip affixes, exact lookup, then fuzzywuzzy-style WRatio >= 85), but
+# for a whole column at once: values are deduplicated, affixes and exact
+# lookups run as string ops over the distinct names, and the leftovers are
+# scored against every mapping key in one RapidFuzz cdist call. Decisions are
+# cached per (mapping version, raw name), where the version is the mapping's
+# content, so edited mappings never reuse stale answers.
+
+FUZZY_CUTOFF = 85
+AFFIXES = ['BRANCH', 'REGION', 'OFFICE', 'DEPOT', 'UNIT', 'DIVISION', 'CENTRE', 'CENTER']
+DECISION_CACHE_SIZE = int(os.getenv('BRANCH_RESOLVER_CACHE_SIZE', '20000'))
+
+# fuzzywuzzy's string processing, reproduced so rapidfuzz scores the same
+# strings: full_process (non-word characters to spaces, lower-case, trim)
+# runs on the query in extractOne, then WRatio runs it again on the query and
+# the choices with force_ascii, which first drops U+0080-U+00FF. rapidfuzz's
+# default_process keeps those and treats '_' as a separator, which changed
+# some matches ('VécOVAI' no longer went to COVAI).
+_FORCE_ASCII = {code: None for code in range(128, 256)}
+_NON_WORD = re.compile(r'(?ui)\W')
+# rapidfuzz's WRatio still differs on some pairs (fuzzywuzzy rounds each
+# component before scaling and uses a heuristic partial_ratio), but never by
+# more than a point upwards, so pairs rapidfuzz puts within RESCORE_MARGIN of
+# the cutoff are rescored with fuzzywuzzy when it is installed.
+RESCORE_MARGIN = 1
+
+_lock = threading.Lock()
+_decisions = OrderedDict()  # (mapping version, raw name) -> resolved branch
+
+
+def mapping_version(branch_mappings):
+    return frozenset(branch_mappings.items())
+
+
+def _clean_names(names):
+    """Upper-case, trim and drop one leading/trailing BRANCH/REGION/... word per affix, in order."""
+    clean = pd.Series(names, dtype=object).str.strip().str.upper()
+    for prefix in AFFIXES:
+        hit = clean.str.startswith(prefix + ' ')
+        if hit.any():
+            clean = clean.where(~hit, clean.str[len(prefix):].str.strip())
+    for suffix in AFFIXES:
+        hit = clean.str.endswith(' ' + suffix)
+        if hit.any():
+            clean = clean.where(~hit, clean.str[:-len(suffix)].str.strip())
+    return clean
+
+
+def _full_process(name, force_ascii=False):
+    if force_ascii:
+        name = name.translate(_FORCE_ASCII)
+    return _NON_WORD.sub(' ', name).lower().strip()
+
+
+def _fuzzy_pick(queries, keys):
+    """Index into keys of each query's best match scoring >= FUZZY_CUTOFF, or -1."""
+    if not keys or not queries:
+        return np.full(len(queries), -1)
+    if RAPIDFUZZ_AVAILABLE:
+        processed_queries = [_full_process(_full_process(query), force_ascii=True) for query in queries]
+        processed_keys = [_full_process(key, force_ascii=True) for key in keys]
+        scores = rf_process.cdist(processed_queries, processed_keys, scorer=fuzz.WRatio, dtype=np.float64)
+        if FUZZYWUZZY_AVAILABLE:
+            rows, cols = np.nonzero(scores >= FUZZY_CUTOFF - RESCORE_MARGIN)
+            scores = np.zeros_like(scores)
+            for row, col in zip(rows, cols):
+                scores[row, col] = fw_fuzz.WRatio(processed_queries[row], processed_keys[col], full_process=False)
+        else:
+            # fuzzywuzzy rounds WRatio to an int
+            scores = np.rint(scores)
+        # extractOne keeps the first of equal scores
+        best = scores.argmax(axis=1)
+        return np.where(scores[np.arange(len(queries)), best] >= FUZZY_CUTOFF, best, -1)
+
+    picks = []
+    for query in queries:
+        match = fw_process.extractOne(query, keys, score_cutoff=FUZZY_CUTOFF)
+        picks.append(keys.index(match[0]) if match else -1)
+    return np.array(picks)
+
+
+def _resolve_names(names, branch_mappings, version):
+    """Resolve distinct raw (string) names, consulting and filling the decision cache."""
+    resolved = [None] * len(names)
+    todo = []
+    with _lock:
+        for i, name in enumerate(names):
+            decision = _decisions.get((version, name))
+            if decision is None:
+                todo.append(i)
+            else:
+                _decisions.move_to_end((version, name))
+                resolved[i] = decision
+    if not todo:
+        return resolved
+
+    clean = _clean_names([names[i] for i in todo]).tolist()
+    exact = [branch_mappings.get(name) for name in clean]
+    pending = [j for j, hit in enumerate(exact) if hit is None]
+    keys = list(branch_mappings.keys())
+    picks = _fuzzy_pick([clean[j] for j in pending], keys)
+    for j, pick in zip(pending, picks):
+        exact[j] = branch_mappings[keys[pick]] if pick >= 0 else clean[j]
+
+    with _lock:
+        for i, decision in zip(todo, exact):
+            resolved[i] = decision
+            _decisions[(version, names[i])] = decision
+        while len(_decisions) > DECISION_CACHE_SIZE:
+            _decisions.popitem(last=False)
+    return resolved
+
+
+def resolve_branch_names(values, branch_mappings):
+    """
+    normalize_branch_name applied to every value of a Series (or list), computed
+    once per distinct value. Missing values resolve to ''. Returns a Series
+    aligned with values.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    missing = series.isna().to_numpy()
+    codes, uniques = pd.factorize(series[~missing].astype(str))
+
+    decisions = np.empty(len(uniques), dtype=object)
+    decisions[:] = _resolve_names(list(uniques), branch_mappings, mapping_version(branch_mappings))
+
+    result = np.full(len(series), '', dtype=object)
+    result[~missing] = decisions[codes]
+    return pd.Series(result, index=series.index, name=series.name)
+
+
+def clear_decision_cache():
+    with _lock:
+        _decisions.clear()
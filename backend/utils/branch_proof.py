@@ -5,11 +5,15 @@ This module contains utility functions for creating detailed Excel proof of calc
 reports for budget vs sales analysis.
 """
 
+import numpy as np
 import pandas as pd
 import logging
 from io import BytesIO
 from typing import Optional, List
 
+from utils.budget_matching import attach_sales_totals, cap_at_budget, SALES_QTY, SALES_VALUE
+from utils.date_parsing import in_months, parse_dates
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -89,8 +93,8 @@ def create_proof_of_calculation_excel(budget_df: pd.DataFrame,
         budget_df = budget_df.copy()
         
         # STEP 1: Convert sales date and filter by month
-        sales_df[sales_date_col] = pd.to_datetime(sales_df[sales_date_col], dayfirst=True, errors='coerce')
-        filtered_sales_df = sales_df[sales_df[sales_date_col].dt.strftime('%b %y') == selected_month].copy()
+        sales_df[sales_date_col] = parse_dates(sales_df[sales_date_col], dayfirst=True)
+        filtered_sales_df = sales_df[in_months(sales_df[sales_date_col], selected_month)].copy()
         
         if filtered_sales_df.empty:
             logger.warning(f"No sales data found for {selected_month}")
@@ -165,72 +169,40 @@ def create_proof_of_calculation_excel(budget_df: pd.DataFrame,
         
         logger.info(f"Budget records after grouping: {len(budget_grouped)}")
         
-        # Initialize results storage
-        final_results = []
+        # Sum matching sales per budget record using the standardized values
+        matched = attach_sales_totals(
+            budget_grouped, filtered_sales_df,
+            [budget_area_col, budget_sl_code_col, budget_product_group_col],
+            [sales_area_col, sales_sl_code_col, sales_product_group_col],
+            sales_qty_col, sales_value_col
+        )
+        budget_qty = matched[budget_qty_col]
+        budget_value = matched[budget_value_col]
         
-        # Process each budget record
-        for _, budget_row in budget_grouped.iterrows():
-            standardized_branch = budget_row[budget_area_col]
-            standardized_sl_code = budget_row[budget_sl_code_col]
-            standardized_product = budget_row[budget_product_group_col]
-            budget_qty = budget_row[budget_qty_col]
-            budget_value = budget_row[budget_value_col]
-            
-            # Use display values for Excel output
-            display_branch = budget_row['display_branch']
-            display_exec = budget_row['display_exec']
-            display_sl_code = budget_row['display_sl_code']
-            display_product = budget_row['display_product']
-            
-            # Check if budget conditions are met
-            budget_conditions_met = budget_qty > 0 and budget_value > 0
-            
-            if budget_conditions_met:
-                # Find matching sales using standardized values
-                matching_sales = filtered_sales_df[
-                    (filtered_sales_df[sales_area_col] == standardized_branch) &
-                    (filtered_sales_df[sales_sl_code_col] == standardized_sl_code) &
-                    (filtered_sales_df[sales_product_group_col] == standardized_product)
-                ]
-                
-                # Sum matching sales
-                if not matching_sales.empty:
-                    sales_qty_total = matching_sales[sales_qty_col].sum()
-                    sales_value_total = matching_sales[sales_value_col].sum()
-                else:
-                    sales_qty_total = 0
-                    sales_value_total = 0
-                
-                # Apply min logic (if sales > budget, use budget; else use sales)
-                final_qty = min(budget_qty, sales_qty_total) if sales_qty_total > 0 else 0
-                final_value = min(budget_value, sales_value_total) if sales_value_total > 0 else 0
-                
-                # Determine match status
-                if sales_qty_total > 0 or sales_value_total > 0:
-                    match_status = 'Mapped'
-                else:
-                    match_status = 'No Sales Data'
-            else:
-                final_qty = 0
-                final_value = 0
-                match_status = 'Budget Invalid'
-            
-            # Store result with original display values
-            final_results.append({
-                'Branch': display_branch,           
-                'Executive Name': display_exec,     
-                'SL Code': display_sl_code,         
-                'Product Group': display_product,   
-                'Budget Qty': round(budget_qty, 2),
-                'Budget Value': round(budget_value, 2),
-                'Sales Qty': round(final_qty, 2),
-                'Sales Value': round(final_value, 2),
-                'Standardized Branch': standardized_branch,  # For debugging
-                'Match Status': match_status
-            })
+        # Check if budget conditions are met, then apply min logic
+        # (if sales > budget, use budget; else use sales)
+        budget_conditions_met = (budget_qty > 0) & (budget_value > 0)
+        has_sales = (matched[SALES_QTY] > 0) | (matched[SALES_VALUE] > 0)
+        final_qty = cap_at_budget(budget_qty, matched[SALES_QTY], positive_only=True).where(budget_conditions_met, 0)
+        final_value = cap_at_budget(budget_value, matched[SALES_VALUE], positive_only=True).where(budget_conditions_met, 0)
+        match_status = np.where(
+            ~budget_conditions_met, 'Budget Invalid',
+            np.where(has_sales, 'Mapped', 'No Sales Data')
+        )
         
-        # Convert to DataFrame and sort
-        proof_df = pd.DataFrame(final_results)
+        # Build results with original display values and sort
+        proof_df = pd.DataFrame({
+            'Branch': matched['display_branch'],
+            'Executive Name': matched['display_exec'],
+            'SL Code': matched['display_sl_code'],
+            'Product Group': matched['display_product'],
+            'Budget Qty': budget_qty.round(2),
+            'Budget Value': budget_value.round(2),
+            'Sales Qty': final_qty.round(2),
+            'Sales Value': final_value.round(2),
+            'Standardized Branch': matched[budget_area_col],  # For debugging
+            'Match Status': match_status
+        }).reset_index(drop=True)
         proof_df = proof_df.sort_values(['Standardized Branch', 'Executive Name', 'SL Code'])
         
         logger.info(f"Created proof with {len(proof_df)} records")
@@ -0,0 +1,162 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.workbook_cache import file_digest
+
+# =========================
+# Budget vs billed matching kernel
+# =========================
+# Budget-vs-billed reports and their proof-of-calculation exports all pair
+# each grouped budget line with the sales rows that share its key (branch or
+# executive + SL code + product group), sum those sales, and cap the billed
+# figure at the budget. Doing that with one boolean filter of the sales frame
+# per budget line is O(budget x sales); here the sales side is grouped once
+# and joined onto the budget lines.
+
+SALES_QTY = 'Sales_Qty'
+SALES_VALUE = 'Sales_Value'
+HAS_SALES = 'Has_Sales'
+
+
+def attach_sales_totals(budget_df, sales_df, budget_keys, sales_keys, sales_qty_col, sales_value_col):
+    """
+    Return a copy of budget_df with the summed sales quantity/value of every
+    sales row whose sales_keys equal the line's budget_keys (0 when none do)
+    in Sales_Qty / Sales_Value, and Has_Sales marking lines with any match.
+    Keys are compared as-is, so both sides must already be standardized.
+    """
+    totals = (
+        sales_df.groupby(list(sales_keys), sort=False)[[sales_qty_col, sales_value_col]]
+        .sum()
+        .rename(columns={sales_qty_col: SALES_QTY, sales_value_col: SALES_VALUE})
+    )
+    totals[HAS_SALES] = True
+
+    result = budget_df.drop(columns=[SALES_QTY, SALES_VALUE, HAS_SALES], errors='ignore')
+    if totals.empty or result.empty:
+        result = result.copy()
+        result[SALES_QTY] = 0
+        result[SALES_VALUE] = 0
+        result[HAS_SALES] = False
+        return result
+
+    # join() keeps the budget row order and index
+    result = result.join(totals, on=list(budget_keys))
+    result[HAS_SALES] = result[HAS_SALES].notna()
+    result[SALES_QTY] = result[SALES_QTY].fillna(0)
+    result[SALES_VALUE] = result[SALES_VALUE].fillna(0)
+    return result
+
+
+def cap_at_budget(budget, billed, positive_only=False):
+    """
+    Billed amount credited against a budget: min(budget, billed).
+    With positive_only, lines whose billed total is not above zero count as 0.
+    """
+    capped = np.minimum(budget, billed)
+    if positive_only:
+        capped = capped.where(billed > 0, 0) if isinstance(capped, pd.Series) else np.where(billed > 0, capped, 0)
+    return capped
+
+
+# =========================
+# Per-month report cache
+# =========================
+# The reports are requested one month at a time while the inputs (files,
+# column mapping, filters) stay the same. Sales are labelled with their month
+# and grouped by (month, keys) once per set of inputs; every month's tables are
+# then cut from those totals. Built results are kept in a small LRU keyed by
+# the files' SHA-256 and the request parameters, so re-uploading a file under
+# the same name gets a new key.
+
+MONTH = '_Month'
+REPORT_CACHE_ENTRIES = int(os.getenv('BUDGET_REPORT_CACHE_ENTRIES', '16'))
+
+_report_lock = threading.Lock()
+_reports = OrderedDict()
+_report_stats = {'hits': 0, 'misses': 0}
+
+
+def chronological(months):
+    """Sort 'Mon YY' labels by date."""
+    return sorted(months, key=lambda month: datetime.strptime(month, '%b %y'))
+
+
+def sum_by_month(sales_df, keys, qty_col, value_col):
+    """Sales qty/value summed per (MONTH, *keys); rows without a date keep a NaN month."""
+    return (
+        sales_df.groupby([MONTH] + list(keys), sort=False, dropna=False)[[qty_col, value_col]]
+        .sum()
+        .reset_index()
+    )
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def report_key(kind, file_paths, params):
+    """Cache key for a report over file_paths' current contents and the given parameters."""
+    return (kind, tuple(file_digest(path) for path in file_paths), _freeze(params))
+
+
+_type_of = np.frompyfunc(type, 1, 1)
+
+
+def frame_fingerprint(df, columns):
+    """
+    Content hash of df[columns], for report keys over frames that are not
+    plain reads of a file: raw bytes of numpy columns; value codes, Python
+    type codes (so 1 / 1.0 / True differ) and distinct values of the rest.
+    """
+    sha = hashlib.sha1(repr([(c, str(df[c].dtype), len(df)) for c in columns]).encode('utf-8'))
+    for c in columns:
+        series = df[c]
+        if isinstance(series.dtype, np.dtype) and series.dtype != object:
+            sha.update(np.ascontiguousarray(series.to_numpy()).tobytes())
+            continue
+        values = series.to_numpy(dtype=object)
+        codes, uniques = pd.factorize(values)  # missing -> -1; their kinds differ by type code
+        type_codes, types = pd.factorize(_type_of(values))
+        sha.update(codes.tobytes())
+        sha.update(type_codes.tobytes())
+        sha.update(repr((list(uniques), [t.__qualname__ for t in types])).encode('utf-8'))
+    return sha.hexdigest()
+
+
+def cached_report(key, build):
+    """Return the cached value for key, calling build() on a miss. Treat results as read-only."""
+    with _report_lock:
+        if key in _reports:
+            _reports.move_to_end(key)
+            _report_stats['hits'] += 1
+            return _reports[key]
+        _report_stats['misses'] += 1
+
+    value = build()
+    with _report_lock:
+        _reports[key] = value
+        _reports.move_to_end(key)
+        while len(_reports) > REPORT_CACHE_ENTRIES:
+            _reports.popitem(last=False)
+    return value
+
+
+def clear_report_cache():
+    with _report_lock:
+        _reports.clear()
+
+
+def report_cache_stats():
+    with _report_lock:
+        return dict(_report_stats, entries=len(_reports))
@@ -3,6 +3,16 @@ import numpy as np
 import os
 from datetime import datetime
 import logging
+import re
+from utils.workbook_cache import read_sheet
+from utils.customer_counts import format_months
+from utils.query_engine import distinct_values, parquet_view, sql_enabled, view_sums
+from utils.sales_facts import NO_MONTH, fact_dimension, fact_isin, fact_month_labels, sales_facts, sales_facts_file
+from utils.normalizers import normalize_column, normalizer
+from utils.budget_matching import (
+    HAS_SALES, MONTH, SALES_QTY, SALES_VALUE, attach_sales_totals, cap_at_budget,
+    cached_report, chronological, report_key, sum_by_month,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -32,6 +42,7 @@ branch_mapping = {
     'BLR': 'BANGALORE', 'BANGALORE': 'BANGALORE', 'BGLR': 'BANGALORE'
 }
 
+@normalizer
 def map_branch(branch_name):
     if pd.isna(branch_name):
         return 'Unknown'
@@ -40,6 +51,22 @@ def map_branch(branch_name):
         branch_str = branch_str.split(' - ')[-1].strip()
     return branch_mapping.get(branch_str, branch_str)
 
+def _sales_branch(text):
+    """Sales branch cell text -> branch, as .str.strip().str.upper().replace(branch_mapping)."""
+    branch = text.strip().upper()
+    return branch_mapping.get(branch, branch)
+
+
+def _sl_code(text):
+    """SL code cell text without surrounding spaces or a trailing '.0', upper-cased."""
+    return re.sub('\\.0$', '', text.strip()).upper()
+
+
+def _product_group(text):
+    """Product group cell text without surrounding spaces, upper-cased."""
+    return text.strip().upper()
+
+
 def find_column_by_names(columns, target_names):
     columns_upper = [col.upper() for col in columns]
     target_names_upper = [name.upper() for name in target_names]
@@ -68,364 +95,422 @@ def auto_map_budget_columns(sales_columns, budget_columns):
     }
     return sales_mapping, budget_mapping
 
+# Request fields that pick a month out of the all-months result rather than change it
+_PER_MONTH_FIELDS = ('selected_month', 'all_months')
+
+
 def calculate_budget_vs_billed(data):
+    """Budget vs billed tables for data['selected_month'], or None if there is nothing to report."""
+    months = calculate_budget_vs_billed_all_months(data)
+    if months is None:
+        return None
+    result = months.get(data['selected_month'])
+    if result is None:
+        print(f"❌ No budget vs billed data for {data['selected_month']}")
+    return result
+
+
+def calculate_budget_vs_billed_all_months(data):
+    """
+    Budget vs billed tables for every month in the sales file, keyed by 'Mon YY'.
+    Sales are grouped by (month, branch, SL code, product) in one pass and the
+    result is cached for these files, columns and filters, so switching
+    selected_month is a cache hit. Returns None on error.
+    """
     try:
-        # Create copies to avoid modifying original DataFrames
-        sales_df = pd.read_excel(
-            os.path.join('uploads', data['sales_filename']), 
-            sheet_name=data['sales_sheet'], 
-            header=data['sales_header'] - 1, 
-            dtype={'SL Code': str}
-        ).copy()
-        
-        budget_df = pd.read_excel(
-            os.path.join('uploads', data['budget_filename']), 
-            sheet_name=data['budget_sheet'], 
-            header=data['budget_header'] - 1, 
-            dtype={'SL Code': str}
-        ).copy()
-        
-        print(f"🔍 Initial data loaded - Sales: {len(sales_df)} rows, Budget: {len(budget_df)} rows")
-        
-        # Convert and clean numeric and date columns
-        sales_df[data['sales_date_col']] = pd.to_datetime(sales_df[data['sales_date_col']], dayfirst=True, errors='coerce')
-        sales_df[data['sales_value_col']] = pd.to_numeric(sales_df[data['sales_value_col']], errors='coerce').fillna(0)
-        sales_df[data['sales_qty_col']] = pd.to_numeric(sales_df[data['sales_qty_col']], errors='coerce').fillna(0)
+        key = report_key(
+            'branch',
+            [os.path.join('uploads', data['sales_filename']), os.path.join('uploads', data['budget_filename'])],
+            {k: v for k, v in data.items() if k not in _PER_MONTH_FIELDS}
+        )
+        return cached_report(key, lambda: _build_all_months(data))
+    except Exception as e:
+        logger.error(f"Error in calculate_budget_vs_billed: {str(e)}")
+        print(f"❌ Error calculating budget values: {str(e)}")
+        import traceback
+        print(traceback.format_exc())
+        return None
 
-        budget_df[data['budget_value_col']] = pd.to_numeric(budget_df[data['budget_value_col']], errors='coerce').fillna(0)
-        budget_df[data['budget_qty_col']] = pd.to_numeric(budget_df[data['budget_qty_col']], errors='coerce').fillna(0)
-        
-        # Filter by executives
-        if data['selected_sales_execs']:
-            sales_df = sales_df[sales_df[data['sales_exec_col']].isin(data['selected_sales_execs'])].copy()
-            print(f"🔍 After sales exec filter: {len(sales_df)} rows")
-        if data['selected_budget_execs']:
-            budget_df = budget_df[budget_df[data['budget_exec_col']].isin(data['selected_budget_execs'])].copy()
-            print(f"🔍 After budget exec filter: {len(budget_df)} rows")
-
-        if sales_df.empty or budget_df.empty:
-            print("❌ No data found for selected executives in one or both files.")
-            return None
-            
-        # Filter sales data for the selected month
-        filtered_sales_df = sales_df[sales_df[data['sales_date_col']].dt.strftime('%b %y') == data['selected_month']].copy()
-        print(f"🔍 After month filter ({data['selected_month']}): {len(filtered_sales_df)} sales rows")
-        
-        if filtered_sales_df.empty:
-            print(f"❌ No sales data found for {data['selected_month']}")
-            return None
-
-        # Debug: Show sample data BEFORE processing
-        print("🔍 BEFORE PROCESSING:")
-        print("Sales sample (branch, sl_code, product):")
-        print(filtered_sales_df[[data['sales_area_col'], data['sales_sl_code_col'], data['sales_product_group_col']]].head(3).to_string())
-        print("Budget sample (branch, sl_code, product):")
-        print(budget_df[[data['budget_area_col'], data['budget_sl_code_col'], data['budget_product_group_col']]].head(3).to_string())
-
-        # Standardize string columns
-        filtered_sales_df[data['sales_area_col']] = filtered_sales_df[data['sales_area_col']].astype(str).str.strip()
-        budget_df[data['budget_area_col']] = budget_df[data['budget_area_col']].astype(str).str.strip()
-        filtered_sales_df[data['sales_product_group_col']] = filtered_sales_df[data['sales_product_group_col']].astype(str).str.strip()
-        filtered_sales_df[data['sales_sl_code_col']] = filtered_sales_df[data['sales_sl_code_col']].astype(str).str.strip().str.replace('\.0$', '', regex=True)
-        budget_df[data['budget_product_group_col']] = budget_df[data['budget_product_group_col']].astype(str).str.strip()
-        budget_df[data['budget_sl_code_col']] = budget_df[data['budget_sl_code_col']].astype(str).str.strip().str.replace('\.0$', '', regex=True)
-
-        # Apply branch mapping exactly like Streamlit
-        budget_df[data['budget_area_col']] = budget_df[data['budget_area_col']].str.split(' - ').str[-1].str.upper()
-        budget_df[data['budget_area_col']] = budget_df[data['budget_area_col']].str.replace('AAAA - ', '', regex=False).str.upper()
-        budget_df[data['budget_area_col']] = budget_df[data['budget_area_col']].replace(branch_mapping)
-        filtered_sales_df[data['sales_area_col']] = filtered_sales_df[data['sales_area_col']].str.upper().replace(branch_mapping)
-        
-        # Apply branch filtering if specified
-        if data['selected_branches']:
-            filtered_sales_df = filtered_sales_df[filtered_sales_df[data['sales_area_col']].isin(data['selected_branches'])].copy()
-            budget_df = budget_df[budget_df[data['budget_area_col']].isin(data['selected_branches'])].copy()
-            print(f"🔍 After branch filter: Sales {len(filtered_sales_df)}, Budget {len(budget_df)}")
-
-        # Standardize product groups and SL codes exactly like Streamlit
-        filtered_sales_df[data['sales_product_group_col']] = filtered_sales_df[data['sales_product_group_col']].str.upper()
-        filtered_sales_df[data['sales_sl_code_col']] = filtered_sales_df[data['sales_sl_code_col']].str.upper()
-        budget_df[data['budget_product_group_col']] = budget_df[data['budget_product_group_col']].str.upper()
-        budget_df[data['budget_sl_code_col']] = budget_df[data['budget_sl_code_col']].str.upper()
-
-        # Debug: Show sample data AFTER processing
-        print("🔍 AFTER PROCESSING:")
-        print("Sales sample (branch, sl_code, product):")
-        print(filtered_sales_df[[data['sales_area_col'], data['sales_sl_code_col'], data['sales_product_group_col']]].head(3).to_string())
-        print("Budget sample (branch, sl_code, product):")
-        print(budget_df[[data['budget_area_col'], data['budget_sl_code_col'], data['budget_product_group_col']]].head(3).to_string())
-
-        # Group by Branch + SL Code + Product Group and sum quantities/values
-        budget_grouped = budget_df.groupby([
-            data['budget_area_col'],
-            data['budget_sl_code_col'], 
-            data['budget_product_group_col']
-        ]).agg({
-            data['budget_qty_col']: 'sum',
-            data['budget_value_col']: 'sum'
-        }).reset_index()
-        
-        # Filter: Only include rows where BOTH qty > 0 AND value > 0
-        budget_valid = budget_grouped[
-            (budget_grouped[data['budget_qty_col']] > 0) & 
-            (budget_grouped[data['budget_value_col']] > 0)
-        ].copy()
-        
-        print(f"🔍 Valid budget combinations: {len(budget_valid)}")
-        
-        if budget_valid.empty:
-            print("❌ No valid budget data found (with qty > 0 and value > 0).")
-            return None
-        
-        # Debug: Show what we're trying to match
-        print("🔍 Budget combinations to match:")
-        print(budget_valid[[data['budget_area_col'], data['budget_sl_code_col'], data['budget_product_group_col']]].head(5).to_string())
-        
-        # Initialize results storage
-        final_results = []
-        matches_found = 0
-        
-        # For each valid budget record, find matching sales
-        for i, budget_row in budget_valid.iterrows():
-            branch = budget_row[data['budget_area_col']]
-            sl_code = budget_row[data['budget_sl_code_col']]
-            product = budget_row[data['budget_product_group_col']]
-            budget_qty = budget_row[data['budget_qty_col']]
-            budget_value = budget_row[data['budget_value_col']]
-            
-            # Find matching sales records (same branch + sl_code + product)
-            matching_sales = filtered_sales_df[
-                (filtered_sales_df[data['sales_area_col']] == branch) &
-                (filtered_sales_df[data['sales_sl_code_col']] == sl_code) &
-                (filtered_sales_df[data['sales_product_group_col']] == product)
-            ]
-            
-            # Sum all matching sales records for this combination
-            if not matching_sales.empty:
-                sales_qty_total = matching_sales[data['sales_qty_col']].sum()
-                sales_value_total = matching_sales[data['sales_value_col']].sum()
-                matches_found += 1
-                
-                # Debug first few matches
-                if matches_found <= 3:
-                    print(f"🔍 MATCH {matches_found}: {branch}/{sl_code}/{product} -> Sales Qty: {sales_qty_total}, Sales Value: {sales_value_total}")
-            else:
-                sales_qty_total = 0
-                sales_value_total = 0
-            
-            # Apply the comparison logic for budget vs billed reports
-            final_qty = budget_qty if sales_qty_total > budget_qty else sales_qty_total
-            final_value = budget_value if sales_value_total > budget_value else sales_value_total
-            
-            # Store result
-            final_results.append({
-                'Branch': branch,
-                'SL_Code': sl_code,
-                'Product': product,
-                'Budget_Qty': budget_qty,
-                'Sales_Qty': sales_qty_total,
-                'Final_Qty': final_qty,
-                'Budget_Value': budget_value,
-                'Sales_Value': sales_value_total,
-                'Final_Value': final_value
-            })
-        
-        print(f"🔍 Total matches found: {matches_found} out of {len(budget_valid)} budget records")
-        
-        # Convert to DataFrame for easier manipulation
-        results_df = pd.DataFrame(final_results)
-        
-        if results_df.empty:
-            print("❌ No results generated")
-            return None
-            
-        # Debug: Show results summary
-        print("🔍 Results summary by branch:")
-        branch_summary = results_df.groupby('Branch').agg({
-            'Budget_Qty': 'sum',
-            'Sales_Qty': 'sum', 
-            'Final_Qty': 'sum'
-        })
-        print(branch_summary.to_string())
-        
-        # Continue with the rest of the processing...
-        # [Rest of the code remains the same as before]
-        
-        # Get default branches
-        if data['selected_branches']:
-            default_branches = data['selected_branches']
+
+def _sales_source(data):
+    """Arguments of sales_facts/sales_facts_file for the request's sales sheet."""
+    return dict(
+        path=os.path.join('uploads', data['sales_filename']),
+        columns={
+            'date': data['sales_date_col'], 'executive': data['sales_exec_col'], 'branch': data['sales_area_col'],
+            'sl_code': data['sales_sl_code_col'], 'product_group': data['sales_product_group_col'],
+            'qty': data['sales_qty_col'], 'value': data['sales_value_col'],
+        },
+        sheet_name=data['sales_sheet'],
+        header=data['sales_header'] - 1,
+        dtype={'SL Code': str},
+        dayfirst=True
+    )
+
+
+def _sales_totals(data):
+    """
+    (months, totals per (MONTH, branch, SL code, product), totals per (MONTH,
+    branch)) of the selected executives' sales; None when they have no rows.
+    """
+    # Sales come from the typed fact table of the sheet (built once per file version)
+    facts = sales_facts(**_sales_source(data))
+    print(f"🔍 Sales facts loaded: {len(facts)} rows")
+
+    # Filter by executives
+    if data['selected_sales_execs']:
+        facts = facts[fact_isin(facts, 'executive', data['selected_sales_execs'])]
+        print(f"🔍 After sales exec filter: {len(facts)} rows")
+    if facts.empty:
+        return None
+
+    # Label every sales row with its month; a month is reported if it has sales before the branch filter
+    months = chronological(fact_month_labels(facts).dropna().unique())
+
+    # Standardize sales branches, SL codes and product groups exactly like Streamlit,
+    # once per distinct value of the fact table's columns
+    sales_df = pd.DataFrame({
+        MONTH: fact_month_labels(facts),
+        data['sales_area_col']: fact_dimension(facts, 'branch', _sales_branch),
+        data['sales_sl_code_col']: fact_dimension(facts, 'sl_code', _sl_code),
+        data['sales_product_group_col']: fact_dimension(facts, 'product_group', _product_group),
+        data['sales_qty_col']: facts['qty'].fillna(0),
+        data['sales_value_col']: facts['value'].fillna(0),
+    })
+    if data['selected_branches']:
+        sales_df = sales_df[sales_df[data['sales_area_col']].isin(data['selected_branches'])].copy()
+        print(f"🔍 After sales branch filter: {len(sales_df)} rows")
+
+    print("Sales sample (branch, sl_code, product):")
+    print(sales_df[[data['sales_area_col'], data['sales_sl_code_col'], data['sales_product_group_col']]].head(3).to_string())
+
+    # One pass over the sales rows for all months
+    keys = [data['sales_area_col'], data['sales_sl_code_col'], data['sales_product_group_col']]
+    sales_totals = sum_by_month(sales_df, keys, data['sales_qty_col'], data['sales_value_col'])
+    area_totals = sum_by_month(sales_df, keys[:1], data['sales_qty_col'], data['sales_value_col'])
+    return months, sales_totals, area_totals
+
+
+def _sql_sales_totals(data):
+    """_sales_totals computed in DuckDB over the fact table's Parquet copy (see query_engine)."""
+    file = sales_facts_file(**_sales_source(data))
+    if file is None:
+        return _sales_totals(data)
+    view = parquet_view(file)
+
+    where = {'executive': data['selected_sales_execs']} if data['selected_sales_execs'] else {}
+    month_rows = view_sums(view, ['month'], [], where=where)
+    print(f"🔍 Sales rows for the selected executives: {int(month_rows['rows'].sum())}")
+    if not month_rows['rows'].sum():
+        return None
+    dated = month_rows['month'][month_rows['month'] != NO_MONTH]
+    months = chronological(format_months(dated, '%b %y'))
+
+    # Branch filter on the raw branches whose standardized name was selected
+    if data['selected_branches']:
+        raw = [None if pd.isna(b) else b for b in distinct_values(view, 'branch')]
+        where['branch'] = [b for b in raw if _sales_branch('nan' if b is None else b) in data['selected_branches']]
+
+    # Sum per raw (month, branch, SL code, product group), then standardize the
+    # distinct raw values and re-add the few groups that collapse together
+    sums = view_sums(view, ['month', 'branch', 'sl_code', 'product_group'], ['qty', 'value'], where=where)
+    labels = np.full(len(sums), np.nan, dtype=object)
+    dated = (sums['month'] != NO_MONTH).to_numpy()
+    labels[dated] = format_months(sums['month'][dated], '%b %y')
+    keys = [data['sales_area_col'], data['sales_sl_code_col'], data['sales_product_group_col']]
+    rows = pd.DataFrame({
+        MONTH: labels,
+        keys[0]: normalize_column(sums['branch'].fillna('nan'), _sales_branch),
+        keys[1]: normalize_column(sums['sl_code'].fillna('nan'), _sl_code),
+        keys[2]: normalize_column(sums['product_group'].fillna('nan'), _product_group),
+        data['sales_qty_col']: sums['qty'].fillna(0),
+        data['sales_value_col']: sums['value'].fillna(0),
+    })
+    sales_totals = sum_by_month(rows, keys, data['sales_qty_col'], data['sales_value_col'])
+    area_totals = sum_by_month(rows, keys[:1], data['sales_qty_col'], data['sales_value_col'])
+    return months, sales_totals, area_totals
+
+
+def _build_all_months(data):
+    # read_sheet returns a private copy of the cached parse
+    budget_df = read_sheet(
+        os.path.join('uploads', data['budget_filename']), 
+        sheet_name=data['budget_sheet'], 
+        header=data['budget_header'] - 1, 
+        dtype={'SL Code': str}
+    )
+    
+    print(f"🔍 Initial data loaded - Budget: {len(budget_df)} rows")
+    
+    # Convert and clean numeric columns
+    budget_df[data['budget_value_col']] = pd.to_numeric(budget_df[data['budget_value_col']], errors='coerce').fillna(0)
+    budget_df[data['budget_qty_col']] = pd.to_numeric(budget_df[data['budget_qty_col']], errors='coerce').fillna(0)
+    
+    # Filter by executives
+    if data['selected_budget_execs']:
+        budget_df = budget_df[budget_df[data['budget_exec_col']].isin(data['selected_budget_execs'])].copy()
+        print(f"🔍 After budget exec filter: {len(budget_df)} rows")
+
+    # Sales totals per month for the selected executives and branches
+    sales = _sql_sales_totals(data) if sql_enabled() else _sales_totals(data)
+    if sales is None or budget_df.empty:
+        print("❌ No data found for selected executives in one or both files.")
+        return {}
+
+    months, sales_totals, area_totals = sales
+    print(f"🔍 Months in sales data: {months}")
+
+    if not months:
+        print("❌ No dated sales rows found")
+        return {}
+
+    # Standardize string columns
+    budget_df[data['budget_area_col']] = budget_df[data['budget_area_col']].astype(str).str.strip()
+    budget_df[data['budget_product_group_col']] = budget_df[data['budget_product_group_col']].astype(str).str.strip()
+    budget_df[data['budget_sl_code_col']] = budget_df[data['budget_sl_code_col']].astype(str).str.strip().str.replace('\\.0$', '', regex=True)
+
+    # Apply branch mapping exactly like Streamlit
+    budget_df[data['budget_area_col']] = budget_df[data['budget_area_col']].str.split(' - ').str[-1].str.upper()
+    budget_df[data['budget_area_col']] = budget_df[data['budget_area_col']].str.replace('AAAA - ', '', regex=False).str.upper()
+    budget_df[data['budget_area_col']] = budget_df[data['budget_area_col']].replace(branch_mapping)
+    
+    # Apply branch filtering if specified
+    if data['selected_branches']:
+        budget_df = budget_df[budget_df[data['budget_area_col']].isin(data['selected_branches'])].copy()
+        print(f"🔍 After budget branch filter: {len(budget_df)} rows")
+
+    # Standardize product groups and SL codes exactly like Streamlit
+    budget_df[data['budget_product_group_col']] = budget_df[data['budget_product_group_col']].str.upper()
+    budget_df[data['budget_sl_code_col']] = budget_df[data['budget_sl_code_col']].str.upper()
+
+    # Debug: Show sample data AFTER processing
+    print("🔍 AFTER PROCESSING:")
+    print("Budget sample (branch, sl_code, product):")
+    print(budget_df[[data['budget_area_col'], data['budget_sl_code_col'], data['budget_product_group_col']]].head(3).to_string())
+
+    # Group by Branch + SL Code + Product Group and sum quantities/values
+    budget_grouped = budget_df.groupby([
+        data['budget_area_col'],
+        data['budget_sl_code_col'], 
+        data['budget_product_group_col']
+    ]).agg({
+        data['budget_qty_col']: 'sum',
+        data['budget_value_col']: 'sum'
+    }).reset_index()
+    
+    # Filter: Only include rows where BOTH qty > 0 AND value > 0
+    budget_valid = budget_grouped[
+        (budget_grouped[data['budget_qty_col']] > 0) & 
+        (budget_grouped[data['budget_value_col']] > 0)
+    ].copy()
+    
+    print(f"🔍 Valid budget combinations: {len(budget_valid)}")
+    
+    if budget_valid.empty:
+        print("❌ No valid budget data found (with qty > 0 and value > 0).")
+        return {}
+
+    budget_branches = budget_df[data['budget_area_col']].dropna().unique().tolist()
+
+    results = {}
+    for month in months:
+        results[month] = _month_tables(
+            data, month, budget_valid, budget_branches,
+            sales_totals[sales_totals[MONTH] == month],
+            area_totals[area_totals[MONTH] == month]
+        )
+    print(f"✅ Budget vs Billed calculated for {len(results)} months")
+    return results
+
+
+def _month_tables(data, month, budget_valid, budget_branches, month_sales, month_areas):
+    """The four budget vs billed tables for one month's sales totals."""
+    # Sum matching sales (same branch + sl_code + product) for every budget line in one pass
+    matched = attach_sales_totals(
+        budget_valid, month_sales,
+        [data['budget_area_col'], data['budget_sl_code_col'], data['budget_product_group_col']],
+        [data['sales_area_col'], data['sales_sl_code_col'], data['sales_product_group_col']],
+        data['sales_qty_col'], data['sales_value_col']
+    )
+    matches_found = int(matched[HAS_SALES].sum())
+
+    # Apply the comparison logic for budget vs billed reports
+    results_df = pd.DataFrame({
+        'Branch': matched[data['budget_area_col']],
+        'SL_Code': matched[data['budget_sl_code_col']],
+        'Product': matched[data['budget_product_group_col']],
+        'Budget_Qty': matched[data['budget_qty_col']],
+        'Sales_Qty': matched[SALES_QTY],
+        'Final_Qty': cap_at_budget(matched[data['budget_qty_col']], matched[SALES_QTY]),
+        'Budget_Value': matched[data['budget_value_col']],
+        'Sales_Value': matched[SALES_VALUE],
+        'Final_Value': cap_at_budget(matched[data['budget_value_col']], matched[SALES_VALUE])
+    }).reset_index(drop=True)
+    
+    print(f"🔍 {month}: {matches_found} matches out of {len(budget_valid)} budget records")
+    
+    # Get default branches
+    if data['selected_branches']:
+        default_branches = data['selected_branches']
+    else:
+        all_sales_branches = month_areas[data['sales_area_col']].dropna().unique().tolist()
+        default_branches = sorted(set(all_sales_branches + budget_branches))
+
+    # Build QUANTITY DataFrame
+    qty_data = []
+    for area in default_branches:
+        area_qty_data = results_df[results_df['Branch'] == area]
+        
+        if not area_qty_data.empty:
+            budget_val = round(float(area_qty_data['Budget_Qty'].sum()), 2)
+            billed_val = round(float(area_qty_data['Final_Qty'].sum()), 2)
         else:
-            all_sales_branches = filtered_sales_df[data['sales_area_col']].dropna().unique().tolist()
-            all_budget_branches = budget_df[data['budget_area_col']].dropna().unique().tolist()
-            default_branches = sorted(set(all_sales_branches + all_budget_branches))
-
-        # Build QUANTITY DataFrame
-        qty_data = []
-        for area in default_branches:
-            area_qty_data = results_df[results_df['Branch'] == area]
-            
-            if not area_qty_data.empty:
-                budget_val = round(float(area_qty_data['Budget_Qty'].sum()), 2)
-                billed_val = round(float(area_qty_data['Final_Qty'].sum()), 2)
-            else:
-                budget_val = 0.0
-                billed_val = 0.0
-            
-            percentage = round((billed_val / budget_val) * 100, 2) if budget_val > 0 else 0.0
-            
-            qty_data.append({
-                'Area': area,
-                'Budget Qty': budget_val,
-                'Billed Qty': billed_val,
-                '%': percentage
-            })
-        
-        budget_vs_billed_qty_df = pd.DataFrame(qty_data)
-        
-        # Build VALUE DataFrame
-        value_data = []
-        for area in default_branches:
-            area_value_data = results_df[results_df['Branch'] == area]
-            
-            if not area_value_data.empty:
-                budget_val = round(float(area_value_data['Budget_Value'].sum()), 2)
-                billed_val = round(float(area_value_data['Final_Value'].sum()), 2)
-            else:
-                budget_val = 0.0
-                billed_val = 0.0
-            
-            percentage = round((billed_val / budget_val) * 100, 2) if budget_val > 0 else 0.0
-            
-            value_data.append({
-                'Area': area,
-                'Budget Value': budget_val,
-                'Billed Value': billed_val,
-                '%': percentage
-            })
-        
-        budget_vs_billed_value_df = pd.DataFrame(value_data)
+            budget_val = 0.0
+            billed_val = 0.0
         
-        # Create Overall Sales DataFrames
-        overall_sales_data = filtered_sales_df.groupby(data['sales_area_col']).agg({
-            data['sales_qty_col']: 'sum',
-            data['sales_value_col']: 'sum'
-        }).reset_index()
-        overall_sales_data.columns = ['Area', 'Overall_Sales_Qty', 'Overall_Sales_Value']
+        percentage = round((billed_val / budget_val) * 100, 2) if budget_val > 0 else 0.0
         
-        budget_totals = results_df.groupby('Branch').agg({
-            'Budget_Qty': 'sum',
-            'Budget_Value': 'sum'
-        }).reset_index()
-        budget_totals.columns = ['Area', 'Budget_Qty', 'Budget_Value']
-        
-        # Overall Sales Quantity DataFrame
-        overall_sales_qty_df = pd.DataFrame({'Area': default_branches})
-        overall_sales_qty_df = pd.merge(
-            overall_sales_qty_df,
-            budget_totals[['Area', 'Budget_Qty']].rename(columns={'Budget_Qty': 'Budget Qty'}),
-            on='Area',
-            how='left'
-        ).fillna({'Budget Qty': 0})
-        
-        overall_sales_qty_df = pd.merge(
-            overall_sales_qty_df,
-            overall_sales_data[['Area', 'Overall_Sales_Qty']].rename(columns={'Overall_Sales_Qty': 'Billed Qty'}),
-            on='Area',
-            how='left'
-        ).fillna({'Billed Qty': 0})
-        
-        # Overall Sales Value DataFrame
-        overall_sales_value_df = pd.DataFrame({'Area': default_branches})
-        overall_sales_value_df = pd.merge(
-            overall_sales_value_df,
-            budget_totals[['Area', 'Budget_Value']].rename(columns={'Budget_Value': 'Budget Value'}),
-            on='Area',
-            how='left'
-        ).fillna({'Budget Value': 0})
-        
-        overall_sales_value_df = pd.merge(
-            overall_sales_value_df,
-            overall_sales_data[['Area', 'Overall_Sales_Value']].rename(columns={'Overall_Sales_Value': 'Billed Value'}),
-            on='Area',
-            how='left'
-        ).fillna({'Billed Value': 0})
-        
-        # Add Total Rows
-        total_budget_qty = round(budget_vs_billed_qty_df['Budget Qty'].sum(), 2)
-        total_billed_qty = round(budget_vs_billed_qty_df['Billed Qty'].sum(), 2)
-        total_percentage_qty = round((total_billed_qty / total_budget_qty * 100), 2) if total_budget_qty > 0 else 0.0
-        
-        total_row_qty = pd.DataFrame({
-            'Area': ['TOTAL'],
-            'Budget Qty': [total_budget_qty],
-            'Billed Qty': [total_billed_qty],
-            '%': [total_percentage_qty]
+        qty_data.append({
+            'Area': area,
+            'Budget Qty': budget_val,
+            'Billed Qty': billed_val,
+            '%': percentage
         })
-        budget_vs_billed_qty_df = pd.concat([budget_vs_billed_qty_df, total_row_qty], ignore_index=True)
-        
-        total_budget_value = round(budget_vs_billed_value_df['Budget Value'].sum(), 2)
-        total_billed_value = round(budget_vs_billed_value_df['Billed Value'].sum(), 2)
-        total_percentage_value = round((total_billed_value / total_budget_value * 100), 2) if total_budget_value > 0 else 0.0
-        
-        total_row_value = pd.DataFrame({
-            'Area': ['TOTAL'],
-            'Budget Value': [total_budget_value],
-            'Billed Value': [total_billed_value],
-            '%': [total_percentage_value]
-        })
-        budget_vs_billed_value_df = pd.concat([budget_vs_billed_value_df, total_row_value], ignore_index=True)
+    
+    budget_vs_billed_qty_df = pd.DataFrame(qty_data)
+    
+    # Build VALUE DataFrame
+    value_data = []
+    for area in default_branches:
+        area_value_data = results_df[results_df['Branch'] == area]
+        
+        if not area_value_data.empty:
+            budget_val = round(float(area_value_data['Budget_Value'].sum()), 2)
+            billed_val = round(float(area_value_data['Final_Value'].sum()), 2)
+        else:
+            budget_val = 0.0
+            billed_val = 0.0
         
-        total_row_overall_qty = pd.DataFrame({
-            'Area': ['TOTAL'],
-            'Budget Qty': [round(overall_sales_qty_df['Budget Qty'].sum(), 2)],
-            'Billed Qty': [round(overall_sales_qty_df['Billed Qty'].sum(), 2)]
-        })
-        overall_sales_qty_df = pd.concat([overall_sales_qty_df, total_row_overall_qty], ignore_index=True)
+        percentage = round((billed_val / budget_val) * 100, 2) if budget_val > 0 else 0.0
         
-        total_row_overall_value = pd.DataFrame({
-            'Area': ['TOTAL'],
-            'Budget Value': [round(overall_sales_value_df['Budget Value'].sum(), 2)],
-            'Billed Value': [round(overall_sales_value_df['Billed Value'].sum(), 2)]
+        value_data.append({
+            'Area': area,
+            'Budget Value': budget_val,
+            'Billed Value': billed_val,
+            '%': percentage
         })
-        overall_sales_value_df = pd.concat([overall_sales_value_df, total_row_overall_value], ignore_index=True)
-        
-        # Convert to integers for final display
-        budget_vs_billed_value_df['Budget Value'] = budget_vs_billed_value_df['Budget Value'].round(0).astype(int)
-        budget_vs_billed_value_df['Billed Value'] = budget_vs_billed_value_df['Billed Value'].round(0).astype(int)
-        budget_vs_billed_qty_df['Budget Qty'] = budget_vs_billed_qty_df['Budget Qty'].round(0).astype(int)
-        budget_vs_billed_qty_df['Billed Qty'] = budget_vs_billed_qty_df['Billed Qty'].round(0).astype(int)
-        overall_sales_qty_df['Budget Qty'] = overall_sales_qty_df['Budget Qty'].round(0).astype(int)
-        overall_sales_qty_df['Billed Qty'] = overall_sales_qty_df['Billed Qty'].round(0).astype(int)
-        overall_sales_value_df['Budget Value'] = overall_sales_value_df['Budget Value'].round(0).astype(int)
-        overall_sales_value_df['Billed Value'] = overall_sales_value_df['Billed Value'].round(0).astype(int)
-        
-        budget_vs_billed_qty_df['%'] = budget_vs_billed_qty_df['%'].round(0).astype(int)
-        budget_vs_billed_value_df['%'] = budget_vs_billed_value_df['%'].round(0).astype(int)
-        
-        print("✅ Budget vs Billed calculation completed successfully!")
-        
-        return {
-            'budget_vs_billed_qty':{
-                'data': budget_vs_billed_qty_df.to_dict(orient='records'),
-                'columns': budget_vs_billed_qty_df.columns.tolist(),
-            },
-            'budget_vs_billed_value': {
-                'data': budget_vs_billed_value_df.to_dict(orient='records'),
-                'columns': budget_vs_billed_value_df.columns.tolist()
-            },
-            'overall_sales_qty': {
-                'data': overall_sales_qty_df.to_dict(orient='records'),
-                'columns': overall_sales_qty_df.columns.tolist()
-            },
-            'overall_sales_value': {
-                'data': overall_sales_value_df.to_dict(orient='records'),
-                'columns': overall_sales_value_df.columns.tolist()
-            }
+    
+    budget_vs_billed_value_df = pd.DataFrame(value_data)
+    
+    # Create Overall Sales DataFrames
+    overall_sales_data = month_areas[[data['sales_area_col'], data['sales_qty_col'], data['sales_value_col']]].copy()
+    overall_sales_data.columns = ['Area', 'Overall_Sales_Qty', 'Overall_Sales_Value']
+    
+    budget_totals = results_df.groupby('Branch').agg({
+        'Budget_Qty': 'sum',
+        'Budget_Value': 'sum'
+    }).reset_index()
+    budget_totals.columns = ['Area', 'Budget_Qty', 'Budget_Value']
+    
+    # Overall Sales Quantity DataFrame
+    overall_sales_qty_df = pd.DataFrame({'Area': default_branches})
+    overall_sales_qty_df = pd.merge(
+        overall_sales_qty_df,
+        budget_totals[['Area', 'Budget_Qty']].rename(columns={'Budget_Qty': 'Budget Qty'}),
+        on='Area',
+        how='left'
+    ).fillna({'Budget Qty': 0})
+    
+    overall_sales_qty_df = pd.merge(
+        overall_sales_qty_df,
+        overall_sales_data[['Area', 'Overall_Sales_Qty']].rename(columns={'Overall_Sales_Qty': 'Billed Qty'}),
+        on='Area',
+        how='left'
+    ).fillna({'Billed Qty': 0})
+    
+    # Overall Sales Value DataFrame
+    overall_sales_value_df = pd.DataFrame({'Area': default_branches})
+    overall_sales_value_df = pd.merge(
+        overall_sales_value_df,
+        budget_totals[['Area', 'Budget_Value']].rename(columns={'Budget_Value': 'Budget Value'}),
+        on='Area',
+        how='left'
+    ).fillna({'Budget Value': 0})
+    
+    overall_sales_value_df = pd.merge(
+        overall_sales_value_df,
+        overall_sales_data[['Area', 'Overall_Sales_Value']].rename(columns={'Overall_Sales_Value': 'Billed Value'}),
+        on='Area',
+        how='left'
+    ).fillna({'Billed Value': 0})
+    
+    # Add Total Rows
+    total_budget_qty = round(budget_vs_billed_qty_df['Budget Qty'].sum(), 2)
+    total_billed_qty = round(budget_vs_billed_qty_df['Billed Qty'].sum(), 2)
+    total_percentage_qty = round((total_billed_qty / total_budget_qty * 100), 2) if total_budget_qty > 0 else 0.0
+    
+    total_row_qty = pd.DataFrame({
+        'Area': ['TOTAL'],
+        'Budget Qty': [total_budget_qty],
+        'Billed Qty': [total_billed_qty],
+        '%': [total_percentage_qty]
+    })
+    budget_vs_billed_qty_df = pd.concat([budget_vs_billed_qty_df, total_row_qty], ignore_index=True)
+    
+    total_budget_value = round(budget_vs_billed_value_df['Budget Value'].sum(), 2)
+    total_billed_value = round(budget_vs_billed_value_df['Billed Value'].sum(), 2)
+    total_percentage_value = round((total_billed_value / total_budget_value * 100), 2) if total_budget_value > 0 else 0.0
+    
+    total_row_value = pd.DataFrame({
+        'Area': ['TOTAL'],
+        'Budget Value': [total_budget_value],
+        'Billed Value': [total_billed_value],
+        '%': [total_percentage_value]
+    })
+    budget_vs_billed_value_df = pd.concat([budget_vs_billed_value_df, total_row_value], ignore_index=True)
+    
+    total_row_overall_qty = pd.DataFrame({
+        'Area': ['TOTAL'],
+        'Budget Qty': [round(overall_sales_qty_df['Budget Qty'].sum(), 2)],
+        'Billed Qty': [round(overall_sales_qty_df['Billed Qty'].sum(), 2)]
+    })
+    overall_sales_qty_df = pd.concat([overall_sales_qty_df, total_row_overall_qty], ignore_index=True)
+    
+    total_row_overall_value = pd.DataFrame({
+        'Area': ['TOTAL'],
+        'Budget Value': [round(overall_sales_value_df['Budget Value'].sum(), 2)],
+        'Billed Value': [round(overall_sales_value_df['Billed Value'].sum(), 2)]
+    })
+    overall_sales_value_df = pd.concat([overall_sales_value_df, total_row_overall_value], ignore_index=True)
+    
+    # Convert to integers for final display
+    budget_vs_billed_value_df['Budget Value'] = budget_vs_billed_value_df['Budget Value'].round(0).astype(int)
+    budget_vs_billed_value_df['Billed Value'] = budget_vs_billed_value_df['Billed Value'].round(0).astype(int)
+    budget_vs_billed_qty_df['Budget Qty'] = budget_vs_billed_qty_df['Budget Qty'].round(0).astype(int)
+    budget_vs_billed_qty_df['Billed Qty'] = budget_vs_billed_qty_df['Billed Qty'].round(0).astype(int)
+    overall_sales_qty_df['Budget Qty'] = overall_sales_qty_df['Budget Qty'].round(0).astype(int)
+    overall_sales_qty_df['Billed Qty'] = overall_sales_qty_df['Billed Qty'].round(0).astype(int)
+    overall_sales_value_df['Budget Value'] = overall_sales_value_df['Budget Value'].round(0).astype(int)
+    overall_sales_value_df['Billed Value'] = overall_sales_value_df['Billed Value'].round(0).astype(int)
+    
+    budget_vs_billed_qty_df['%'] = budget_vs_billed_qty_df['%'].round(0).astype(int)
+    budget_vs_billed_value_df['%'] = budget_vs_billed_value_df['%'].round(0).astype(int)
+    
+    return {
+        'budget_vs_billed_qty':{
+            'data': budget_vs_billed_qty_df.to_dict(orient='records'),
+            'columns': budget_vs_billed_qty_df.columns.tolist(),
+        },
+        'budget_vs_billed_value': {
+            'data': budget_vs_billed_value_df.to_dict(orient='records'),
+            'columns': budget_vs_billed_value_df.columns.tolist()
+        },
+        'overall_sales_qty': {
+            'data': overall_sales_qty_df.to_dict(orient='records'),
+            'columns': overall_sales_qty_df.columns.tolist()
+        },
+        'overall_sales_value': {
+            'data': overall_sales_value_df.to_dict(orient='records'),
+            'columns': overall_sales_value_df.columns.tolist()
         }
-
-    except Exception as e:
-        logger.error(f"Error in calculate_budget_vs_billed: {str(e)}")
-        print(f"❌ Error calculating budget values: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
-        return None
+    }
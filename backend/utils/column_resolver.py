@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from utils.workbook_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Column auto-detection cache
+# =========================
+# The find_column helpers fuzzy-score every alias against every header on
+# each request, although the same export templates come in every month.
+# resolve_column() keys each decision by a hash of the header tuple, the
+# finder (including a digest of its code, so edited matching logic never
+# reuses old answers), the aliases and the finder's options. Decisions are
+# kept in an in-process LRU and in a small SQLite store so they survive
+# restarts and are shared between workers; a repeat upload of a known
+# template never reaches the fuzzy scorer.
+
+STORE_PATH = os.getenv('COLUMN_RESOLVER_DB', os.path.join(CACHE_DIR, 'column_decisions.sqlite3'))
+MAX_ENTRIES = int(os.getenv('COLUMN_RESOLVER_ENTRIES', '4096'))
+_NO_MATCH = -1
+
+_lock = threading.Lock()
+_decisions = OrderedDict()  # decision key -> column position (or _NO_MATCH)
+_stats = {'hits': 0, 'store_hits': 0, 'misses': 0}
+_store_ready = False
+
+
+def header_signature(columns):
+    """Stable hash of a header row (labels, their types and their order)."""
+    return hashlib.sha1(repr(tuple(columns)).encode('utf-8')).hexdigest()
+
+
+def _code_digest(code, digest):
+    digest.update(code.co_code)
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):  # nested helper; its repr carries a memory address
+            _code_digest(const, digest)
+        else:
+            digest.update(repr(const).encode('utf-8'))
+    return digest
+
+
+def _finder_id(finder):
+    digest = _code_digest(finder.__code__, hashlib.sha1()).hexdigest()[:12]
+    return f"{finder.__module__}.{finder.__qualname__}:{digest}"
+
+
+def _decision_key(columns, aliases, finder, options):
+    raw = repr((header_signature(columns), _finder_id(finder), aliases, sorted(options.items())))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _execute(sql, params=()):
+    """Run one statement against the store and return its first row."""
+    global _store_ready
+    os.makedirs(os.path.dirname(STORE_PATH) or '.', exist_ok=True)
+    conn = sqlite3.connect(STORE_PATH, timeout=5)
+    try:
+        with conn:
+            if not _store_ready:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS column_decisions (key TEXT PRIMARY KEY, position INTEGER NOT NULL)"
+                )
+                _store_ready = True
+            return conn.execute(sql, params).fetchone()
+    finally:
+        conn.close()
+
+
+def _load(key):
+    try:
+        row = _execute("SELECT position FROM column_decisions WHERE key = ?", (key,))
+        return row[0] if row else None
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Column decision store unavailable: {e}")
+        return None
+
+
+def _save(key, position):
+    try:
+        _execute("INSERT OR REPLACE INTO column_decisions (key, position) VALUES (?, ?)", (key, position))
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Could not persist column decision: {e}")
+
+
+def _remember(key, position):
+    with _lock:
+        _decisions[key] = position
+        _decisions.move_to_end(key)
+        while len(_decisions) > MAX_ENTRIES:
+            _decisions.popitem(last=False)
+
+
+def resolve_column(columns, aliases, finder, **options):
+    """
+    finder(columns, aliases, **options) for this header row, computed once per
+    (header, finder, aliases, options) and then served from the cache.
+    finder must be deterministic and return one of columns or None.
+    """
+    columns = list(columns)
+    if not isinstance(aliases, str):  # a bare string is passed through as is
+        aliases = tuple(aliases)
+    key = _decision_key(columns, aliases, finder, options)
+
+    with _lock:
+        position = _decisions.get(key)
+        if position is not None:
+            _decisions.move_to_end(key)
+            _stats['hits'] += 1
+    if position is None and os.path.exists(STORE_PATH):
+        position = _load(key)
+        if position is not None and position < len(columns):
+            _remember(key, position)
+            with _lock:
+                _stats['store_hits'] += 1
+        else:
+            position = None
+
+    if position is None:
+        with _lock:
+            _stats['misses'] += 1
+        match = finder(columns, aliases if isinstance(aliases, str) else list(aliases), **options)
+        if match is None:
+            position = _NO_MATCH
+        elif match in columns:
+            position = columns.index(match)
+        else:
+            return match  # not a header label; nothing sensible to cache
+        _remember(key, position)
+        _save(key, position)
+
+    return None if position == _NO_MATCH else columns[position]
+
+
+def column_resolver_stats():
+    with _lock:
+        return dict(_stats, entries=len(_decisions))
+
+
+def clear_column_decisions(persistent=False):
+    """Forget in-process decisions (and the on-disk store when persistent=True)."""
+    with _lock:
+        _decisions.clear()
+    if persistent and os.path.exists(STORE_PATH):
+        try:
+            _execute("DELETE FROM column_decisions")
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Could not clear column decision store: {e}")
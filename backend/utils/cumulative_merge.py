@@ -0,0 +1,196 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import traceback
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import pandas as pd
+
+from utils.result_store import get_table, put_table, result_key
+from utils.workbook_cache import PARQUET_AVAILABLE
+
+if PARQUET_AVAILABLE:
+    import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Cumulative monthly merge
+# =========================
+# /api/process and /api/download take up to twelve monthly workbooks. They
+# used to parse them one after another, each by trying openpyxl, then xlrd,
+# then calamine, and /download parsed again what /process had just parsed.
+# The reader engine is now picked from the file signature (zip container ->
+# openpyxl, or calamine for .xlsb; OLE2 compound file -> xlrd); the other
+# engines are only tried if that one fails. Months not parsed before are
+# parsed concurrently in a process pool (CUMULATIVE_WORKERS processes,
+# default one per core), and every parsed month is kept in the result store
+# keyed by the upload's SHA-256, month and options, so the download and
+# repeated previews reuse it. Months are combined through Arrow schema
+# unification (a column missing from a month becomes nulls of its type),
+# falling back to pd.concat for columns Arrow can't type consistently.
+
+ENGINES = ('openpyxl', 'xlrd', 'calamine')
+MAX_WORKERS = int(os.getenv('CUMULATIVE_WORKERS', str(os.cpu_count() or 1)))
+_OLE2 = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+_lock = threading.Lock()
+_pool = {'executor': None}
+
+
+def sniff_engine(data):
+    """pandas engine for a workbook's bytes, from its signature (None when unrecognized)."""
+    if data[:4] == b'PK\x03\x04':
+        try:
+            with zipfile.ZipFile(BytesIO(data)) as archive:
+                if 'xl/workbook.bin' in archive.namelist():
+                    return 'calamine'
+        except zipfile.BadZipFile:
+            return None
+        return 'openpyxl'
+    if data[:8] == _OLE2:
+        return 'xlrd'
+    return None
+
+
+def _read_workbook(data, header, filename):
+    engine = sniff_engine(data)
+    engines = [engine] + [e for e in ENGINES if e != engine] if engine else list(ENGINES)
+    for position, name in enumerate(engines):
+        try:
+            return pd.read_excel(BytesIO(data), header=header, engine=name)
+        except Exception as e:
+            if position == len(engines) - 1:
+                raise
+            logger.warning(f"{name} failed for {filename}, trying {engines[position + 1]}: {e}")
+
+
+def parse_month_file(data, month, filename, skip_first_row=False):
+    """
+    Frame of one monthly workbook (bytes): column names stripped, infinities
+    blanked, Month (unless the sheet has one) and Source File added. None if
+    it is empty or unreadable.
+    """
+    try:
+        logger.info(f"Reading Excel file: {filename}")
+        df = _read_workbook(data, None if skip_first_row else 0, filename)
+
+        if skip_first_row and not df.empty:
+            df.columns = df.iloc[0]
+            df = df.iloc[1:]
+
+        if not df.empty:
+            # Clean column names
+            df.columns = [str(col).strip() for col in df.columns]
+
+            # Replace problematic values
+            df = df.replace([float('inf'), -float('inf')], None)
+
+            # Add metadata
+            if "Month" not in df.columns:
+                df["Month"] = month
+            df["Source File"] = filename
+
+            logger.info(f"Processed {filename}: {len(df)} rows, {len(df.columns)} columns")
+            return df
+        else:
+            logger.warning(f"Empty dataframe from {filename}")
+            return None
+
+    except Exception as e:
+        logger.error(f"Error reading {filename}: {str(e)}")
+        logger.error(traceback.format_exc())
+        return None
+
+
+def _month_key(data, month, filename, skip_first_row):
+    return result_key('cumulative_month', hashlib.sha256(data).hexdigest(), month, filename, bool(skip_first_row))
+
+
+def _executor():
+    with _lock:
+        if _pool['executor'] is None:
+            method = 'forkserver' if os.name == 'posix' else 'spawn'
+            context = multiprocessing.get_context(method)
+            _pool['executor'] = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=context)
+        return _pool['executor']
+
+
+def _reset_executor():
+    with _lock:
+        executor, _pool['executor'] = _pool['executor'], None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_all(pending, skip_first_row, progress):
+    """{index: frame or None} for pending [(index, month, filename, data)], in parallel when worthwhile."""
+    # daemonic processes (background jobs) can't start a pool of their own
+    parallel = len(pending) > 1 and MAX_WORKERS > 1 and not multiprocessing.current_process().daemon
+    parsed = {}
+    if parallel:
+        try:
+            executor = _executor()
+            futures = {
+                executor.submit(parse_month_file, data, month, filename, skip_first_row): index
+                for index, month, filename, data in pending
+            }
+            for future, index in futures.items():
+                parsed[index] = future.result()
+                if progress:
+                    progress(len(parsed), len(pending))
+            return parsed
+        except BrokenProcessPool as e:
+            logger.warning(f"Parse pool broke ({e}); parsing the remaining files here")
+            _reset_executor()
+    for index, month, filename, data in pending:
+        if index not in parsed:
+            parsed[index] = parse_month_file(data, month, filename, skip_first_row)
+            if progress:
+                progress(len(parsed), len(pending))
+    return parsed
+
+
+def parse_month_files(uploads, skip_first_row=False, progress=None):
+    """
+    parse_month_file of each (month, filename, bytes) upload, in order.
+    Uploads parsed before (same bytes, month, name and options) come from
+    the result store; the rest are parsed concurrently. progress(done,
+    total) is called as files finish.
+    """
+    frames, pending, keys = [None] * len(uploads), [], {}
+    for index, (month, filename, data) in enumerate(uploads):
+        keys[index] = _month_key(data, month, filename, skip_first_row)
+        stored = get_table(keys[index])
+        if stored is not None:
+            frames[index] = stored[0]
+        else:
+            pending.append((index, month, filename, data))
+    if len(pending) < len(uploads):
+        logger.info(f"Reusing {len(uploads) - len(pending)} of {len(uploads)} parsed month files")
+
+    for index, df in _parse_all(pending, skip_first_row, progress).items():
+        frames[index] = df
+        if df is not None and not df.empty:
+            put_table(keys[index], df, {'month': uploads[index][0], 'filename': uploads[index][1]})
+    return frames
+
+
+def combine_frames(frames):
+    """
+    Rows of all frames under the union of their columns (in order of first
+    appearance), like pd.concat(frames, ignore_index=True); missing cells
+    are null (None in text columns).
+    """
+    if PARQUET_AVAILABLE and len(frames) > 1:
+        try:
+            tables = [pa.Table.from_pandas(df, preserve_index=False) for df in frames]
+            return pa.concat_tables(tables, promote_options='permissive').to_pandas()
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, ValueError, TypeError) as e:
+            logger.debug(f"Combining month files with pd.concat: {e}")
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,140 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from utils.budget_matching import _freeze, cached_report, frame_fingerprint
+from utils.date_parsing import parse_dates
+from utils.normalizers import factorize_values
+from utils.query_engine import query, sql_enabled
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Billed-customer (NBC) counts
+# =========================
+# Both NBC reports (per branch in nbc_od_utils, per executive in
+# executive_nbc) count distinct customers per month, one table per financial
+# year. They used to derive the financial year row by row, slice the sales
+# frame once per year and run groupby(...).nunique() over the raw rows on
+# every request. customer_cube() reduces a sheet once to its distinct
+# (month, branch, executive, customer) combinations - usually a small
+# fraction of the rows - and caches that per dataset. A request maps the
+# distinct raw branch/executive values to its own names and filters, and
+# customer_counts() runs a single groupby([key, month]).nunique() over the
+# reduced table, covering every financial year at once. Financial years and
+# month labels are derived from month numbers, not per-row dates. With the
+# DuckDB engine (query_engine) the reduction and the counts run as SQL.
+
+
+def financial_years(months, two_digit=False):
+    """
+    April-March financial year label ('2024-2025', or '24-25' with
+    two_digit) of each month number (months since Jan 1970).
+    """
+    months = np.asarray(months, dtype=np.int64)
+    year, month = months // 12 + 1970, months % 12 + 1
+    # two-digit labels subtract after taking the year mod 100, as the reports always have
+    start = (year % 100 if two_digit else year) - (month < 4)
+    starts, inverse = np.unique(start, return_inverse=True)
+    labels = np.array([f"{s}-{s + 1}" for s in starts], dtype=object)
+    return labels[inverse.reshape(-1)]
+
+
+def format_months(months, fmt='%b %Y'):
+    """fmt label of each month number, formatting every distinct month once."""
+    months = np.asarray(months, dtype=np.int64)
+    distinct, inverse = np.unique(months, return_inverse=True)
+    labels = np.array([pd.Period(ordinal=int(m), freq='M').strftime(fmt) for m in distinct], dtype=object)
+    return labels[inverse.reshape(-1)]
+
+
+def _build_cube(sales_df, date_col, customer_id_col, dims, dayfirst):
+    dates = parse_dates(sales_df[date_col], dayfirst=dayfirst).to_numpy(dtype='datetime64[ns]')
+    valid = ~np.isnat(dates)
+    columns = {'month': dates[valid].astype('datetime64[M]').astype(np.int64)}
+    # nunique ignores missing customers; they stay as -1 so their rows still show up as groups
+    columns['customer'] = pd.factorize(sales_df[customer_id_col].to_numpy()[valid])[0]
+    values = {}
+    for i, dim in enumerate(dims):
+        codes, values[dim] = factorize_values(sales_df[dim])
+        columns[i] = codes[valid]
+
+    if sql_enabled():
+        distinct = query("SELECT DISTINCT * FROM combos", combos=pd.DataFrame(
+            {name if isinstance(name, str) else f"d{name}": codes for name, codes in columns.items()}))
+        distinct.columns = list(columns)
+    else:
+        distinct = pd.DataFrame(columns).drop_duplicates()
+    logger.info(f"Customer cube: {valid.sum()} dated rows -> {len(distinct)} distinct combinations")
+    return {
+        'month': distinct['month'].to_numpy(),
+        'customer': distinct['customer'].to_numpy(),
+        'codes': {dim: distinct[i].to_numpy() for i, dim in enumerate(dims)},
+        'values': values,
+    }
+
+
+def customer_cube(sales_df, date_col, customer_id_col, dims, dayfirst=False, sources=None):
+    """
+    Cached distinct (month, *dims, customer) combinations of the sales rows
+    with a valid date (parse_dates(..., dayfirst)). 'values'[dim] holds the
+    distinct raw values of each dim (a Series of the column's dtype) and
+    'codes'[dim] indexes them per combination. sources identifies an
+    unmodified file read (see od_engine.od_cube); without it the frame's
+    contents key the cache.
+    """
+    dims = list(dict.fromkeys(dims))
+    if sources is not None:
+        content = ('sources', _freeze(sources))
+    else:
+        content = frame_fingerprint(sales_df, list(dict.fromkeys([date_col, customer_id_col] + dims)))
+    key = ('customer_cube', content, _freeze([date_col, customer_id_col, dims, dayfirst]))
+    return cached_report(key, lambda: _build_cube(sales_df, date_col, customer_id_col, dims, dayfirst))
+
+
+def cube_mask(cube, where=None, months=None):
+    """
+    Combinations whose dim values are allowed by where ({dim: boolean array
+    over cube['values'][dim]}) and whose month is in months (if given).
+    """
+    mask = np.ones(len(cube['month']), dtype=bool)
+    for dim, allowed in (where or {}).items():
+        mask &= np.asarray(allowed, dtype=bool)[cube['codes'][dim]]
+    if months is not None:
+        mask &= np.isin(cube['month'], list(months))
+    return mask
+
+
+def customer_counts(cube, dim, keys, mask=None):
+    """
+    Distinct customers per (key, month) over the combinations in mask, where
+    keys gives the output key of each distinct value of dim - the equivalent
+    of rows.groupby([key, month])[customer].nunique(). Returns a DataFrame
+    [key, month, count]; groups whose customers are all missing count 0.
+    """
+    mask = np.ones(len(cube['month']), dtype=bool) if mask is None else mask
+    if sql_enabled():
+        return _sql_customer_counts(cube, dim, keys, mask)
+    customers = cube['customer'][mask]
+    reduced = pd.DataFrame({
+        'key': np.asarray(keys, dtype=object)[cube['codes'][dim][mask]],
+        'month': cube['month'][mask],
+        'customer': np.where(customers >= 0, customers, np.nan),
+    })
+    return reduced.groupby(['key', 'month'])['customer'].nunique().reset_index(name='count')
+
+
+def _sql_customer_counts(cube, dim, keys, mask):
+    """customer_counts as one COUNT(DISTINCT) in DuckDB, grouped by sorted key codes."""
+    key_codes, unique_keys = pd.factorize(np.asarray(keys, dtype=object)[cube['codes'][dim][mask]], sort=True)
+    counts = query(
+        "SELECT key, month, count(DISTINCT customer) FILTER (WHERE customer >= 0) AS count "
+        "FROM reduced WHERE key >= 0 GROUP BY key, month ORDER BY key, month",
+        reduced=pd.DataFrame({'key': key_codes, 'month': cube['month'][mask], 'customer': cube['customer'][mask]}),
+    )
+    return pd.DataFrame({
+        'key': np.asarray(unique_keys, dtype=object)[counts['key'].to_numpy()],
+        'month': counts['month'].to_numpy(dtype=np.int64),
+        'count': counts['count'].to_numpy(dtype=np.int64),
+    })
@@ -0,0 +1,120 @@
+import datetime
+import logging
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Date-column parsing
+# =========================
+# Uploaded sheets carry dates as text ('01/04/2024'), as datetime cells, or
+# as a mix, and every report used to re-run pd.to_datetime(dayfirst=...) on
+# them and then strftime every row to compare months as strings.
+# parse_dates() gives the same result as
+# pd.to_datetime(values, dayfirst=..., errors='coerce'): the format is
+# inferred once per column (from its first value, as pandas does), and the
+# distinct values are converted with that explicit format and broadcast back.
+# Columns it can't reason about fall back to pandas as a whole;
+# parse_mixed_dates() does the same for format='mixed' parsing. Month
+# filters compare Periods (in_months) and labels are formatted once per
+# distinct month (month_labels). workbook_cache.read_sheet(date_columns=...)
+# caches the parsed columns together with the sheet.
+
+# Leading values pandas skips when it picks the value to infer a format from
+_SKIPPED_FIRST = {'', 'nan', 'nat', 'now', 'today'}
+
+
+def _is_datetime(value):
+    return isinstance(value, (datetime.datetime, datetime.date, np.datetime64)) and \
+        getattr(value, 'tzinfo', None) is None
+
+
+def infer_date_format(first_value, dayfirst=False):
+    """strptime format pandas would infer for a column starting with first_value (None if unsure)."""
+    if type(first_value) is not str or first_value.strip().lower() in _SKIPPED_FIRST:
+        return None
+    fmt = guess_datetime_format(first_value, dayfirst=dayfirst)
+    if fmt is None or '%z' in fmt or '%Z' in fmt:
+        return None
+    return fmt
+
+
+def parse_dates(values, dayfirst=False):
+    """
+    pd.to_datetime(values, dayfirst=dayfirst, errors='coerce') for a Series,
+    parsing each distinct value once with an explicit inferred format.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    if series.dtype != object:
+        return pd.to_datetime(series, dayfirst=dayfirst, errors='coerce')
+
+    codes, uniques = pd.factorize(series)
+    parsed = np.full(len(uniques), np.datetime64('NaT'), dtype='datetime64[ns]')
+    if len(uniques):
+        fmt = infer_date_format(uniques[0], dayfirst)
+        is_text = np.fromiter((type(v) is str for v in uniques), dtype=bool, count=len(uniques))
+        is_date = np.fromiter((_is_datetime(v) for v in uniques), dtype=bool, count=len(uniques))
+        if fmt is not None and (is_text | is_date).all():
+            parsed[is_text] = pd.to_datetime(uniques[is_text], format=fmt, errors='coerce').to_numpy('datetime64[ns]')
+            if is_date.any():
+                parsed[is_date] = pd.to_datetime(uniques[is_date], errors='coerce').to_numpy('datetime64[ns]')
+        else:
+            logger.debug(f"No single date format for {series.name!r}; parsing its values individually")
+            parsed[:] = pd.to_datetime(pd.Series(uniques, dtype=object), dayfirst=dayfirst,
+                                       errors='coerce').to_numpy('datetime64[ns]')
+
+    result = np.full(len(codes), np.datetime64('NaT'), dtype='datetime64[ns]')
+    present = codes >= 0
+    result[present] = parsed[codes[present]]
+    return pd.Series(result, index=series.index, name=series.name)
+
+
+def parse_mixed_dates(values, dayfirst=False):
+    """
+    pd.to_datetime(values, dayfirst=dayfirst, errors='coerce', format='mixed')
+    for a Series. 'mixed' parses every value on its own, so each distinct
+    text/datetime value is parsed once and broadcast back.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    if series.dtype == object:
+        codes, uniques = pd.factorize(series)
+        if all(type(v) is str or _is_datetime(v) for v in uniques):
+            parsed = pd.to_datetime(pd.Series(uniques, dtype=object), dayfirst=dayfirst, errors='coerce',
+                                    format='mixed')
+            if parsed.dtype == 'datetime64[ns]':
+                result = np.full(len(codes), np.datetime64('NaT'), dtype='datetime64[ns]')
+                present = codes >= 0
+                result[present] = parsed.to_numpy()[codes[present]]
+                return pd.Series(result, index=series.index, name=series.name)
+    return pd.to_datetime(series, dayfirst=dayfirst, errors='coerce', format='mixed')
+
+
+def month_period(label, fmt='%b %y'):
+    """Period('YYYY-MM') for a month label such as 'Apr 24'; None if it doesn't round-trip through fmt."""
+    try:
+        period = pd.Period(datetime.datetime.strptime(str(label), fmt), freq='M')
+    except ValueError:
+        return None
+    # strptime is case-insensitive; a string comparison against strftime was not
+    return period if period.strftime(fmt) == str(label) else None
+
+
+def in_months(dates, labels, fmt='%b %y'):
+    """Boolean mask equal to dates.dt.strftime(fmt).isin(labels), compared as Periods."""
+    if labels is None or isinstance(labels, str):
+        labels = [labels]
+    periods = [p for p in (month_period(label, fmt) for label in labels) if p is not None]
+    return pd.Series(dates.dt.to_period('M').isin(periods), index=dates.index)
+
+
+def month_labels(dates, fmt='%b %y'):
+    """fmt label of each date (NaN for NaT), formatting every distinct month once; fmt may only use month/year fields."""
+    codes, months = pd.factorize(dates.dt.to_period('M'))
+    labels = np.full(len(codes), np.nan, dtype=object)
+    present = codes >= 0
+    if present.any():
+        labels[present] = np.asarray(months.strftime(fmt), dtype=object)[codes[present]]
+    return pd.Series(labels, index=dates.index)
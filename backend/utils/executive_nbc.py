@@ -3,6 +3,9 @@ import numpy as np
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import logging
+from utils.workbook_cache import read_sheet
+from utils.normalizers import normalize_column, normalizer
+from utils.customer_counts import cube_mask, customer_counts, customer_cube, financial_years, format_months
 import os
 from pathlib import Path
 
@@ -19,6 +22,7 @@ def determine_financial_year(date):
     else:
         return f"{year-1}-{year}"
 
+@normalizer
 def extract_area_name(area):
     """Extract and standardize area/branch names"""
     if pd.isna(area) or not str(area).strip():
@@ -60,6 +64,13 @@ def extract_area_name(area):
     
     return area_upper
 
+@normalizer
+def extract_executive_name(executive):
+    """Standardize executive names, treating null/empty as 'BLANK'"""
+    if pd.isna(executive) or str(executive).strip() == '':
+        return 'BLANK'
+    return str(executive).strip().upper()
+
 # ==================== BILLED CUSTOMERS FUNCTIONS (UNCHANGED) ====================
 
 def auto_map_customer_columns(sales_df):
@@ -133,13 +144,11 @@ def get_customer_options(sales_df, date_col, branch_col, executive_col):
         }
 
 def create_customer_table(sales_df, date_col, branch_col, customer_id_col, executive_col, 
-                         selected_months=None, selected_branches=None, selected_executives=None):
+                         selected_months=None, selected_branches=None, selected_executives=None, sources=None):
     """
     Creates a table of unique customer counts per executive for selected months, branches, and executives.
     """
     try:
-        sales_df = sales_df.copy()
-        
         # Validate columns
         required_columns = [date_col, branch_col, customer_id_col, executive_col]
         for col in required_columns:
@@ -149,9 +158,10 @@ def create_customer_table(sales_df, date_col, branch_col, customer_id_col, execu
                     'error': f"Column '{col}' not found in sales data."
                 }
         
-        # Convert date column to datetime
+        # Distinct (month, branch, executive, customer) of the dated rows, cached per dataset
         try:
-            sales_df[date_col] = pd.to_datetime(sales_df[date_col], errors='coerce', dayfirst=True)
+            cube = customer_cube(sales_df, date_col, customer_id_col, [branch_col, executive_col],
+                                 dayfirst=True, sources=sources)
         except Exception as e:
             return {
                 'success': False,
@@ -159,28 +169,25 @@ def create_customer_table(sales_df, date_col, branch_col, customer_id_col, execu
             }
         
         # Check for valid dates
-        valid_dates = sales_df[date_col].notna()
-        if not valid_dates.any():
+        if not len(cube['month']):
             return {
                 'success': False,
                 'error': f"Column '{date_col}' contains no valid dates."
             }
         
-        # Extract month-year for filtering
-        sales_df['Month_Year'] = sales_df[date_col].dt.strftime('%b %Y')
-        
         # Filter by selected months if provided
+        months = np.unique(cube['month'])
         if selected_months:
-            sales_df = sales_df[sales_df['Month_Year'].isin(selected_months)]
-            if sales_df.empty:
+            months = months[pd.Series(format_months(months)).isin(selected_months).to_numpy()]
+            if not len(months):
                 return {
                     'success': False,
                     'error': f"No data found for selected months: {', '.join(selected_months)}"
                 }
         
-        # Determine financial year
-        sales_df['Financial_Year'] = sales_df[date_col].apply(determine_financial_year)
-        available_financial_years = sales_df['Financial_Year'].dropna().unique()
+        # Determine financial year of each month
+        month_fy = financial_years(months)
+        available_financial_years = pd.unique(month_fy)
         
         if len(available_financial_years) == 0:
             return {
@@ -188,17 +195,17 @@ def create_customer_table(sales_df, date_col, branch_col, customer_id_col, execu
                 'error': "No valid financial years found in the data."
             }
         
+        # Standardize branch and executive names once per distinct value
+        branch_names = cube['values'][branch_col].astype(str).str.strip().str.upper()
+        executive_names = cube['values'][executive_col].astype(str).str.strip().str.upper()
+        
         result_dict = {}
         
         for fin_year in sorted(available_financial_years):
-            fy_df = sales_df[sales_df['Financial_Year'] == fin_year].copy()
-            if fy_df.empty:
-                continue
+            fy_months = months[month_fy == fin_year]
             
-            # Extract unique months in chronological order
-            fy_df['Month_Year_Period'] = fy_df[date_col].dt.to_period('M')
-            available_months_periods = fy_df['Month_Year_Period'].unique()
-            month_names = [pd.to_datetime(str(m) + '-01').strftime('%b %Y') for m in sorted(available_months_periods)]
+            # Unique months in chronological order
+            month_names = list(format_months(fy_months))
             
             if not month_names:
                 continue
@@ -209,25 +216,19 @@ def create_customer_table(sales_df, date_col, branch_col, customer_id_col, execu
                 if not month_names:
                     continue
             
-            # Standardize branch and executive names
-            try:
-                fy_df['Branch'] = fy_df[branch_col].astype(str).str.strip().str.upper()
-                fy_df['Executive_Upper'] = fy_df[executive_col].astype(str).str.strip().str.upper()
-            except Exception as e:
-                logger.error(f"Error processing columns: {e}")
-                continue
-            
             # Apply branch filter if provided
+            where = {}
             if selected_branches:
-                fy_df = fy_df[fy_df['Branch'].isin([b.upper() for b in selected_branches])]
-                if fy_df.empty:
-                    continue
+                where[branch_col] = branch_names.isin([b.upper() for b in selected_branches]).to_numpy()
+            fy_rows = cube_mask(cube, where, fy_months)
+            if selected_branches and not fy_rows.any():
+                continue
+            fy_executives = executive_names.to_numpy()[np.unique(cube['codes'][executive_col][fy_rows])]
             
             # Determine executives to display based on both branch and executive selections
             if selected_branches:
                 # If branches are selected, get executives associated with those branches
-                branch_df = fy_df[fy_df['Branch'].isin([b.upper() for b in selected_branches])]
-                branch_executives = sorted(branch_df['Executive_Upper'].dropna().unique())
+                branch_executives = sorted(set(fy_executives))
                 
                 # If specific executives are also selected, use intersection
                 if selected_executives:
@@ -237,19 +238,25 @@ def create_customer_table(sales_df, date_col, branch_col, customer_id_col, execu
                     executives_to_display = branch_executives
             else:
                 # Use provided selected_executives or all executives in filtered data
-                executives_to_display = [str(e).upper() for e in selected_executives] if selected_executives else sorted(fy_df['Executive_Upper'].dropna().unique())
+                executives_to_display = [str(e).upper() for e in selected_executives] if selected_executives else sorted(set(fy_executives))
             
             # Apply executive filter
             if executives_to_display:
-                fy_df = fy_df[fy_df['Executive_Upper'].isin(executives_to_display)]
-                if fy_df.empty:
+                where[executive_col] = executive_names.isin(executives_to_display).to_numpy()
+                fy_rows = cube_mask(cube, where, fy_months)
+                if not fy_rows.any():
                     continue
             
             if not executives_to_display:
                 continue
             
-            # Group by executive and month to count unique customer codes
-            grouped_df = fy_df.groupby(['Executive_Upper', 'Month_Year'])[customer_id_col].nunique().reset_index(name='Customer_Count')
+            # Count unique customer codes per executive and month
+            grouped_df = customer_counts(cube, executive_col, executive_names, fy_rows)
+            grouped_df = pd.DataFrame({
+                'Executive_Upper': grouped_df['key'],
+                'Month_Year': format_months(grouped_df['month']),
+                'Customer_Count': grouped_df['count'],
+            })
             
             # Pivot to create table with months as columns
             pivot_df = grouped_df.pivot_table(
@@ -358,7 +365,7 @@ def get_od_options(os_df, due_date_col, area_col, executive_col):
         years = sorted(os_df[due_date_col].dt.year.dropna().astype(int).unique().tolist())
         
         # Get branches using extract_area_name
-        os_branches = sorted(set([b for b in os_df[area_col].apply(extract_area_name).dropna().unique() if b]))
+        os_branches = sorted(set([b for b in normalize_column(os_df[area_col], extract_area_name).dropna().unique() if b]))
         
         # Get executives
         os_executives = sorted(os_df[executive_col].dropna().astype(str).unique().tolist())
@@ -393,8 +400,8 @@ def filter_os_qty(os_df, os_area_col, os_qty_col, os_due_date_col, os_exec_col,
                 }
         
         os_df = os_df.copy()
-        os_df[os_area_col] = os_df[os_area_col].apply(extract_area_name).astype(str).str.strip().str.upper()
-        os_df[os_exec_col] = os_df[os_exec_col].apply(lambda x: 'BLANK' if pd.isna(x) or str(x).strip() == '' else str(x).strip().upper())
+        os_df[os_area_col] = normalize_column(os_df[os_area_col], extract_area_name).astype(str).str.strip().str.upper()
+        os_df[os_exec_col] = normalize_column(os_df[os_exec_col], extract_executive_name)
         
         try:
             os_df[os_due_date_col] = pd.to_datetime(os_df[os_due_date_col], errors='coerce')
@@ -524,7 +531,7 @@ def load_data(file_path):
         if file_path.endswith('.csv'):
             return pd.read_csv(file_path)
         elif file_path.endswith(('.xlsx', '.xls')):
-            return pd.read_excel(file_path)
+            return read_sheet(file_path)
         else:
             raise ValueError(f"Unsupported file format: {file_path}")
     except Exception as e:
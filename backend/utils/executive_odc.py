@@ -3,11 +3,15 @@ import numpy as np
 import os
 from pathlib import Path
 import logging
+from utils.workbook_cache import read_sheet
+from utils.normalizers import normalize_column, normalizer
+from utils.od_engine import OS_FIRST, OS_SECOND, SALES, month_number, od_cube, od_sums
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
 logger = logging.getLogger(__name__)
 
+@normalizer
 def extract_area_name(area):
     """Extract and standardize area/branch name"""
     if pd.isna(area) or not str(area).strip():
@@ -91,7 +95,7 @@ def get_od_executives_and_branches(os_jan, os_feb, total_sale,
             (total_sale, sale_area_col)
         ]:
             if area_col in df.columns:
-                branches = df[area_col].apply(extract_area_name).dropna().astype(str).str.upper().unique().tolist()
+                branches = normalize_column(df[area_col], extract_area_name).dropna().astype(str).str.upper().unique().tolist()
                 all_branches.update([b for b in branches if b])
         
         return {
@@ -252,61 +256,68 @@ def calculate_od_values(os_jan, os_feb, total_sale, selected_month_str,
                         os_jan_due_date_col, os_jan_ref_date_col, os_jan_net_value_col, os_jan_exec_col, os_jan_sl_code_col, os_jan_area_col,
                         os_feb_due_date_col, os_feb_ref_date_col, os_feb_net_value_col, os_feb_exec_col, os_feb_sl_code_col, os_feb_area_col,
                         sale_bill_date_col, sale_due_date_col, sale_value_col, sale_exec_col, sale_sl_code_col, sale_area_col,
-                        selected_executives, selected_branches=None):
+                        selected_executives, selected_branches=None, sources=None):
     """
     Flask version of OD Target vs Collection calculation with improved individual executive report logic
-    and consistent 2-decimal formatting
+    and consistent 2-decimal formatting.
+    sources optionally identifies the three files (see od_engine.od_cube) so the cube lookup skips hashing them.
     """
     try:
-        # Convert and validate numeric cols
-        for df, col, file in [
-            (os_jan, os_jan_net_value_col, "OS Jan"),
-            (os_feb, os_feb_net_value_col, "OS Feb"),
-            (total_sale, sale_value_col, "Total Sale")
+        for df, col in [(os_jan, os_jan_sl_code_col), (os_feb, os_feb_sl_code_col), (total_sale, sale_sl_code_col)]:
+            df[col]  # mapped columns must exist
+        if os_feb_ref_date_col not in os_feb.columns:
+            os_feb = os_feb.copy()
+            os_feb[os_feb_ref_date_col] = pd.NaT
+
+        # One cached pass over the three files; every month is then a lookup (utils.od_engine)
+        cube = od_cube(
+            os_jan, os_feb, total_sale,
+            cols={
+                'os_first_due': os_jan_due_date_col, 'os_first_value': os_jan_net_value_col,
+                'os_second_due': os_feb_due_date_col, 'os_second_ref': os_feb_ref_date_col,
+                'os_second_value': os_feb_net_value_col,
+                'sale_bill': sale_bill_date_col, 'sale_due': sale_due_date_col, 'sale_value': sale_value_col,
+            },
+            dims={
+                OS_FIRST: [os_jan_area_col, os_jan_exec_col],
+                OS_SECOND: [os_feb_area_col, os_feb_exec_col],
+                SALES: [sale_area_col, sale_exec_col],
+            },
+            sources=sources,
+        )
+
+        # Validate numeric cols
+        for table, col, file in [
+            (OS_FIRST, os_jan_net_value_col, "OS Jan"),
+            (OS_SECOND, os_feb_net_value_col, "OS Feb"),
+            (SALES, sale_value_col, "Total Sale")
         ]:
-            try:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-                if df[col].isna().all():
-                    return {"success": False, "error": f"Column '{col}' in {file} contains no valid numeric data."}
-            except Exception as e:
-                return {"success": False, "error": f"Error processing column '{col}' in {file}: {e}"}
-
-        # Clip negative
-        os_jan[os_jan_net_value_col] = os_jan[os_jan_net_value_col].clip(lower=0)
-        os_feb[os_feb_net_value_col] = os_feb[os_feb_net_value_col].clip(lower=0)
-
-        # Standardize branch
-        os_jan[os_jan_area_col] = os_jan[os_jan_area_col].apply(extract_area_name).astype(str).str.strip().str.upper()
-        os_feb[os_feb_area_col] = os_feb[os_feb_area_col].apply(extract_area_name).astype(str).str.strip().str.upper()
-        total_sale[sale_area_col] = total_sale[sale_area_col].apply(extract_area_name).astype(str).str.strip().str.upper()
-
-        # Branch filter
-        if selected_branches:
-            os_jan = os_jan[os_jan[os_jan_area_col].isin([b.upper() for b in selected_branches])]
-            os_feb = os_feb[os_feb[os_feb_area_col].isin([b.upper() for b in selected_branches])]
-            total_sale = total_sale[total_sale[sale_area_col].isin([b.upper() for b in selected_branches])]
-
-        # Date conversion + exec normalization
-        os_jan[os_jan_due_date_col] = pd.to_datetime(os_jan[os_jan_due_date_col], errors='coerce')
-        os_jan[os_jan_ref_date_col] = pd.to_datetime(os_jan.get(os_jan_ref_date_col), errors='coerce')
-        os_jan["SL Code"] = os_jan[os_jan_sl_code_col].astype(str)
-        os_jan["Executive"] = os_jan[os_jan_exec_col].astype(str).str.strip().str.upper()
-
-        os_feb[os_feb_due_date_col] = pd.to_datetime(os_feb[os_feb_due_date_col], errors='coerce')
-        os_feb[os_feb_ref_date_col] = pd.to_datetime(os_feb.get(os_feb_ref_date_col), errors='coerce')
-        os_feb["SL Code"] = os_feb[os_feb_sl_code_col].astype(str)
-        os_feb["Executive"] = os_feb[os_feb_exec_col].astype(str).str.strip().str.upper()
-
-        total_sale[sale_bill_date_col] = pd.to_datetime(total_sale[sale_bill_date_col], errors='coerce')
-        total_sale[sale_due_date_col] = pd.to_datetime(total_sale[sale_due_date_col], errors='coerce')
-        total_sale["SL Code"] = total_sale[sale_sl_code_col].astype(str)
-        total_sale["Executive"] = total_sale[sale_exec_col].astype(str).str.strip().str.upper()
+            if cube['all_nan'][table]:
+                return {"success": False, "error": f"Column '{col}' in {file} contains no valid numeric data."}
+
+        # Standardize branch + exec normalization, once per distinct (area, executive)
+        groups = {}
+        for table, area_col, exec_col in [
+            (OS_FIRST, os_jan_area_col, os_jan_exec_col),
+            (OS_SECOND, os_feb_area_col, os_feb_exec_col),
+            (SALES, sale_area_col, sale_exec_col)
+        ]:
+            g = cube['groups'][table]
+            g = pd.DataFrame({
+                'Area': normalize_column(g[area_col], extract_area_name).astype(str).str.strip().str.upper(),
+                'Executive': g[exec_col].astype(str).str.strip().str.upper(),
+                'rows': g['rows'],
+            })
+            # Branch filter
+            if selected_branches:
+                g = g[g['Area'].isin([b.upper() for b in selected_branches])]
+            groups[table] = g
 
         # ✅ FIXED EXECUTIVE FILTERING (borrowed logic from NBC)
         if selected_branches:
-            branch_execs = set(os_jan.loc[os_jan[os_jan_area_col].isin([b.upper() for b in selected_branches]), "Executive"].dropna())
-            branch_execs.update(os_feb.loc[os_feb[os_feb_area_col].isin([b.upper() for b in selected_branches]), "Executive"].dropna())
-            branch_execs.update(total_sale.loc[total_sale[sale_area_col].isin([b.upper() for b in selected_branches]), "Executive"].dropna())
+            branch_execs = set()
+            for g in groups.values():
+                branch_execs.update(g["Executive"].dropna())
             branch_execs = {str(e).strip().upper() for e in branch_execs}
 
             if selected_executives:
@@ -316,21 +327,20 @@ def calculate_od_values(os_jan, os_feb, total_sale, selected_month_str,
                 executives_to_display = sorted(branch_execs)
         else:
             executives_to_display = [str(e).strip().upper() for e in selected_executives] if selected_executives else \
-                                    sorted(set(os_jan["Executive"].dropna()) | set(os_feb["Executive"].dropna()) | set(total_sale["Executive"].dropna()))
+                                    sorted(set(groups[OS_FIRST]["Executive"].dropna()) | set(groups[OS_SECOND]["Executive"].dropna()) | set(groups[SALES]["Executive"].dropna()))
 
         # Filter data by selected executives
-        os_jan_filtered = os_jan[os_jan["Executive"].isin(executives_to_display)]
-        os_feb_filtered = os_feb[os_feb["Executive"].isin(executives_to_display)]
-        total_sale_filtered = total_sale[total_sale["Executive"].isin(executives_to_display)]
+        shown = {table: g[g["Executive"].isin(executives_to_display)] for table, g in groups.items()}
+        os_jan_empty, os_feb_empty, total_sale_empty = (shown[t].empty for t in (OS_FIRST, OS_SECOND, SALES))
 
         # CRITICAL FIX: Check if we have ANY data, not if ALL datasets have data
-        if total_sale_filtered.empty and os_jan_filtered.empty and os_feb_filtered.empty:
+        if total_sale_empty and os_jan_empty and os_feb_empty:
             return {"success": False, "error": "No data found for selected executives."}
         
         # Check for partial data and prepare warning message
-        executives_in_sale = set(total_sale_filtered["Executive"].unique())
-        executives_in_os_jan = set(os_jan_filtered["Executive"].unique())
-        executives_in_os_feb = set(os_feb_filtered["Executive"].unique())
+        executives_in_sale = set(shown[SALES]["Executive"].unique())
+        executives_in_os_jan = set(shown[OS_FIRST]["Executive"].unique())
+        executives_in_os_feb = set(shown[OS_SECOND]["Executive"].unique())
         
         partial_data_execs = []
         warning_message = ""
@@ -342,30 +352,29 @@ def calculate_od_values(os_jan, os_feb, total_sale, selected_month_str,
             warning_message = f"Note: {', '.join(partial_data_execs)} found only in sales data, not in OS files. OS calculations will show as 0."
 
         specified_date = pd.to_datetime("01-" + selected_month_str, format="%d-%b-%y")
-        specified_month_end = specified_date + pd.offsets.MonthEnd(0)
+        month = month_number(specified_date)
+
+        def executive_sums(measure, table, name):
+            keys = shown[table]["Executive"].reindex(cube['groups'][table].index)
+            sums = od_sums(cube, measure, month, keys, count='rows')
+            sums.columns = ["Executive", name]
+            return sums
 
         # Due Target - Handle empty os_jan_filtered
-        if not os_jan_filtered.empty:
-            due_target_sum = os_jan_filtered[os_jan_filtered[os_jan_due_date_col] <= specified_month_end] \
-                .groupby("Executive")[os_jan_net_value_col].sum().reset_index()
-            due_target_sum.columns = ["Executive", "Due Target"]
+        if not os_jan_empty:
+            due_target_sum = executive_sums('due', OS_FIRST, "Due Target")
         else:
             due_target_sum = pd.DataFrame(columns=["Executive", "Due Target"])
 
         # OS Jan Coll - Handle empty os_jan_filtered
-        if not os_jan_filtered.empty:
-            os_jan_coll_sum = os_jan_filtered[os_jan_filtered[os_jan_due_date_col] <= specified_month_end] \
-                .groupby("Executive")[os_jan_net_value_col].sum().reset_index()
-            os_jan_coll_sum.columns = ["Executive", "OS Jan Coll"]
+        if not os_jan_empty:
+            os_jan_coll_sum = executive_sums('due', OS_FIRST, "OS Jan Coll")
         else:
             os_jan_coll_sum = pd.DataFrame(columns=["Executive", "OS Jan Coll"])
 
         # OS Feb Coll - Handle empty os_feb_filtered
-        if not os_feb_filtered.empty:
-            os_feb_coll_sum = os_feb_filtered[(os_feb_filtered[os_feb_ref_date_col] < specified_date) &
-                                     (os_feb_filtered[os_feb_due_date_col] <= specified_month_end)] \
-                .groupby("Executive")[os_feb_net_value_col].sum().reset_index()
-            os_feb_coll_sum.columns = ["Executive", "OS Feb Coll"]
+        if not os_feb_empty:
+            os_feb_coll_sum = executive_sums('carried', OS_SECOND, "OS Feb Coll")
         else:
             os_feb_coll_sum = pd.DataFrame(columns=["Executive", "OS Feb Coll"])
 
@@ -380,12 +389,8 @@ def calculate_od_values(os_jan, os_feb, total_sale, selected_month_str,
         )
 
         # Overdue - Handle empty total_sale_filtered
-        if not total_sale_filtered.empty:
-            overdue_sum = total_sale_filtered[
-                total_sale_filtered[sale_bill_date_col].between(specified_date, specified_month_end) &
-                total_sale_filtered[sale_due_date_col].between(specified_date, specified_month_end)
-            ].groupby("Executive")[sale_value_col].sum().reset_index()
-            overdue_sum.columns = ["Executive", "For the month Overdue"]
+        if not total_sale_empty:
+            overdue_sum = executive_sums('overdue', SALES, "For the month Overdue")
         else:
             overdue_sum = pd.DataFrame(columns=["Executive", "For the month Overdue"])
 
@@ -395,12 +400,8 @@ def calculate_od_values(os_jan, os_feb, total_sale, selected_month_str,
         else:
             sale_value_sum = pd.DataFrame(columns=["Executive", "Sale Value"])
         
-        if not os_feb_filtered.empty:
-            os_feb_month_sum = os_feb_filtered[
-                os_feb_filtered[os_feb_ref_date_col].between(specified_date, specified_month_end) &
-                os_feb_filtered[os_feb_due_date_col].between(specified_date, specified_month_end)
-            ].groupby("Executive")[os_feb_net_value_col].sum().reset_index()
-            os_feb_month_sum.columns = ["Executive", "OS Month Collection"]
+        if not os_feb_empty:
+            os_feb_month_sum = executive_sums('month_os', OS_SECOND, "OS Month Collection")
         else:
             os_feb_month_sum = pd.DataFrame(columns=["Executive", "OS Month Collection"])
 
@@ -482,7 +483,7 @@ def load_data(file_path):
         if file_path.endswith('.csv'):
             return pd.read_csv(file_path)
         elif file_path.endswith(('.xlsx', '.xls')):
-            return pd.read_excel(file_path)
+            return read_sheet(file_path)
         else:
             raise ValueError(f"Unsupported file format: {file_path}")
     except Exception as e:
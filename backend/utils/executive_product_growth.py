@@ -5,6 +5,10 @@ import numpy as np
 import os
 from pathlib import Path
 import logging
+from utils.workbook_cache import read_sheet
+from utils.date_parsing import in_months, month_labels, parse_dates, parse_mixed_dates
+from utils.normalizers import normalize_column
+from utils.product_growth_engine import growth_percent, growth_positions, growth_sums
 
 logger = logging.getLogger(__name__)
 
@@ -43,9 +47,12 @@ def create_sl_code_mapping(ly_df, cy_df, budget_df, ly_sl_code_col, cy_sl_code_c
             return {}
         
         combined = pd.concat(mappings, ignore_index=True)
-        combined['COMPANY_GROUP'] = combined['COMPANY_GROUP'].apply(standardize_name)
+        combined['COMPANY_GROUP'] = normalize_column(combined['COMPANY_GROUP'], standardize_name)
         
-        mapping_df = combined.groupby('SL_CODE')['COMPANY_GROUP'].agg(lambda x: x.mode()[0] if not x.empty else "").reset_index()
+        # Most frequent group per SL code, the alphabetically first on ties (Series.mode()[0])
+        counts = combined.groupby(['SL_CODE', 'COMPANY_GROUP'], sort=False).size().reset_index(name='ROWS')
+        mapping_df = counts.sort_values(['ROWS', 'COMPANY_GROUP'], ascending=[False, True], kind='stable') \
+            .drop_duplicates('SL_CODE')
         sl_code_map = dict(zip(mapping_df['SL_CODE'], mapping_df['COMPANY_GROUP']))
         
         return sl_code_map
@@ -56,21 +63,23 @@ def create_sl_code_mapping(ly_df, cy_df, budget_df, ly_sl_code_col, cy_sl_code_c
 
 def apply_sl_code_mapping(df, sl_code_col, company_group_col, sl_code_map):
     """Apply SL Code mapping - EXACT STREAMLIT LOGIC"""
+    standardized = normalize_column(df[company_group_col], standardize_name)
     if not sl_code_col or sl_code_col not in df.columns or not sl_code_map:
-        return df[company_group_col].apply(standardize_name)
+        return standardized
     
     try:
-        def map_company(row):
-            if pd.isna(row[sl_code_col]) or row[sl_code_col] == "":
-                return standardize_name(row[company_group_col])
-            sl_code = str(row[sl_code_col]).strip()
-            return sl_code_map.get(sl_code, standardize_name(row[company_group_col]))
+        def map_code(sl_code):
+            if pd.isna(sl_code) or sl_code == "":
+                return None
+            return sl_code_map.get(str(sl_code).strip())
         
-        return df.apply(map_company, axis=1)
+        # Each distinct SL code is looked up once; rows without a mapped code keep their own group
+        mapped = normalize_column(df[sl_code_col], map_code)
+        return mapped.where(mapped.notna(), standardized)
         
     except Exception as e:
         logger.error(f"Error applying SL Code mapping: {e}")
-        return df[company_group_col].apply(standardize_name)
+        return standardized
 
 def auto_map_product_growth_columns(ly_df, cy_df, budget_df):
     """Auto-map columns - EXACT STREAMLIT LOGIC"""
@@ -150,9 +159,9 @@ def get_product_growth_options(ly_df, cy_df, budget_df, ly_exec_col, cy_exec_col
         cy_df[cy_company_group_col] = apply_sl_code_mapping(cy_df, cy_sl_code_col, cy_company_group_col, sl_code_map)
         budget_df[budget_company_group_col] = apply_sl_code_mapping(budget_df, budget_sl_code_col, budget_company_group_col, sl_code_map)
         
-        ly_df[ly_product_group_col] = ly_df[ly_product_group_col].apply(standardize_name)
-        cy_df[cy_product_group_col] = cy_df[cy_product_group_col].apply(standardize_name)
-        budget_df[budget_product_group_col] = budget_df[budget_product_group_col].apply(standardize_name)
+        ly_df[ly_product_group_col] = normalize_column(ly_df[ly_product_group_col], standardize_name)
+        cy_df[cy_product_group_col] = normalize_column(cy_df[cy_product_group_col], standardize_name)
+        budget_df[budget_product_group_col] = normalize_column(budget_df[budget_product_group_col], standardize_name)
         
         all_executives = set()
         for df, exec_col in [(ly_df, ly_exec_col), (cy_df, cy_exec_col), (budget_df, budget_exec_col)]:
@@ -189,11 +198,11 @@ def get_product_growth_months(ly_df, cy_df, ly_date_col, cy_date_col):
         ly_df = ly_df.copy()
         cy_df = cy_df.copy()
         
-        ly_df[ly_date_col] = pd.to_datetime(ly_df[ly_date_col], dayfirst=True, errors='coerce')
-        cy_df[cy_date_col] = pd.to_datetime(cy_df[cy_date_col], dayfirst=True, errors='coerce')
+        ly_df[ly_date_col] = parse_dates(ly_df[ly_date_col], dayfirst=True)
+        cy_df[cy_date_col] = parse_dates(cy_df[cy_date_col], dayfirst=True)
         
-        available_ly_months = ly_df[ly_date_col].dt.strftime('%b %y').dropna().unique().tolist()
-        available_cy_months = cy_df[cy_date_col].dt.strftime('%b %y').dropna().unique().tolist()
+        available_ly_months = month_labels(ly_df[ly_date_col]).dropna().unique().tolist()
+        available_cy_months = month_labels(cy_df[cy_date_col]).dropna().unique().tolist()
         
         return {
             'ly_months': sorted(available_ly_months),
@@ -260,14 +269,14 @@ def calculate_product_growth(ly_df, cy_df, budget_df, ly_month, cy_month, ly_dat
             budget_df[budget_company_group_col] = apply_sl_code_mapping(budget_df, budget_sl_code_col, budget_company_group_col, sl_code_map)
         else:
             # Standardize company group names without SL code mapping
-            ly_df[ly_company_group_col] = ly_df[ly_company_group_col].apply(standardize_name)
-            cy_df[cy_company_group_col] = cy_df[cy_company_group_col].apply(standardize_name)
-            budget_df[budget_company_group_col] = budget_df[budget_company_group_col].apply(standardize_name)
+            ly_df[ly_company_group_col] = normalize_column(ly_df[ly_company_group_col], standardize_name)
+            cy_df[cy_company_group_col] = normalize_column(cy_df[cy_company_group_col], standardize_name)
+            budget_df[budget_company_group_col] = normalize_column(budget_df[budget_company_group_col], standardize_name)
         
         # Standardize product group names
-        ly_df[ly_product_group_col] = ly_df[ly_product_group_col].apply(standardize_name)
-        cy_df[cy_product_group_col] = cy_df[cy_product_group_col].apply(standardize_name)
-        budget_df[budget_product_group_col] = budget_df[budget_product_group_col].apply(standardize_name)
+        ly_df[ly_product_group_col] = normalize_column(ly_df[ly_product_group_col], standardize_name)
+        cy_df[cy_product_group_col] = normalize_column(cy_df[cy_product_group_col], standardize_name)
+        budget_df[budget_product_group_col] = normalize_column(budget_df[budget_product_group_col], standardize_name)
         
         # Filter by executives
         if selected_executives:
@@ -284,12 +293,12 @@ def calculate_product_growth(ly_df, cy_df, budget_df, ly_month, cy_month, ly_dat
             return {"success": False, "error": "No data remains after executive filtering. Please check executive selections."}
         
         # Convert dates
-        ly_df[ly_date_col] = pd.to_datetime(ly_df[ly_date_col], dayfirst=True, errors='coerce', format='mixed')
-        cy_df[cy_date_col] = pd.to_datetime(cy_df[cy_date_col], dayfirst=True, errors='coerce', format='mixed')
+        ly_df[ly_date_col] = parse_mixed_dates(ly_df[ly_date_col], dayfirst=True)
+        cy_df[cy_date_col] = parse_mixed_dates(cy_df[cy_date_col], dayfirst=True)
         
         # Get available months
-        available_ly_months = ly_df[ly_date_col].dt.strftime('%b %y').dropna().unique().tolist()
-        available_cy_months = cy_df[cy_date_col].dt.strftime('%b %y').dropna().unique().tolist()
+        available_ly_months = month_labels(ly_df[ly_date_col]).dropna().unique().tolist()
+        available_cy_months = month_labels(cy_df[cy_date_col]).dropna().unique().tolist()
         
         if not available_ly_months or not available_cy_months:
             logger.error("No valid dates found in LY or CY data.")
@@ -297,17 +306,17 @@ def calculate_product_growth(ly_df, cy_df, budget_df, ly_month, cy_month, ly_dat
         
         # Filter by months
         if ly_month:
-            ly_filtered_df = ly_df[ly_df[ly_date_col].dt.strftime('%b %y') == ly_month]
+            ly_filtered_df = ly_df[in_months(ly_df[ly_date_col], ly_month)]
         else:
             latest_ly_month = max(available_ly_months, key=lambda x: pd.to_datetime(f"01 {x}", format="%d %b %y"))
-            ly_filtered_df = ly_df[ly_df[ly_date_col].dt.strftime('%b %y') == latest_ly_month]
+            ly_filtered_df = ly_df[in_months(ly_df[ly_date_col], latest_ly_month)]
             ly_month = latest_ly_month
         
         if cy_month:
-            cy_filtered_df = cy_df[cy_df[cy_date_col].dt.strftime('%b %y') == cy_month]
+            cy_filtered_df = cy_df[in_months(cy_df[cy_date_col], cy_month)]
         else:
             latest_cy_month = max(available_cy_months, key=lambda x: pd.to_datetime(f"01 {x}", format="%d %b %y"))
-            cy_filtered_df = cy_df[cy_df[cy_date_col].dt.strftime('%b %y') == latest_cy_month]
+            cy_filtered_df = cy_df[in_months(cy_df[cy_date_col], latest_cy_month)]
             cy_month = latest_cy_month
         
         if ly_filtered_df.empty or cy_filtered_df.empty:
@@ -382,145 +391,66 @@ def calculate_product_growth(ly_df, cy_df, budget_df, ly_month, cy_month, ly_dat
             logger.error("No valid company groups found in the data.")
             return {"success": False, "error": "No valid company groups found in the data. Please check company group columns."}
         
-        # Result dictionary
-        result = {}
+        # One aligned groupby over (company group, product group) for LY, CY and budget
+        keys, (ly_sums, cy_sums, budget_sums) = growth_sums([
+            (ly_filtered_df, ly_company_group_col, ly_product_group_col, [ly_qty_col, ly_value_col]),
+            (cy_filtered_df, cy_company_group_col, cy_product_group_col, [cy_qty_col, cy_value_col]),
+            (budget_df, budget_company_group_col, budget_product_group_col, [budget_qty_col, budget_value_col]),
+        ])
+        products_by_company = keys.groupby('company', sort=False)['product'].agg(list)
         
+        spans, table_companies, table_products = [], [], []
         for company in company_groups:
-            # Initialize DataFrames
-            qty_df = pd.DataFrame(columns=['PRODUCT GROUP', 'LY_QTY', 'BUDGET_QTY', 'CY_QTY'])
-            value_df = pd.DataFrame(columns=['PRODUCT GROUP', 'LY_VALUE', 'BUDGET_VALUE', 'CY_VALUE'])
-            
-            # Filter data for this company
-            ly_company_df = ly_filtered_df[ly_filtered_df[ly_company_group_col] == company]
-            cy_company_df = cy_filtered_df[cy_filtered_df[cy_company_group_col] == company]
-            budget_company_df = budget_df[budget_df[budget_company_group_col] == company]
-            
-            if ly_company_df.empty and cy_company_df.empty and budget_company_df.empty:
+            if any(company == seen for seen, _, _ in spans):
+                continue  # selected twice; the result holds one table per company
+            if company not in products_by_company.index:
                 logger.warning(f"No data for company group: {company}. Skipping.")
                 continue
             
-            # Get product groups for this company
-            company_product_groups = pd.concat([
-                ly_company_df[ly_product_group_col],
-                cy_company_df[cy_product_group_col],
-                budget_company_df[budget_product_group_col]
-            ]).dropna().unique().tolist()
-            
-            if not company_product_groups:
-                logger.warning(f"No product groups for company: {company}. Skipping.")
-                continue
-            
+            # Product groups for this company, in order of first appearance (LY, CY, budget)
+            company_product_groups = products_by_company[company]
             if selected_product_groups:
                 company_product_groups = [pg for pg in company_product_groups if pg in selected_product_groups]
                 if not company_product_groups:
                     logger.warning(f"No valid product groups for company: {company} after filtering. Skipping.")
                     continue
             
-            # Aggregate data
-            ly_qty = ly_company_df.groupby([ly_company_group_col, ly_product_group_col])[ly_qty_col].sum().reset_index()
-            ly_qty = ly_qty.rename(columns={ly_product_group_col: 'PRODUCT GROUP', ly_qty_col: 'LY_QTY'})
-            
-            cy_qty = cy_company_df.groupby([cy_company_group_col, cy_product_group_col])[cy_qty_col].sum().reset_index()
-            cy_qty = cy_qty.rename(columns={cy_product_group_col: 'PRODUCT GROUP', cy_qty_col: 'CY_QTY'})
-            
-            budget_qty = budget_company_df.groupby([budget_company_group_col, budget_product_group_col])[budget_qty_col].sum().reset_index()
-            budget_qty = budget_qty.rename(columns={budget_product_group_col: 'PRODUCT GROUP', budget_qty_col: 'BUDGET_QTY'})
-            
-            ly_value = ly_company_df.groupby([ly_company_group_col, ly_product_group_col])[ly_value_col].sum().reset_index()
-            ly_value = ly_value.rename(columns={ly_product_group_col: 'PRODUCT GROUP', ly_value_col: 'LY_VALUE'})
-            
-            cy_value = cy_company_df.groupby([cy_company_group_col, cy_product_group_col])[cy_value_col].sum().reset_index()
-            cy_value = cy_value.rename(columns={cy_product_group_col: 'PRODUCT GROUP', cy_value_col: 'CY_VALUE'})
-            
-            budget_value = budget_company_df.groupby([budget_company_group_col, budget_product_group_col])[budget_value_col].sum().reset_index()
-            budget_value = budget_value.rename(columns={budget_product_group_col: 'PRODUCT GROUP', budget_value_col: 'BUDGET_VALUE'})
-            
-            # Create base DataFrames
-            product_qty_df = pd.DataFrame({'PRODUCT GROUP': company_product_groups})
-            product_value_df = pd.DataFrame({'PRODUCT GROUP': company_product_groups})
-            
-            # Store the data first, then calculate ALL percentages at once
-            # Merge data
-            qty_df = product_qty_df.merge(ly_qty[['PRODUCT GROUP', 'LY_QTY']], on='PRODUCT GROUP', how='left')\
-                                   .merge(budget_qty[['PRODUCT GROUP', 'BUDGET_QTY']], on='PRODUCT GROUP', how='left')\
-                                   .merge(cy_qty[['PRODUCT GROUP', 'CY_QTY']], on='PRODUCT GROUP', how='left').fillna(0)
-            
-            value_df = product_value_df.merge(ly_value[['PRODUCT GROUP', 'LY_VALUE']], on='PRODUCT GROUP', how='left')\
-                                       .merge(budget_value[['PRODUCT GROUP', 'BUDGET_VALUE']], on='PRODUCT GROUP', how='left')\
-                                       .merge(cy_value[['PRODUCT GROUP', 'CY_VALUE']], on='PRODUCT GROUP', how='left').fillna(0)
-            
-            # Round all numeric columns to 2 decimal places BEFORE any calculation
-            numeric_cols_qty = ['LY_QTY', 'BUDGET_QTY', 'CY_QTY']
-            numeric_cols_value = ['LY_VALUE', 'BUDGET_VALUE', 'CY_VALUE']
-            
-            for col in numeric_cols_qty:
-                qty_df[col] = qty_df[col].round(2)
-            
-            for col in numeric_cols_value:
-                value_df[col] = value_df[col].round(2)
-            
-            # Calculate totals first
-            total_ly_qty = qty_df['LY_QTY'].sum()
-            total_cy_qty = qty_df['CY_QTY'].sum() 
-            total_budget_qty = qty_df['BUDGET_QTY'].sum()
-            
-            total_ly_value = value_df['LY_VALUE'].sum()
-            total_cy_value = value_df['CY_VALUE'].sum()
-            total_budget_value = value_df['BUDGET_VALUE'].sum()
-            
-            # Add total rows first
-            qty_totals = pd.DataFrame({
-                'PRODUCT GROUP': ['TOTAL'],
-                'LY_QTY': [round(total_ly_qty, 2)],
-                'BUDGET_QTY': [round(total_budget_qty, 2)],
-                'CY_QTY': [round(total_cy_qty, 2)],
-            })
-            qty_df = pd.concat([qty_df, qty_totals], ignore_index=True)
-            
-            value_totals = pd.DataFrame({
-                'PRODUCT GROUP': ['TOTAL'],
-                'LY_VALUE': [round(total_ly_value, 2)],
-                'BUDGET_VALUE': [round(total_budget_value, 2)],
-                'CY_VALUE': [round(total_cy_value, 2)],
-            })
-            value_df = pd.concat([value_df, value_totals], ignore_index=True)
-            
-            # NOW CALCULATE ALL GROWTH % USING IDENTICAL FORMULA
-            # One function, one formula, applied to every single row identically
-            qty_growth_list = []
-            for _, row in qty_df.iterrows():
-                cy = float(row['CY_QTY'])
-                ly = float(row['LY_QTY'])
-                if ly == 0:
-                    growth = 0.00 if cy == 0 else 100.00
-                else:
-                    growth = round(((cy - ly) / ly) * 100, 2)
-                qty_growth_list.append(growth)
-            qty_df['ACHIEVEMENT %'] = qty_growth_list
-            
-            value_growth_list = []
-            for _, row in value_df.iterrows():
-                cy = float(row['CY_VALUE'])
-                ly = float(row['LY_VALUE'])
-                if ly == 0:
-                    growth = 0.00 if cy == 0 else 100.00
-                else:
-                    growth = round(((cy - ly) / ly) * 100, 2)
-                value_growth_list.append(growth)
-            value_df['ACHIEVEMENT %'] = value_growth_list
-            
-            # Reorder columns
-            qty_df = qty_df[['PRODUCT GROUP', 'LY_QTY', 'BUDGET_QTY', 'CY_QTY', 'ACHIEVEMENT %']]
-            value_df = value_df[['PRODUCT GROUP', 'LY_VALUE', 'BUDGET_VALUE', 'CY_VALUE', 'ACHIEVEMENT %']]
-            
-            # ✅ CONSISTENT DECIMAL FORMATTING: Apply 2-decimal formatting to all numeric columns
-            for df in [qty_df, value_df]:
-                numeric_cols = df.select_dtypes(include=[np.number]).columns
-                for col in numeric_cols:
-                    # Format to exactly 2 decimal places
-                    df[col] = df[col].round(2).apply(lambda x: f"{x:.2f}")
-            
-            # Store result
+            spans.append((company, len(table_products), len(table_products) + len(company_product_groups)))
+            table_companies += [company] * len(company_product_groups)
+            table_products += company_product_groups
+        
+        # Every company's rows in one table, rounded to 2 decimals BEFORE any calculation
+        positions = growth_positions(keys, table_companies, table_products)
+        table = pd.DataFrame({'COMPANY': table_companies, 'PRODUCT GROUP': table_products}, dtype=object)
+        for column, summed in [
+            ('LY_QTY', ly_sums[ly_qty_col]), ('BUDGET_QTY', budget_sums[budget_qty_col]), ('CY_QTY', cy_sums[cy_qty_col]),
+            ('LY_VALUE', ly_sums[ly_value_col]), ('BUDGET_VALUE', budget_sums[budget_value_col]), ('CY_VALUE', cy_sums[cy_value_col])
+        ]:
+            table[column] = summed.reindex(positions).fillna(0).round(2).to_numpy()
+        
+        # Add a TOTAL row per company (totals of the rounded values)
+        parts = []
+        for company, lo, hi in spans:
+            part = table.iloc[lo:hi]
+            totals = {column: [round(part[column].sum(), 2)] for column in table.columns[2:]}
+            parts += [part, pd.DataFrame({'COMPANY': [company], 'PRODUCT GROUP': ['TOTAL'], **totals})]
+        table = pd.concat(parts, ignore_index=True) if parts else table
+        
+        # NOW CALCULATE ALL GROWTH % USING IDENTICAL FORMULA, for every row of every company at once
+        table['QTY ACHIEVEMENT %'] = growth_percent(table['CY_QTY'], table['LY_QTY'])
+        table['VALUE ACHIEVEMENT %'] = growth_percent(table['CY_VALUE'], table['LY_VALUE'])
+        
+        # ✅ CONSISTENT DECIMAL FORMATTING: Apply 2-decimal formatting to all numeric columns
+        for col in table.columns[2:]:
+            table[col] = [f"{x:.2f}" for x in table[col].round(2)]
+        
+        # Result dictionary
+        result = {}
+        for company, part in table.groupby('COMPANY', sort=False):
+            qty_df = part[['PRODUCT GROUP', 'LY_QTY', 'BUDGET_QTY', 'CY_QTY', 'QTY ACHIEVEMENT %']] \
+                .rename(columns={'QTY ACHIEVEMENT %': 'ACHIEVEMENT %'})
+            value_df = part[['PRODUCT GROUP', 'LY_VALUE', 'BUDGET_VALUE', 'CY_VALUE', 'VALUE ACHIEVEMENT %']] \
+                .rename(columns={'VALUE ACHIEVEMENT %': 'ACHIEVEMENT %'})
             result[company] = {'qty_df': qty_df, 'value_df': value_df}
         
         if not result:
@@ -556,7 +486,7 @@ def load_data(file_path):
        if file_path.endswith('.csv'):
            return pd.read_csv(file_path)
        elif file_path.endswith(('.xlsx', '.xls')):
-           return pd.read_excel(file_path)
+           return read_sheet(file_path)
        else:
            raise ValueError(f"Unsupported file format: {file_path}")
    except Exception as e:
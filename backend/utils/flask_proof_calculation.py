@@ -1,6 +1,9 @@
+import numpy as np
 import pandas as pd
 from io import BytesIO
 import logging
+from utils.budget_matching import attach_sales_totals, cap_at_budget, SALES_QTY, SALES_VALUE
+from utils.date_parsing import in_months, parse_dates
 
 # Set up logger for Flask
 logger = logging.getLogger(__name__)
@@ -25,8 +28,8 @@ def create_proof_of_calculation_excel(budget_df, sales_df, selected_month,
         budget_df = budget_df.copy()
         
         # Convert sales date and filter by month
-        sales_df[sales_date_col] = pd.to_datetime(sales_df[sales_date_col], dayfirst=True, errors='coerce')
-        filtered_sales_df = sales_df[sales_df[sales_date_col].dt.strftime('%b %y') == selected_month].copy()
+        sales_df[sales_date_col] = parse_dates(sales_df[sales_date_col], dayfirst=True)
+        filtered_sales_df = sales_df[in_months(sales_df[sales_date_col], selected_month)].copy()
         
         # Apply branch filter if provided
         if selected_branches:
@@ -62,9 +65,6 @@ def create_proof_of_calculation_excel(budget_df, sales_df, selected_month,
         filtered_sales_df[sales_qty_col] = pd.to_numeric(filtered_sales_df[sales_qty_col], errors='coerce').fillna(0)
         filtered_sales_df[sales_value_col] = pd.to_numeric(filtered_sales_df[sales_value_col], errors='coerce').fillna(0)
         
-        # Create detailed mapping
-        detailed_records = []
-        
         # Group budget data by executive, sl_code, and product_group
         budget_grouped = budget_df.groupby(['exec_std', 'sl_code_std', 'product_std']).agg({
             budget_exec_col: 'first',
@@ -76,60 +76,39 @@ def create_proof_of_calculation_excel(budget_df, sales_df, selected_month,
             budget_value_col: 'sum'
         }).reset_index()
         
-        for _, budget_row in budget_grouped.iterrows():
-            exec_name = budget_row['exec_std']
-            sl_code = budget_row['sl_code_std']
-            product = budget_row['product_std']
-            budget_qty = budget_row[budget_qty_col]
-            budget_value = budget_row[budget_value_col]
-            
-            # Check if budget conditions are met (qty > 0 AND value > 0)
-            budget_conditions_met = budget_qty > 0 and budget_value > 0
-            
-            if budget_conditions_met:
-                # Find matching sales records
-                matching_sales = filtered_sales_df[
-                    (filtered_sales_df['exec_std'] == exec_name) &
-                    (filtered_sales_df['sl_code_std'] == sl_code) &
-                    (filtered_sales_df['product_std'] == product) &
-                    filtered_sales_df[sales_qty_col].notna() &
-                    filtered_sales_df[sales_value_col].notna()
-                ]
-                
-                # Calculate total sales for this combination
-                sales_qty_total = matching_sales[sales_qty_col].sum() if not matching_sales.empty else 0
-                sales_value_total = matching_sales[sales_value_col].sum() if not matching_sales.empty else 0
-                
-                # Apply min logic (same as calculate_budget_values)
-                final_sales_qty = min(budget_qty, sales_qty_total) if sales_qty_total > 0 else 0
-                final_sales_value = min(budget_value, sales_value_total) if sales_value_total > 0 else 0
-                
-                # Determine match status
-                match_status = 'Mapped' if sales_qty_total > 0 or sales_value_total > 0 else 'No Sales Data'
-            else:
-                # Budget conditions not met, set sales to 0
-                final_sales_qty = 0
-                final_sales_value = 0
-                match_status = 'Budget Invalid'
-            
-            # Create record for detailed view
-            detailed_record = {
-                'Executive Name': budget_row[budget_exec_col],
-                'Executive Code': budget_row[budget_exec_code_col],
-                'Branch': budget_row[budget_area_col],
-                'SL Code': budget_row[budget_sl_code_col],
-                'Product Group': budget_row[budget_product_group_col],
-                'Budget Qty': round(budget_qty, 2),
-                'Budget Value': round(budget_value, 2),
-                'Sales Qty': round(final_sales_qty, 2),
-                'Sales Value': round(final_sales_value, 2),
-                'Match Status': match_status
-            }
-            
-            detailed_records.append(detailed_record)
+        # Sum matching sales per budget line in one grouped join
+        matched = attach_sales_totals(
+            budget_grouped, filtered_sales_df,
+            ['exec_std', 'sl_code_std', 'product_std'],
+            ['exec_std', 'sl_code_std', 'product_std'],
+            sales_qty_col, sales_value_col
+        )
+        budget_qty = matched[budget_qty_col]
+        budget_value = matched[budget_value_col]
+        
+        # Budget lines need qty > 0 AND value > 0; min logic as in calculate_budget_values
+        budget_conditions_met = (budget_qty > 0) & (budget_value > 0)
+        has_sales = (matched[SALES_QTY] > 0) | (matched[SALES_VALUE] > 0)
+        final_sales_qty = cap_at_budget(budget_qty, matched[SALES_QTY], positive_only=True).where(budget_conditions_met, 0)
+        final_sales_value = cap_at_budget(budget_value, matched[SALES_VALUE], positive_only=True).where(budget_conditions_met, 0)
+        match_status = np.where(
+            ~budget_conditions_met, 'Budget Invalid',
+            np.where(has_sales, 'Mapped', 'No Sales Data')
+        )
         
-        # Create DataFrame
-        proof_df = pd.DataFrame(detailed_records)
+        # Create DataFrame for detailed view
+        proof_df = pd.DataFrame({
+            'Executive Name': matched[budget_exec_col],
+            'Executive Code': matched[budget_exec_code_col],
+            'Branch': matched[budget_area_col],
+            'SL Code': matched[budget_sl_code_col],
+            'Product Group': matched[budget_product_group_col],
+            'Budget Qty': budget_qty.round(2),
+            'Budget Value': budget_value.round(2),
+            'Sales Qty': final_sales_qty.round(2),
+            'Sales Value': final_sales_value.round(2),
+            'Match Status': match_status
+        }).reset_index(drop=True)
         
         # Sort by Executive Name, then by SL Code
         proof_df = proof_df.sort_values(['Executive Name', 'SL Code'])
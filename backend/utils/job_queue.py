@@ -0,0 +1,419 @@
+import functools
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from flask import jsonify, request
+
+from utils.workbook_cache import CACHE_DIR, _write_atomic
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Background jobs
+# =========================
+# Heavy report endpoints (region / TS-PW / ERO-PW / product analysis, the
+# consolidated PPTs, the cumulative download) do minutes of pandas work in
+# the request, long enough for nginx to time out while a Flask worker is
+# blocked. Views wrapped in @background_job keep answering synchronously,
+# but a client that asks for it (?async=1 or "Prefer: respond-async") gets a
+# 202 with a job id instead. The request (method, path, headers, body) is
+# saved and replayed against the same view in a child process, and the
+# response it produces (JSON or a file) is kept as the job's result. Jobs
+# live in a SQLite table (JOB_DB), so every web worker sees the same queue
+# and no broker is needed. Each web process runs a dispatcher thread that
+# claims queued jobs while fewer than JOB_WORKERS are running (across all
+# processes) and starts one child per job: cancelling a running job
+# terminates it. Views report progress with report_progress(); finished
+# jobs and their results are removed after JOB_RETENTION seconds.
+
+JOBS_DIR = os.getenv('JOB_DIR', os.path.join(CACHE_DIR, 'jobs'))
+JOB_DB = os.getenv('JOB_DB', os.path.join(JOBS_DIR, 'jobs.sqlite'))
+MAX_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+RETENTION_SECONDS = int(os.getenv('JOB_RETENTION', str(24 * 3600)))
+APP_FACTORY = os.getenv('JOB_APP_FACTORY', 'app:create_app')
+START_METHOD = os.getenv('JOB_START_METHOD', 'forkserver' if os.name == 'posix' else 'spawn')
+POLL_SECONDS = 0.5
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# request headers replayed in the job (the rest describe the original connection)
+REPLAYED_HEADERS = ('Content-Type', 'Cookie', 'Authorization', 'Accept', 'Accept-Language', 'Origin')
+# response headers kept with the result
+KEPT_HEADERS = ('Content-Disposition',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner_pid INTEGER,
+    worker_pid INTEGER,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    result_status INTEGER,
+    result_mimetype TEXT,
+    result_headers TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at);
+"""
+
+_lock = threading.Lock()
+_state = {'schema': None, 'dispatcher': None, 'last_purge': 0.0}
+_running = {}  # job id -> child process started by this web process
+_current = {'job_id': None}  # set in a job's child process
+
+
+class JobError(Exception):
+    """Raised for requests on unknown jobs or results that aren't available."""
+
+
+def _connect():
+    conn = sqlite3.connect(JOB_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    if _state['schema'] != JOB_DB:
+        os.makedirs(os.path.dirname(JOB_DB) or '.', exist_ok=True)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _state['schema'] = JOB_DB
+    return conn
+
+
+def _execute(sql, params=()):
+    conn = _connect()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def _request_path(job_id):
+    return os.path.join(JOBS_DIR, f"{job_id}.request")
+
+
+def _result_path(job_id):
+    return os.path.join(JOBS_DIR, f"{job_id}.result")
+
+
+def _write_pickle(path, obj):
+    def writer(tmp):
+        with open(tmp, 'wb') as fh:
+            pickle.dump(obj, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    _write_atomic(path, writer)
+
+
+def _write_bytes(path, data):
+    def writer(tmp):
+        with open(tmp, 'wb') as fh:
+            fh.write(data)
+    _write_atomic(path, writer)
+
+
+def current_job():
+    """Id of the job this process is running, or None in a web request."""
+    return _current['job_id']
+
+
+def wants_async():
+    """Whether the current request asked to run as a background job."""
+    if current_job() is not None:
+        return False
+    flag = request.args.get('async', '').lower() in ('1', 'true', 'yes')
+    return flag or 'respond-async' in request.headers.get('Prefer', '').lower()
+
+
+def report_progress(percent, message=None):
+    """Record a running job's progress (0-100); a no-op outside a job."""
+    job_id = current_job()
+    if job_id is None:
+        return
+    try:
+        _execute("UPDATE jobs SET progress = ?, message = COALESCE(?, message) WHERE id = ?",
+                 (max(0.0, min(100.0, float(percent))), message, job_id))
+    except sqlite3.Error as e:
+        logger.warning(f"Could not record progress of job {job_id}: {e}")
+
+
+def submit_request(endpoint):
+    """Queue a replay of the current request as a job; returns the job id."""
+    job_id = uuid.uuid4().hex
+    query = [(k, v) for k, v in request.args.items(multi=True) if k != 'async']
+    saved = {
+        'method': request.method,
+        'path': request.path,
+        'query_string': query,
+        'headers': [(h, request.headers[h]) for h in REPLAYED_HEADERS if h in request.headers],
+        'body': request.get_data(cache=True),
+    }
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    _write_pickle(_request_path(job_id), saved)
+    _execute("INSERT INTO jobs (id, endpoint, status, created_at) VALUES (?, ?, ?, ?)",
+             (job_id, endpoint, QUEUED, time.time()))
+    logger.info(f"Queued job {job_id} for {endpoint} ({len(saved['body'])} request bytes)")
+    start_dispatcher()
+    return job_id
+
+
+def background_job(view):
+    """
+    Let a view run as a background job when the client asks for it (see
+    wants_async); otherwise the view runs in the request as before.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method == 'OPTIONS' or not wants_async():
+            return view(*args, **kwargs)
+        job_id = submit_request(request.endpoint)
+        response = jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': QUEUED,
+            'status_url': f"/api/jobs/{job_id}",
+        })
+        response.status_code = 202
+        response.headers['Location'] = f"/api/jobs/{job_id}"
+        return response
+    return wrapper
+
+
+def job_status(job_id):
+    """Status dict of a job (what GET /api/jobs/<id> returns); raises JobError if unknown."""
+    rows = _execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+    if not rows:
+        raise JobError(f"Unknown job {job_id}")
+    row = rows[0]
+    status = {
+        'job_id': row['id'],
+        'endpoint': row['endpoint'],
+        'status': row['status'],
+        'progress': row['progress'],
+        'message': row['message'],
+        'error': row['error'],
+        'created_at': row['created_at'],
+        'started_at': row['started_at'],
+        'finished_at': row['finished_at'],
+        'cancel_requested': bool(row['cancel_requested']),
+    }
+    if row['status'] == QUEUED:
+        status['queue_position'] = _execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at <= ?", (QUEUED, row['created_at']))[0][0]
+    if row['result_status'] is not None:
+        status['result_status'] = row['result_status']
+        status['result_url'] = f"/api/jobs/{job_id}/result"
+    return status
+
+
+def list_jobs(limit=50):
+    """Most recent jobs, newest first."""
+    rows = _execute("SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (int(limit),))
+    return [job_status(row['id']) for row in rows]
+
+
+def job_result(job_id):
+    """(body bytes, HTTP status, mimetype, headers) of a finished job; raises JobError if there is none."""
+    rows = _execute("SELECT result_status, result_mimetype, result_headers FROM jobs WHERE id = ?", (job_id,))
+    if not rows:
+        raise JobError(f"Unknown job {job_id}")
+    row = rows[0]
+    if row['result_status'] is None or not os.path.exists(_result_path(job_id)):
+        raise JobError(f"Job {job_id} has no result")
+    with open(_result_path(job_id), 'rb') as fh:
+        body = fh.read()
+    return body, row['result_status'], row['result_mimetype'], json.loads(row['result_headers'] or '{}')
+
+
+def cancel_job(job_id):
+    """Cancel a job: queued jobs at once, running ones when their dispatcher next polls. Returns its status."""
+    job_status(job_id)
+    now = time.time()
+    _execute("UPDATE jobs SET status = ?, finished_at = ?, cancel_requested = 1 WHERE id = ? AND status = ?",
+             (CANCELLED, now, job_id, QUEUED))
+    _execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+    return job_status(job_id)
+
+
+# -------------------------
+# Job processes
+# -------------------------
+
+def _load_app():
+    module_name, _, attr = APP_FACTORY.partition(':')
+    factory = getattr(importlib.import_module(module_name), attr or 'create_app')
+    return factory()
+
+
+def _finish(job_id, status, **fields):
+    assignments = ', '.join(f"{name} = ?" for name in fields)
+    _execute(
+        f"UPDATE jobs SET status = ?, finished_at = ?{', ' if fields else ''}{assignments} WHERE id = ? AND status = ?",
+        (status, time.time(), *fields.values(), job_id, RUNNING),
+    )
+
+
+def _error_message(response):
+    try:
+        payload = response.get_json(silent=True) or {}
+    except Exception:
+        payload = {}
+    return str(payload.get('error') or payload.get('message') or f"HTTP {response.status_code}")
+
+
+def run_job(job_id):
+    """Replay a job's request against the app in this process and store the response."""
+    _current['job_id'] = job_id
+    try:
+        with open(_request_path(job_id), 'rb') as fh:
+            saved = pickle.load(fh)
+        app = _load_app()
+        report_progress(0, 'started')
+        with app.test_client() as client:
+            response = client.open(
+                saved['path'], method=saved['method'], query_string=saved['query_string'],
+                headers=saved['headers'], data=saved['body'],
+            )
+            body = response.get_data()
+        _write_bytes(_result_path(job_id), body)
+        headers = {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers}
+        succeeded = response.status_code < 400
+        _finish(
+            job_id, SUCCEEDED if succeeded else FAILED,
+            progress=100.0, result_status=response.status_code, result_mimetype=response.mimetype,
+            result_headers=json.dumps(headers), error=None if succeeded else _error_message(response),
+        )
+        logger.info(f"Job {job_id} finished with HTTP {response.status_code} ({len(body)} bytes)")
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {traceback.format_exc()}")
+        _finish(job_id, FAILED, error=str(e))
+    finally:
+        try:
+            os.remove(_request_path(job_id))
+        except OSError:
+            pass
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _claim_job():
+    """Mark the oldest queued job running if fewer than MAX_WORKERS are; returns its id or None."""
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        running = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (RUNNING,)).fetchone()[0]
+        row = None
+        if running < MAX_WORKERS:
+            row = conn.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = ?, started_at = ?, owner_pid = ? WHERE id = ?",
+                             (RUNNING, time.time(), os.getpid(), row['id']))
+        conn.execute("COMMIT")
+        return row['id'] if row is not None else None
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def _watch_children():
+    """Terminate cancelled children and record those that died without a result."""
+    for job_id, process in list(_running.items()):
+        rows = _execute("SELECT status, cancel_requested FROM jobs WHERE id = ?", (job_id,))
+        row = rows[0] if rows else None
+        if row is not None and row['cancel_requested'] and process.is_alive():
+            process.terminate()
+            process.join(10)
+            _finish(job_id, CANCELLED, message='cancelled')
+            logger.info(f"Cancelled running job {job_id}")
+        if process.is_alive():
+            continue
+        process.join()
+        _running.pop(job_id, None)
+        if row is not None and row['status'] == RUNNING:
+            _finish(job_id, FAILED, error=f"job process exited with code {process.exitcode}")
+
+
+def _recover_orphans():
+    """Fail running jobs whose owning web process is gone (restart or crash)."""
+    for row in _execute("SELECT id, owner_pid FROM jobs WHERE status = ?", (RUNNING,)):
+        if row['id'] not in _running and row['owner_pid'] and not _pid_alive(row['owner_pid']):
+            _finish(row['id'], FAILED, error='server restarted while the job was running')
+
+
+def purge_jobs():
+    """Remove finished jobs (rows and result files) older than RETENTION_SECONDS."""
+    cutoff = time.time() - RETENTION_SECONDS
+    marks = ', '.join('?' * len(FINISHED))
+    rows = _execute(f"SELECT id FROM jobs WHERE status IN ({marks}) AND finished_at < ?", (*FINISHED, cutoff))
+    for row in rows:
+        for path in (_result_path(row['id']), _request_path(row['id'])):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    _execute(f"DELETE FROM jobs WHERE status IN ({marks}) AND finished_at < ?", (*FINISHED, cutoff))
+    return len(rows)
+
+
+def _dispatch_once(context):
+    _watch_children()
+    now = time.time()
+    if now - _state['last_purge'] > 600:
+        _state['last_purge'] = now
+        _recover_orphans()
+        purged = purge_jobs()
+        if purged:
+            logger.info(f"Removed {purged} finished jobs")
+    while True:
+        job_id = _claim_job()
+        if job_id is None:
+            break
+        process = context.Process(target=run_job, args=(job_id,), name=f"job-{job_id[:8]}", daemon=True)
+        process.start()
+        _running[job_id] = process
+        _execute("UPDATE jobs SET worker_pid = ? WHERE id = ?", (process.pid, job_id))
+        logger.info(f"Started job {job_id} in process {process.pid}")
+
+
+def _dispatch_loop():
+    context = multiprocessing.get_context(START_METHOD)
+    if START_METHOD == 'forkserver':
+        context.set_forkserver_preload([APP_FACTORY.partition(':')[0]])
+    while True:
+        try:
+            _dispatch_once(context)
+        except Exception as e:
+            logger.error(f"Job dispatcher error: {e}")
+        time.sleep(POLL_SECONDS)
+
+
+def start_dispatcher():
+    """Start this web process's dispatcher thread (once)."""
+    with _lock:
+        thread = _state['dispatcher']
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(target=_dispatch_loop, name='job-dispatcher', daemon=True)
+        _state['dispatcher'] = thread
+        thread.start()
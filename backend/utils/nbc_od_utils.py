@@ -4,6 +4,9 @@ from io import BytesIO
 import logging
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
+from utils.normalizers import normalize_column, normalizer
+from utils.customer_counts import cube_mask, customer_counts, customer_cube, financial_years, format_months
+from utils.date_parsing import parse_dates
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +23,22 @@ nbc_branch_mapping = {
     'POULTRY': 'POULTRY'
 }
 
+@normalizer
+def map_nbc_branch(raw_branch):
+    """Map a stripped, upper-cased branch to its NBC branch - handle cases where mapping doesn't exist."""
+    if pd.isna(raw_branch) or raw_branch == '' or raw_branch == 'NAN':
+        return 'UNKNOWN'
+    # Try direct mapping first
+    if raw_branch in nbc_branch_mapping:
+        return nbc_branch_mapping[raw_branch]
+    # Try extracting last part after ' - '
+    if ' - ' in raw_branch:
+        branch_part = raw_branch.split(' - ')[-1].strip()
+        if branch_part in nbc_branch_mapping:
+            return nbc_branch_mapping[branch_part]
+    # Return cleaned branch name if no mapping found
+    return raw_branch
+
 def determine_financial_year(date):
     """Determine the financial year for a given date (April to March)."""
     year = date.year
@@ -55,71 +74,54 @@ def get_most_recent_month(sorted_months):
     recent_month = sorted_months[-1] if isinstance(sorted_months, list) else str(sorted_months)
     return recent_month.upper()
 
-def create_customer_table(sales_df, date_col, branch_col, customer_id_col, executive_col, selected_branches=None, selected_executives=None):
+def create_customer_table(sales_df, date_col, branch_col, customer_id_col, executive_col, selected_branches=None, selected_executives=None, sources=None):
     """Create customer table WITHOUT S.No column and with proper Branch column"""
-    sales_df = sales_df.copy()
-
     # Validate essential columns
     for col in [date_col, branch_col, customer_id_col, executive_col]:
         if col not in sales_df.columns:
             logger.warning(f"Missing column in sales data: {col}")
             return None
 
-    # Convert to datetime
-    sales_df[date_col] = pd.to_datetime(sales_df[date_col], errors='coerce')
-    sales_df = sales_df[sales_df[date_col].notna()]
+    # Distinct (month, branch, executive, customer) of the dated rows, cached per dataset
+    cube = customer_cube(sales_df, date_col, customer_id_col, [branch_col, executive_col], sources=sources)
 
-    if sales_df.empty:
+    if not len(cube['month']):
         logger.warning("No valid date rows in sales_df")
         return None
 
-    sales_df['Financial_Year'] = sales_df[date_col].apply(determine_financial_year)
-    sales_df['Month_Name'] = sales_df[date_col].dt.strftime('%b %Y').str.upper()
-
-    # FIXED: Proper branch processing
-    sales_df['Raw_Branch'] = sales_df[branch_col].astype(str).str.strip().str.upper()
-    
-    # Apply branch mapping - handle cases where mapping doesn't exist
-    def map_branch(raw_branch):
-        if pd.isna(raw_branch) or raw_branch == '' or raw_branch == 'NAN':
-            return 'UNKNOWN'
-        # Try direct mapping first
-        if raw_branch in nbc_branch_mapping:
-            return nbc_branch_mapping[raw_branch]
-        # Try extracting last part after ' - '
-        if ' - ' in raw_branch:
-            branch_part = raw_branch.split(' - ')[-1].strip()
-            if branch_part in nbc_branch_mapping:
-                return nbc_branch_mapping[branch_part]
-        # Return cleaned branch name if no mapping found
-        return raw_branch
-
-    sales_df['Branch'] = sales_df['Raw_Branch'].apply(map_branch)
+    # FIXED: Proper branch processing, once per distinct raw branch
+    raw_branches = cube['values'][branch_col].astype(str).str.strip().str.upper()
+    branches = normalize_column(raw_branches, map_nbc_branch)
     
     # Debug logging
-    logger.info(f"Unique raw branches: {sales_df['Raw_Branch'].unique()[:10]}")
-    logger.info(f"Unique mapped branches: {sales_df['Branch'].unique()}")
+    logger.info(f"Unique raw branches: {raw_branches.unique()[:10]}")
+    logger.info(f"Unique mapped branches: {branches.unique()}")
 
     # Filters
+    where = {}
     if selected_branches:
-        sales_df = sales_df[sales_df['Branch'].isin(selected_branches)]
+        where[branch_col] = branches.isin(selected_branches).to_numpy()
     if selected_executives:
-        sales_df = sales_df[sales_df[executive_col].isin(selected_executives)]
+        where[executive_col] = cube['values'][executive_col].isin(selected_executives).to_numpy()
 
-    if sales_df.empty:
+    # One groupby(Branch, month).nunique() for every financial year at once
+    counts = customer_counts(cube, branch_col, branches, cube_mask(cube, where))
+    if counts.empty:
         logger.warning("No data after applying filters")
         return None
 
+    counts = counts.sort_values('month', kind='stable')
+    counts['Financial_Year'] = financial_years(counts['month'], two_digit=True)
+    counts['Month_Name'] = pd.Series(format_months(counts['month'], '%b %Y'), index=counts.index).str.upper()
+
     result_dict = {}
-    for fy in sorted(sales_df['Financial_Year'].dropna().unique()):
-        fy_df = sales_df[sales_df['Financial_Year'] == fy].copy()
-        if fy_df.empty:
-            continue
+    for fy in sorted(counts['Financial_Year'].unique()):
+        fy_counts = counts[counts['Financial_Year'] == fy]
 
-        available_months = fy_df.sort_values(date_col)['Month_Name'].unique().tolist()
+        available_months = fy_counts['Month_Name'].unique().tolist()
         
         # Group by Branch and Month
-        grouped = fy_df.groupby(['Branch', 'Month_Name'])[customer_id_col].nunique().reset_index(name='Count')
+        grouped = fy_counts.rename(columns={'key': 'Branch', 'count': 'Count'})[['Branch', 'Month_Name', 'Count']]
         
         # Create pivot table
         pivot_df = grouped.pivot_table(index='Branch', columns='Month_Name', values='Count', aggfunc='sum', fill_value=0).reset_index()
@@ -165,6 +167,7 @@ def auto_map_od_target_columns(os_columns):
         'executive': find_column_by_names(os_columns, ['Executive Name', 'Executive', 'Sales Executive'])
     }
 
+@normalizer
 def extract_area_name(area):
     """Extract and standardize branch names."""
     if pd.isna(area) or str(area).strip() == '':
@@ -194,6 +197,7 @@ def extract_area_name(area):
             return area.split(sep)[-1].strip()    
     return area
 
+@normalizer
 def extract_executive_name(executive):
     """Normalize executive names, treating null/empty as 'BLANK'."""
     if pd.isna(executive) or str(executive).strip() == '':
@@ -221,11 +225,11 @@ def filter_os_qty(
             return None, None, None
 
     os_df = os_df.copy()
-    os_df[os_area_col] = os_df[os_area_col].apply(extract_area_name)
-    os_df[os_exec_col] = os_df[os_exec_col].apply(extract_executive_name)
+    os_df[os_area_col] = normalize_column(os_df[os_area_col], extract_area_name)
+    os_df[os_exec_col] = normalize_column(os_df[os_exec_col], extract_executive_name)
 
     try:
-        os_df[os_due_date_col] = pd.to_datetime(os_df[os_due_date_col], errors='coerce')
+        os_df[os_due_date_col] = parse_dates(os_df[os_due_date_col])
     except Exception as e:
         logger.warning(f"Error converting due date column to datetime: {e}")
         return None, None, None
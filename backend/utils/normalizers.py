@@ -0,0 +1,78 @@
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# Memoized value normalizers
+# =========================
+# Branch/area/executive normalizers are plain per-value functions, but a
+# column of 500k rows usually holds only a few dozen distinct strings.
+# normalize_column() factorizes the column, calls the normalizer once per
+# distinct value and broadcasts the results back through the codes. Functions
+# decorated with @normalizer also keep a bounded LRU of raw -> normalized
+# results, so the next request over the same files skips even those calls.
+
+NORMALIZER_CACHE_SIZE = int(os.getenv('NORMALIZER_CACHE_SIZE', '4096'))
+
+
+def normalizer(func):
+    """Memoize a pure single-value normalizer in a bounded LRU (typed, so 1 and 1.0 stay distinct)."""
+    cached = functools.lru_cache(maxsize=NORMALIZER_CACHE_SIZE, typed=True)(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return cached(*args, **kwargs)
+        except TypeError:  # unhashable cell value
+            return func(*args, **kwargs)
+
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+
+# factorize treats 1, 1.0 and True as one value although str() of them differs,
+# so columns mixing Python types are mapped value by value (still memoized)
+_MIXED_TYPES = {'mixed', 'mixed-integer', 'mixed-integer-float'}
+
+
+def distinct_key(series):
+    """
+    series itself, or a type-tagged proxy when it mixes Python types (or kinds
+    of missing value) that factorize/groupby would merge but str() tells apart.
+    """
+    if series.dtype != object:
+        return series
+    missing_kinds = series[series.isna()].map(type).nunique()
+    if missing_kinds < 2 and pd.api.types.infer_dtype(series, skipna=True) not in _MIXED_TYPES:
+        return series
+    return series.map(lambda v: f"{type(v).__name__}:{v!r}")
+
+
+def factorize_values(series):
+    """
+    pd.factorize(series, use_na_sentinel=False) that keeps values str() tells
+    apart distinct (see distinct_key); uniques are the original values, as a
+    Series of series' dtype.
+    """
+    codes, _ = pd.factorize(distinct_key(series), use_na_sentinel=False)
+    _, first = np.unique(codes, return_index=True)
+    return codes, series.iloc[first].reset_index(drop=True)
+
+
+def normalize_column(series, func):
+    """
+    Equivalent of series.apply(func) for a per-value func that calls func once
+    per distinct value (missing values included) instead of once per row.
+    """
+    if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) in _MIXED_TYPES:
+        return series.map(func)
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+
+    results = np.empty(len(uniques), dtype=object)
+    for i, value in enumerate(uniques):
+        results[i] = func(value)
+    return pd.Series(results[codes], index=series.index, name=series.name)
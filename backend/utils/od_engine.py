@@ -0,0 +1,231 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from utils.budget_matching import _freeze, cached_report, frame_fingerprint
+from utils.date_parsing import parse_dates
+from utils.normalizers import distinct_key
+from utils.query_engine import query, sql_enabled
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# OD target vs collection engine
+# =========================
+# Both OD reports (branch-wise in od_target, executive-wise in executive_odc)
+# sum the same four things for a month M, only grouped differently:
+#   due      OS-first net value due by the end of M            (cumulative)
+#   carried  OS-second net value due by the end of M and
+#            referenced before M starts                        (cumulative)
+#   overdue  sales billed and due within M                     (per month)
+#   month_os OS-second net value referenced and due within M   (per month)
+# od_cube() groups every row by its raw dimension values (branch/area,
+# executive, region), turns each row into the first month it counts for, and
+# sums those events once, with running totals per group in due-month order. A
+# month's figures are then a lookup (od_sums) instead of a filter over every
+# row, and each report maps the few distinct raw dimension values to its own
+# branch/executive names. Cubes are cached by the content of the columns they
+# read, so every month and both endpoints reuse one pass over the files.
+# Sums are accumulated in extended precision so running totals agree with a
+# direct pandas sum to the last bit (in practice). With the DuckDB engine
+# (query_engine) the per-(group, month) sums run as SQL and only the running
+# totals are taken here.
+
+OS_FIRST = 'os_first'
+OS_SECOND = 'os_second'
+SALES = 'sales'
+
+# measure -> (table, cumulative)
+MEASURES = {
+    'due': (OS_FIRST, True),
+    'carried': (OS_SECOND, True),
+    'month_os': (OS_SECOND, False),
+    'overdue': (SALES, False),
+}
+
+_NO_MONTH = np.iinfo(np.int64).min
+
+
+def month_number(month_start):
+    """Months since Jan 1970 of a date, the unit od_sums() takes."""
+    return (month_start.year - 1970) * 12 + month_start.month - 1
+
+
+def _months(dates):
+    """
+    For each date: its month number, the first month whose end (last day,
+    00:00) it is not after, and whether it lies within its own month's
+    [first day 00:00, last day 00:00] window. NaT gets _NO_MONTH.
+    """
+    values = dates.to_numpy(dtype='datetime64[ns]')
+    valid = ~np.isnat(values)
+    month = values.astype('datetime64[M]')
+    last_midnight = ((month + 1).astype('datetime64[D]') - np.timedelta64(1, 'D')).astype('datetime64[ns]')
+    late = valid & (values > last_midnight)
+    number = np.where(valid, month.astype(np.int64), _NO_MONTH)
+    until = np.where(valid, number + late, _NO_MONTH)
+    within = valid & ~late
+    return number, until, within
+
+
+def _events(group, month, value, kept, cumulative):
+    """Sum value/kept/rows per (group, month); running totals per group when cumulative."""
+    if sql_enabled():
+        ev_group, ev_month, sums, kept_counts, rows = _sql_events(group, month, value, kept)
+    else:
+        has_month = month != _NO_MONTH
+        group, month, value, kept = group[has_month], month[has_month], value[has_month], kept[has_month]
+        order = np.lexsort((month, group))
+        group, month, value, kept = group[order], month[order], value[order], kept[order]
+
+        starts = np.flatnonzero(np.r_[True, (group[1:] != group[:-1]) | (month[1:] != month[:-1])]) if len(group) else np.array([], dtype=int)
+        sums = np.add.reduceat(value, starts) if len(starts) else np.array([], dtype=np.longdouble)
+        kept_counts = np.add.reduceat(kept.astype(np.int64), starts) if len(starts) else np.array([], dtype=np.int64)
+        rows = np.diff(np.r_[starts, len(group)])
+        ev_group, ev_month = group[starts], month[starts]
+
+    if cumulative and len(ev_group):
+        bounds = np.flatnonzero(np.r_[True, ev_group[1:] != ev_group[:-1], True])
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            sums[lo:hi] = np.cumsum(sums[lo:hi])
+            kept_counts[lo:hi] = np.cumsum(kept_counts[lo:hi])
+            rows[lo:hi] = np.cumsum(rows[lo:hi])
+    return {'group': ev_group, 'month': ev_month, 'sum': sums, 'kept': kept_counts, 'rows': rows,
+            'cumulative': cumulative}
+
+
+def _sql_events(group, month, value, kept):
+    """Per (group, month) sums of _events as one GROUP BY in DuckDB, ordered like the lexsort."""
+    events = query(
+        f"SELECT g, m, fsum(v) AS s, sum(k)::BIGINT AS k, count(*) AS n FROM rows "
+        f"WHERE m <> {_NO_MONTH} GROUP BY g, m ORDER BY g, m",
+        rows=pd.DataFrame({'g': group, 'm': month, 'v': value.astype(np.float64), 'k': kept.astype(np.int64)}),
+    )
+    return (events['g'].to_numpy(dtype=np.int64), events['m'].to_numpy(dtype=np.int64),
+            events['s'].to_numpy(dtype=np.longdouble), events['k'].to_numpy(dtype=np.int64),
+            events['n'].to_numpy(dtype=np.int64))
+
+
+def _groups(df, dims):
+    """Group id of every row by its raw dims (NaN kept) and the distinct dim combinations."""
+    dims = list(dict.fromkeys(dims))
+    if not dims:
+        return np.zeros(len(df), dtype=np.int64), pd.DataFrame(index=[0])
+    keys = [distinct_key(df[d]) for d in dims]
+    ids = df.groupby(keys, dropna=False, sort=False).ngroup().to_numpy(dtype=np.int64)
+    _, first = np.unique(ids, return_index=True)
+    return ids, df[dims].iloc[first].reset_index(drop=True)
+
+
+def _table(df, value_col, dims, clip):
+    """Numeric values (negatives/NaN as 0 for OS files) and per-group row counts of one file."""
+    numeric = pd.to_numeric(df[value_col], errors='coerce')
+    all_nan = bool(numeric.isna().all())
+    # OS rows with a negative or missing net value are dropped (or clipped to 0) by both reports
+    kept = (numeric >= 0).to_numpy() if clip else np.ones(len(df), dtype=bool)
+    value = numeric.where(numeric >= 0, 0) if clip else numeric.fillna(0)
+    ids, groups = _groups(df, dims)
+    groups['rows'] = np.bincount(ids, minlength=len(groups))
+    groups['kept'] = np.bincount(ids, weights=kept, minlength=len(groups)).astype(np.int64)
+    return ids, value.to_numpy(dtype=np.longdouble), kept, groups, all_nan
+
+
+def _build_cube(os_first, os_second, total_sale, cols, dims):
+    first_ids, first_value, first_kept, first_groups, first_nan = _table(
+        os_first, cols['os_first_value'], dims[OS_FIRST], clip=True)
+    second_ids, second_value, second_kept, second_groups, second_nan = _table(
+        os_second, cols['os_second_value'], dims[OS_SECOND], clip=True)
+    sale_ids, sale_value, sale_kept, sale_groups, sale_nan = _table(
+        total_sale, cols['sale_value'], dims[SALES], clip=False)
+
+    _, first_due, _ = _months(parse_dates(os_first[cols['os_first_due']]))
+    second_due_month, second_due, second_due_within = _months(parse_dates(os_second[cols['os_second_due']]))
+    second_ref_month, _, second_ref_within = _months(parse_dates(os_second[cols['os_second_ref']]))
+    bill_month, _, bill_within = _months(parse_dates(total_sale[cols['sale_bill']]))
+    sale_due_month, _, sale_due_within = _months(parse_dates(total_sale[cols['sale_due']]))
+
+    # carried: due by the end of M and referenced before M starts -> counts from max(until(due), ref month + 1)
+    both = (second_due != _NO_MONTH) & (second_ref_month != _NO_MONTH)
+    carried_from = np.where(both, np.maximum(second_due, second_ref_month + 1), _NO_MONTH)
+    # per-month measures need both dates inside the same month's window
+    month_os = np.where(second_ref_within & second_due_within & (second_ref_month == second_due_month),
+                        second_ref_month, _NO_MONTH)
+    overdue = np.where(bill_within & sale_due_within & (bill_month == sale_due_month), bill_month, _NO_MONTH)
+
+    events = {
+        'due': _events(first_ids, first_due, first_value, first_kept, True),
+        'carried': _events(second_ids, carried_from, second_value, second_kept, True),
+        'month_os': _events(second_ids, month_os, second_value, second_kept, False),
+        'overdue': _events(sale_ids, overdue, sale_value, sale_kept, False),
+    }
+    event_months = np.concatenate([e['month'] for e in events.values()])
+    logger.info(f"OD cube: {len(first_groups)}/{len(second_groups)}/{len(sale_groups)} groups, "
+                f"{sum(len(e['month']) for e in events.values())} month events")
+    return {
+        'groups': {OS_FIRST: first_groups, OS_SECOND: second_groups, SALES: sale_groups},
+        'all_nan': {OS_FIRST: first_nan, OS_SECOND: second_nan, SALES: sale_nan},
+        'events': events,
+        'months': np.unique(event_months),
+    }
+
+
+def od_cube(os_first, os_second, total_sale, cols, dims, sources=None):
+    """
+    Cached cube over the three OD files. cols names the date/value columns
+    (os_first_due, os_first_value, os_second_due, os_second_ref,
+    os_second_value, sale_bill, sale_due, sale_value); dims maps each table
+    (OS_FIRST, OS_SECOND, SALES) to the columns rows are grouped by.
+    sources, when the frames are unmodified reads of known files (e.g. a
+    (file_digest, sheet, header) per file), keys the cache instead of hashing
+    the frames' contents.
+    """
+    used = {
+        OS_FIRST: [cols['os_first_due'], cols['os_first_value']] + list(dims[OS_FIRST]),
+        OS_SECOND: [cols['os_second_due'], cols['os_second_ref'], cols['os_second_value']] + list(dims[OS_SECOND]),
+        SALES: [cols['sale_bill'], cols['sale_due'], cols['sale_value']] + list(dims[SALES]),
+    }
+    frames = {OS_FIRST: os_first, OS_SECOND: os_second, SALES: total_sale}
+    if sources is not None:
+        content = ('sources', _freeze(sources))
+    else:
+        content = tuple(frame_fingerprint(frames[t], list(dict.fromkeys(used[t]))) for t in used)
+    key = ('od_cube', content, _freeze([cols, dims]))
+    return cached_report(key, lambda: _build_cube(os_first, os_second, total_sale, cols, dims))
+
+
+def od_sums(cube, measure, month, group_keys, count='kept'):
+    """
+    measure summed per output key for month (a month_number), like
+    rows.groupby(key)[value].sum() over the rows that count for that month.
+    group_keys gives each of the table's groups its key (NaN leaves it out).
+    Returns a DataFrame [key, value] sorted by key, with a row for every key
+    that has at least one counted row (count='kept' or 'rows').
+    """
+    events = cube['events'][measure]
+    ev_month = events['month']
+    if events['cumulative']:
+        # last running total at or before month, per group
+        upto = ev_month <= month
+        same_group_next = np.r_[events['group'][1:] == events['group'][:-1], False]
+        next_upto = np.r_[upto[1:], False]
+        pick = upto & ~(same_group_next & next_upto)
+    else:
+        pick = ev_month == month
+
+    keys = np.asarray(group_keys, dtype=object)[events['group'][pick]]
+    sums, counts = events['sum'][pick], events[count][pick]
+    present = pd.notna(keys) & (counts > 0)
+    keys, sums = keys[present], sums[present]
+    if not len(keys):
+        return pd.DataFrame({'key': pd.Series(dtype=object), 'value': pd.Series(dtype=np.float64)})
+
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    totals = np.zeros(len(unique_keys), dtype=np.longdouble)
+    np.add.at(totals, inverse, sums)
+    return pd.DataFrame({'key': unique_keys, 'value': totals.astype(np.float64)})
+
+
+def od_month_labels(cube, fmt='%b-%y'):
+    """Labels of the months any measure has events in, chronologically."""
+    return [pd.Period(ordinal=int(m), freq='M').strftime(fmt) for m in cube['months']]
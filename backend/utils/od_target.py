@@ -5,6 +5,8 @@ from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
 import logging
+from utils.normalizers import normalize_column, normalizer
+from utils.od_engine import OS_FIRST, OS_SECOND, SALES, month_number, od_cube, od_sums
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +50,7 @@ def auto_map_od_columns(os_first_columns, os_second_columns, sales_columns):
 # =========================
 # Branch Mapping Helper (KEEP ORIGINAL)
 # =========================
+@normalizer
 def map_branch(val, case='title'):
     if not val or not isinstance(val, str):
         return 'Unknown'
@@ -62,11 +65,11 @@ def map_branch(val, case='title'):
 def get_cumulative_branches(os_first, os_second, total_sale, os_first_unit_col, os_second_unit_col, sale_branch_col):
     branches = set()
     if os_first_unit_col in os_first.columns:
-        branches.update(os_first[os_first_unit_col].dropna().apply(lambda x: map_branch(x, 'title')).unique())
+        branches.update(os_first[os_first_unit_col].dropna().pipe(normalize_column, lambda x: map_branch(x, 'title')).unique())
     if os_second_unit_col in os_second.columns:
-        branches.update(os_second[os_second_unit_col].dropna().apply(lambda x: map_branch(x, 'title')).unique())
+        branches.update(os_second[os_second_unit_col].dropna().pipe(normalize_column, lambda x: map_branch(x, 'title')).unique())
     if sale_branch_col in total_sale.columns:
-        branches.update(total_sale[sale_branch_col].dropna().apply(lambda x: map_branch(x, 'title')).unique())
+        branches.update(total_sale[sale_branch_col].dropna().pipe(normalize_column, lambda x: map_branch(x, 'title')).unique())
     return sorted(b for b in branches if b and b != 'Unknown')
 
 def get_cumulative_regions(os_first, os_second, total_sale, os_first_region_col, os_second_region_col, sale_region_col):
@@ -96,7 +99,7 @@ def create_region_branch_mapping(os_first, os_second, total_sale,
     ]:
         if unit_col and region_col and unit_col in df.columns and region_col in df.columns:
             temp = df[[unit_col, region_col]].dropna()
-            temp['Branch'] = temp[unit_col].apply(lambda x: map_branch(x, 'title'))
+            temp['Branch'] = normalize_column(temp[unit_col], lambda x: map_branch(x, 'title'))
             temp['Region'] = temp[region_col].astype(str).str.strip()
             combined.append(temp[['Branch', 'Region']])
 
@@ -193,89 +196,81 @@ def calculate_od_values_updated(
     os_first_due_date_col, os_first_ref_date_col, os_first_unit_col, os_first_net_value_col, os_first_exec_col, os_first_region_col,
     os_second_due_date_col, os_second_ref_date_col, os_second_unit_col, os_second_net_value_col, os_second_exec_col, os_second_region_col,
     sale_bill_date_col, sale_due_date_col, sale_branch_col, sale_value_col, sale_exec_col, sale_region_col,
-    selected_executives, selected_branches, selected_regions
+    selected_executives, selected_branches, selected_regions, sources=None
 ):
     try:
-        os_first = os_first.copy()
-        os_second = os_second.copy()
-        total_sale = total_sale.copy()
+        # Every month's sums come from one cached cube grouped by the raw unit/executive/region values
+        dims = {
+            OS_FIRST: [os_first_unit_col, os_first_exec_col, os_first_region_col],
+            OS_SECOND: [os_second_unit_col, os_second_exec_col, os_second_region_col],
+            SALES: [sale_branch_col, sale_exec_col, sale_region_col],
+        }
+        cube = od_cube(os_first, os_second, total_sale, {
+            'os_first_due': os_first_due_date_col, 'os_first_value': os_first_net_value_col,
+            'os_second_due': os_second_due_date_col, 'os_second_ref': os_second_ref_date_col,
+            'os_second_value': os_second_net_value_col,
+            'sale_bill': sale_bill_date_col, 'sale_due': sale_due_date_col, 'sale_value': sale_value_col,
+        }, {table: [c for c in dict.fromkeys(cols) if c] for table, cols in dims.items()}, sources=sources)
+        if os_first_ref_date_col and os_first_ref_date_col not in os_first.columns:
+            raise KeyError(os_first_ref_date_col)
 
         # Validate numeric columns - KEEP ORIGINAL
-        for df, col, name in [
-            (os_first, os_first_net_value_col, "OS First"),
-            (os_second, os_second_net_value_col, "OS Second"),
-            (total_sale, sale_value_col, "Sales")
+        for table, col, name in [
+            (OS_FIRST, os_first_net_value_col, "OS First"),
+            (OS_SECOND, os_second_net_value_col, "OS Second"),
+            (SALES, sale_value_col, "Sales")
         ]:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-            if df[col].isna().all():
+            if cube['all_nan'][table]:
                 raise ValueError(f"Column '{col}' in {name} contains no valid numeric data.")
 
-        # Remove negative values - KEEP ORIGINAL
-        os_first = os_first[os_first[os_first_net_value_col] >= 0]
-        os_second = os_second[os_second[os_second_net_value_col] >= 0]
-
-        # Date conversion & branch mapping - KEEP ORIGINAL
-        os_first[os_first_due_date_col] = pd.to_datetime(os_first[os_first_due_date_col], errors='coerce')
-        os_first[os_first_ref_date_col] = pd.to_datetime(os_first[os_first_ref_date_col], errors='coerce') if os_first_ref_date_col else None
-        os_first["Branch"] = os_first[os_first_unit_col].apply(lambda x: map_branch(x, case='title'))
-
-        os_second[os_second_due_date_col] = pd.to_datetime(os_second[os_second_due_date_col], errors='coerce')
-        os_second[os_second_ref_date_col] = pd.to_datetime(os_second[os_second_ref_date_col], errors='coerce') if os_second_ref_date_col else None
-        os_second["Branch"] = os_second[os_second_unit_col].apply(lambda x: map_branch(x, case='title'))
-
-        total_sale[sale_bill_date_col] = pd.to_datetime(total_sale[sale_bill_date_col], errors='coerce')
-        total_sale[sale_due_date_col] = pd.to_datetime(total_sale[sale_due_date_col], errors='coerce')
-        total_sale["Branch"] = total_sale[sale_branch_col].apply(lambda x: map_branch(x, case='title'))
+        # Negative/missing OS net values are left out; only groups with remaining rows count
+        groups = {table: g[g['kept'] > 0] for table, g in cube['groups'].items()}
 
         # Region-branch mapping - KEEP ORIGINAL
         region_map = create_region_branch_mapping(
-            os_first, os_second, total_sale,
+            groups[OS_FIRST], groups[OS_SECOND], groups[SALES],
             os_first_unit_col, os_first_region_col,
             os_second_unit_col, os_second_region_col,
             sale_branch_col, sale_region_col
         )
-
-        # Remove rows where Branch is null or "Unknown"
-        os_first = os_first[os_first["Branch"].notna() & (os_first["Branch"] != "Unknown")]
-        os_second = os_second[os_second["Branch"].notna() & (os_second["Branch"] != "Unknown")]
-        total_sale = total_sale[total_sale["Branch"].notna() & (total_sale["Branch"] != "Unknown")]
-
-        # Filters
-        if selected_executives:
-            os_first = os_first[os_first[os_first_exec_col].isin(selected_executives)]
-            os_second = os_second[os_second[os_second_exec_col].isin(selected_executives)]
-            total_sale = total_sale[total_sale[sale_exec_col].isin(selected_executives)]
-
-        if selected_branches:
-            os_first = os_first[os_first["Branch"].isin(selected_branches)]
-            os_second = os_second[os_second["Branch"].isin(selected_branches)]
-            total_sale = total_sale[total_sale["Branch"].isin(selected_branches)]
-
-        if selected_regions and region_map:
-            allowed = [b for r in selected_regions for b in region_map.get(r, [])]
-            os_first = os_first[os_first["Branch"].isin(allowed)]
-            os_second = os_second[os_second["Branch"].isin(allowed)]
-            total_sale = total_sale[total_sale["Branch"].isin(allowed)]
-
-        if os_first.empty or os_second.empty or total_sale.empty:
+        allowed = [b for r in selected_regions for b in region_map.get(r, [])] if selected_regions and region_map else None
+
+        def branch_keys(table, unit_col, exec_col):
+            """Branch of each group of a table, NaN where the group is filtered out."""
+            group = groups[table]
+            branch = normalize_column(group[unit_col], lambda x: map_branch(x, case='title'))
+            # Remove rows where Branch is null or "Unknown", then apply the filters
+            keep = branch.notna() & (branch != "Unknown")
+            if selected_executives:
+                keep &= group[exec_col].isin(selected_executives)
+            if selected_branches:
+                keep &= branch.isin(selected_branches)
+            if allowed is not None:
+                keep &= branch.isin(allowed)
+            return branch.where(keep).reindex(cube['groups'][table].index)
+
+        first_keys = branch_keys(OS_FIRST, os_first_unit_col, os_first_exec_col)
+        second_keys = branch_keys(OS_SECOND, os_second_unit_col, os_second_exec_col)
+        sale_keys = branch_keys(SALES, sale_branch_col, sale_exec_col)
+
+        if any(cube['groups'][table]['kept'][keys.notna()].sum() == 0
+               for table, keys in [(OS_FIRST, first_keys), (OS_SECOND, second_keys), (SALES, sale_keys)]):
             logger.error("Error in calculate_od_values_updated: One or more datasets are empty after filtering. Cannot compute results.")
             raise ValueError("One or more datasets are empty after filtering. Cannot compute results.")
 
         # Date range
         month_str = selected_month_str.replace(" ", "-")
         specified_date = pd.to_datetime("01-" + month_str, format="%d-%b-%y")
-        month_end = specified_date + pd.offsets.MonthEnd(0)
+        month = month_number(specified_date)
 
         # === Branch-wise Calculations
-        due_target = os_first[os_first[os_first_due_date_col] <= month_end]
-        due_target_sum = due_target.groupby("Branch")[os_first_net_value_col].sum().reset_index()
+        due_target_sum = od_sums(cube, 'due', month, first_keys)
         due_target_sum.columns = ["Branch", "Due Target"]
 
-        jan_coll = os_first[os_first[os_first_due_date_col] <= month_end].groupby("Branch")[os_first_net_value_col].sum().reset_index()
+        jan_coll = od_sums(cube, 'due', month, first_keys)
         jan_coll.columns = ["Branch", "OS Jan Coll"]
 
-        feb_coll = os_second[(os_second[os_second_due_date_col] <= month_end) & 
-                             (os_second[os_second_ref_date_col] < specified_date)].groupby("Branch")[os_second_net_value_col].sum().reset_index()
+        feb_coll = od_sums(cube, 'carried', month, second_keys)
         feb_coll.columns = ["Branch", "OS Feb Coll"]
 
         collection = jan_coll.merge(feb_coll, on="Branch", how="outer").fillna(0)
@@ -286,17 +281,13 @@ def calculate_od_values_updated(
         collection = collection.merge(due_target_sum, on="Branch", how="left").fillna(0)
 
         # === Overdue + Month Collection
-        overdue = total_sale[(total_sale[sale_bill_date_col].between(specified_date, month_end)) &
-                             (total_sale[sale_due_date_col].between(specified_date, month_end))]
-        overdue_sum = overdue.groupby("Branch")[sale_value_col].sum().reset_index()
+        overdue_sum = od_sums(cube, 'overdue', month, sale_keys)
         overdue_sum.columns = ["Branch", "For the month Overdue"]
 
-        sales_sum = overdue.groupby("Branch")[sale_value_col].sum().reset_index()
+        sales_sum = od_sums(cube, 'overdue', month, sale_keys)
         sales_sum.columns = ["Branch", "Sale Value"]
 
-        os_month = os_second[(os_second[os_second_ref_date_col].between(specified_date, month_end)) &
-                             (os_second[os_second_due_date_col].between(specified_date, month_end))]
-        os_month_sum = os_month.groupby("Branch")[os_second_net_value_col].sum().reset_index()
+        os_month_sum = od_sums(cube, 'month_os', month, second_keys)
         os_month_sum.columns = ["Branch", "OS Month Collection"]
 
         month_result = sales_sum.merge(os_month_sum, on="Branch", how="outer").fillna(0)
@@ -4,6 +4,9 @@ from io import BytesIO
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from utils.ppt_generator import create_title_slide, add_table_slide
+from utils.date_parsing import in_months, parse_dates
+from utils.normalizers import normalize_column
+from utils.product_growth_engine import growth_percent, growth_positions, growth_sums
 import logging
 
 logger = logging.getLogger(__name__)
@@ -100,11 +103,11 @@ def calculate_product_growth(
         if ly_df.empty or cy_df.empty or budget_df.empty:
             raise ValueError("No data remains after executive filtering")
 
-        ly_df[ly_date_col] = pd.to_datetime(ly_df[ly_date_col], dayfirst=True, errors='coerce')
-        cy_df[cy_date_col] = pd.to_datetime(cy_df[cy_date_col], dayfirst=True, errors='coerce')
+        ly_df[ly_date_col] = parse_dates(ly_df[ly_date_col], dayfirst=True)
+        cy_df[cy_date_col] = parse_dates(cy_df[cy_date_col], dayfirst=True)
 
-        ly_filtered_df = ly_df[ly_df[ly_date_col].dt.strftime('%b %y').isin(ly_months)]
-        cy_filtered_df = cy_df[cy_df[cy_date_col].dt.strftime('%b %y').isin(cy_months)]
+        ly_filtered_df = ly_df[in_months(ly_df[ly_date_col], ly_months)]
+        cy_filtered_df = cy_df[in_months(cy_df[cy_date_col], cy_months)]
 
         if ly_filtered_df.empty or cy_filtered_df.empty:
             raise ValueError("No data found for selected LY or CY months")
@@ -118,7 +121,7 @@ def calculate_product_growth(
             (ly_filtered_df, ly_product_col), (cy_filtered_df, cy_product_col), (budget_df, budget_product_group_col),
             (ly_filtered_df, ly_company_group_col), (cy_filtered_df, cy_company_group_col), (budget_df, budget_company_group_col)
         ]:
-            df[col] = df[col].fillna("").astype(str).apply(standardize_name)
+            df[col] = normalize_column(df[col].fillna("").astype(str), standardize_name)
 
         if selected_company_groups:
             selected_company_groups = [standardize_name(g) for g in selected_company_groups]
@@ -153,55 +156,61 @@ def calculate_product_growth(
                     return 100.00  # or could be a large positive number
             return round(((current_value - last_year_value) / last_year_value) * 100, 2)
 
-        result = {}
+        # One aligned groupby over (company group, product) for LY, CY and budget
+        keys, (ly_sums, cy_sums, budget_sums) = growth_sums([
+            (ly_filtered_df, ly_company_group_col, ly_product_col, [ly_qty_col, ly_value_col]),
+            (cy_filtered_df, cy_company_group_col, cy_product_col, [cy_qty_col, cy_value_col]),
+            (budget_df, budget_company_group_col, budget_product_group_col, [budget_qty_col, budget_value_col]),
+        ])
+        names_by_group = normalize_column(keys['product'], standardize_name) \
+            .groupby(keys['company'], sort=False).agg(lambda names: sorted(set(names)))
 
+        spans, table_groups, table_products = [], [], []
         for group in company_groups:
-            ly_group_df = ly_filtered_df[ly_filtered_df[ly_company_group_col] == group]
-            cy_group_df = cy_filtered_df[cy_filtered_df[cy_company_group_col] == group]
-            budget_group_df = budget_df[budget_df[budget_company_group_col] == group]
-
-            if ly_group_df.empty and cy_group_df.empty and budget_group_df.empty:
+            if group not in names_by_group.index:
                 continue
-
-            ly_products = ly_group_df[ly_product_col].dropna().apply(standardize_name).unique().tolist()
-            cy_products = cy_group_df[cy_product_col].dropna().apply(standardize_name).unique().tolist()
-            budget_products = budget_group_df[budget_product_group_col].dropna().apply(standardize_name).unique().tolist()
-            group_products = sorted(set(ly_products + cy_products + budget_products))
-
+            group_products = names_by_group[group]
             if group != 'General':
                 group_products = [p for p in group_products if p != 'Gc']
             if not group_products:
                 continue
+            spans.append((group, len(table_products), len(table_products) + len(group_products)))
+            table_groups += [group] * len(group_products)
+            table_products += group_products
+
+        # Rows of every group in one table, with growth computed for all of them at once
+        positions = growth_positions(keys, table_groups, table_products)
+        sums = {
+            'LAST YEAR QTY/MT': ly_sums[ly_qty_col], 'BUDGET QTY/MT': budget_sums[budget_qty_col],
+            'CURRENT YEAR QTY/MT': cy_sums[cy_qty_col], 'LAST YEAR VALUE/L': ly_sums[ly_value_col],
+            'BUDGET VALUE/L': budget_sums[budget_value_col], 'CURRENT YEAR VALUE/L': cy_sums[cy_value_col],
+        }
+        table = pd.DataFrame({'PRODUCT NAME': pd.Series(table_products, dtype=object)})
+        for column, summed in sums.items():
+            table[column] = summed.reindex(positions).to_numpy()
+        filled = table.fillna(0)
+        table['QTY GROWTH %'] = growth_percent(filled['CURRENT YEAR QTY/MT'], filled['LAST YEAR QTY/MT'])
+        table['VALUE GROWTH %'] = growth_percent(filled['CURRENT YEAR VALUE/L'], filled['LAST YEAR VALUE/L'])
+
+        def group_frame(part, columns, growth_col):
+            frame = part[['PRODUCT NAME']].reset_index(drop=True)
+            for column in columns:
+                values = part[column].reset_index(drop=True)
+                # integer sums stay integer when every product of the group has one
+                if sums[column].dtype.kind in 'iub' and values.notna().all():
+                    frame[column] = values.astype(sums[column].dtype)
+                else:
+                    frame[column] = values.fillna(0)
+            frame['GROWTH %'] = part[growth_col].to_numpy()
+            frame[columns] = frame[columns].round(2)
+            return frame
 
-            # FIXED: Use spaces instead of underscores in column names
-            ly_qty = ly_group_df.groupby(ly_product_col)[ly_qty_col].sum().reset_index().rename(columns={ly_product_col: 'PRODUCT NAME', ly_qty_col: 'LAST YEAR QTY/MT'})
-            cy_qty = cy_group_df.groupby(cy_product_col)[cy_qty_col].sum().reset_index().rename(columns={cy_product_col: 'PRODUCT NAME', cy_qty_col: 'CURRENT YEAR QTY/MT'})
-            ly_value = ly_group_df.groupby(ly_product_col)[ly_value_col].sum().reset_index().rename(columns={ly_product_col: 'PRODUCT NAME', ly_value_col: 'LAST YEAR VALUE/L'})
-            cy_value = cy_group_df.groupby(cy_product_col)[cy_value_col].sum().reset_index().rename(columns={cy_product_col: 'PRODUCT NAME', cy_value_col: 'CURRENT YEAR VALUE/L'})
-            budget_qty = budget_group_df.groupby(budget_product_group_col)[budget_qty_col].sum().reset_index().rename(columns={budget_product_group_col: 'PRODUCT NAME', budget_qty_col: 'BUDGET QTY/MT'})
-            budget_value = budget_group_df.groupby(budget_product_group_col)[budget_value_col].sum().reset_index().rename(columns={budget_product_group_col: 'PRODUCT NAME', budget_value_col: 'BUDGET VALUE/L'})
-
-            all_products_df = pd.DataFrame({'PRODUCT NAME': group_products})
-
-            qty_df = all_products_df.merge(ly_qty, on='PRODUCT NAME', how='left') \
-                .merge(budget_qty, on='PRODUCT NAME', how='left') \
-                .merge(cy_qty, on='PRODUCT NAME', how='left').fillna(0)
-
-            value_df = all_products_df.merge(ly_value, on='PRODUCT NAME', how='left') \
-                .merge(budget_value, on='PRODUCT NAME', how='left') \
-                .merge(cy_value, on='PRODUCT NAME', how='left').fillna(0)
-
-            # FIXED: Use spaces instead of underscores in column references
-            qty_df['GROWTH %'] = qty_df.apply(lambda row: calculate_growth_percentage(row['CURRENT YEAR QTY/MT'], row['LAST YEAR QTY/MT']), axis=1)
-            value_df['GROWTH %'] = value_df.apply(lambda row: calculate_growth_percentage(row['CURRENT YEAR VALUE/L'], row['LAST YEAR VALUE/L']), axis=1)
-
-            # FIXED: Use spaces instead of underscores in column names
-            qty_df[['LAST YEAR QTY/MT', 'BUDGET QTY/MT', 'CURRENT YEAR QTY/MT']] = qty_df[['LAST YEAR QTY/MT', 'BUDGET QTY/MT', 'CURRENT YEAR QTY/MT']].round(2)
-            value_df[['LAST YEAR VALUE/L', 'BUDGET VALUE/L', 'CURRENT YEAR VALUE/L']] = value_df[['LAST YEAR VALUE/L', 'BUDGET VALUE/L', 'CURRENT YEAR VALUE/L']].round(2)
+        result = {}
 
-            # FIXED: Use spaces instead of underscores in column ordering
-            qty_df = qty_df[['PRODUCT NAME', 'LAST YEAR QTY/MT', 'BUDGET QTY/MT', 'CURRENT YEAR QTY/MT', 'GROWTH %']]
-            value_df = value_df[['PRODUCT NAME', 'LAST YEAR VALUE/L', 'BUDGET VALUE/L', 'CURRENT YEAR VALUE/L', 'GROWTH %']]
+        for group, lo, hi in spans:
+            part = table.iloc[lo:hi]
+            qty_df = group_frame(part, ['LAST YEAR QTY/MT', 'BUDGET QTY/MT', 'CURRENT YEAR QTY/MT'], 'QTY GROWTH %')
+            value_df = group_frame(part, ['LAST YEAR VALUE/L', 'BUDGET VALUE/L', 'CURRENT YEAR VALUE/L'], 'VALUE GROWTH %')
 
             # FIXED: Use spaces instead of underscores in total calculations
             total_ly_qty = qty_df['LAST YEAR QTY/MT'].sum()
@@ -0,0 +1,74 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Product growth engine
+# =========================
+# Both product growth reports (per company group in product_growth, for an
+# executive selection in executive_product_growth) compare LY, CY and budget
+# quantity/value per (company group, product group). They used to filter all
+# three frames once per company group, group each slice, merge the pieces
+# and then compute growth row by row. growth_sums() groups the three frames
+# over (company group, product group) with one key aligned across them, so
+# every company group's table is a lookup into the same result, and
+# growth_percent() computes the growth/achievement column for all rows of
+# all groups at once.
+
+
+def growth_sums(frames):
+    """
+    Sums per (company group, product group) over several frames with one
+    aligned key. frames is a list of (df, company_col, product_col,
+    measure_cols). Returns (keys, sums): keys is a DataFrame [company,
+    product] of every pair with rows in any frame, in order of first
+    appearance (frame by frame, row by row); sums holds each frame's measure
+    sums, as df.groupby(...)[measure_cols].sum() gives them, indexed by
+    position in keys and only for the pairs that frame has rows for.
+    """
+    stacked = pd.concat([
+        pd.DataFrame({
+            'company': df[company_col].to_numpy(dtype=object),
+            'product': df[product_col].to_numpy(dtype=object),
+        })
+        for df, company_col, product_col, _ in frames
+    ], ignore_index=True)
+    ids = stacked.groupby(['company', 'product'], sort=False).ngroup().to_numpy(dtype=np.int64)
+    valid = ids >= 0  # pairs with a missing name are left out, as groupby does
+    _, first = np.unique(ids[valid], return_index=True)
+    keys = stacked[valid].iloc[first].reset_index(drop=True)
+
+    sums, offset = [], 0
+    for df, _, _, measure_cols in frames:
+        part = ids[offset:offset + len(df)]
+        offset += len(df)
+        present = part >= 0
+        sums.append(df[measure_cols][present].groupby(part[present]).sum())
+    logger.info(f"Product growth sums: {len(stacked)} rows -> {len(keys)} (company, product) pairs")
+    return keys, sums
+
+
+def growth_positions(keys, companies, products):
+    """Position in keys of each (company, product) pair, -1 where no frame has rows for it."""
+    index = pd.MultiIndex.from_arrays([keys['company'], keys['product']])
+    wanted = pd.MultiIndex.from_arrays([pd.Index(companies, dtype=object), pd.Index(products, dtype=object)])
+    return index.get_indexer(wanted)
+
+
+def growth_percent(current, last):
+    """
+    (current - last) / last * 100 rounded to 2 places for whole columns: 0
+    where both are 0 (or missing) and 100 where only last is.
+    """
+    current = np.asarray(current, dtype=np.float64)
+    last = np.asarray(last, dtype=np.float64)
+    no_base = np.isnan(last) | (last == 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(no_base, np.where(np.isnan(current) | (current == 0), 0.0, 100.0),
+                          (current - last) / last * 100)
+    # builtin round() on Python floats (correctly rounded) as the row-by-row
+    # reports used; np.round can land on the other side of a .xx5 tie
+    return np.array([round(g, 2) for g in growth.tolist()], dtype=np.float64)
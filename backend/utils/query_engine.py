@@ -0,0 +1,130 @@
+import hashlib
+import logging
+import os
+import threading
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:  # pragma: no cover - reports fall back to pandas
+    DUCKDB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Embedded SQL engine (DuckDB)
+# =========================
+# The report functions group and filter full DataFrames in a single thread.
+# With REPORT_QUERY_ENGINE=duckdb their heavy row passes run as SQL on an
+# in-process DuckDB database instead (no server): sales fact tables are
+# registered as views over their Parquet copies (sales_facts_file), so
+# filters and column selection are pushed down into the scan and a report
+# never materializes the rows it doesn't aggregate; in-memory frames are
+# registered on the calling thread's cursor for the duration of one query.
+# Grouping runs on all cores (DUCKDB_THREADS caps it). Queries group by the
+# raw dimension values; reports map those to their own names in Python,
+# once per distinct value, and combine the (small) grouped result.
+# SQL sums are compensated (fsum) but not in row order, so totals can differ
+# from pandas in the last bits; pandas stays the default engine.
+
+QUERY_ENGINE = os.getenv('REPORT_QUERY_ENGINE', 'pandas').lower()
+THREADS = int(os.getenv('DUCKDB_THREADS', '0'))  # 0: DuckDB's default (all cores)
+MEMORY_LIMIT = os.getenv('DUCKDB_MEMORY_LIMIT')
+
+_lock = threading.Lock()
+_local = threading.local()
+_database = None
+_views = {}  # view name -> Parquet path
+
+
+def sql_enabled():
+    """Whether reports should run their aggregations through DuckDB."""
+    return DUCKDB_AVAILABLE and QUERY_ENGINE == 'duckdb'
+
+
+def _connect():
+    global _database
+    with _lock:
+        if _database is None:
+            _database = duckdb.connect(':memory:')
+            if THREADS:
+                _database.execute(f"SET threads = {THREADS}")
+            if MEMORY_LIMIT:
+                _database.execute(f"SET memory_limit = '{MEMORY_LIMIT}'")
+            logger.info(f"DuckDB {duckdb.__version__} started (threads={THREADS or 'default'})")
+        return _database
+
+
+def cursor():
+    """This thread's cursor on the shared in-process database (cursors are not thread-safe)."""
+    cur = getattr(_local, 'cursor', None)
+    if cur is None:
+        cur = _local.cursor = _connect().cursor()
+    return cur
+
+
+def quote(text):
+    """SQL string literal of text."""
+    return "'" + str(text).replace("'", "''") + "'"
+
+
+def parquet_view(path):
+    """Name of a view over a Parquet file, created on first use."""
+    path = os.path.abspath(path)
+    name = 'pq_' + hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+    cur = cursor()
+    # DDL goes through this thread's cursor like every other statement; the
+    # lock keeps two threads from creating the same view at once
+    with _lock:
+        if name not in _views:
+            cur.execute(f"CREATE OR REPLACE VIEW {name} AS SELECT * FROM read_parquet({quote(path)})")
+            _views[name] = path
+    return name
+
+
+def query(sql, params=None, **frames):
+    """
+    Result of sql as a DataFrame, with each keyword frame (DataFrame or
+    Arrow table) visible to the query under its keyword name.
+    """
+    cur = cursor()
+    for name, frame in frames.items():
+        cur.register(name, frame)
+    try:
+        return cur.execute(sql, params or []).df()
+    finally:
+        for name in frames:
+            cur.unregister(name)
+
+
+def distinct_values(view, field):
+    """Distinct values of a view's column, missing included."""
+    return query(f"SELECT DISTINCT {field} FROM {view}")[field]
+
+
+def _in_list(expression, values, params):
+    """expression IN (values) with values as parameters; None matches missing values."""
+    present = [str(v) for v in values if v is not None]
+    params.extend(present)
+    conditions = [f"{expression} IN ({', '.join('?' * len(present))})"] if present else []
+    if len(present) < len(values):
+        conditions.append(f"{expression} IS NULL")
+    return f"({' OR '.join(conditions)})" if conditions else 'FALSE'
+
+
+def view_sums(view, by, measures, where=None):
+    """
+    SELECT by..., fsum(measure)..., count(*) AS rows FROM view GROUP BY by,
+    over the rows whose where fields ({field: values}, compared as text,
+    None for missing) hold one of the given values.
+    """
+    params, conditions = [], []
+    for field, values in (where or {}).items():
+        conditions.append(_in_list(field, list(values), params))
+    columns = list(by) + [f"fsum({m}) AS {m}" for m in measures] + ["count(*) AS rows"]
+    sql = f"SELECT {', '.join(columns)} FROM {view}"
+    if conditions:
+        sql += f" WHERE {' AND '.join(conditions)}"
+    if by:
+        sql += f" GROUP BY {', '.join(by)}"
+    return query(sql, params)
@@ -0,0 +1,253 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.budget_matching import _freeze
+from utils.workbook_cache import CACHE_DIR, PARQUET_AVAILABLE, _nan_columns, _write_atomic, sweep_disk_cache
+
+if PARQUET_AVAILABLE:
+    import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Server-side result store
+# =========================
+# Processed tables (the auditor's Table 1 / Table 2, product totals) used to
+# live in the Flask session: every row was serialized into the cookie on each
+# response, and large tables overflowed it. The store keeps them on the
+# server under opaque keys (result_key of e.g. file hash, sheet and table
+# type); the session only remembers the keys. Entries are a DataFrame plus
+# JSON-able metadata. They are held in an LRU capped by total DataFrame
+# memory (RESULT_STORE_MAX_MB) and written to RESULTS_DIR as Arrow IPC files
+# (pickle when a table doesn't fit Arrow's types), so an entry evicted from
+# memory, or stored by another worker, is read back from disk. Entries expire
+# RESULT_STORE_TTL seconds after they were stored, in memory and on disk.
+
+RESULTS_DIR = os.path.join(CACHE_DIR, 'results')
+MAX_BYTES = int(float(os.getenv('RESULT_STORE_MAX_MB', '256')) * 1024 * 1024)
+TTL_SECONDS = int(os.getenv('RESULT_STORE_TTL', str(6 * 3600)))
+SWEEP_SECONDS = 600
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (frame, meta, nbytes, stored_at)
+_state = {'bytes': 0, 'last_sweep': 0.0}
+_stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'stores': 0}
+
+
+def result_key(*parts):
+    """Opaque key for a result identified by parts (e.g. file digest, sheet, table type)."""
+    return hashlib.sha1(repr(_freeze(list(parts))).encode('utf-8')).hexdigest()
+
+
+def _entry_path(key, ext):
+    return os.path.join(RESULTS_DIR, key[:2], f"{key}.{ext}")
+
+
+def _write_arrow(path, frame, meta):
+    nan_columns = _nan_columns(frame)
+    if nan_columns is None or not frame.columns.is_unique or not all(isinstance(c, str) for c in frame.columns):
+        raise TypeError("table needs pickle")
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    extra = {'meta': meta, 'nan_columns': nan_columns}
+    table = table.replace_schema_metadata(dict(table.schema.metadata or {}, result_store=json.dumps(extra, default=str)))
+
+    def writer(tmp):
+        with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as ipc:
+            ipc.write_table(table)
+    _write_atomic(path, writer)
+
+
+def _read_arrow(path):
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    extra = json.loads(table.schema.metadata[b'result_store'])
+    frame = table.to_pandas()
+    for position in extra['nan_columns']:
+        column = frame.iloc[:, position]
+        frame.iloc[:, position] = column.where(column.notna(), np.nan)
+    return frame, extra['meta']
+
+
+def _store_to_disk(key, frame, meta):
+    os.makedirs(os.path.dirname(_entry_path(key, 'arrow')), exist_ok=True)
+    # The file in the other format may hold an earlier version of the entry
+    # (_load_from_disk reads .arrow first), so it goes once the new one is written
+    if PARQUET_AVAILABLE:
+        try:
+            _write_arrow(_entry_path(key, 'arrow'), frame, meta)
+            _remove_file(_entry_path(key, 'pkl'))
+            return
+        except Exception as e:
+            logger.debug(f"Result {key[:12]} stored as pickle: {e}")
+    try:
+        _write_atomic(_entry_path(key, 'pkl'), lambda p: _dump_pickle(p, frame, meta))
+        _remove_file(_entry_path(key, 'arrow'))
+    except Exception as e:
+        logger.warning(f"Could not persist result {key[:12]}: {e}")
+        _remove_files(key)
+
+
+def _dump_pickle(path, frame, meta):
+    with open(path, 'wb') as fh:
+        pickle.dump((frame, meta), fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _load_pickle(path):
+    with open(path, 'rb') as fh:
+        return pickle.load(fh)
+
+
+def _disk_files(key):
+    return [_entry_path(key, ext) for ext in ('arrow', 'pkl')]
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _remove_files(key):
+    for path in _disk_files(key):
+        _remove_file(path)
+
+
+def _load_from_disk(key):
+    """(frame, meta, stored_at) from disk, or None; expired or unreadable files are removed."""
+    for path, reader in zip(_disk_files(key), (_read_arrow, _load_pickle)):
+        if not os.path.exists(path) or (path.endswith('.arrow') and not PARQUET_AVAILABLE):
+            continue
+        try:
+            stored_at = os.path.getmtime(path)
+            if time.time() - stored_at > TTL_SECONDS:
+                os.remove(path)
+                with _lock:
+                    _stats['expired'] += 1
+                continue
+            frame, meta = reader(path)
+            return frame, meta, stored_at
+        except Exception as e:
+            logger.warning(f"Discarding unreadable result {path}: {e}")
+            _remove_file(path)
+    return None
+
+
+def _remember(key, frame, meta, stored_at):
+    nbytes = int(frame.memory_usage(index=True, deep=True).sum())
+    with _lock:
+        previous = _entries.pop(key, None)
+        if previous is not None:
+            _state['bytes'] -= previous[2]
+        _entries[key] = (frame, meta, nbytes, stored_at)
+        _state['bytes'] += nbytes
+        while _state['bytes'] > MAX_BYTES and len(_entries) > 1:
+            _, evicted = _entries.popitem(last=False)
+            _state['bytes'] -= evicted[2]
+            _stats['evictions'] += 1
+
+
+def put_table(key, frame, meta=None):
+    """Store frame and its JSON-able meta under key, replacing any earlier entry."""
+    meta = dict(meta or {})
+    stored_at = time.time()
+    _store_to_disk(key, frame, meta)
+    _remember(key, frame, meta, stored_at)
+    with _lock:
+        _stats['stores'] += 1
+        sweep = stored_at - _state['last_sweep'] > SWEEP_SECONDS
+        if sweep:
+            _state['last_sweep'] = stored_at
+    if sweep:
+        purge_expired()
+    sweep_disk_cache()
+
+
+def get_table(key):
+    """(frame, meta) stored under key, or None if missing or expired. Treat both as read-only."""
+    now = time.time()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and now - entry[3] > TTL_SECONDS:
+            _entries.pop(key)
+            _state['bytes'] -= entry[2]
+            _stats['expired'] += 1
+            entry = None
+            expired = True
+        else:
+            expired = False
+        if entry is not None:
+            _entries.move_to_end(key)
+            _stats['hits'] += 1
+            return entry[0], entry[1]
+    if expired:
+        _remove_files(key)
+        with _lock:
+            _stats['misses'] += 1
+        return None
+
+    loaded = _load_from_disk(key)
+    with _lock:
+        _stats['disk_hits' if loaded is not None else 'misses'] += 1
+    if loaded is None:
+        return None
+    frame, meta, stored_at = loaded
+    _remember(key, frame, meta, stored_at)
+    return frame, meta
+
+
+def has_table(key):
+    """Whether key has a live entry (in memory or on disk)."""
+    return get_table(key) is not None
+
+
+def drop_table(key):
+    """Forget key's entry, in memory and on disk. Returns whether it was in memory."""
+    with _lock:
+        entry = _entries.pop(key, None)
+        if entry is not None:
+            _state['bytes'] -= entry[2]
+    _remove_files(key)
+    return entry is not None
+
+
+def purge_expired():
+    """Drop entries older than TTL_SECONDS from memory and RESULTS_DIR. Returns how many files were removed."""
+    now = time.time()
+    with _lock:
+        stale = [key for key, entry in _entries.items() if now - entry[3] > TTL_SECONDS]
+        for key in stale:
+            _state['bytes'] -= _entries.pop(key)[2]
+        _stats['expired'] += len(stale)
+    removed = 0
+    for path in glob.glob(os.path.join(RESULTS_DIR, '*', '*')):
+        try:
+            if now - os.path.getmtime(path) > TTL_SECONDS:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    if stale or removed:
+        logger.info(f"Result store: expired {len(stale)} in-memory entries, {removed} files")
+    return removed
+
+
+def result_store_stats():
+    with _lock:
+        return dict(_stats, entries=len(_entries), bytes=_state['bytes'], max_bytes=MAX_BYTES, ttl_seconds=TTL_SECONDS)
+
+
+def clear_result_store():
+    """Forget in-memory entries (files on disk stay until they expire)."""
+    with _lock:
+        _entries.clear()
+        _state['bytes'] = 0
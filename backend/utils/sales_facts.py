@@ -0,0 +1,273 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.budget_matching import _freeze, cached_report
+from utils.customer_counts import financial_years, format_months
+from utils.date_parsing import parse_dates
+from utils.normalizers import factorize_values
+from utils.workbook_cache import (CACHE_DIR, PARQUET_AVAILABLE, _write_atomic, file_digest, read_sheet,
+                                  sweep_disk_cache, touch)
+
+if PARQUET_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Sales fact table
+# =========================
+# Reports used to re-derive the same columns from a raw sales sheet on every
+# request: parsed dates and their months, numeric quantity/value, and text
+# branch / executive / SL code / product columns normalized row by row.
+# sales_facts() does the typing once per (file content, sheet, column
+# mapping). Dimensions are dictionary-encoded: a categorical over the cell
+# text (astype(str) of each distinct value), with missing cells null. month is
+# an int32 month number (months since Jan 1970, NO_MONTH when undated) with
+# its April-March financial year in fy, date keeps the parsed date, and
+# qty/value are pd.to_numeric(errors='coerce'). Tables are kept as Arrow in
+# memory and written to Parquet under CACHE_DIR/facts, so other workers and
+# restarts skip the ingest. Reports normalize a dimension once per category
+# (fact_dimension) rather than per row, and sales_rollup() pre-sums
+# month x branch x executive x product.
+#
+# Only the branch and executive budget vs billed reports read their sales
+# rows from here so far. OD, NBC and product growth group their own inputs
+# once per file into cached cubes (od_engine, customer_counts,
+# product_growth_engine). The auditor region / product / TS-PW / ERO-PW
+# reports still read the sheet: they pick columns by fuzzy header match per
+# sheet, take months from text cells by month name (parse_dates reads those
+# differently) and drop branch-months whose rows are all zero, none of which
+# the fact table or the rollup records. Moving them over needs those rules
+# in the fact table first.
+
+DIMENSIONS = ('branch', 'region', 'executive', 'sl_code', 'product_group', 'company_group', 'customer')
+MEASURES = ('qty', 'value')
+ROLLUP = ('month', 'branch', 'executive', 'product_group')
+NO_MONTH = np.iinfo(np.int32).min
+
+FACTS_DIR = os.path.join(CACHE_DIR, 'facts')
+MAX_ENTRIES = int(os.getenv('SALES_FACTS_ENTRIES', '8'))
+
+_lock = threading.Lock()
+_tables = OrderedDict()  # facts key -> (Arrow table or DataFrame, source columns)
+_stats = {'hits': 0, 'disk_hits': 0, 'misses': 0}
+
+
+def _text_categories(series):
+    """Categorical over the astype(str) text of series' values; missing cells stay missing."""
+    codes, uniques = factorize_values(series)
+    text_codes, categories = pd.factorize(uniques.astype(str))
+    text_codes = np.where(uniques.isna().to_numpy(), -1, text_codes)
+    return pd.Categorical.from_codes(text_codes[codes], categories=categories)
+
+
+def build_sales_facts(df, columns, dayfirst=True):
+    """
+    Fact table of a sales frame. columns maps fields (date, qty, value and
+    any of DIMENSIONS) to df's columns; fields whose column is missing or
+    None are left out.
+    """
+    present = {field: col for field, col in columns.items() if col is not None and col in df.columns}
+    facts = {}
+    if 'date' in present:
+        dates = parse_dates(df[present['date']], dayfirst=dayfirst)
+        values = dates.to_numpy(dtype='datetime64[ns]')
+        dated = ~np.isnat(values)
+        months = np.where(dated, values.astype('datetime64[M]').astype(np.int64), NO_MONTH).astype(np.int32)
+        fy = np.full(len(df), None, dtype=object)
+        fy[dated] = financial_years(months[dated])
+        facts.update(date=values, month=months, fy=pd.Categorical(fy))
+    for field in DIMENSIONS:
+        if field in present:
+            facts[field] = _text_categories(df[present[field]])
+    for field in MEASURES:
+        if field in present:
+            facts[field] = pd.to_numeric(df[present[field]], errors='coerce').to_numpy()
+    return pd.DataFrame(facts, index=pd.RangeIndex(len(df)))
+
+
+def _facts_path(key):
+    name = hashlib.sha1(repr(key[1:]).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(FACTS_DIR, key[0][:2], f"{key[0]}_{name}.parquet")
+
+
+def _load_from_disk(key):
+    path = _facts_path(key)
+    if not PARQUET_AVAILABLE or not os.path.exists(path):
+        return None
+    try:
+        table = pq.read_table(path)
+        meta = json.loads(table.schema.metadata[b'sales_facts'])
+        touch(path)
+        return table, meta['source_columns']
+    except Exception as e:
+        logger.warning(f"Discarding unreadable fact table {path}: {e}")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+
+def _to_arrow(facts, source_columns):
+    table = pa.Table.from_pandas(facts, preserve_index=False)
+    meta = dict(table.schema.metadata or {})
+    meta[b'sales_facts'] = json.dumps({'source_columns': list(source_columns)}, default=str).encode('utf-8')
+    return table.replace_schema_metadata(meta)
+
+
+def _store_to_disk(key, table):
+    try:
+        path = _facts_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(path, lambda p: pq.write_table(table, p))
+    except Exception as e:
+        logger.warning(f"Could not persist fact table for {key[0][:12]}: {e}")
+    finally:
+        sweep_disk_cache()
+
+
+def _read_source(path, sheet_name, header, dtype):
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    return read_sheet(path, sheet_name=sheet_name, header=header, dtype=dtype)
+
+
+def _facts_key(path, columns, sheet_name, header, dtype, dayfirst):
+    dtype_key = tuple(sorted((str(k), str(v)) for k, v in dtype.items())) if dtype else ()
+    return (file_digest(path), sheet_name, header, dtype_key, _freeze(columns), bool(dayfirst))
+
+
+def _facts_entry(key, path, columns, sheet_name, header, dtype, dayfirst):
+    """(Arrow table or DataFrame, source columns) for key: from memory, the Parquet copy or a fresh build."""
+    with _lock:
+        entry = _tables.get(key)
+        if entry is not None:
+            _tables.move_to_end(key)
+            _stats['hits'] += 1
+            return entry
+
+    entry = _load_from_disk(key)
+    if entry is not None:
+        with _lock:
+            _stats['disk_hits'] += 1
+    else:
+        with _lock:
+            _stats['misses'] += 1
+        df = _read_source(path, sheet_name, header, dtype)
+        facts = build_sales_facts(df, columns, dayfirst=dayfirst)
+        logger.info(f"Sales facts for {os.path.basename(path)}: {len(facts)} rows, fields {list(facts.columns)}")
+        if PARQUET_AVAILABLE:
+            entry = (_to_arrow(facts, df.columns), list(df.columns))
+            _store_to_disk(key, entry[0])
+        else:
+            entry = (facts, list(df.columns))
+    with _lock:
+        _tables[key] = entry
+        _tables.move_to_end(key)
+        while len(_tables) > MAX_ENTRIES:
+            _tables.popitem(last=False)
+    return entry
+
+
+def sales_facts(path, columns, sheet_name=0, header=0, dtype=None, dayfirst=True):
+    """
+    Fact table (see build_sales_facts) of a sales workbook or CSV, built once
+    per file content, sheet, header, dtype overrides and column mapping.
+    attrs['source_columns'] lists the sheet's own columns. Returns a fresh
+    DataFrame; its categories are shared, so treat them as read-only.
+    """
+    key = _facts_key(path, columns, sheet_name, header, dtype, dayfirst)
+    table, source_columns = _facts_entry(key, path, columns, sheet_name, header, dtype, dayfirst)
+    facts = table.copy() if isinstance(table, pd.DataFrame) else table.to_pandas()
+    facts.attrs['source_columns'] = list(source_columns)
+    return facts
+
+
+def sales_facts_file(path, columns, sheet_name=0, header=0, dtype=None, dayfirst=True):
+    """
+    Path of the Parquet copy of sales_facts(path, columns, ...), for readers
+    that scan it directly (see query_engine); None without pyarrow.
+    """
+    if not PARQUET_AVAILABLE:
+        return None
+    key = _facts_key(path, columns, sheet_name, header, dtype, dayfirst)
+    file = _facts_path(key)
+    if not os.path.exists(file):
+        table, _ = _facts_entry(key, path, columns, sheet_name, header, dtype, dayfirst)
+        if not os.path.exists(file):  # kept in memory, but the copy on disk was removed
+            _store_to_disk(key, table)
+    return file if os.path.exists(file) else None
+
+
+def fact_dimension(facts, field, func=None, missing='nan'):
+    """
+    Row values of a dimension: the cell text (missing cells as missing,
+    'nan' by default like astype(str)), passed through func once per
+    distinct value when given.
+    """
+    column = facts[field]
+    values = list(column.cat.categories) + [missing]
+    if func is not None:
+        values = [func(v) for v in values]
+    lookup = np.empty(len(values), dtype=object)
+    lookup[:] = values
+    return pd.Series(lookup[column.cat.codes.to_numpy()], index=facts.index, name=field)
+
+
+def fact_isin(facts, field, values):
+    """Boolean mask of rows whose dimension text is one of values (compared as str)."""
+    column = facts[field]
+    allowed = column.cat.categories.isin([str(v) for v in values])
+    codes = column.cat.codes.to_numpy()
+    return np.where(codes >= 0, allowed[np.maximum(codes, 0)], False) if len(allowed) else np.zeros(len(codes), dtype=bool)
+
+
+def fact_month_labels(facts, fmt='%b %y'):
+    """fmt label of each row's month (NaN when undated), like date_parsing.month_labels of the dates."""
+    months = facts['month'].to_numpy()
+    labels = np.full(len(months), np.nan, dtype=object)
+    dated = months != NO_MONTH
+    if dated.any():
+        labels[dated] = format_months(months[dated], fmt)
+    return pd.Series(labels, index=facts.index)
+
+
+def sales_rollup(path, columns, by=ROLLUP, sheet_name=0, header=0, dtype=None, dayfirst=True):
+    """
+    qty/value summed and rows counted per by (the fields of it the fact
+    table has) over sales_facts(path, columns, ...), with value also in
+    lakhs. Cached per fact table and grouping.
+    """
+    key = ('sales_rollup', _facts_key(path, columns, sheet_name, header, dtype, dayfirst), tuple(by))
+
+    def build():
+        facts = sales_facts(path, columns, sheet_name=sheet_name, header=header, dtype=dtype, dayfirst=dayfirst)
+        fields = [field for field in by if field in facts.columns]
+        grouped = facts.groupby(fields, observed=True, sort=False, dropna=False)
+        rollup = grouped[[field for field in MEASURES if field in facts.columns]].sum()
+        rollup['rows'] = grouped.size()
+        if 'value' in rollup:
+            rollup['value_lakhs'] = rollup['value'] / 100000
+        return rollup.reset_index()
+
+    return cached_report(key, build)
+
+
+def sales_facts_stats():
+    with _lock:
+        return dict(_stats, entries=len(_tables))
+
+
+def clear_sales_facts():
+    """Forget in-memory fact tables (Parquet copies stay valid; they are keyed by file content)."""
+    with _lock:
+        _tables.clear()
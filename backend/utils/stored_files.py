@@ -0,0 +1,59 @@
+from flask import Response, abort, stream_with_context
+from sqlalchemy import func
+
+from extensions import db
+
+# =========================
+# Stored-file listings and downloads
+# =========================
+# BudgetFile/SalesFile/OsFile keep whole workbooks in a LargeBinary column.
+# Listings select metadata only, and downloads pull the blob out of the
+# database in DOWNLOAD_CHUNK slices (SUBSTR on the column), so a download never
+# holds more than one chunk of the file in the worker.
+
+DOWNLOAD_CHUNK = 1024 * 1024
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def list_stored_files(model):
+    """id / filename / uploaded_at / size of every stored file, newest first, without the blobs."""
+    rows = (
+        db.session.query(model.id, model.filename, model.uploaded_at, model.file_size)
+        .order_by(model.uploaded_at.desc())
+        .all()
+    )
+    return [
+        {
+            "id": file_id,
+            "filename": filename,
+            "uploaded_at": uploaded_at.isoformat() if uploaded_at else None,
+            "size": size,
+        }
+        for file_id, filename, uploaded_at, size in rows
+    ]
+
+
+def stream_stored_file(model, file_id, download_name=None, mimetype=XLSX_MIMETYPE):
+    """Attachment response that streams model.file_data for file_id in chunks (404 if missing)."""
+    row = db.session.query(model.filename, model.file_size).filter(model.id == file_id).first()
+    if row is None:
+        abort(404)
+    size = row.file_size
+    if size is None:
+        size = db.session.query(func.length(model.file_data)).filter(model.id == file_id).scalar() or 0
+
+    def generate():
+        for offset in range(0, size, DOWNLOAD_CHUNK):
+            chunk = (
+                db.session.query(func.substr(model.file_data, offset + 1, DOWNLOAD_CHUNK))
+                .filter(model.id == file_id)
+                .scalar()
+            )
+            if not chunk:
+                break
+            yield bytes(chunk)
+
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers["Content-Length"] = str(size)
+    response.headers.set("Content-Disposition", "attachment", filename=download_name or row.filename)
+    return response
@@ -0,0 +1,300 @@
+import os
+import glob
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.date_parsing import parse_dates
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Parsed-workbook cache
+# =========================
+# Sheets are keyed by (file SHA-256, sheet, header row, dtype overrides), so
+# the same bytes uploaded under two names share one parse and an overwritten
+# upload gets a new key automatically. Parsed frames live in an in-process
+# LRU and are spilled to Parquet (pickle for sheets Arrow can't represent)
+# under CACHE_DIR so other workers and the next restart skip openpyxl entirely.
+# Arrow reads every missing text cell back as None, while a parse gives NaN
+# (astype(str) -> 'nan' vs 'None'), so the Parquet file records which object
+# columns held NaN and those are restored on load.
+#
+# Everything under CACHE_DIR that lives in a two-character shard directory
+# (parsed sheets here, fact tables, stored results) can be rebuilt, so those
+# files are pruned: unused for WORKBOOK_CACHE_TTL seconds (disk hits refresh
+# the mtime), then least recently used first while they take more than
+# WORKBOOK_CACHE_MAX_MB. Writers sweep at most every SWEEP_SECONDS.
+
+CACHE_DIR = os.getenv('WORKBOOK_CACHE_DIR', os.path.join('uploads', '.cache'))
+MAX_ENTRIES = int(os.getenv('WORKBOOK_CACHE_ENTRIES', '32'))
+DISK_TTL_SECONDS = int(os.getenv('WORKBOOK_CACHE_TTL', str(14 * 24 * 3600)))
+DISK_MAX_BYTES = int(float(os.getenv('WORKBOOK_CACHE_MAX_MB', '4096')) * 1024 * 1024)
+SWEEP_SECONDS = 600
+_HASH_CHUNK = 1024 * 1024
+
+_lock = threading.RLock()
+_digests = {}            # abs path -> (mtime_ns, size, sha256)
+_frames = OrderedDict()  # cache key -> DataFrame
+_stats = {'hits': 0, 'disk_hits': 0, 'misses': 0}
+_state = {'last_sweep': 0.0}
+
+
+def file_digest(path):
+    """Return the SHA-256 of a file, rehashing only when its mtime/size change."""
+    abs_path = os.path.abspath(path)
+    st = os.stat(abs_path)
+    with _lock:
+        known = _digests.get(abs_path)
+        if known and known[0] == st.st_mtime_ns and known[1] == st.st_size:
+            return known[2]
+
+    sha = hashlib.sha256()
+    with open(abs_path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(_HASH_CHUNK), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _lock:
+        _digests[abs_path] = (st.st_mtime_ns, st.st_size, digest)
+        if known and known[2] != digest:
+            _drop_digest(known[2])
+    return digest
+
+
+def _drop_digest(digest):
+    """Evict in-memory entries of a file version that is no longer on disk under its path."""
+    if any(d == digest for _, _, d in _digests.values()):
+        return
+    for key in [k for k in _frames if k[0] == digest]:
+        del _frames[key]
+
+
+def _cache_key(digest, sheet_name, header, dtype, date_columns=None, dayfirst=False, nrows=None):
+    dtype_key = tuple(sorted((str(k), str(v)) for k, v in dtype.items())) if dtype else ()
+    key = (digest, sheet_name, header, dtype_key)
+    if date_columns:
+        key += ((tuple(sorted(map(str, date_columns))), bool(dayfirst)),)
+    if nrows is not None:
+        key += (('nrows', int(nrows)),)
+    return key
+
+
+def _entry_path(key, ext):
+    name = hashlib.sha1(repr(key[1:]).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, key[0][:2], f"{key[0]}_{name}.{ext}")
+
+
+def _nan_columns(frame):
+    """Object columns whose missing cells are all NaN (Arrow reads every missing cell back as None)."""
+    columns = []
+    for position, dtype in enumerate(frame.dtypes):
+        if dtype != object:
+            continue
+        values = frame.iloc[:, position].to_numpy()
+        missing = [v for v in values if v is None or (isinstance(v, float) and np.isnan(v))]
+        if missing and all(v is not None for v in missing):
+            columns.append(position)
+        elif missing and any(v is not None for v in missing) and any(v is None for v in missing):
+            return None  # both kinds in one column: only pickle keeps them apart
+    return columns
+
+
+def _write_parquet(path, df):
+    nan_columns = _nan_columns(df)
+    if nan_columns is None:
+        raise TypeError("sheet mixes None and NaN")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    extra = json.dumps({'nan_columns': nan_columns})
+    table = table.replace_schema_metadata(dict(table.schema.metadata or {}, workbook_cache=extra))
+    _write_atomic(path, lambda p: pq.write_table(table, p))
+
+
+def _read_parquet(path):
+    table = pq.read_table(path)
+    extra = (table.schema.metadata or {}).get(b'workbook_cache')
+    if extra is None:
+        raise ValueError("written before NaN columns were recorded")
+    df = table.to_pandas()
+    for position in json.loads(extra)['nan_columns']:
+        column = df.iloc[:, position]
+        df.iloc[:, position] = column.where(column.notna(), np.nan)
+    return df
+
+
+def _load_from_disk(key):
+    for ext, reader in (('parquet', _read_parquet), ('pkl', pd.read_pickle)):
+        if ext == 'parquet' and not PARQUET_AVAILABLE:
+            continue
+        path = _entry_path(key, ext)
+        if not os.path.exists(path):
+            continue
+        try:
+            df = reader(path)
+            touch(path)
+            return df
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return None
+
+
+def _write_atomic(path, writer):
+    # unique per thread: workers write the same entry concurrently
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        writer(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _store_to_disk(key, df):
+    # Parquet needs unique string column labels and single-typed columns.
+    # Exports routinely mix ints and text in code columns, so anything Arrow
+    # rejects is pickled instead to keep the cached frame identical to a parse.
+    try:
+        os.makedirs(os.path.dirname(_entry_path(key, 'pkl')), exist_ok=True)
+        if (PARQUET_AVAILABLE and all(isinstance(c, str) for c in df.columns)
+                and not df.columns.duplicated().any()):
+            try:
+                _write_parquet(_entry_path(key, 'parquet'), df)
+                return
+            except Exception as e:
+                logger.debug(f"Sheet {key[1]!r} not Arrow-compatible, pickling instead: {e}")
+        _write_atomic(_entry_path(key, 'pkl'), df.to_pickle)
+    except Exception as e:
+        logger.warning(f"Could not persist parsed sheet {key[1]!r}: {e}")
+    finally:
+        sweep_disk_cache()
+
+
+def touch(path):
+    """Mark a cache file as used, so pruning keeps it."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def purge_disk_cache():
+    """
+    Remove shard files under CACHE_DIR unused for DISK_TTL_SECONDS, then the
+    least recently used until the rest fit in DISK_MAX_BYTES. Returns how many
+    files were removed.
+    """
+    now = time.time()
+    files = []
+    for path in glob.glob(os.path.join(CACHE_DIR, '**', '??', '*'), recursive=True):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+
+    removed = 0
+    total = 0
+    for mtime, size, path in sorted(files, reverse=True):
+        total += size
+        if now - mtime <= DISK_TTL_SECONDS and total <= DISK_MAX_BYTES:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    if removed:
+        logger.info(f"Workbook cache: removed {removed} files from {CACHE_DIR}")
+    return removed
+
+
+def sweep_disk_cache():
+    """purge_disk_cache, at most once every SWEEP_SECONDS per process."""
+    now = time.time()
+    with _lock:
+        if now - _state['last_sweep'] <= SWEEP_SECONDS:
+            return 0
+        _state['last_sweep'] = now
+    return purge_disk_cache()
+
+
+def _remember(key, df):
+    with _lock:
+        _frames[key] = df
+        _frames.move_to_end(key)
+        while len(_frames) > MAX_ENTRIES:
+            _frames.popitem(last=False)
+
+
+def read_sheet(path, sheet_name=0, header=0, dtype=None, date_columns=None, dayfirst=False, nrows=None):
+    """
+    Drop-in replacement for pd.read_excel(path, sheet_name=..., header=..., dtype=..., nrows=...)
+    that parses each (file content, sheet, header) at most once.
+    date_columns (present ones only) come back as parse_dates(col, dayfirst),
+    cached alongside the sheet so they are converted once per file version.
+    nrows only parses the top of the sheet; that head is cached as its own entry.
+    Returns a fresh copy, so callers are free to mutate the frame.
+    """
+    digest = file_digest(path)
+    key = _cache_key(digest, sheet_name, header, dtype, date_columns, dayfirst, nrows)
+
+    with _lock:
+        df = _frames.get(key)
+        if df is not None:
+            _frames.move_to_end(key)
+            _stats['hits'] += 1
+            return df.copy()
+
+    df = _load_from_disk(key)
+    if df is not None:
+        with _lock:
+            _stats['disk_hits'] += 1
+    else:
+        with _lock:
+            _stats['misses'] += 1
+        if date_columns:
+            df = read_sheet(path, sheet_name=sheet_name, header=header, dtype=dtype, nrows=nrows)
+            for col in date_columns:
+                if col in df.columns:
+                    df[col] = parse_dates(df[col], dayfirst=dayfirst)
+        else:
+            df = pd.read_excel(path, sheet_name=sheet_name, header=header, dtype=dtype, nrows=nrows)
+        _store_to_disk(key, df)
+
+    _remember(key, df)
+    return df.copy()
+
+
+def invalidate(path=None):
+    """Forget cached sheets for one file (or everything when path is None)."""
+    with _lock:
+        if path is None:
+            _frames.clear()
+            _digests.clear()
+            return
+        known = _digests.pop(os.path.abspath(path), None)
+        if known:
+            _drop_digest(known[2])
+
+
+def cache_stats():
+    with _lock:
+        return dict(_stats, entries=len(_frames))
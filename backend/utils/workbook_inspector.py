@@ -0,0 +1,299 @@
+import re
+import zipfile
+import logging
+import posixpath
+from datetime import datetime, timedelta
+from xml.etree.ElementTree import iterparse
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Metadata-only workbook inspection
+# =========================
+# Sheet pickers and header previews only need sheet names and the first few
+# rows. For .xlsx files those are read straight out of the zip: workbook.xml
+# for the sheet list and a streamed parse of the sheet XML that stops as soon
+# as enough rows have been seen, so the cost no longer grows with row count.
+# Anything that is not an xlsx zip (legacy .xls, csv) falls back to pandas.
+
+PROBE_ROWS = 50          # data rows scanned past the header to size the column set
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+_BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_CELL_REF = re.compile(r'([A-Z]+)(\d+)')
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return source
+
+
+def is_xlsx(source):
+    """True when source (path or file object) is an OOXML zip container."""
+    try:
+        return zipfile.is_zipfile(_rewind(source))
+    finally:
+        _rewind(source)
+
+
+def _col_index(letters):
+    idx = 0
+    for ch in letters:
+        idx = idx * 26 + (ord(ch) - 64)
+    return idx - 1
+
+
+class _Workbook:
+    """Lazily-read view over the parts of an xlsx zip we need."""
+
+    def __init__(self, source):
+        self.zf = zipfile.ZipFile(_rewind(source))
+        self._sheets = None
+        self._date_styles = None
+
+    def close(self):
+        self.zf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def sheets(self):
+        """Ordered list of (sheet name, part path inside the zip)."""
+        if self._sheets is None:
+            targets = {}
+            rels_path = 'xl/_rels/workbook.xml.rels'
+            for _, el in iterparse(self.zf.open(rels_path)):
+                if _local(el.tag) == 'Relationship':
+                    target = el.get('Target', '')
+                    if target.startswith('/'):
+                        target = target.lstrip('/')
+                    else:
+                        target = posixpath.normpath(posixpath.join('xl', target))
+                    targets[el.get('Id')] = target
+            sheets = []
+            for _, el in iterparse(self.zf.open('xl/workbook.xml')):
+                if _local(el.tag) == 'sheet':
+                    rid = el.get(f'{{{_REL_NS}}}id') or el.get('id')
+                    sheets.append((el.get('name'), targets.get(rid)))
+            self._sheets = sheets
+        return self._sheets
+
+    def sheet_part(self, sheet_name):
+        if isinstance(sheet_name, int):
+            if sheet_name >= len(self.sheets):
+                raise ValueError(f"Worksheet index {sheet_name} is invalid, {len(self.sheets)} worksheets found")
+            return self.sheets[sheet_name][1]
+        for name, part in self.sheets:
+            if name == sheet_name:
+                return part
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+
+    @property
+    def date_styles(self):
+        """Set of cellXfs indices whose number format renders a date/time."""
+        if self._date_styles is None:
+            self._date_styles = set()
+            if 'xl/styles.xml' not in self.zf.namelist():
+                return self._date_styles
+            custom = {}
+            xf_index = 0
+            in_cell_xfs = False
+            for event, el in iterparse(self.zf.open('xl/styles.xml'), events=('start', 'end')):
+                tag = _local(el.tag)
+                if tag == 'cellXfs':
+                    in_cell_xfs = event == 'start'
+                elif event == 'end' and tag == 'numFmt':
+                    custom[int(el.get('numFmtId'))] = el.get('formatCode', '')
+                elif event == 'end' and tag == 'xf' and in_cell_xfs:
+                    fmt_id = int(el.get('numFmtId', 0))
+                    if fmt_id in _BUILTIN_DATE_FORMATS or _is_date_format(custom.get(fmt_id, '')):
+                        self._date_styles.add(xf_index)
+                    xf_index += 1
+        return self._date_styles
+
+    def shared_strings(self, needed):
+        """Resolve only the shared-string indices in `needed`, streaming until the largest."""
+        if not needed or 'xl/sharedStrings.xml' not in self.zf.namelist():
+            return {}
+        last = max(needed)
+        found = {}
+        idx = 0
+        for _, el in iterparse(self.zf.open('xl/sharedStrings.xml')):
+            if _local(el.tag) != 'si':
+                continue
+            if idx in needed:
+                # Phonetic runs (rPh) are annotations, not part of the cell text
+                found[idx] = ''.join(
+                    t.text or '' for t in el.iter()
+                    if _local(t.tag) == 't' and not _inside_phonetic(el, t)
+                )
+            el.clear()
+            if idx >= last:
+                break
+            idx += 1
+        return found
+
+    def dimension(self, sheet_name):
+        """The sheet's declared used range (e.g. 'A1:AZ500001'), read from the sheet header."""
+        for _, el in iterparse(self.zf.open(self.sheet_part(sheet_name)), events=('start',)):
+            tag = _local(el.tag)
+            if tag == 'dimension':
+                return el.get('ref')
+            if tag == 'sheetData':
+                return None
+        return None
+
+    def head_rows(self, sheet_name, nrows):
+        """First `nrows` physical rows of a sheet as lists of python values."""
+        raw_rows = []
+        sst_needed = set()
+        row_no = 0
+        for _, el in iterparse(self.zf.open(self.sheet_part(sheet_name))):
+            if _local(el.tag) != 'row':
+                continue
+            row_no = int(el.get('r', row_no + 1))
+            if row_no > nrows:
+                break
+            cells = []
+            col = -1
+            for c in el:
+                if _local(c.tag) != 'c':
+                    continue
+                ref = c.get('r')
+                col = _col_index(_CELL_REF.match(ref).group(1)) if ref else col + 1
+                kind = c.get('t', 'n')
+                style = int(c.get('s', 0))
+                value = None
+                for child in c:
+                    name = _local(child.tag)
+                    if name == 'v':
+                        value = child.text
+                    elif name == 'is':
+                        value = ''.join(t.text or '' for t in child.iter() if _local(t.tag) == 't')
+                if value is None:
+                    continue
+                if kind == 's':
+                    value = int(value)
+                    sst_needed.add(value)
+                cells.append((col, kind, style, value))
+            raw_rows.append((row_no, cells))
+            el.clear()
+
+        strings = self.shared_strings(sst_needed)
+        date_styles = self.date_styles
+        rows = [[] for _ in range(nrows)]
+        for row_no, cells in raw_rows:
+            out = rows[row_no - 1]
+            for col, kind, style, value in cells:
+                converted = _convert(kind, style, value, strings, date_styles)
+                if converted is None:
+                    continue
+                if len(out) <= col:
+                    out.extend([None] * (col + 1 - len(out)))
+                out[col] = converted
+        return rows
+
+
+def _inside_phonetic(si, target):
+    for child in si:
+        if _local(child.tag) == 'rPh' and any(t is target for t in child.iter()):
+            return True
+    return False
+
+
+def _is_date_format(code):
+    code = re.sub(r'"[^"]*"|\[[^\]]*\]|\\.', '', code).lower()
+    return bool(re.search(r'[dmyhs]', code)) and 'general' not in code
+
+
+def _convert(kind, style, value, strings, date_styles):
+    if kind == 's':
+        return strings.get(value)
+    if kind in ('str', 'inlineStr'):
+        return value
+    if kind == 'b':
+        return value == '1'
+    if kind == 'e':
+        return None
+    if kind == 'd':
+        return pd.Timestamp(value).to_pydatetime()
+    number = float(value) if any(ch in value for ch in '.eE') else int(value)
+    if style in date_styles:
+        # Serial day fractions carry float noise; snap to the millisecond like openpyxl
+        stamp = _EXCEL_EPOCH + timedelta(milliseconds=round(number * 86400000))
+        return stamp.time() if 0 <= number < 1 else stamp
+    return number
+
+
+def _label_columns(header_cells, width):
+    """Mirror pandas' header handling: blank labels become 'Unnamed: i', duplicates get '.n'."""
+    labels = []
+    seen = {}
+    for i in range(width):
+        label = header_cells[i] if i < len(header_cells) else None
+        if label is None or (isinstance(label, str) and label == ''):
+            label = f'Unnamed: {i}'
+        if label in seen:
+            base = label
+            while label in seen:
+                seen[base] += 1
+                label = f'{base}.{seen[base]}'
+        seen[label] = 0
+        labels.append(label)
+    return labels
+
+
+def list_sheets(source):
+    """Sheet names in workbook order, without parsing any sheet data."""
+    if is_xlsx(source):
+        with _Workbook(source) as wb:
+            return [name for name, _ in wb.sheets]
+    xl = pd.ExcelFile(_rewind(source))
+    try:
+        return xl.sheet_names
+    finally:
+        xl.close()
+
+
+def sheet_dimensions(source):
+    """{sheet name: declared used range} for every sheet of an xlsx workbook."""
+    with _Workbook(source) as wb:
+        return {name: wb.dimension(name) for name, _ in wb.sheets}
+
+
+def preview_sheet(source, sheet_name=0, header=0, nrows=10):
+    """
+    Return the first `nrows` data rows under `header` (0-based) as a DataFrame,
+    reading only the top of the sheet. Columns follow pd.read_excel naming.
+    """
+    if not is_xlsx(source):
+        return pd.read_excel(_rewind(source), sheet_name=sheet_name, header=header, nrows=nrows)
+
+    with _Workbook(source) as wb:
+        rows = wb.head_rows(sheet_name, header + 1 + max(nrows, PROBE_ROWS))
+
+    # Header positions count blank rows; only trailing blank rows are dropped
+    while rows and not any(v is not None for v in rows[-1]):
+        rows.pop()
+    if len(rows) <= header:
+        return pd.DataFrame()
+    width = max(len(r) for r in rows)
+    columns = _label_columns(rows[header], width)
+    body = [r + [None] * (width - len(r)) for r in rows[header + 1:header + 1 + nrows]]
+    return pd.DataFrame(body, columns=columns)
+
+
+def get_columns(source, sheet_name=0, header=0):
+    """Column labels pd.read_excel would produce for this sheet/header, from the sheet head only."""
+    return preview_sheet(source, sheet_name=sheet_name, header=header, nrows=0).columns.tolist()
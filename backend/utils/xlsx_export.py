@@ -0,0 +1,223 @@
+import datetime
+import logging
+import math
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pandas as pd
+import xlsxwriter
+from flask import Response
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Streaming XLSX export
+# =========================
+# Exports used to go through df.to_excel / pd.ExcelWriter into a BytesIO:
+# pandas turns every cell into an ExcelCell object and xlsxwriter keeps every
+# written cell in memory until close, so a 1M-row report grew to several GB.
+# Here workbooks are opened in xlsxwriter's constant_memory mode: each row is
+# flushed to a temporary file (under EXPORT_TMP_DIR) as soon as the next one
+# starts, so rows must be written in order. write_frame() streams a DataFrame
+# CHUNK_ROWS rows at a time with its formats registered once up front, and
+# produces the same cells as df.to_excel(index=False) (same value
+# conversions, pandas' header style by default). Finished workbooks go to a
+# temporary file that xlsx_response() sends in STREAM_CHUNK pieces (chunked
+# transfer, no full copy in memory) and deletes afterwards.
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+TMP_DIR = os.getenv('EXPORT_TMP_DIR') or None
+CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '10000'))
+STREAM_CHUNK = 1024 * 1024
+# Excel's sheet size (xlsxwriter silently drops cells beyond it)
+MAX_ROWS = 1048576
+MAX_COLS = 16384
+
+# df.to_excel's header style and default date formats
+HEADER_FORMAT = {'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}
+DATETIME_FORMAT = 'YYYY-MM-DD HH:MM:SS'
+DATE_FORMAT = 'YYYY-MM-DD'
+
+
+def open_workbook(target):
+    """Constant-memory xlsxwriter Workbook writing to target (path or binary file); write rows in order."""
+    options = {'constant_memory': True}
+    if TMP_DIR:
+        options['tmpdir'] = TMP_DIR
+    return xlsxwriter.Workbook(target, options)
+
+
+@contextmanager
+def export_file(suffix='.xlsx'):
+    """Path of a temporary file for an export; removed on error (xlsx_response removes it once sent)."""
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix='export_', dir=TMP_DIR)
+    os.close(fd)
+    try:
+        yield path
+    except BaseException:
+        _remove(path)
+        raise
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def register_formats(workbook, formats):
+    """{name: Format} for {name: format properties}, added to the workbook once."""
+    return {name: workbook.add_format(props) for name, props in formats.items()}
+
+
+def _write_number_cells(worksheet, row, col, value, fmt):
+    if value != value:
+        return
+    if math.isinf(value):
+        worksheet.write_string(row, col, 'inf' if value > 0 else '-inf', fmt)
+    else:
+        worksheet.write_number(row, col, value, fmt)
+
+
+def _frame_formats(workbook, body_format):
+    """Cell formats for write_frame, registered once per sheet (xlsxwriter merges duplicates)."""
+    body = dict(body_format or {})
+    formats = register_formats(workbook, {
+        'datetime': dict(body, num_format=DATETIME_FORMAT),
+        'date': dict(body, num_format=DATE_FORMAT),
+        'days': dict(body, num_format='0'),
+    })
+    formats['body'] = workbook.add_format(body) if body else None
+    return formats
+
+
+def _cell_writer(series, formats):
+    """(row chunk -> list of values, write(worksheet, row, col, value)) for a column, like df.to_excel."""
+    dtype = series.dtype
+    fmt = formats['body']
+    numpy_dtype = not isinstance(dtype, pd.api.extensions.ExtensionDtype)
+
+    if numpy_dtype and pd.api.types.is_integer_dtype(dtype):
+        return (lambda chunk: chunk.to_numpy().tolist()), (lambda ws, r, c, v: ws.write_number(r, c, v, fmt))
+
+    if numpy_dtype and pd.api.types.is_float_dtype(dtype):
+        return (lambda chunk: chunk.to_numpy().tolist()), (lambda ws, r, c, v: _write_number_cells(ws, r, c, v, fmt))
+
+    if numpy_dtype and pd.api.types.is_bool_dtype(dtype):
+        return (lambda chunk: chunk.to_numpy().tolist()), (lambda ws, r, c, v: ws.write_boolean(r, c, v, fmt))
+
+    if numpy_dtype and pd.api.types.is_datetime64_dtype(dtype):
+        def write_datetime(worksheet, row, col, value):
+            if value is not pd.NaT:
+                worksheet.write_datetime(row, col, value, formats['datetime'])
+        return (lambda chunk: chunk.astype(object).tolist()), write_datetime
+
+    def write(worksheet, row, col, value):
+        # df.to_excel's conversions (ExcelFormatter._format_value, ExcelWriter._value_with_fmt)
+        if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)):
+            return
+        if pd.api.types.is_integer(value):
+            worksheet.write_number(row, col, int(value), fmt)
+        elif pd.api.types.is_float(value):
+            _write_number_cells(worksheet, row, col, float(value), fmt)
+        elif pd.api.types.is_bool(value):
+            worksheet.write_boolean(row, col, bool(value), fmt)
+        elif isinstance(value, (datetime.datetime, datetime.date)):
+            if getattr(value, 'tzinfo', None) is not None:
+                raise ValueError("Excel does not support datetimes with timezones. "
+                                 "Please ensure that datetimes are timezone unaware before writing to Excel.")
+            kind = 'datetime' if isinstance(value, datetime.datetime) else 'date'
+            worksheet.write_datetime(row, col, value, formats[kind])
+        elif isinstance(value, datetime.timedelta):
+            worksheet.write_number(row, col, value.total_seconds() / 86400, formats['days'])
+        else:
+            worksheet.write(row, col, str(value), fmt)
+    return (lambda chunk: chunk.to_numpy(dtype=object).tolist()), write
+
+
+def write_frame(workbook, sheet_name, df, header_format=HEADER_FORMAT, column_formats=None, column_widths=None,
+                body_format=None, start_row=0):
+    """
+    Write df (header row, then its rows; no index) to a new worksheet, like
+    df.to_excel(index=False), streaming CHUNK_ROWS rows at a time.
+    column_formats / column_widths map column names to set_column formats
+    and widths. Returns the worksheet. Raises ValueError, like df.to_excel,
+    if the header and rows don't fit on a sheet.
+    """
+    num_rows = start_row + 1 + len(df)
+    num_cols = len(df.columns)
+    if num_rows > MAX_ROWS or num_cols > MAX_COLS:
+        raise ValueError(f"This sheet is too large! Your sheet size is: {num_rows}, {num_cols} "
+                         f"Max sheet size is: {MAX_ROWS}, {MAX_COLS}")
+    worksheet = workbook.add_worksheet(sheet_name)
+    header = workbook.add_format(header_format) if header_format else None
+    for column, props in (column_formats or {}).items():
+        if column in df.columns:
+            position = df.columns.get_loc(column)
+            width = (column_widths or {}).get(column)
+            worksheet.set_column(position, position, width, workbook.add_format(props))
+    for column, width in (column_widths or {}).items():
+        if column in df.columns and column not in (column_formats or {}):
+            position = df.columns.get_loc(column)
+            worksheet.set_column(position, position, width)
+
+    for col, name in enumerate(df.columns):
+        worksheet.write(start_row, col, name if isinstance(name, (int, float)) else str(name), header)
+
+    formats = _frame_formats(workbook, body_format)
+    writers = [_cell_writer(df.iloc[:, col], formats) for col in range(len(df.columns))]
+    cells = [write for _, write in writers]
+    row = start_row + 1
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS]
+        columns = [values(chunk.iloc[:, col]) for col, (values, _) in enumerate(writers)]
+        for row_values in zip(*columns):
+            for col, value in enumerate(row_values):
+                cells[col](worksheet, row, col, value)
+            row += 1
+    return worksheet
+
+
+def write_xlsx(target, sheets, **options):
+    """Write [(sheet name, DataFrame)] (or a dict) to target with write_frame; options go to write_frame."""
+    items = sheets.items() if isinstance(sheets, dict) else sheets
+    with open_workbook(target) as workbook:
+        for sheet_name, df in items:
+            write_frame(workbook, sheet_name, df, **options)
+
+
+def xlsx_response(path, download_name, mimetype=XLSX_MIMETYPE):
+    """Attachment response streaming a finished export file in STREAM_CHUNK pieces, deleting it afterwards."""
+    size = os.path.getsize(path)
+
+    def generate():
+        try:
+            with open(path, 'rb') as fh:
+                for chunk in iter(lambda: fh.read(STREAM_CHUNK), b''):
+                    yield chunk
+        finally:
+            _remove(path)
+
+    response = Response(generate(), mimetype=mimetype, direct_passthrough=True)
+    response.headers["Content-Length"] = str(size)
+    response.headers.set("Content-Disposition", "attachment", filename=download_name)
+    return response
+
+
+def frames_response(sheets, download_name, **options):
+    """Streamed .xlsx download of [(sheet name, DataFrame)] written by write_xlsx."""
+    with export_file() as path:
+        write_xlsx(path, sheets, **options)
+    logger.info(f"Export {download_name}: {os.path.getsize(path)} bytes")
+    return xlsx_response(path, download_name)
+
+
+def read_export(path):
+    """Bytes of a finished export file (for base64 JSON responses), removing the file."""
+    try:
+        with open(path, 'rb') as fh:
+            return fh.read()
+    finally:
+        _remove(path)